@@ -7,7 +7,6 @@ from flask_migrate import Migrate
 from flask_swagger_ui import get_swaggerui_blueprint
 from config import Config
 from dotenv import load_dotenv
-from apscheduler.schedulers.background import BackgroundScheduler
 from flask_cors import CORS # <-- 1. IMPORT CORS
 
 # Load environment variables from .env file
@@ -31,10 +30,11 @@ swaggerui_blueprint = get_swaggerui_blueprint(
 )
 # ---------------------------------
 
-def create_app(test_config=None):
+def create_app(test_config=None, start_scheduler=True):
     """
     Creates and configures an instance of the Flask application.
     This is the Application Factory pattern.
+    Pass start_scheduler=False when the caller runs the scheduler itself (see scheduler.py).
     """
     app = Flask(__name__)
 
@@ -50,6 +50,7 @@ def create_app(test_config=None):
          resources={r"/api/*": {"origins": origins}},
          allow_headers=["Authorization", "Content-Type", "X-API-Key", "x-api-key"],
          methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+         expose_headers=["X-Next-Cursor"],
          supports_credentials=True
     )
     # -------------------------
@@ -70,6 +71,26 @@ def create_app(test_config=None):
     db.init_app(app)
     migrate.init_app(app, db)
 
+    # Size the auth caches, the report cache and the token revocation filter from config
+    from .utils.client_cache import client_cache
+    from .utils.report_cache import report_cache
+    from .utils.token_revocation import revocation_filter
+    from .utils.user_cache import user_cache
+    client_cache.init_app(app)
+    report_cache.init_app(app)
+    revocation_filter.init_app(app)
+    user_cache.init_app(app)
+
+    # Set up the shared LLM gateway, the background plan-generation worker pool and the plan cache
+    from .services.plan_job_service import plan_job_service
+    from .services.plan_cache import plan_cache
+    from .services.llm_gateway import llm_gateway
+    from .services.calorie_controller import calorie_controller
+    llm_gateway.init_app(app)
+    calorie_controller.init_app(app)
+    plan_job_service.init_app(app)
+    plan_cache.init_app(app)
+
     # Register Blueprints for all your API routes
     from .api.auth_routes import auth_bp
     from .api.diet_routes import diet_bp
@@ -77,6 +98,7 @@ def create_app(test_config=None):
     from .api.progress_routes import progress_bp
     from .api.reward_routes import reward_bp
     from .api.user_routes import user_bp
+    from .api.job_routes import job_bp
 
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(diet_bp, url_prefix='/api/diet')
@@ -84,18 +106,45 @@ def create_app(test_config=None):
     app.register_blueprint(progress_bp, url_prefix='/api/progress')
     app.register_blueprint(reward_bp, url_prefix='/api/reward')
     app.register_blueprint(user_bp, url_prefix='/api/user')
+    app.register_blueprint(job_bp, url_prefix='/api/jobs')
 
     # Register the Swagger UI blueprint with the app
     app.register_blueprint(swaggerui_blueprint)
 
-    # --- Set up and start the background scheduler ---
-    if not app.config.get("TESTING"):
-        from .services.adaptive_planner_service import run_weekly_adaptive_planning
+    # Keeps daily_nutrition in step with diet_log; `flask rebuild-daily-nutrition` backfills it
+    from .services.nutrition_rollup import rebuild_daily_nutrition_command
+    app.cli.add_command(rebuild_daily_nutrition_command)
+
+    # Keeps progress_bucket in step with the logs; `flask rebuild-progress-buckets` backfills it
+    from .services.progress_buckets import rebuild_progress_buckets_command
+    app.cli.add_command(rebuild_progress_buckets_command)
+
+    # Keeps the activity calendar bitmaps and streaks in step; `flask rebuild-activity-calendar` backfills them
+    from .services.activity_calendar import rebuild_activity_calendar_command
+    app.cli.add_command(rebuild_activity_calendar_command)
+
+    # Exercise names are stored as catalog ids; `flask seed-exercise-catalog` adds the bundled library and aliases
+    from .services.exercise_catalog import seed_exercise_catalog_command
+    app.cli.add_command(seed_exercise_catalog_command)
 
-        scheduler = BackgroundScheduler(daemon=True)
-        scheduler.add_job(run_weekly_adaptive_planning, 'cron', day_of_week='sun', hour=2)
-        scheduler.start()
+    # Keeps exercise_stats in step with the workout logs; `flask rebuild-exercise-stats` backfills it
+    from .services.exercise_stats import rebuild_exercise_stats_command
+    app.cli.add_command(rebuild_exercise_stats_command)
+
+    # Keeps weight_trend in step with the weigh-ins; `flask rebuild-weight-trend` backfills it
+    from .services.weight_trend import rebuild_weight_trend_command
+    app.cli.add_command(rebuild_weight_trend_command)
+
+    # Grants achievements as logs are written; `flask evaluate-achievements` grants already earned ones
+    from .services.achievement_engine import evaluate_achievements_command
+    app.cli.add_command(evaluate_achievements_command)
+
+    # --- Set up the scheduler; only the process holding the lease runs scheduled jobs ---
+    from .services.scheduler_service import leader_scheduler
+    leader_scheduler.init_app(app)
+    if start_scheduler and not app.config.get("TESTING") and leader_scheduler.mode == 'embedded':
+        leader_scheduler.start()
     # ---------------------------------------------
-   
+
     from app import models
     return app
\ No newline at end of file
@@ -6,6 +6,7 @@ from datetime import datetime, timedelta, timezone
 from pydantic import ValidationError
 from app.schemas.user_schemas import UserRegistrationSchema, UserLoginSchema
 from app.utils.decorators import require_api_key, require_jwt
+from app.utils.token_revocation import revocation_filter
 import logging
 import jwt
 import uuid # Import uuid for generating token IDs
@@ -53,6 +54,7 @@ def register_user():
             phone_number=data.phone_number,
             weight_kg=data.weight_kg,
             height_cm=data.height_cm,
+            target_weight_kg=data.target_weight_kg,
             fitness_goals=data.fitness_goals,
             workouts_per_week=data.workouts_per_week,
             workout_duration=data.workout_duration,
@@ -117,7 +119,7 @@ def login_user():
             access_token = jwt.encode({
                 'user_id': user.id,
                 'client_id': g.client.id,
-                'exp': datetime.now(timezone.utc) + timedelta(minutes=15),  # Short-lived token
+                'exp': datetime.now(timezone.utc) + timedelta(minutes=current_app.config.get('ACCESS_TOKEN_EXPIRES_MINUTES', 15)),  # Short-lived token
                 'jti': access_token_id,
                 'type': 'access'
             }, current_app.config['SECRET_KEY'], algorithm="HS256")
@@ -189,7 +191,7 @@ def refresh_token():
             'user_id': payload['user_id'],
             'client_id': payload['client_id'],
             # CORRECTED THIS LINE
-            'exp': datetime.now(timezone.utc) + timedelta(minutes=15),
+            'exp': datetime.now(timezone.utc) + timedelta(minutes=current_app.config.get('ACCESS_TOKEN_EXPIRES_MINUTES', 15)),
             'jti': new_access_token_id,
             'type': 'access'
         }, current_app.config['SECRET_KEY'], algorithm="HS256")
@@ -228,6 +230,9 @@ def logout_user():
         
         # Commit both changes to the database
         db.session.commit()
+
+        # Reject the token in this worker right away; other workers pick it up on refresh
+        revocation_filter.revoke(jti)
         
         return jsonify({"message": "Successfully logged out."}), 200
     except Exception as e:
@@ -3,16 +3,34 @@ from flask import Blueprint, request, jsonify, current_app, g
 from app.models import db, User, DietLog, DietPlan 
 from app.services.diet_planner import DietPlannerService
 from app.services.reporting_service import ReportingService
-import google.generativeai as genai
 from datetime import datetime
 from pydantic import ValidationError
 from app.schemas.diet_schemas import DietLogSchema, GenerateDietPlanSchema
 # --- MODIFIED: Import require_jwt ---
-from app.utils.decorators import require_api_key, require_jwt
+from app.utils.decorators import require_api_key, require_jwt, get_current_user, service_unavailable
+from app.services.plan_job_service import plan_job_service, JobQueueFullError
+from app.services.llm_gateway import llm_gateway
+from app.utils.pagination import parse_page_args, paginate_by_date, page_response
+from app.utils.sse import plan_event_stream
 
 # Create a Blueprint for diet routes
 diet_bp = Blueprint('diet_bp', __name__)
 
+def _store_plan(generated_plan):
+    new_plan = DietPlan(
+        client_id=g.client.id,
+        user_id=g.identity.id,
+        generated_plan=generated_plan
+    )
+    db.session.add(new_plan)
+    db.session.commit()
+    return new_plan
+
+def _save_plan(generated_plan):
+    """Stores a plan that was ready without a background job and returns it."""
+    _store_plan(generated_plan)
+    return jsonify(generated_plan), 200
+
 # This route remains unchanged as it's a B2B client action
 @diet_bp.route('/generate-plan', methods=['POST'])
 @require_api_key
@@ -23,31 +41,77 @@ def generate_diet_plan():
         data = GenerateDietPlanSchema(**raw_data)
     except ValidationError as e:
         return jsonify({"error": "Invalid input", "details": e.errors()}), 400
-    
-    user = g.current_user
-    
-    try:
-        gemini_api_key = current_app.config.get('GEMINI_API_KEY')
-        if not gemini_api_key:
-            raise ValueError("GEMINI_API_KEY not configured in .env file.")
-        genai.configure(api_key=gemini_api_key)
-    except Exception as e:
-        return jsonify({"error": "API Key configuration error", "details": str(e)}), 500
 
-    planner = DietPlannerService(user=user, form_data=data.dict())
-    result = planner.generate_plan()
+    planner = DietPlannerService(user=get_current_user(), form_data=data.model_dump(exclude_none=True),
+                                 engine=g.client.plan_engine)
+
+    # Tenants on the template engine get their plan built locally in milliseconds, so no job is needed
+    if planner.plan_engine == 'template':
+        result = planner.generate_plan()
+        if not result.get("success"):
+            return jsonify({"error": "Could not build a diet plan", "details": result.get("error")}), 400
+        return _save_plan(result['plan'])
 
-    if result.get("success"):
-        new_plan = DietPlan(
+    # Identical inputs were already generated for this tenant: answer straight from the plan cache
+    cached_plan = planner.get_cached_plan()
+    if cached_plan is not None:
+        return _save_plan(cached_plan)
+
+    if not llm_gateway.is_configured():
+        return jsonify({"error": "API Key configuration error", "details": "GEMINI_API_KEY not configured."}), 500
+
+    # Shed load up front while the LLM is overloaded or its circuit breaker is open
+    overload = llm_gateway.admission_error()
+    if overload:
+        return service_unavailable(str(overload), overload.retry_after)
+
+    # Generation takes seconds to minutes, so it runs on the job worker pool
+    try:
+        job = plan_job_service.enqueue(
+            current_app._get_current_object(),
+            kind='diet',
+            user_id=g.identity.id,
             client_id=g.client.id,
-            author=user,
-            generated_plan=result['plan']
+            form_data=data.model_dump(exclude_none=True)
         )
-        db.session.add(new_plan)
-        db.session.commit()
-        return jsonify(result['plan']), 200
-    else:
-        return jsonify({"error": result.get("error")}), 500
+    except JobQueueFullError as e:
+        return service_unavailable(str(e), llm_gateway.retry_after)
+
+    response = jsonify({
+        "message": "Plan generation started.",
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/api/jobs/{job.id}"
+    })
+    response.headers['Location'] = f"/api/jobs/{job.id}"
+    return response, 202
+
+@diet_bp.route('/generate-plan/stream', methods=['POST'])
+@require_api_key
+@require_jwt
+def stream_diet_plan():
+    """
+    Streams the plan as Server-Sent Events: one `day` event per completed day
+    while the model is still writing the rest, then `done` once it is stored.
+    """
+    raw_data = request.get_json()
+    try:
+        data = GenerateDietPlanSchema(**raw_data)
+    except ValidationError as e:
+        return jsonify({"error": "Invalid input", "details": e.errors()}), 400
+
+    planner = DietPlannerService(user=get_current_user(), form_data=data.model_dump(exclude_none=True),
+                                 engine=g.client.plan_engine)
+
+    # Refuse before the stream starts when the plan needs the LLM and it cannot take the call
+    if planner.plan_engine != 'template' and planner.get_cached_plan() is None:
+        if not llm_gateway.is_configured():
+            return jsonify({"error": "API Key configuration error", "details": "GEMINI_API_KEY not configured."}), 500
+        overload = llm_gateway.admission_error()
+        if overload:
+            return service_unavailable(str(overload), overload.retry_after)
+
+    return plan_event_stream(planner.stream_plan(), _store_plan)
 
 # --- MODIFIED: This route is now protected by JWT ---
 @diet_bp.route('/log', methods=['POST'])
@@ -64,8 +128,8 @@ def log_meal():
         macros = data.macros.model_dump() if data.macros else {}
         new_log = DietLog(
             # Use the authenticated user's info from the JWT
-            client_id=g.current_user.client_id,
-            user_id=g.current_user.id,
+            client_id=g.identity.client_id,
+            user_id=g.identity.id,
             meal_name=data.meal_name,
             food_items=data.food_items,
             calories=data.calories,
@@ -74,6 +138,7 @@ def log_meal():
             fat_g=macros.get('fat_g')
         )
         db.session.add(new_log)
+        # The flush also adds the meal to its daily_nutrition row, in this same transaction
         db.session.commit()
         return jsonify({"message": "Meal logged successfully!", "log": new_log.to_dict()}), 201
     except Exception as e:
@@ -84,15 +149,21 @@ def log_meal():
 @diet_bp.route('/logs/me', methods=['GET'])
 @require_jwt
 def get_my_diet_logs():
-    logs = DietLog.query.filter_by(user_id=g.current_user.id).order_by(DietLog.date.desc()).all()
-    return jsonify([log.to_dict() for log in logs]), 200
+    try:
+        limit, position = parse_page_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    query = DietLog.query.filter_by(user_id=g.identity.id)
+    logs, next_cursor = paginate_by_date(query, DietLog, limit, position, descending=True)
+    return page_response([log.to_dict() for log in logs], next_cursor), 200
 
 # --- MODIFIED: Route changed to fetch current user's data ---
 @diet_bp.route('/plan/latest/me', methods=['GET'])
 @require_jwt
 def get_my_latest_diet_plan():
     latest_plan = DietPlan.query.filter_by(
-        user_id=g.current_user.id
+        user_id=g.identity.id
     ).order_by(DietPlan.created_at.desc()).first()
 
     if not latest_plan:
@@ -118,7 +189,7 @@ def get_my_latest_diet_plan():
 @require_jwt
 def get_my_diet_summary():
     try:
-        reporter = ReportingService(g.current_user.id)
+        reporter = ReportingService(g.identity.id)
         summary = reporter.get_weekly_diet_summary()
         return jsonify(summary), 200
     except Exception as e:
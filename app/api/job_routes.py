@@ -0,0 +1,28 @@
+# app/api/job_routes.py
+from flask import Blueprint, jsonify, g
+from app.models import db, PlanJob, DietPlan, WorkoutPlan
+from app.services.plan_job_service import plan_job_service
+from app.utils.decorators import require_jwt
+
+job_bp = Blueprint('job_bp', __name__)
+
+
+@job_bp.route('/<job_id>', methods=['GET'])
+@require_jwt
+def get_job_status(job_id):
+    """
+    Reports the status of a plan generation job owned by the authenticated user.
+    Once the job has succeeded the generated plan is included in the response.
+    """
+    job = PlanJob.query.filter_by(id=job_id, user_id=g.identity.id).first()
+    if not job:
+        return jsonify({"error": "Job not found."}), 404
+    if job.status in ('queued', 'running') and plan_job_service.expire_stale_jobs(job.id):
+        db.session.refresh(job)
+
+    response = job.to_dict()
+    if job.status == 'succeeded' and job.plan_id:
+        plan_model = DietPlan if job.kind == 'diet' else WorkoutPlan
+        plan = db.session.get(plan_model, job.plan_id)
+        response['plan'] = plan.generated_plan if plan else None
+    return jsonify(response), 200
@@ -1,11 +1,15 @@
 from flask import Blueprint, request, jsonify, g
 from app.models import db, User, WeightEntry, MeasurementLog
-from app.services.reporting_service import ReportingService
-from datetime import datetime
+from app.services.reporting_service import ReportingService, ProgressReportService, parse_report_range
+from app.services.activity_calendar import get_activity_calendar
+from app.services.weight_trend import get_weight_trend
+from datetime import datetime, timezone
 from pydantic import ValidationError
 from app.schemas.progress_schemas import WeightLogSchema, MeasurementLogSchema
 # --- MODIFIED: Import require_jwt ---
-from app.utils.decorators import require_api_key, require_jwt
+from app.utils.decorators import require_api_key, require_jwt, get_current_user
+from app.utils.user_cache import user_cache
+from app.utils.pagination import parse_page_args, paginate_by_date, page_response
 
 progress_bp = Blueprint('progress_bp', __name__)
 
@@ -15,12 +19,49 @@ progress_bp = Blueprint('progress_bp', __name__)
 def get_my_weekly_report():
     try:
         # Use the authenticated user's ID
-        reporting_service = ReportingService(g.current_user.id)
+        reporting_service = ReportingService(g.identity.id)
         report = reporting_service.get_weekly_report()
         return jsonify(report), 200
     except Exception as e:
         return jsonify({"error": "Failed to generate report", "details": str(e)}), 500
 
+@progress_bp.route('/report/me', methods=['GET'])
+@require_jwt
+def get_my_progress_report():
+    """
+    Progress between ?from= (inclusive) and ?to= (exclusive), both YYYY-MM-DD
+    UTC dates, broken down by ?granularity= day, week or month.
+    """
+    try:
+        start, end, granularity = parse_report_range(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        report = ProgressReportService(g.identity.id).get_report(start, end, granularity)
+        return jsonify(report), 200
+    except Exception as e:
+        return jsonify({"error": "Failed to generate report", "details": str(e)}), 500
+
+@progress_bp.route('/calendar/me', methods=['GET'])
+@require_jwt
+def get_my_activity_calendar():
+    """
+    The ?year= (default: the current UTC year) activity heatmap for meals,
+    workouts, weigh-ins and any of them, with the logging streaks.
+    """
+    try:
+        year = int(request.args.get('year', datetime.now(timezone.utc).year))
+        if not 1900 <= year <= 9999:
+            raise ValueError
+    except ValueError:
+        return jsonify({"error": "year must be a year between 1900 and 9999"}), 400
+
+    try:
+        return jsonify(get_activity_calendar(g.identity.id, year)), 200
+    except Exception as e:
+        return jsonify({"error": "Failed to load the activity calendar", "details": str(e)}), 500
+
 # --- MODIFIED: This route is now protected by JWT ---
 @progress_bp.route('/weight/log', methods=['POST'])
 @require_jwt
@@ -34,15 +75,17 @@ def log_weight():
 
     try:
         # Use the authenticated user's info from the JWT
-        g.current_user.weight_kg = data.weight_kg
+        get_current_user().weight_kg = data.weight_kg
         new_entry = WeightEntry(
-            client_id=g.current_user.client_id,
-            user_id=g.current_user.id,
+            client_id=g.identity.client_id,
+            user_id=g.identity.id,
             weight_kg=data.weight_kg
         )
         db.session.add(new_entry)
         db.session.commit()
-        return jsonify({"message": "Weight logged successfully!", "entry": new_entry.to_dict()}), 201
+        user_cache.invalidate(g.identity.id)
+        return jsonify({"message": "Weight logged successfully!", "entry": new_entry.to_dict(),
+                        "trend": get_weight_trend(get_current_user())}), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": "Failed to log weight.", "details": str(e)}), 500
@@ -61,8 +104,8 @@ def log_measurements():
     try:
         new_log = MeasurementLog(
             # Use the authenticated user's info from the JWT
-            client_id=g.current_user.client_id,
-            author=g.current_user,
+            client_id=g.identity.client_id,
+            user_id=g.identity.id,
             waist_cm=data.waist_cm,
             chest_cm=data.chest_cm,
             arms_cm=data.arms_cm,
@@ -79,18 +122,40 @@ def log_measurements():
 @progress_bp.route('/weight/me', methods=['GET'])
 @require_jwt
 def get_my_weight_history():
-    history = WeightEntry.query.filter_by(user_id=g.current_user.id).order_by(WeightEntry.date.asc()).all()
-    return jsonify([entry.to_dict() for entry in history]), 200
+    try:
+        limit, position = parse_page_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    query = WeightEntry.query.filter_by(user_id=g.identity.id)
+    history, next_cursor = paginate_by_date(query, WeightEntry, limit, position, descending=False)
+    return page_response([entry.to_dict() for entry in history], next_cursor), 200
+
+@progress_bp.route('/weight/trend/me', methods=['GET'])
+@require_jwt
+def get_my_weight_trend():
+    """
+    The smoothed weight behind /weight/me: the moving average, the weekly
+    rate and the projected date of the profile's target weight.
+    """
+    return jsonify(get_weight_trend(get_current_user())), 200
 
 # --- ADD THIS NEW ROUTE ---
 @progress_bp.route('/measurements/me', methods=['GET'])
 @require_jwt
 def get_my_measurement_history():
     """
-    Fetches the measurement history for the authenticated user.
+    Fetches the measurement history for the authenticated user, oldest first,
+    one page at a time (see app/utils/pagination.py).
     """
     try:
-        history = MeasurementLog.query.filter_by(user_id=g.current_user.id).order_by(MeasurementLog.date.asc()).all()
-        return jsonify([entry.to_dict() for entry in history]), 200
+        limit, position = parse_page_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        query = MeasurementLog.query.filter_by(user_id=g.identity.id)
+        history, next_cursor = paginate_by_date(query, MeasurementLog, limit, position, descending=False)
+        return page_response([entry.to_dict() for entry in history], next_cursor), 200
     except Exception as e:
         return jsonify({"error": "An error occurred while retrieving measurement history.", "details": str(e)}), 500
\ No newline at end of file
@@ -1,30 +1,67 @@
 # app/api/reward_routes.py
-from flask import Blueprint, jsonify, g
-from app.models import User, Achievement
-from app.services.reward_service import RewardService
+from datetime import datetime, timezone
+from flask import Blueprint, jsonify, g, request
+from app.models import Achievement
 # --- MODIFIED: Import require_jwt ---
 from app.utils.decorators import require_api_key, require_jwt
 
 reward_bp = Blueprint('reward_bp', __name__)
 
+# checked_at before anything has been unlocked, so the next ?since= lists everything
+EPOCH = datetime(1970, 1, 1)
+
+
+def _naive_utc(moment):
+    """unlocked_at is stored as naive UTC; compare everything that way."""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
 # --- MODIFIED: Route changed to fetch current user's data ---
 @reward_bp.route('/status/me', methods=['GET'])
 @require_jwt
 def get_my_reward_status():
     """
-    Checks for new rewards and returns all achievements for the authenticated user.
+    Returns all achievements for the authenticated user, newest first.
+    Achievements are granted as meals, weigh-ins and workouts are logged (see
+    achievement_engine), so this is a single indexed read. Pass the previous
+    response's last_id as ?after_id= to get what was unlocked in between
+    listed in newly_unlocked_rewards.
+
+    ?since= (the previous response's checked_at) still works. checked_at is
+    the newest unlocked_at this read saw rather than the time of the read,
+    since unlocked_at is stamped before the achievement commits.
     """
+    after_id = since = None
+    if request.args.get('after_id'):
+        try:
+            after_id = int(request.args['after_id'])
+        except ValueError:
+            return jsonify({"error": "after_id must be an integer"}), 400
+    if request.args.get('since'):
+        try:
+            since = _naive_utc(datetime.fromisoformat(request.args['since'].replace('Z', '+00:00')))
+        except ValueError:
+            return jsonify({"error": "since must be an ISO 8601 timestamp"}), 400
+
     try:
         # Use the authenticated user's ID
-        reward_service = RewardService(g.current_user.id)
-        newly_unlocked = reward_service.check_and_grant_rewards()
-        
-        all_achievements = Achievement.query.filter_by(user_id=g.current_user.id).order_by(Achievement.unlocked_at.desc()).all()
+        all_achievements = Achievement.query.filter_by(user_id=g.identity.id).order_by(Achievement.unlocked_at.desc()).all()
+        if after_id is not None:
+            newly_unlocked = [ach for ach in all_achievements if ach.id > after_id]
+        elif since is not None:
+            newly_unlocked = [ach for ach in all_achievements if _naive_utc(ach.unlocked_at) > since]
+        else:
+            newly_unlocked = []
+        checked_at = max((_naive_utc(ach.unlocked_at) for ach in all_achievements), default=since or EPOCH)
 
         return jsonify({
-            "newly_unlocked_rewards": newly_unlocked,
-            "all_achievements": [ach.to_dict() for ach in all_achievements]
+            "newly_unlocked_rewards": [ach.name for ach in newly_unlocked],
+            "all_achievements": [ach.to_dict() for ach in all_achievements],
+            "last_id": max((ach.id for ach in all_achievements), default=after_id or 0),
+            "checked_at": checked_at.replace(tzinfo=timezone.utc).isoformat()
         }), 200
 
     except Exception as e:
-        return jsonify({"error": "Failed to check rewards", "details": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": "Failed to check rewards", "details": str(e)}), 500
@@ -1,7 +1,8 @@
 # app/api/user_routes.py
 
-from flask import Blueprint, jsonify, g, request
-from app.utils.decorators import require_jwt
+from flask import Blueprint, jsonify, request
+from app.utils.decorators import require_jwt, get_current_user
+from app.utils.user_cache import user_cache
 from app.models import db
 from app.schemas.user_schemas import UserProfileUpdateSchema
 from pydantic import ValidationError
@@ -13,7 +14,7 @@ user_bp = Blueprint('user_bp', __name__)
 @require_jwt # This decorator protects the route
 def get_my_profile():
     """Fetches the complete profile for the authenticated user."""
-    user = g.current_user
+    user = get_current_user()
     # Now uses the consistent to_dict() method from the User model
     return jsonify(user.to_dict()), 200
 
@@ -24,7 +25,7 @@ def update_my_profile():
     """
     Endpoint for a user to update their own profile details.
     """
-    user = g.current_user
+    user = get_current_user()
     raw_data = request.get_json()
 
     if not raw_data:
@@ -42,6 +43,7 @@ def update_my_profile():
             setattr(user, field, value)
 
         db.session.commit()
+        user_cache.invalidate(user.id)
         
         # Return the updated user profile using the consistent to_dict() method
         return jsonify(user.to_dict()), 200
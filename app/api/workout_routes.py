@@ -1,15 +1,36 @@
 from flask import Blueprint, request, jsonify, current_app, g
-from app.models import db, User, WorkoutLog, ExerciseEntry, WorkoutPlan
+from app.models import db, User, WorkoutLog, ExerciseEntry, ExerciseStats, WorkoutPlan
+from sqlalchemy.orm import selectinload
 from app.services.workout_planner_service import WorkoutPlannerService
-import google.generativeai as genai
+from app.services.exercise_catalog import exercise_catalog
+from app.services.training_analytics import TrainingAnalyticsService, parse_analytics_weeks
 from datetime import datetime
 from pydantic import ValidationError
 from app.schemas.workout_schemas import GenerateWorkoutPlanSchema, WorkoutLogSchema
 # --- MODIFIED: Import require_jwt ---
-from app.utils.decorators import require_api_key, require_jwt
+from app.utils.decorators import require_api_key, require_jwt, get_current_user, service_unavailable
+from app.services.plan_job_service import plan_job_service, JobQueueFullError
+from app.services.llm_gateway import llm_gateway
+from app.utils.pagination import parse_page_args, paginate_by_date, page_response
+from app.utils.sse import plan_event_stream
 
 workout_bp = Blueprint('workout_bp', __name__)
 
+def _store_plan(generated_plan):
+    new_plan = WorkoutPlan(
+        client_id=g.client.id,
+        user_id=g.identity.id,
+        generated_plan=generated_plan
+    )
+    db.session.add(new_plan)
+    db.session.commit()
+    return new_plan
+
+def _save_plan(generated_plan):
+    """Stores a plan that was ready without a background job and returns it."""
+    _store_plan(generated_plan)
+    return jsonify(generated_plan), 200
+
 # This route remains unchanged as it's a B2B client action
 @workout_bp.route('/generate-plan', methods=['POST'])
 @require_api_key
@@ -21,30 +42,83 @@ def generate_workout_plan():
     except ValidationError as e:
         return jsonify({"error": "Invalid input", "details": e.errors()}), 400
 
-    user = g.current_user
-    
-    try:
-        gemini_api_key = current_app.config.get('GEMINI_API_KEY')
-        if not gemini_api_key:
-            raise ValueError("GEMINI_API_KEY not configured.")
-        genai.configure(api_key=gemini_api_key)
-    except Exception as e:
-        return jsonify({"error": "API Key configuration error", "details": str(e)}), 500
+    planner = WorkoutPlannerService(user=get_current_user(), form_data=data.model_dump(exclude_none=True),
+                                    engine=g.client.workout_engine)
+
+    # Identical inputs were already generated for this tenant: answer straight from the plan cache
+    cached_plan = planner.get_cached_plan()
+    if cached_plan is not None:
+        return _save_plan(cached_plan)
+
+    # Refinement is optional: while the LLM is unavailable, refine tenants get the template draft as is
+    if planner.plan_engine == 'refine' and (not llm_gateway.is_configured() or llm_gateway.admission_error()):
+        planner.engine = 'template'
 
-    planner = WorkoutPlannerService(user=user, form_data=data.dict())
-    result = planner.generate_plan()
+    # Tenants on the template engine get their plan built locally in milliseconds, so no job is needed
+    if planner.plan_engine == 'template':
+        result = planner.generate_plan()
+        if not result.get("success"):
+            return jsonify({"error": "Could not build a workout plan", "details": result.get("error")}), 400
+        return _save_plan(result['plan'])
 
-    if result.get("success"):
-        new_plan = WorkoutPlan(
+    if not llm_gateway.is_configured():
+        return jsonify({"error": "API Key configuration error", "details": "GEMINI_API_KEY not configured."}), 500
+
+    # Shed load up front while the LLM is overloaded or its circuit breaker is open
+    overload = llm_gateway.admission_error()
+    if overload:
+        return service_unavailable(str(overload), overload.retry_after)
+
+    # Generation takes seconds to minutes, so it runs on the job worker pool
+    try:
+        job = plan_job_service.enqueue(
+            current_app._get_current_object(),
+            kind='workout',
+            user_id=g.identity.id,
             client_id=g.client.id,
-            author=user, 
-            generated_plan=result['plan']
+            form_data=data.model_dump(exclude_none=True)
         )
-        db.session.add(new_plan)
-        db.session.commit()
-        return jsonify(result['plan']), 200
-    else:
-        return jsonify({"error": result.get("error")}), 500
+    except JobQueueFullError as e:
+        return service_unavailable(str(e), llm_gateway.retry_after)
+
+    response = jsonify({
+        "message": "Plan generation started.",
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/api/jobs/{job.id}"
+    })
+    response.headers['Location'] = f"/api/jobs/{job.id}"
+    return response, 202
+
+@workout_bp.route('/generate-plan/stream', methods=['POST'])
+@require_api_key
+@require_jwt
+def stream_workout_plan():
+    """
+    Streams the plan as Server-Sent Events: one `day` event per completed day
+    while the model is still writing the rest, then `done` once it is stored.
+    """
+    raw_data = request.get_json()
+    try:
+        data = GenerateWorkoutPlanSchema(**raw_data)
+    except ValidationError as e:
+        return jsonify({"error": "Invalid input", "details": e.errors()}), 400
+
+    planner = WorkoutPlannerService(user=get_current_user(), form_data=data.model_dump(exclude_none=True),
+                                    engine=g.client.workout_engine)
+    # As in generate_workout_plan, refine tenants get the template draft while the LLM is unavailable
+    if planner.plan_engine == 'refine' and (not llm_gateway.is_configured() or llm_gateway.admission_error()):
+        planner.engine = 'template'
+
+    # Refuse before the stream starts when the plan needs the LLM and it cannot take the call
+    if planner.plan_engine != 'template' and planner.get_cached_plan() is None:
+        if not llm_gateway.is_configured():
+            return jsonify({"error": "API Key configuration error", "details": "GEMINI_API_KEY not configured."}), 500
+        overload = llm_gateway.admission_error()
+        if overload:
+            return service_unavailable(str(overload), overload.retry_after)
+
+    return plan_event_stream(planner.stream_plan(), _store_plan)
 
 # --- MODIFIED: This route is now protected by JWT ---
 @workout_bp.route('/log', methods=['POST'])
@@ -58,19 +132,22 @@ def log_workout():
         return jsonify({"error": "Invalid input", "details": e.errors()}), 400
 
     try:
+        # One catalog id per name; names seen before resolve from memory
+        exercise_ids = exercise_catalog.resolve([ex_data.name for ex_data in data.exercises])
+
         new_workout_log = WorkoutLog(
             # Use the authenticated user's info from the JWT
-            client_id=g.current_user.client_id,
-            user_id=g.current_user.id,
+            client_id=g.identity.client_id,
+            user_id=g.identity.id,
             name=data.name
         )
+        # The workout and its entries go out in one flush at commit
         db.session.add(new_workout_log)
-        db.session.flush()
 
-        for ex_data in data.exercises:
+        for ex_data, exercise_id in zip(data.exercises, exercise_ids):
             exercise_entry = ExerciseEntry(
-                client_id=g.current_user.client_id,
-                name=ex_data.name,
+                client_id=g.identity.client_id,
+                exercise_id=exercise_id,
                 sets=ex_data.sets,
                 reps=ex_data.reps,
                 weight=ex_data.weight,
@@ -92,8 +169,56 @@ def log_workout():
 @workout_bp.route('/history/me', methods=['GET'])
 @require_jwt
 def get_my_workout_history():
-    logs = WorkoutLog.query.filter_by(user_id=g.current_user.id).order_by(WorkoutLog.date.desc()).all()
-    return jsonify([log.to_dict() for log in logs]), 200
+    try:
+        limit, position = parse_page_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Load every page's exercises in one batched IN query instead of one query per workout
+    query = WorkoutLog.query.filter_by(user_id=g.identity.id).options(selectinload(WorkoutLog.exercises))
+    logs, next_cursor = paginate_by_date(query, WorkoutLog, limit, position, descending=True)
+    return page_response([log.to_dict() for log in logs], next_cursor), 200
+
+@workout_bp.route('/exercises/me', methods=['GET'])
+@require_jwt
+def get_my_exercise_stats():
+    """
+    Personal records, last session and totals for every exercise the
+    authenticated user has logged, from one primary key range read.
+    """
+    stats = ExerciseStats.query.filter_by(user_id=g.identity.id).all()
+    stats.sort(key=lambda row: row.exercise.key)
+    return jsonify([exercise.to_dict() for exercise in stats]), 200
+
+@workout_bp.route('/exercises/me/<path:name>', methods=['GET'])
+@require_jwt
+def get_my_exercise(name):
+    """
+    One exercise's stats, to prefill the next log with what was done last
+    time. `name` may be any spelling or alias the catalog knows.
+    """
+    exercise_id = exercise_catalog.lookup(name)
+    stats = db.session.get(ExerciseStats, (g.identity.id, exercise_id)) if exercise_id else None
+    if not stats:
+        return jsonify({"error": "This exercise has not been logged yet."}), 404
+    return jsonify(stats.to_dict()), 200
+
+@workout_bp.route('/analytics/me', methods=['GET'])
+@require_jwt
+def get_my_training_analytics():
+    """
+    Weekly tonnage, per-exercise frequency and progression over the last
+    ?weeks= ISO weeks (default 12), and the current acute:chronic workload ratio.
+    """
+    try:
+        weeks = parse_analytics_weeks(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        return jsonify(TrainingAnalyticsService(g.identity.id).get_analytics(weeks)), 200
+    except Exception as e:
+        return jsonify({"error": "Failed to compute training analytics", "details": str(e)}), 500
 
 # --- NEW ROUTE TO FETCH THE LATEST WORKOUT PLAN ---
 @workout_bp.route('/plan/latest/me', methods=['GET'])
@@ -106,7 +231,7 @@ def get_my_latest_workout_plan():
         # Query the database for the latest plan created for the current user,
         # ordered by creation date.
         latest_plan = WorkoutPlan.query.filter_by(
-            user_id=g.current_user.id
+            user_id=g.identity.id
         ).order_by(WorkoutPlan.created_at.desc()).first()
 
         # If no plan is found for the user, return a 404 error.
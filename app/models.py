@@ -14,6 +14,10 @@ class Client(db.Model):
     api_key = db.Column(db.String(128), nullable=False, unique=True, index=True)
     # --- ADDED REFERRAL CODE FIELD ---
     referral_code = db.Column(db.String(20), unique=True, index=True)
+    # 'llm' generates plans with the model; 'template' builds them locally from bundled data
+    plan_engine = db.Column(db.String(20), nullable=False, default='llm', server_default='llm')
+    # Workout plans: 'llm', 'template', or 'refine' (a template draft the LLM then improves)
+    workout_engine = db.Column(db.String(20), nullable=False, default='llm', server_default='llm')
     created_at = db.Column(db.DateTime, server_default=db.func.now())
 
     users = db.relationship('User', back_populates='client')
@@ -64,6 +68,9 @@ class User(db.Model):
     sleep_hours = db.Column(db.String(10))
     stress_level = db.Column(db.String(20))
     activity_level = db.Column(db.String(50))
+    target_weight_kg = db.Column(db.Float, nullable=True)  # the goal weight_trend projects a date for
+    # Bumped with every write that can change this user's reports (see report_cache)
+    data_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     client = db.relationship('Client', back_populates='users')
     membership = db.relationship('Membership', back_populates='user', uselist=False, cascade="all, delete-orphan")
@@ -73,6 +80,11 @@ class User(db.Model):
     measurement_logs = db.relationship('MeasurementLog', back_populates='author', lazy=True, cascade="all, delete-orphan")
     workout_plans = db.relationship('WorkoutPlan', back_populates='author', lazy=True, cascade="all, delete-orphan")
     achievements = db.relationship('Achievement', back_populates='author', lazy=True, cascade="all, delete-orphan")
+    achievement_state = db.relationship('AchievementState', uselist=False, cascade="all, delete-orphan")
+    activity_calendars = db.relationship('ActivityCalendar', cascade="all, delete-orphan")
+    activity_streaks = db.relationship('ActivityStreak', cascade="all, delete-orphan")
+    exercise_stats = db.relationship('ExerciseStats', cascade="all, delete-orphan")
+    weight_trend = db.relationship('WeightTrend', uselist=False, cascade="all, delete-orphan")
     diet_plans = db.relationship('DietPlan', back_populates='author', lazy=True, cascade="all, delete-orphan")
     refresh_tokens = db.relationship('RefreshToken', back_populates='user', cascade='all, delete-orphan')
 
@@ -88,6 +100,7 @@ class User(db.Model):
             "phone_number": self.phone_number,
             "height_cm": self.height_cm,
             "weight_kg": self.weight_kg,
+            "target_weight_kg": self.target_weight_kg,
             "fitness_goals": self.fitness_goals,
             "workouts_per_week": self.workouts_per_week,
             "workout_duration": self.workout_duration,
@@ -149,6 +162,7 @@ class DietLog(db.Model):
     author = db.relationship('User', back_populates='diet_logs')
     
     __table_args__ = (
+        db.Index('ix_neondb_diet_log_user_id_date', 'user_id', 'date'),
         {'schema': 'neondb'},
     )
 
@@ -161,6 +175,96 @@ class DietLog(db.Model):
         }
 
 
+class DailyNutrition(db.Model):
+    """Per-user, per-day totals of diet_log, kept in step with every meal logged (see nutrition_rollup)."""
+    __tablename__ = 'daily_nutrition'
+    user_id = db.Column(db.Integer, db.ForeignKey('neondb.user.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)  # UTC date of the meals
+    client_id = db.Column(db.Integer, db.ForeignKey('neondb.clients.id'), nullable=False)
+    calories = db.Column(db.Integer, nullable=False, default=0)
+    protein_g = db.Column(db.Float, nullable=False, default=0)
+    carbs_g = db.Column(db.Float, nullable=False, default=0)
+    fat_g = db.Column(db.Float, nullable=False, default=0)
+    meal_count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        {'schema': 'neondb'},
+    )
+
+    def to_dict(self):
+        return {
+            'day': self.day.isoformat(),
+            'calories': self.calories,
+            'protein_g': self.protein_g, 'carbs_g': self.carbs_g, 'fat_g': self.fat_g,
+            'meal_count': self.meal_count
+        }
+
+
+class ProgressBucket(db.Model):
+    """
+    Day, ISO-week and month aggregates of a user's diet, workout and weight
+    logs, kept in step with those logs (see progress_buckets). Only buckets
+    with activity have a row.
+    """
+    __tablename__ = 'progress_bucket'
+    user_id = db.Column(db.Integer, db.ForeignKey('neondb.user.id'), primary_key=True)
+    grain = db.Column(db.String(5), primary_key=True)  # 'day', 'week' or 'month'
+    start = db.Column(db.Date, primary_key=True)  # UTC date the bucket starts on
+    client_id = db.Column(db.Integer, db.ForeignKey('neondb.clients.id'), nullable=False)
+    calories = db.Column(db.Integer, nullable=False, default=0)
+    protein_g = db.Column(db.Float, nullable=False, default=0)
+    carbs_g = db.Column(db.Float, nullable=False, default=0)
+    fat_g = db.Column(db.Float, nullable=False, default=0)
+    meal_count = db.Column(db.Integer, nullable=False, default=0)
+    logged_days = db.Column(db.Integer, nullable=False, default=0)  # days with at least one meal
+    workouts = db.Column(db.Integer, nullable=False, default=0)
+    weigh_ins = db.Column(db.Integer, nullable=False, default=0)
+    weight_sum = db.Column(db.Float, nullable=False, default=0)
+    weight_min = db.Column(db.Float)
+    weight_max = db.Column(db.Float)
+    first_weight = db.Column(db.Float)
+    first_weighed_at = db.Column(db.DateTime)
+    last_weight = db.Column(db.Float)
+    last_weighed_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        {'schema': 'neondb'},
+    )
+
+
+class ActivityCalendar(db.Model):
+    """
+    One year of one kind of activity for a user, one bit per day, kept in
+    step with the logs (see activity_calendar). Bit n of `days` (least
+    significant bit of each byte first) is day-of-year n + 1, in UTC.
+    """
+    __tablename__ = 'activity_calendar'
+    user_id = db.Column(db.Integer, db.ForeignKey('neondb.user.id'), primary_key=True)
+    activity = db.Column(db.String(10), primary_key=True)  # 'meal', 'workout', 'weight' or 'any'
+    year = db.Column(db.Integer, primary_key=True)
+    client_id = db.Column(db.Integer, db.ForeignKey('neondb.clients.id'), nullable=False)
+    days = db.Column(db.LargeBinary(46), nullable=False)
+
+    __table_args__ = (
+        {'schema': 'neondb'},
+    )
+
+
+class ActivityStreak(db.Model):
+    """A user's running streak of consecutive active UTC days, per kind of activity."""
+    __tablename__ = 'activity_streak'
+    user_id = db.Column(db.Integer, db.ForeignKey('neondb.user.id'), primary_key=True)
+    activity = db.Column(db.String(10), primary_key=True)
+    client_id = db.Column(db.Integer, db.ForeignKey('neondb.clients.id'), nullable=False)
+    current_streak = db.Column(db.Integer, nullable=False, default=0)  # the run ending on last_day
+    longest_streak = db.Column(db.Integer, nullable=False, default=0)
+    last_day = db.Column(db.Date)
+
+    __table_args__ = (
+        {'schema': 'neondb'},
+    )
+
+
 class DietPlan(db.Model):
     __tablename__ = 'diet_plan'
     id = db.Column(db.Integer, primary_key=True)
@@ -173,6 +277,7 @@ class DietPlan(db.Model):
     author = db.relationship('User', back_populates='diet_plans')
 
     __table_args__ = (
+        db.Index('ix_neondb_diet_plan_user_id_created_at', 'user_id', 'created_at'),
         {'schema': 'neondb'},
     )
 
@@ -196,6 +301,7 @@ class WorkoutLog(db.Model):
     exercises = db.relationship('ExerciseEntry', backref='workout_log', lazy=True, cascade="all, delete-orphan")
 
     __table_args__ = (
+        db.Index('ix_neondb_workout_log_user_id_date', 'user_id', 'date'),
         {'schema': 'neondb'},
     )
 
@@ -207,26 +313,94 @@ class WorkoutLog(db.Model):
         }
 
 
+class Exercise(db.Model):
+    """
+    One exercise in the catalog shared by all clients (see exercise_catalog).
+    Entries and stats refer to it by id; `key` is the canonical name.
+    """
+    __tablename__ = 'exercise'
+    __table_args__ = {'schema': 'neondb'}
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(150), unique=True, nullable=False)
+    name = db.Column(db.String(150), nullable=False)
+
+
+class ExerciseAlias(db.Model):
+    """A canonical name that resolves to a catalog exercise, its own key included."""
+    __tablename__ = 'exercise_alias'
+    __table_args__ = {'schema': 'neondb'}
+    alias = db.Column(db.String(150), primary_key=True)
+    exercise_id = db.Column(db.Integer, db.ForeignKey('neondb.exercise.id'), nullable=False)
+
+
 class ExerciseEntry(db.Model):
     __tablename__ = 'exercise_entry'
     __table_args__ = {'schema': 'neondb'}
     id = db.Column(db.Integer, primary_key=True)
     client_id = db.Column(db.Integer, db.ForeignKey('neondb.clients.id'), nullable=False)
-    name = db.Column(db.String(150), nullable=False)
+    exercise_id = db.Column(db.Integer, db.ForeignKey('neondb.exercise.id'), nullable=False, index=True)
     sets = db.Column(db.Integer, nullable=False)
     reps = db.Column(db.Integer, nullable=False)
     weight = db.Column(db.Float, nullable=False)
-    workout_log_id = db.Column(db.Integer, db.ForeignKey('neondb.workout_log.id'), nullable=False)
+    workout_log_id = db.Column(db.Integer, db.ForeignKey('neondb.workout_log.id'), nullable=False, index=True)
 
     client = db.relationship('Client', back_populates='exercise_entries')
+    exercise = db.relationship('Exercise', lazy='joined')
 
     def to_dict(self):
         return {
-            'name': self.name, 'sets': self.sets,
+            'name': self.exercise.name, 'exercise_id': self.exercise_id, 'sets': self.sets,
             'reps': self.reps, 'weight': self.weight
         }
 
 
+class ExerciseStats(db.Model):
+    """
+    A user's running history of one exercise, kept in step with their
+    workout logs (see exercise_stats): the last session for prefill, the
+    personal records and the lifetime totals.
+    """
+    __tablename__ = 'exercise_stats'
+    user_id = db.Column(db.Integer, db.ForeignKey('neondb.user.id'), primary_key=True)
+    exercise_id = db.Column(db.Integer, db.ForeignKey('neondb.exercise.id'), primary_key=True)
+    client_id = db.Column(db.Integer, db.ForeignKey('neondb.clients.id'), nullable=False)
+    session_count = db.Column(db.Integer, nullable=False, default=0)
+    total_sets = db.Column(db.Integer, nullable=False, default=0)
+    total_reps = db.Column(db.Integer, nullable=False, default=0)
+    total_volume = db.Column(db.Float, nullable=False, default=0)  # sets x reps x weight
+    last_performed_at = db.Column(db.DateTime, nullable=False)
+    last_workout_log_id = db.Column(db.Integer, nullable=False)
+    last_session = db.Column(db.JSON, nullable=False)  # [{sets, reps, weight}, ...] of the last workout
+    best_weight = db.Column(db.Float, nullable=False)
+    best_weight_reps = db.Column(db.Integer, nullable=False)
+    best_weight_at = db.Column(db.DateTime, nullable=False)
+    best_e1rm = db.Column(db.Float, nullable=False)  # estimated one-rep max
+    best_e1rm_at = db.Column(db.DateTime, nullable=False)
+
+    exercise = db.relationship('Exercise', lazy='joined')
+
+    __table_args__ = (
+        {'schema': 'neondb'},
+    )
+
+    def to_dict(self):
+        return {
+            'exercise': self.exercise.name,
+            'exercise_id': self.exercise_id,
+            'sessions': self.session_count,
+            'total_sets': self.total_sets,
+            'total_reps': self.total_reps,
+            'total_volume': round(self.total_volume, 2),
+            'last_performed_at': self.last_performed_at.isoformat(),
+            'last_session': self.last_session,
+            'best_weight': self.best_weight,
+            'best_weight_reps': self.best_weight_reps,
+            'best_weight_at': self.best_weight_at.isoformat(),
+            'best_e1rm': self.best_e1rm,
+            'best_e1rm_at': self.best_e1rm_at.isoformat()
+        }
+
+
 class WeightEntry(db.Model):
     __tablename__ = 'weight_entry'
     id = db.Column(db.Integer, primary_key=True)
@@ -239,6 +413,7 @@ class WeightEntry(db.Model):
     author = db.relationship('User', back_populates='weight_history')
 
     __table_args__ = (
+        db.Index('ix_neondb_weight_entry_user_id_date', 'user_id', 'date'),
         {'schema': 'neondb'},
     )
 
@@ -248,6 +423,32 @@ class WeightEntry(db.Model):
         }
 
 
+class WeightTrend(db.Model):
+    """
+    A user's smoothed weight trend, advanced with every weigh-in (see
+    weight_trend): an exponentially weighted moving average of the weight and
+    the sufficient statistics of a linear regression over the weigh-ins, each
+    weighted by how recent it is. Times are in days relative to last_at.
+    """
+    __tablename__ = 'weight_trend'
+    user_id = db.Column(db.Integer, db.ForeignKey('neondb.user.id'), primary_key=True)
+    client_id = db.Column(db.Integer, db.ForeignKey('neondb.clients.id'), nullable=False)
+    entries = db.Column(db.Integer, nullable=False)
+    last_at = db.Column(db.DateTime, nullable=False)  # the latest weigh-in
+    last_kg = db.Column(db.Float, nullable=False)
+    ewma_kg = db.Column(db.Float, nullable=False)
+    # Decayed sums of 1, t, t^2, kg and t*kg over the weigh-ins
+    sum_w = db.Column(db.Float, nullable=False)
+    sum_t = db.Column(db.Float, nullable=False)
+    sum_tt = db.Column(db.Float, nullable=False)
+    sum_kg = db.Column(db.Float, nullable=False)
+    sum_t_kg = db.Column(db.Float, nullable=False)
+
+    __table_args__ = (
+        {'schema': 'neondb'},
+    )
+
+
 class MeasurementLog(db.Model):
     __tablename__ = 'measurement_log'
     id = db.Column(db.Integer, primary_key=True)
@@ -263,6 +464,7 @@ class MeasurementLog(db.Model):
     author = db.relationship('User', back_populates='measurement_logs')
 
     __table_args__ = (
+        db.Index('ix_neondb_measurement_log_user_id_date', 'user_id', 'date'),
         {'schema': 'neondb'},
     )
 
@@ -286,6 +488,7 @@ class WorkoutPlan(db.Model):
     author = db.relationship('User', back_populates='workout_plans')
 
     __table_args__ = (
+        db.Index('ix_neondb_workout_plan_user_id_created_at', 'user_id', 'created_at'),
         {'schema': 'neondb'},
     )
 
@@ -309,6 +512,7 @@ class Achievement(db.Model):
     author = db.relationship('User', back_populates='achievements')
 
     __table_args__ = (
+        db.Index('ix_neondb_achievement_user_id_unlocked_at', 'user_id', 'unlocked_at'),
         {'schema': 'neondb'},
     )
 
@@ -318,6 +522,66 @@ class Achievement(db.Model):
             'description': self.description, 'unlocked_at': self.unlocked_at.isoformat()
         }
 
+class AchievementState(db.Model):
+    """The small per-user state the achievement rules keep between write events (see achievement_engine)."""
+    __tablename__ = 'achievement_state'
+    user_id = db.Column(db.Integer, db.ForeignKey('neondb.user.id'), primary_key=True)
+    client_id = db.Column(db.Integer, db.ForeignKey('neondb.clients.id'), nullable=False)
+    state = db.Column(db.JSON, nullable=False)  # achievements unlocked so far plus each rule's own counters
+    updated_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        {'schema': 'neondb'},
+    )
+
+class PlanJob(db.Model):
+    """A queued diet or workout plan generation, run by the local job worker pool."""
+    __tablename__ = 'plan_job'
+    id = db.Column(db.String(32), primary_key=True, default=lambda: uuid.uuid4().hex)
+    client_id = db.Column(db.Integer, db.ForeignKey('neondb.clients.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('neondb.user.id'), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # 'diet' or 'workout'
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, succeeded, failed
+    form_data = db.Column(db.JSON)
+    plan_id = db.Column(db.Integer)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_neondb_plan_job_user_id_created_at', 'user_id', 'created_at'),
+        {'schema': 'neondb'},
+    )
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'plan_id': self.plan_id,
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class PlanCacheEntry(db.Model):
+    """A generated plan stored under a hash of the normalized inputs that produced it."""
+    __tablename__ = 'plan_cache'
+    key = db.Column(db.String(64), primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # 'diet' or 'workout'
+    plan = db.Column(db.JSON, nullable=False)
+    hit_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    last_used_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc), index=True)
+
+    __table_args__ = (
+        {'schema': 'neondb'},
+    )
+
+
 # --- NEW MODEL FOR TOKEN BLOCKLIST ---
 class TokenBlocklist(db.Model):
     __tablename__ = 'token_blocklist'
@@ -347,4 +611,35 @@ class RefreshToken(db.Model):
     )
 
     def __repr__(self):
-        return f"<RefreshToken for User {self.user_id}>"
\ No newline at end of file
+        return f"<RefreshToken for User {self.user_id}>"
+
+
+class AdaptiveRunCheckpoint(db.Model):
+    """Per-user progress of one weekly adaptive planning run, so a rerun can resume."""
+    __tablename__ = 'adaptive_run_checkpoint'
+    run_key = db.Column(db.String(16), primary_key=True)  # ISO week of the run, e.g. '2026-W42'
+    user_id = db.Column(db.Integer, db.ForeignKey('neondb.user.id'), primary_key=True)
+    status = db.Column(db.String(20), nullable=False)  # succeeded, failed, skipped
+    calorie_adjustment = db.Column(db.Integer)
+    adjustment_source = db.Column(db.String(20))  # controller, llm or default
+    adjustment_inputs = db.Column(db.JSON)  # the report summary and goal the adjustment was based on
+    error = db.Column(db.Text)
+    duration_ms = db.Column(db.Integer)
+    processed_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        {'schema': 'neondb'},
+    )
+
+
+class SchedulerLease(db.Model):
+    """A named, expiring lease; the process holding it is the leader that runs scheduled jobs."""
+    __tablename__ = 'scheduler_lease'
+    name = db.Column(db.String(50), primary_key=True)
+    holder = db.Column(db.String(120), nullable=False)
+    acquired_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        {'schema': 'neondb'},
+    )
@@ -25,6 +25,7 @@ class UserRegistrationSchema(BaseModel):
     gender: Literal['Male', 'Female', 'Other']
     weight_kg: float = Field(gt=20, description="Weight in kilograms, must be greater than 20")
     height_cm: float = Field(gt=100, description="Height in centimeters, must be greater than 100")
+    target_weight_kg: Optional[float] = Field(None, gt=20, description="Goal weight in kilograms, optional")
     fitness_goals: str = Field(min_length=5, max_length=200)
     workouts_per_week: str
     workout_duration: int = Field(gt=0, description="Duration in minutes.")
@@ -61,6 +62,7 @@ class UserProfileUpdateSchema(BaseModel):
     age: Optional[int] = Field(None, gt=13, lt=100)
     gender: Optional[Literal['Male', 'Female', 'Other']] = None
     weight_kg: Optional[float] = Field(None, gt=20)
+    target_weight_kg: Optional[float] = Field(None, gt=20)
     height_cm: Optional[float] = Field(None, gt=100)
     fitness_goals: Optional[str] = Field(None, min_length=5, max_length=200)
     workouts_per_week: Optional[str] = None
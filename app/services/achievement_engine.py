@@ -0,0 +1,284 @@
+# app/services/achievement_engine.py
+
+import logging
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event, func, insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, object_session
+from app.models import (db, User, Achievement, AchievementState, DailyNutrition,
+                        DietLog, WeightEntry, WorkoutLog)
+from app.services.activity_calendar import read_streak
+from app.services.nutrition_rollup import UPSERT_INSERTS
+from app.services.reporting_service import WEEKLY_REPORT_DAYS, adherence_score, calculate_target_calories
+
+logger = logging.getLogger(__name__)
+
+# The write events rules can subscribe to, raised when one of these logs is inserted
+EVENT_SOURCES = {
+    DietLog: 'meal_logged',
+    WeightEntry: 'weight_logged',
+    WorkoutLog: 'workout_logged',
+}
+
+
+class RuleContext:
+    """What a rule sees while it is evaluated for one user."""
+
+    def __init__(self, connection, user_id, events):
+        self.connection = connection
+        self.user_id = user_id
+        self.events = events  # event name -> logs inserted in this flush, in insert order
+        self._profile = None
+
+    def logs(self, event_name):
+        return self.events.get(event_name, [])
+
+    @property
+    def profile(self):
+        """The user's row, read at most once however many rules need it."""
+        if self._profile is None:
+            users = User.__table__
+            self._profile = self.connection.execute(select(users).where(users.c.id == self.user_id)).first()
+        return self._profile
+
+
+class AchievementRule(ABC):
+    """
+    One achievement. A rule names the write events it subscribes to and is
+    evaluated when one of them happens for a user who hasn't unlocked it yet.
+    evaluate() returns the achievement's description to grant it, or None.
+    Anything a rule wants to carry from one event to the next goes in `state`,
+    a small JSON dict per user shared by all rules, so key it by rule.
+    """
+    name = None
+    events = ()
+
+    @abstractmethod
+    def evaluate(self, context, state):
+        """Returns the description to grant the achievement with, or None."""
+
+
+class CheatMealRule(AchievementRule):
+    """At least 90% diet adherence over the weekly report's 7 days."""
+    name = "Cheat Meal Unlocked"
+    events = ('meal_logged',)
+    required_score = 90.0
+
+    def evaluate(self, context, state):
+        start_day = datetime.now(timezone.utc).date() - timedelta(days=WEEKLY_REPORT_DAYS - 1)
+        table = DailyNutrition.__table__
+        daily_calories = context.connection.scalars(select(table.c.calories).where(
+            table.c.user_id == context.user_id,
+            table.c.day >= start_day,
+            table.c.meal_count > 0
+        )).all()
+
+        score = adherence_score(daily_calories, calculate_target_calories(context.profile))
+        if score >= self.required_score:
+            return f"Unlocked for maintaining a {score}% diet adherence for 7 days."
+        return None
+
+
+class WeightLossMilestoneRule(AchievementRule):
+    """The latest weigh-in is 5% below the first one the user ever logged."""
+    name = "5% Weight Loss Milestone"
+    events = ('weight_logged',)
+    percentage_goal = 5.0
+
+    def evaluate(self, context, state):
+        entries = context.logs('weight_logged')
+        if not entries:
+            return None
+        if 'initial_weight_kg' not in state:
+            # Looked up once per user; the starting weight never changes afterwards
+            table = WeightEntry.__table__
+            state['initial_weight_kg'] = context.connection.scalar(
+                select(table.c.weight_kg).where(table.c.user_id == context.user_id)
+                .order_by(table.c.date.asc(), table.c.id.asc()).limit(1)
+            )
+
+        initial_weight = state['initial_weight_kg']
+        # Ensure initial_weight is not zero to avoid division by zero error
+        if not initial_weight:
+            return None
+
+        weight_loss_percentage = ((initial_weight - entries[-1].weight_kg) / initial_weight) * 100
+        if weight_loss_percentage >= self.percentage_goal:
+            return f"Congratulations on losing {weight_loss_percentage:.1f}% of your starting body weight!"
+        return None
+
+
+class WorkoutCountRule(AchievementRule):
+    """Ten workouts logged, counted incrementally."""
+    name = "10 Workouts Logged"
+    events = ('workout_logged',)
+    required_workouts = 10
+
+    def evaluate(self, context, state):
+        if 'workouts_logged' in state:
+            state['workouts_logged'] += len(context.logs('workout_logged'))
+        else:
+            # First workout this rule sees for the user: count the history once, this flush included
+            table = WorkoutLog.__table__
+            state['workouts_logged'] = context.connection.scalar(
+                select(func.count()).select_from(table).where(table.c.user_id == context.user_id)
+            )
+
+        if state['workouts_logged'] >= self.required_workouts:
+            return f"Logged {state['workouts_logged']} workouts."
+        return None
+
+
+class LoggingStreakRule(AchievementRule):
+    """Something logged seven UTC days in a row, read off the activity streak counters."""
+    name = "7-Day Logging Streak"
+    events = ('meal_logged', 'weight_logged', 'workout_logged')
+    required_days = 7
+
+    def evaluate(self, context, state):
+        _, longest_streak, _ = read_streak(context.connection, context.user_id, 'any')
+        if longest_streak >= self.required_days:
+            return f"Logged something {longest_streak} days in a row."
+        return None
+
+
+class AchievementEngine:
+    """
+    Evaluates the achievement rules against write events, inside the flush
+    that wrote the logs, so achievements commit or roll back with them and
+    reading a user's achievements is a single indexed read of `achievement`.
+    """
+
+    def __init__(self, rules=()):
+        self.rules = list(rules)
+
+    def register(self, rule):
+        """Adds a rule; it is evaluated from the next write event on."""
+        self.rules.append(rule)
+        return rule
+
+    def unregister(self, rule):
+        self.rules.remove(rule)
+
+    def process(self, connection, user_id, client_id, events):
+        """
+        Evaluates the rules subscribed to `events` for one user, grants what
+        they unlock and saves the user's state. Returns the names granted.
+        """
+        subscribed = [rule for rule in self.rules if any(name in events for name in rule.events)]
+        if not subscribed:
+            return []
+
+        state, exists = self._load_state(connection, user_id)
+        context = RuleContext(connection, user_id, events)
+        granted = []
+        for rule in subscribed:
+            if rule.name in state['unlocked']:
+                continue
+            try:
+                description = rule.evaluate(context, state)
+            except SQLAlchemyError:
+                raise
+            except Exception:
+                # A rule that can't be evaluated (e.g. an incomplete profile) must not fail the write
+                logger.warning("Achievement rule %r failed for user %s", rule.name, user_id, exc_info=True)
+                continue
+            if description:
+                connection.execute(insert(Achievement.__table__).values(
+                    client_id=client_id, user_id=user_id, name=rule.name,
+                    description=description, unlocked_at=datetime.now(timezone.utc)
+                ))
+                state['unlocked'].append(rule.name)
+                granted.append(rule.name)
+
+        self._save_state(connection, user_id, client_id, state, exists)
+        return granted
+
+    def _load_state(self, connection, user_id):
+        table = AchievementState.__table__
+        # Locked so concurrent writes for the same user evaluate one after the other
+        state = connection.scalar(select(table.c.state).where(table.c.user_id == user_id).with_for_update())
+        if state is not None:
+            return state, True
+
+        # First event for this user: start from what they have already unlocked
+        achievements = Achievement.__table__
+        unlocked = connection.scalars(select(achievements.c.name).where(achievements.c.user_id == user_id)).all()
+        return {'unlocked': list(unlocked)}, False
+
+    def _save_state(self, connection, user_id, client_id, state, exists):
+        table = AchievementState.__table__
+        values = {'state': state, 'updated_at': datetime.now(timezone.utc)}
+        if exists:
+            connection.execute(table.update().where(table.c.user_id == user_id).values(values))
+            return
+        statement = UPSERT_INSERTS[connection.dialect.name](table).values(
+            user_id=user_id, client_id=client_id, **values
+        )
+        connection.execute(statement.on_conflict_do_update(index_elements=[table.c.user_id], set_=values))
+
+
+achievement_engine = AchievementEngine([CheatMealRule(), WeightLossMilestoneRule(), WorkoutCountRule(),
+                                        LoggingStreakRule()])
+
+
+def _record_event(mapper, connection, target):
+    events = object_session(target).info.setdefault('achievement_events', {})
+    user_events = events.setdefault((target.user_id, target.client_id), {})
+    user_events.setdefault(EVENT_SOURCES[mapper.class_], []).append(target)
+
+
+for _model in EVENT_SOURCES:
+    event.listen(_model, 'after_insert', _record_event)
+
+
+@event.listens_for(Session, 'after_flush_postexec')
+def _evaluate_achievements(session, flush_context):
+    # After the flush, so rules read daily_nutrition and the logs including this flush's rows
+    events = session.info.pop('achievement_events', None)
+    if not events:
+        return
+    connection = session.connection()
+    for (user_id, client_id), user_events in events.items():
+        achievement_engine.process(connection, user_id, client_id, user_events)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_events(session):
+    session.info.pop('achievement_events', None)
+
+
+def evaluate_achievements(user_ids=None):
+    """
+    Evaluates every rule for the given users or for everyone, as if each had
+    just logged a meal, a weigh-in (their latest) and a workout. Use it to
+    grant achievements earned before a rule existed. Returns the number granted.
+    """
+    query = db.session.query(User.id, User.client_id).order_by(User.id)
+    if user_ids is not None:
+        query = query.filter(User.id.in_(user_ids))
+
+    granted = 0
+    for user_id, client_id in query.all():
+        latest_weight = WeightEntry.query.filter_by(user_id=user_id).order_by(
+            WeightEntry.date.desc(), WeightEntry.id.desc()).first()
+        events = {
+            'meal_logged': [],
+            'weight_logged': [latest_weight] if latest_weight else [],
+            'workout_logged': [],
+        }
+        granted += len(achievement_engine.process(db.session.connection(), user_id, client_id, events))
+    db.session.commit()
+    return granted
+
+
+@click.command('evaluate-achievements')
+@click.option('--user-id', 'user_ids', type=int, multiple=True, help='Only evaluate these users (repeatable).')
+@with_appcontext
+def evaluate_achievements_command(user_ids):
+    """Grants the achievements users have already earned."""
+    granted = evaluate_achievements(list(user_ids) or None)
+    click.echo(f"Granted {granted} achievements.")
@@ -0,0 +1,314 @@
+# app/services/activity_calendar.py
+
+import logging
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import delete, event, exists, insert, inspect, select, update
+from sqlalchemy.orm import Session, object_session
+from app.models import db, User, ActivityCalendar, ActivityStreak, DietLog, WorkoutLog, WeightEntry
+from .nutrition_rollup import UPSERT_INSERTS, rollup_day
+
+logger = logging.getLogger(__name__)
+
+# The logs that make a day active, and the activity each one counts as
+ACTIVITY_SOURCES = {
+    DietLog: 'meal',
+    WorkoutLog: 'workout',
+    WeightEntry: 'weight',
+}
+ACTIVITY_MODELS = {activity: model for model, activity in ACTIVITY_SOURCES.items()}
+
+# 'any' is a day with at least one of the others
+ACTIVITIES = ('meal', 'workout', 'weight', 'any')
+
+BITMAP_BYTES = 46  # 366 days
+
+
+def days_in_year(year):
+    return (date(year + 1, 1, 1) - date(year, 1, 1)).days
+
+
+def _bit(day):
+    index = day.timetuple().tm_yday - 1
+    return index >> 3, 1 << (index & 7)
+
+
+def is_active(bitmap, day):
+    byte, mask = _bit(day)
+    return bool(bitmap[byte] & mask)
+
+
+def mark_day(bitmap, day, active=True):
+    """Returns a copy of a year's bitmap with `day` set (or cleared)."""
+    bitmap = bytearray(bitmap or bytes(BITMAP_BYTES))
+    byte, mask = _bit(day)
+    if active:
+        bitmap[byte] |= mask
+    else:
+        bitmap[byte] &= ~mask & 0xFF
+    return bytes(bitmap)
+
+
+def bitmap_days(year, bitmap):
+    """The active days of one year's bitmap, in order."""
+    first = date(year, 1, 1)
+    return [first + timedelta(days=index) for index in range(days_in_year(year))
+            if bitmap[index >> 3] & (1 << (index & 7))]
+
+
+def extend_streak(streak, day):
+    """
+    Adds an active day on or after the streak's last day to a
+    (current_streak, longest_streak, last_day) tuple, in O(1).
+    """
+    current, longest, last_day = streak
+    if last_day is not None and day <= last_day:
+        return streak
+    current = current + 1 if last_day == day - timedelta(days=1) else 1
+    return current, max(longest, current), day
+
+
+def streak_from_days(days):
+    """The (current_streak, longest_streak, last_day) of a sorted list of active days."""
+    streak = (0, 0, None)
+    for day in days:
+        streak = extend_streak(streak, day)
+    return streak
+
+
+def live_streak(current, last_day, today):
+    """A stored streak is only still running if its last day is today or yesterday."""
+    if last_day is None or last_day < today - timedelta(days=1):
+        return 0
+    return current
+
+
+def read_streak(connection, user_id, activity):
+    """(current_streak, longest_streak, last_day) for one activity, read off its primary key."""
+    table = ActivityStreak.__table__
+    row = connection.execute(select(table.c.current_streak, table.c.longest_streak, table.c.last_day).where(
+        table.c.user_id == user_id, table.c.activity == activity
+    )).first()
+    return tuple(row) if row else (0, 0, None)
+
+
+def _day_has_logs(connection, user_id, activity, day):
+    table = ACTIVITY_MODELS[activity].__table__
+    start = datetime.combine(day, time.min, timezone.utc)
+    return connection.scalar(select(exists().where(
+        table.c.user_id == user_id, table.c.date >= start, table.c.date < start + timedelta(days=1)
+    )))
+
+
+def _insert_missing(connection, table, rows):
+    """Creates the rows that don't exist yet, so concurrent writers lock the same rows afterwards."""
+    connection.execute(UPSERT_INSERTS[connection.dialect.name](table).values(rows).on_conflict_do_nothing())
+
+
+def update_calendar(connection, user_id, client_id, added, removed):
+    """
+    Applies the (activity, day) pairs a flush added and removed to a user's
+    bitmaps and streaks. A removed day stays active while another log of
+    that activity is left on it. Streaks only moving forward are extended in
+    place; anything else recomputes them from the user's bitmaps.
+    """
+    added = added | {('any', day) for _, day in added}
+    calendar = ActivityCalendar.__table__
+    streaks = ActivityStreak.__table__
+
+    if added:
+        _insert_missing(connection, calendar, [
+            {'user_id': user_id, 'activity': activity, 'year': year, 'client_id': client_id,
+             'days': bytes(BITMAP_BYTES)}
+            for activity, year in {(activity, day.year) for activity, day in added}
+        ])
+    years = {day.year for _, day in added | removed}
+    rows = connection.execute(select(calendar.c.activity, calendar.c.year, calendar.c.days).where(
+        calendar.c.user_id == user_id, calendar.c.year.in_(years)
+    ).with_for_update())
+    original = {(row.activity, row.year): row.days for row in rows}
+    bitmaps = dict(original)
+
+    for activity, day in removed:
+        key = (activity, day.year)
+        if key in bitmaps and not _day_has_logs(connection, user_id, activity, day):
+            bitmaps[key] = mark_day(bitmaps[key], day, active=False)
+    for activity, day in added:
+        bitmaps[(activity, day.year)] = mark_day(bitmaps[(activity, day.year)], day)
+    for _, day in removed:
+        key = ('any', day.year)
+        if key in bitmaps and not any(is_active(bitmaps.get((activity, day.year), bytes(BITMAP_BYTES)), day)
+                                      for activity in ACTIVITY_MODELS):
+            bitmaps[key] = mark_day(bitmaps[key], day, active=False)
+
+    for (activity, year), bitmap in bitmaps.items():
+        if bitmap != original[(activity, year)]:
+            connection.execute(update(calendar).where(
+                calendar.c.user_id == user_id, calendar.c.activity == activity, calendar.c.year == year
+            ).values(days=bitmap))
+
+    added_days = defaultdict(list)
+    for activity, day in added:
+        added_days[activity].append(day)
+    removed_activities = {activity for activity, _ in removed} | ({'any'} if removed else set())
+
+    if added_days:
+        _insert_missing(connection, streaks, [
+            {'user_id': user_id, 'activity': activity, 'client_id': client_id,
+             'current_streak': 0, 'longest_streak': 0, 'last_day': None}
+            for activity in added_days
+        ])
+    current = {row.activity: (row.current_streak, row.longest_streak, row.last_day) for row in connection.execute(
+        select(streaks).where(
+            streaks.c.user_id == user_id, streaks.c.activity.in_(set(added_days) | removed_activities)
+        ).with_for_update()
+    )}
+
+    for activity, streak in current.items():
+        days = sorted(added_days.get(activity, ()))
+        if activity not in removed_activities and (streak[2] is None or days[0] >= streak[2]):
+            for day in days:
+                streak = extend_streak(streak, day)
+        else:
+            # A back-dated or removed day can join or split runs anywhere in the history
+            streak = streak_from_days([day for year, bitmap in connection.execute(
+                select(calendar.c.year, calendar.c.days).where(
+                    calendar.c.user_id == user_id, calendar.c.activity == activity
+                ).order_by(calendar.c.year)
+            ) for day in bitmap_days(year, bitmap)])
+        connection.execute(update(streaks).where(
+            streaks.c.user_id == user_id, streaks.c.activity == activity
+        ).values(current_streak=streak[0], longest_streak=streak[1], last_day=streak[2]))
+
+
+def _touched(target, user_id):
+    touched = object_session(target).info.setdefault('activity_calendar_days', {})
+    return touched.setdefault((user_id, target.client_id), {'added': set(), 'removed': set()})
+
+
+def _record_insert(mapper, connection, target):
+    _touched(target, target.user_id)['added'].add((ACTIVITY_SOURCES[mapper.class_], rollup_day(target.date)))
+
+
+def _record_delete(mapper, connection, target):
+    _touched(target, target.user_id)['removed'].add((ACTIVITY_SOURCES[mapper.class_], rollup_day(target.date)))
+
+
+def _record_update(mapper, connection, target):
+    # Only a log moved to another day or user changes the calendar
+    attrs = inspect(target).attrs
+    old_dates, old_user_ids = attrs.date.history.deleted, attrs.user_id.history.deleted
+    if not (old_dates or old_user_ids):
+        return
+    activity = ACTIVITY_SOURCES[mapper.class_]
+    old_user_id = old_user_ids[0] if old_user_ids else target.user_id
+    old_date = old_dates[0] if old_dates else target.date
+    if old_user_id is not None and old_date is not None:
+        _touched(target, old_user_id)['removed'].add((activity, rollup_day(old_date)))
+    _touched(target, target.user_id)['added'].add((activity, rollup_day(target.date)))
+
+
+for _model in ACTIVITY_SOURCES:
+    event.listen(_model, 'after_insert', _record_insert)
+    event.listen(_model, 'after_update', _record_update)
+    event.listen(_model, 'after_delete', _record_delete)
+
+
+@event.listens_for(Session, 'after_flush')
+def _update_touched_calendars(session, flush_context):
+    # Inside the flush's transaction, before the achievement rules read the streaks
+    touched = session.info.pop('activity_calendar_days', None)
+    if not touched:
+        return
+    connection = session.connection()
+    for (user_id, client_id), changes in touched.items():
+        update_calendar(connection, user_id, client_id, changes['added'], changes['removed'])
+
+
+def get_activity_calendar(user_id, year, today=None):
+    """
+    A year's heatmap per activity as a string of '0'/'1' per day (January
+    1st first), with monthly totals and the streaks. Two primary key reads.
+    """
+    today = today or datetime.now(timezone.utc).date()
+    bitmaps = dict(db.session.query(ActivityCalendar.activity, ActivityCalendar.days).filter(
+        ActivityCalendar.user_id == user_id, ActivityCalendar.year == year
+    ).all())
+    streaks = {streak.activity: streak for streak in ActivityStreak.query.filter_by(user_id=user_id).all()}
+
+    activities = {}
+    for activity in ACTIVITIES:
+        bitmap = bitmaps.get(activity, bytes(BITMAP_BYTES))
+        days = bitmap_days(year, bitmap)
+        streak = streaks.get(activity)
+        activities[activity] = {
+            "days": ''.join('1' if bitmap[index >> 3] & (1 << (index & 7)) else '0'
+                            for index in range(days_in_year(year))),
+            "active_days": len(days),
+            "active_days_by_month": [sum(1 for day in days if day.month == month) for month in range(1, 13)],
+            "current_streak": live_streak(streak.current_streak, streak.last_day, today) if streak else 0,
+            "longest_streak": streak.longest_streak if streak else 0,
+            "last_active": streak.last_day.isoformat() if streak and streak.last_day else None
+        }
+    return {"year": year, "activities": activities}
+
+
+def _active_days(connection, user_id):
+    days = {}
+    for model, activity in ACTIVITY_SOURCES.items():
+        table = model.__table__
+        days[activity] = {rollup_day(logged_at) for logged_at in connection.scalars(
+            select(table.c.date).where(table.c.user_id == user_id)
+        )}
+    days['any'] = set().union(*days.values())
+    return days
+
+
+def rebuild_activity_calendar(user_ids=None):
+    """
+    Recomputes the bitmaps and streaks of the given users, or of everyone,
+    from their logs. Use it to backfill, or after log rows were changed with
+    bulk statements that bypass the flush hooks above. Returns the number of
+    calendar rows written.
+    """
+    users = db.session.query(User.id, User.client_id).order_by(User.id.asc())
+    if user_ids is not None:
+        users = users.filter(User.id.in_(user_ids))
+
+    connection = db.session.connection()
+    calendar = ActivityCalendar.__table__
+    streaks = ActivityStreak.__table__
+    written = 0
+    for user_id, client_id in users.all():
+        connection.execute(delete(calendar).where(calendar.c.user_id == user_id))
+        connection.execute(delete(streaks).where(streaks.c.user_id == user_id))
+
+        calendar_rows, streak_rows = [], []
+        for activity, days in _active_days(connection, user_id).items():
+            if not days:
+                continue
+            bitmaps = {}
+            for day in days:
+                bitmaps[day.year] = mark_day(bitmaps.get(day.year), day)
+            calendar_rows.extend({'user_id': user_id, 'activity': activity, 'year': year,
+                                  'client_id': client_id, 'days': bitmap} for year, bitmap in bitmaps.items())
+            current, longest, last_day = streak_from_days(sorted(days))
+            streak_rows.append({'user_id': user_id, 'activity': activity, 'client_id': client_id,
+                                'current_streak': current, 'longest_streak': longest, 'last_day': last_day})
+        if calendar_rows:
+            connection.execute(insert(calendar), calendar_rows)
+            connection.execute(insert(streaks), streak_rows)
+        written += len(calendar_rows)
+    db.session.commit()
+    return written
+
+
+@click.command('rebuild-activity-calendar')
+@click.option('--user-id', 'user_ids', type=int, multiple=True, help='Only rebuild these users (repeatable).')
+@with_appcontext
+def rebuild_activity_calendar_command(user_ids):
+    """Recomputes the activity calendar bitmaps and streaks from the logs."""
+    rows = rebuild_activity_calendar(list(user_ids) or None)
+    click.echo(f"Rebuilt {rows} activity_calendar rows.")
@@ -1,9 +1,14 @@
 # app/services/adaptive_planner_service.py
 
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
 from flask import current_app
-import google.generativeai as genai
-from app.models import db, User, WorkoutPlan
-from .reporting_service import ReportingService
+from app.models import db, User, WorkoutPlan, AdaptiveRunCheckpoint
+from .llm_gateway import llm_gateway
+from .reporting_service import BatchReportingService
+from .calorie_controller import calorie_controller
 from .diet_planner import DietPlannerService
 from .workout_planner_service import WorkoutPlannerService
 import json
@@ -13,16 +18,14 @@ class AdaptivePlannerService:
     A service dedicated to the weekly adaptive planning loop.
     """
     def __init__(self):
-        # Configure the Gemini API once for the job
+        # The shared LLM gateway owns the model; just confirm it can be used for this job
         try:
-            gemini_api_key = current_app.config.get('GEMINI_API_KEY')
-            if not gemini_api_key:
+            if not llm_gateway.is_configured():
                 raise ValueError("GEMINI_API_KEY not configured.")
-            genai.configure(api_key=gemini_api_key)
-            self.model = genai.GenerativeModel('gemini-2.5-pro')
+            self.llm_ready = True
         except Exception as e:
             print(f"A critical error occurred during API configuration: {e}")
-            self.model = None
+            self.llm_ready = False
 
     def _get_dynamic_adjustment(self, user, report):
         """
@@ -44,54 +47,208 @@ class AdaptivePlannerService:
         """
 
         try:
-            response = self.model.generate_content(prompt)
+            response_text = llm_gateway.generate(prompt)
             # Clean up the response and convert to integer
-            adjustment = int(response.text.strip())
+            adjustment = int(response_text.strip())
             return adjustment
         except Exception as e:
             print(f"    - Could not get dynamic adjustment from AI: {e}. Defaulting to 0.")
-            return 0 # Default to no adjustment if AI fails
+            return None # The caller falls back to no adjustment
 
-    def run_for_all_users(self):
+    def _process_user(self, user_id, report, calorie_adjustment=None):
         """
-        Iterates through all users and generates new, adjusted plans.
+        Runs the adjustment and plan generation for one user and returns
+        (status, calorie_adjustment, adjustment_source, error). Without a
+        precomputed adjustment the LLM is asked for one.
+        Must be called inside an app context.
         """
-        if not self.model:
-            print("Aborting job due to API configuration error.")
-            return
+        user = db.session.get(User, user_id)
+        print(f"Processing user: {user.name} (ID: {user.id})")
+
+        if calorie_adjustment is not None:
+            adjustment_source = 'controller'
+            print(f"  - Controller calorie adjustment: {calorie_adjustment} kcal")
+        else:
+            # Get the dynamic calorie adjustment from the AI
+            calorie_adjustment = self._get_dynamic_adjustment(user, report)
+            adjustment_source = 'llm'
+            if calorie_adjustment is None:
+                calorie_adjustment, adjustment_source = 0, 'default'
+            print(f"  - AI suggested calorie adjustment of: {calorie_adjustment} kcal")
+
+        # Generate new plans with the dynamic adjustment
+        diet_planner = DietPlannerService(user, form_data={})
+        diet_result = diet_planner.generate_plan(calorie_adjustment=calorie_adjustment)
+
+        if not diet_result.get("success"):
+            return 'failed', calorie_adjustment, adjustment_source, diet_result.get("error")
+        print(f"  - Successfully generated new diet plan for {user.name}.")
 
-        all_users = User.query.all()
-        for user in all_users:
+        # You could similarly add logic to adjust and regenerate workout plans
+        return 'succeeded', calorie_adjustment, adjustment_source, None
+
+    def _run_user(self, app, run_key, user_id, report, calorie_adjustment=None):
+        """Worker entry point: processes one user in its own app context and checkpoints the outcome."""
+        started = time.monotonic()
+        with app.app_context():
             try:
-                print(f"Processing user: {user.name} (ID: {user.id})")
-                
-                reporter = ReportingService(user.id)
-                report = reporter.get_weekly_report()
-                
-                # Get the dynamic calorie adjustment from the AI
-                calorie_adjustment = self._get_dynamic_adjustment(user, report)
-                print(f"  - AI suggested calorie adjustment of: {calorie_adjustment} kcal")
-
-                # Generate new plans with the dynamic adjustment
-                diet_planner = DietPlannerService(user, form_data={})
-                diet_result = diet_planner.generate_plan(calorie_adjustment=calorie_adjustment)
-                
-                if diet_result.get("success"):
-                    print(f"  - Successfully generated new diet plan for {user.name}.")
-                
-                # You could similarly add logic to adjust and regenerate workout plans
-                
+                status, calorie_adjustment, adjustment_source, error = \
+                    self._process_user(user_id, report, calorie_adjustment)
             except Exception as e:
-                print(f"  - An error occurred for user {user.id}: {e}")
-                continue
-        
-        # This part of the logic does not directly interact with the DB,
-        # so commit is not needed here. Plan saving happens in the planner services.
+                db.session.rollback()
+                print(f"  - An error occurred for user {user_id}: {e}")
+                status, adjustment_source, error = 'failed', None, str(e)
+
+            duration = time.monotonic() - started
+            user = db.session.get(User, user_id)
+            db.session.merge(AdaptiveRunCheckpoint(
+                run_key=run_key, user_id=user_id, status=status,
+                calorie_adjustment=calorie_adjustment, adjustment_source=adjustment_source,
+                adjustment_inputs=dict(report['summary'], fitness_goals=user.fitness_goals),
+                error=error,
+                duration_ms=int(duration * 1000), processed_at=datetime.now(timezone.utc)
+            ))
+            db.session.commit()
+        return status, duration
+
+    def _skip_user(self, run_key, user_id):
+        print(f"  - Skipping user {user_id}: profile is incomplete.")
+        db.session.merge(AdaptiveRunCheckpoint(run_key=run_key, user_id=user_id, status='skipped',
+                                               error='Profile is incomplete.', duration_ms=0,
+                                               processed_at=datetime.now(timezone.utc)))
+        db.session.commit()
+
+    def run_for_all_users(self, run_key=None, workers=None):
+        """
+        Generates new, adjusted plans for every user on a bounded thread pool.
+
+        Each user's outcome is checkpointed under run_key (the current ISO week by
+        default), so rerunning the same week skips users that already succeeded
+        or were skipped and retries only failures and users never reached.
+        Returns the run statistics, or None if the job could not start.
+        """
+        if not self.llm_ready:
+            print("Aborting job due to API configuration error.")
+            return None
+
+        app = current_app._get_current_object()
+        run_key = run_key or current_run_key()
+        workers = workers or app.config.get('ADAPTIVE_JOB_WORKERS', 4)
+        # The local controller computes adjustments for a whole chunk at once; 'llm' asks per user
+        use_llm = app.config.get('CALORIE_ADJUSTMENT_MODE', 'controller') == 'llm'
+        stats = RunStats(run_key)
+
+        # Reports are built a chunk of users at a time with a few grouped queries
+        reporter = BatchReportingService(chunk_size=app.config.get('REPORT_BATCH_SIZE', 1000))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='adaptive-plan') as executor:
+            for users in reporter.iter_user_chunks():
+                done = {user_id for (user_id,) in db.session.query(AdaptiveRunCheckpoint.user_id).filter(
+                    AdaptiveRunCheckpoint.run_key == run_key,
+                    AdaptiveRunCheckpoint.user_id.in_([user.id for user in users]),
+                    AdaptiveRunCheckpoint.status.in_(('succeeded', 'skipped'))
+                )}
+                pending = [user for user in users if user.id not in done]
+                stats.resumed += len(users) - len(pending)
+                reports = reporter.get_weekly_reports(pending)
+                adjustments = {} if use_llm else calorie_controller.adjust_reports(pending, reports)
+
+                futures = []
+                for user in pending:
+                    if user.id not in reports:
+                        self._skip_user(run_key, user.id)
+                        stats.skipped += 1
+                        continue
+                    futures.append(executor.submit(self._run_user, app, run_key, user.id, reports[user.id],
+                                                   adjustments.get(user.id)))
+
+                # Finish the chunk before reading the next one, so at most one chunk is in memory
+                for future in as_completed(futures):
+                    status, duration = future.result()
+                    stats.record(status, duration)
+
+        summary = stats.summary()
+        print(f"Run {run_key}: {summary['processed']} users in {summary['elapsed_seconds']}s "
+              f"({summary['users_per_minute']} users/min), {summary['failed']} failed, "
+              f"{summary['skipped']} skipped, {summary['resumed']} already done; "
+              f"latency p50={summary['latency_p50_s']}s p95={summary['latency_p95_s']}s "
+              f"p99={summary['latency_p99_s']}s max={summary['latency_max_s']}s")
+        return summary
+
+
+def current_run_key(now=None):
+    """Names a weekly run after its ISO week, so every rerun in the same week resumes it."""
+    year, week, _ = (now or datetime.now(timezone.utc)).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+class RunStats:
+    """Collects per-user outcomes and latencies for one adaptive planning run."""
+    def __init__(self, run_key):
+        self.run_key = run_key
+        self.started = time.monotonic()
+        self.succeeded = 0
+        self.failed = 0
+        self.skipped = 0
+        self.resumed = 0
+        self.latencies = []
+
+    def record(self, status, duration):
+        if status == 'succeeded':
+            self.succeeded += 1
+        else:
+            self.failed += 1
+        self.latencies.append(duration)
+
+    @staticmethod
+    def _percentile(ordered, pct):
+        if not ordered:
+            return 0.0
+        # Nearest-rank percentile
+        rank = max(1, math.ceil(pct / 100 * len(ordered)))
+        return round(ordered[rank - 1], 3)
+
+    def summary(self):
+        elapsed = time.monotonic() - self.started
+        ordered = sorted(self.latencies)
+        processed = self.succeeded + self.failed
+        return {
+            "run_key": self.run_key,
+            "processed": processed,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "resumed": self.resumed,
+            "elapsed_seconds": round(elapsed, 2),
+            "users_per_minute": round(processed / elapsed * 60, 2) if elapsed else 0.0,
+            "latency_p50_s": self._percentile(ordered, 50),
+            "latency_p95_s": self._percentile(ordered, 95),
+            "latency_p99_s": self._percentile(ordered, 99),
+            "latency_max_s": round(ordered[-1], 3) if ordered else 0.0
+        }
+
+
+def compare_controller_with_llm(run_key=None):
+    """
+    Compares the local calorie controller with the LLM adjustments recorded
+    in the run checkpoints (all runs, or one run_key). Run a week with
+    CALORIE_ADJUSTMENT_MODE='llm' to record a sample.
+    """
+    query = AdaptiveRunCheckpoint.query.filter(AdaptiveRunCheckpoint.adjustment_source == 'llm')
+    if run_key:
+        query = query.filter(AdaptiveRunCheckpoint.run_key == run_key)
+
+    records = [
+        dict(checkpoint.adjustment_inputs, llm_adjustment=checkpoint.calorie_adjustment)
+        for checkpoint in query if checkpoint.adjustment_inputs
+    ]
+    return calorie_controller.compare(records)
+
 
 # This is the function the scheduler will call
-def run_weekly_adaptive_planning():
+def run_weekly_adaptive_planning(app=None):
     print("Starting weekly adaptive planning job...")
-    from run import app
+    if app is None:
+        from run import app
     with app.app_context():
         planner = AdaptivePlannerService()
         planner.run_for_all_users()
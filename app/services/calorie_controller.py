@@ -0,0 +1,109 @@
+# app/services/calorie_controller.py
+
+import numpy as np
+
+# Energy content of one kg of body weight; spread over a week this is ~1100 kcal/day per kg/week
+KCAL_PER_KG = 7700
+
+GOAL_LOSS = -1
+GOAL_MAINTAIN = 0
+GOAL_GAIN = 1
+
+
+def goal_direction(fitness_goals):
+    """Classifies a free-text goal the same way the calorie target does: loss, gain or maintain."""
+    goal = (fitness_goals or '').lower()
+    if 'loss' in goal:
+        return GOAL_LOSS
+    if 'gain' in goal:
+        return GOAL_GAIN
+    return GOAL_MAINTAIN
+
+
+class CalorieController:
+    """
+    A deterministic proportional controller for the weekly calorie adjustment.
+
+    For each user it compares last week's weight change with the weekly
+    change their goal aims for and converts the shortfall into a daily
+    calorie correction. Small errors inside the deadband are ignored, weeks
+    with poor diet adherence are not adjusted (the target was not what
+    moved the scale), and results are clipped and rounded to a step.
+    All inputs are arrays, so a whole batch of users is one computation.
+    """
+    def __init__(self, target_rate_kg=0.5, gain=0.5, deadband_kg=0.1, min_adherence=60,
+                 max_adjustment=300, step=50):
+        self.target_rate_kg = target_rate_kg
+        self.gain = gain
+        self.deadband_kg = deadband_kg
+        self.min_adherence = min_adherence
+        self.max_adjustment = max_adjustment
+        self.step = step
+
+    def init_app(self, app):
+        self.target_rate_kg = app.config.get('CALORIE_CONTROLLER_TARGET_RATE_KG', 0.5)
+        self.gain = app.config.get('CALORIE_CONTROLLER_GAIN', 0.5)
+        self.deadband_kg = app.config.get('CALORIE_CONTROLLER_DEADBAND_KG', 0.1)
+        self.min_adherence = app.config.get('CALORIE_CONTROLLER_MIN_ADHERENCE', 60)
+        self.max_adjustment = app.config.get('CALORIE_CONTROLLER_MAX_ADJUSTMENT', 300)
+        self.step = app.config.get('CALORIE_CONTROLLER_STEP', 50)
+
+    def compute(self, directions, weight_changes, adherence):
+        """
+        Returns an int array of daily calorie adjustments.
+        directions holds GOAL_LOSS / GOAL_MAINTAIN / GOAL_GAIN per user,
+        weight_changes the kg change over the week and adherence the 0-100 score.
+        """
+        directions = np.asarray(directions, dtype=float)
+        weight_changes = np.asarray(weight_changes, dtype=float)
+        adherence = np.asarray(adherence, dtype=float)
+
+        error_kg = directions * self.target_rate_kg - weight_changes
+        error_kg = np.where(np.abs(error_kg) < self.deadband_kg, 0.0, error_kg)
+
+        adjustment = self.gain * error_kg * KCAL_PER_KG / 7
+        adjustment = np.where(adherence < self.min_adherence, 0.0, adjustment)
+        adjustment = np.clip(adjustment, -self.max_adjustment, self.max_adjustment)
+        return (np.round(adjustment / self.step) * self.step).astype(int)
+
+    def adjust_reports(self, users, reports):
+        """Returns {user_id: adjustment} for users with a weekly report, computed as one batch."""
+        users = [user for user in users if user.id in reports]
+        if not users:
+            return {}
+        summaries = [reports[user.id]['summary'] for user in users]
+        adjustments = self.compute(
+            [goal_direction(user.fitness_goals) for user in users],
+            [summary['weight_change_kg'] for summary in summaries],
+            [summary['diet_adherence_score'] for summary in summaries]
+        )
+        return {user.id: int(adjustment) for user, adjustment in zip(users, adjustments)}
+
+    def compare(self, records):
+        """
+        Measures how closely the controller agrees with recorded LLM adjustments.
+        Each record needs 'fitness_goals', 'weight_change_kg', 'diet_adherence_score'
+        and 'llm_adjustment'.
+        """
+        if not records:
+            return {"records": 0}
+
+        recorded = np.array([record['llm_adjustment'] for record in records], dtype=float)
+        computed = self.compute(
+            [goal_direction(record['fitness_goals']) for record in records],
+            [record['weight_change_kg'] for record in records],
+            [record['diet_adherence_score'] for record in records]
+        )
+        diff = np.abs(computed - recorded)
+        return {
+            "records": len(records),
+            "mean_abs_diff_kcal": round(float(diff.mean()), 1),
+            "max_abs_diff_kcal": int(diff.max()),
+            "exact_match_rate": round(float(np.mean(diff == 0)), 4),
+            "within_50_kcal_rate": round(float(np.mean(diff <= 50)), 4),
+            "within_100_kcal_rate": round(float(np.mean(diff <= 100)), 4),
+            "direction_agreement_rate": round(float(np.mean(np.sign(computed) == np.sign(recorded))), 4)
+        }
+
+
+calorie_controller = CalorieController()
@@ -1,14 +1,39 @@
 import os
-import google.generativeai as genai
-import json
+import re
+from app.models import db, Client
+from .llm_gateway import llm_gateway
+from .plan_cache import plan_cache, make_cache_key, normalize_text, normalize_list
+from .template_diet_engine import TemplateDietEngine
+from .plan_stream import stream_llm_plan, replay_plan
+
+DEFAULT_MONTHLY_BUDGET = 5000
+
+
+def parse_budget(value):
+    """
+    Reads the monthly budget from free text as its first whole number, so
+    "₹4,500.50" is 4500 and a range like "3000-5000" is 3000. Falls back to
+    DEFAULT_MONTHLY_BUDGET when there is no number.
+    """
+    match = re.search(r'\d[\d,]*', str(value))
+    return int(match.group().replace(',', '')) if match else DEFAULT_MONTHLY_BUDGET
+
 
 class DietPlannerService:
-    def __init__(self, user, form_data):
+    def __init__(self, user, form_data, engine=None):
         self.user = user
         self.form_data = form_data # For data not stored in the user model like budget
+        self.engine = engine # 'llm' or 'template'; looked up from the user's tenant when not given
         self.bmr = 0
         self.tdee = 0
 
+    @property
+    def plan_engine(self):
+        if self.engine is None:
+            client = db.session.get(Client, self.user.client_id)
+            self.engine = client.plan_engine if client else 'llm'
+        return self.engine
+
     def _calculate_bmr(self):
         # Using data from the user database object
         if self.user.gender.lower() == 'male':
@@ -41,7 +66,7 @@ class DietPlannerService:
     def _generate_llm_prompt(self, target_calories):
         # Get temporary data from the incoming request
         diet_preference = self.form_data.get('diet_type', 'veg').capitalize()
-        monthly_budget = self.form_data.get('budget', '5000').replace(',', '')
+        monthly_budget = parse_budget(self.form_data.get('budget', DEFAULT_MONTHLY_BUDGET))
         optional_cuisines = self.form_data.get('optional_cuisines', [])
         activity_level = self.form_data.get('activityLevel', 'sedentary')
 
@@ -115,11 +140,22 @@ class DietPlannerService:
         """
         return prompt
 
+    def _generate_template_plan(self, target_calories):
+        """Builds the plan locally from the bundled food table instead of asking the LLM."""
+        return TemplateDietEngine().build_plan(
+            target_calories,
+            diet_type=self.form_data.get('diet_type', 'veg'),
+            monthly_budget=parse_budget(self.form_data.get('budget', DEFAULT_MONTHLY_BUDGET)),
+            optional_cuisines=[c for c in (self.form_data.get('optional_cuisines') or []) if isinstance(c, str)],
+            disliked_foods=self.user.disliked_foods,
+            allergies=self.user.allergies,
+            goal=self.user.fitness_goals,
+            weight_kg=self.user.weight_kg
+        )
+
     def _call_llm_api(self, prompt):
-        model = genai.GenerativeModel('gemini-2.5-pro') # Or your preferred model
-        generation_config = genai.GenerationConfig(response_mime_type="application/json")
-        response = model.generate_content(prompt, generation_config=generation_config)
-        return json.loads(response.text)
+        # Goes through the shared gateway, which owns the model and enforces concurrency limits
+        return llm_gateway.generate_json(prompt)
         
     def _adjust_calories_for_goal(self, adjustment=0): # Add the adjustment parameter
         goal = self.user.fitness_goals.lower()
@@ -134,15 +170,72 @@ class DietPlannerService:
         # Apply the dynamic adjustment
         return base_calories + adjustment
     
+    def _target_calories(self, calorie_adjustment=0):
+        self._calculate_bmr()
+        self._calculate_tdee()
+        # Pass the adjustment to the calculation, then bucket it so close targets share cached plans
+        target_calories = self._adjust_calories_for_goal(adjustment=calorie_adjustment)
+        return plan_cache.bucket_calories(target_calories)
+
+    def _cache_key(self, target_calories):
+        """Hashes the normalized inputs _generate_llm_prompt turns into a plan."""
+        optional_cuisines = self.form_data.get('optional_cuisines') or []
+        return make_cache_key('diet', {
+            "client_id": self.user.client_id,
+            "goal": normalize_text(self.user.fitness_goals),
+            "target_calories": int(target_calories),
+            "diet_type": normalize_text(self.form_data.get('diet_type', 'veg')),
+            "budget": parse_budget(self.form_data.get('budget', DEFAULT_MONTHLY_BUDGET)),
+            "cuisines": normalize_list(c for c in optional_cuisines if isinstance(c, str)),
+            "disliked_foods": normalize_list(self.user.disliked_foods),
+            "allergies": normalize_list(self.user.allergies)
+        })
+
+    def get_cached_plan(self, calorie_adjustment=0):
+        """Returns a previously generated plan for identical inputs, or None."""
+        if self.plan_engine == 'template':
+            # Template plans are cheaper to rebuild than to look up
+            return None
+        try:
+            return plan_cache.get(self._cache_key(self._target_calories(calorie_adjustment)))
+        except Exception:
+            return None
+
     def generate_plan(self, calorie_adjustment=0): # Add the calorie_adjustment parameter
         try:
-            self._calculate_bmr()
-            self._calculate_tdee()
-            # Pass the adjustment to the calculation
-            target_calories = self._adjust_calories_for_goal(adjustment=calorie_adjustment)
+            target_calories = self._target_calories(calorie_adjustment)
+            if self.plan_engine == 'template':
+                return {"success": True, "plan": self._generate_template_plan(target_calories), "engine": "template"}
+
+            cache_key = self._cache_key(target_calories)
+            cached_plan = plan_cache.get(cache_key)
+            if cached_plan is not None:
+                return {"success": True, "plan": cached_plan, "cached": True}
+
             prompt = self._generate_llm_prompt(target_calories)
             final_plan = self._call_llm_api(prompt)
+            plan_cache.put('diet', cache_key, final_plan)
             return {"success": True, "plan": final_plan}
         except Exception as e:
             return {"success": False, "error": str(e)}
 
+    def stream_plan(self, calorie_adjustment=0):
+        """
+        Like generate_plan, but yields ('day', name, meals) as each day becomes
+        available and finally ('plan', None, plan). Errors are raised, not returned.
+        """
+        target_calories = self._target_calories(calorie_adjustment)
+        if self.plan_engine == 'template':
+            yield from replay_plan(self._generate_template_plan(target_calories), 'weekly_plan')
+            return
+
+        cache_key = self._cache_key(target_calories)
+        cached_plan = plan_cache.get(cache_key)
+        if cached_plan is not None:
+            yield from replay_plan(cached_plan, 'weekly_plan')
+            return
+
+        for kind, name, value in stream_llm_plan(self._generate_llm_prompt(target_calories)):
+            if kind == 'plan':
+                plan_cache.put('diet', cache_key, value)
+            yield kind, name, value
@@ -0,0 +1,145 @@
+# app/services/exercise_catalog.py
+
+import csv
+import logging
+import os
+import re
+import threading
+from functools import lru_cache
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from app.models import db, Exercise, ExerciseAlias
+from .nutrition_rollup import UPSERT_INSERTS
+from .template_workout_engine import EXERCISE_LIBRARY_PATH, load_exercise_library
+
+logger = logging.getLogger(__name__)
+
+EXERCISE_ALIASES_PATH = os.path.join(os.path.dirname(EXERCISE_LIBRARY_PATH), 'exercise_aliases.csv')
+
+
+def canonical_key(name):
+    """Case-, spacing- and punctuation-insensitive key: 'Pull-Up', 'pull up' and ' PULL  UP' share it."""
+    return ' '.join(re.sub(r'[^0-9a-z]+', ' ', name.lower()).split())
+
+
+def display_name(name):
+    """How a name nobody has logged before is shown: as typed, with its spacing tidied."""
+    return ' '.join(name.split())
+
+
+@lru_cache(maxsize=None)
+def load_aliases(path=EXERCISE_ALIASES_PATH):
+    """The bundled aliases as (alias, library exercise name) pairs, read once per process."""
+    with open(path, newline='', encoding='utf-8') as f:
+        return tuple((row['alias'], row['exercise']) for row in csv.DictReader(f))
+
+
+class ExerciseCatalog:
+    """
+    In-memory map from canonical exercise names and aliases to catalog ids.
+    The catalog only ever grows, so ids are cached for the life of the
+    process: a workout whose exercises were all seen before resolves without
+    touching the database, and a miss looks up just the missing names.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = {}  # canonical alias -> exercise id
+
+    def _remember(self, rows):
+        with self._lock:
+            self._ids.update(rows)
+
+    def _fetch(self, keys):
+        aliases = ExerciseAlias.__table__
+        rows = db.session.execute(select(aliases.c.alias, aliases.c.exercise_id).where(aliases.c.alias.in_(keys)))
+        found = dict(rows.all())
+        self._remember(found)
+        return found
+
+    def lookup(self, name):
+        """The catalog id `name` resolves to, or None if nobody has logged it."""
+        key = canonical_key(name)
+        exercise_id = self._ids.get(key)
+        if exercise_id is None:
+            exercise_id = self._fetch([key]).get(key)
+        return exercise_id
+
+    def resolve(self, names):
+        """
+        The catalog ids of `names`, in order. Names never seen before are
+        added to the catalog in the caller's transaction, so they only stick
+        if it commits.
+        """
+        keys = [canonical_key(name) for name in names]
+        missing = {key for key in keys if key not in self._ids}
+        found = self._fetch(missing) if missing else {}
+        for name, key in zip(names, keys):
+            if key in self._ids or key in found:
+                continue
+            found[key] = self._intern(key, display_name(name))
+        return [self._ids.get(key) or found[key] for key in keys]
+
+    def _intern(self, key, name):
+        exercises, aliases = Exercise.__table__, ExerciseAlias.__table__
+        upsert_insert = UPSERT_INSERTS[db.session.get_bind().dialect.name]
+        # Concurrent loggers of the same new name end up on the same row
+        db.session.execute(upsert_insert(exercises).values(key=key, name=name).on_conflict_do_nothing())
+        exercise_id = db.session.scalar(select(exercises.c.id).where(exercises.c.key == key))
+        db.session.execute(upsert_insert(aliases).values(alias=key, exercise_id=exercise_id).on_conflict_do_nothing())
+        db.session.info['exercise_catalog_interned'] = True
+        logger.info("Added exercise %r to the catalog", name)
+        return exercise_id
+
+    def clear(self):
+        with self._lock:
+            self._ids.clear()
+
+
+exercise_catalog = ExerciseCatalog()
+
+
+@event.listens_for(Session, 'after_commit')
+def _keep_interned_names(session):
+    session.info.pop('exercise_catalog_interned', None)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_rolled_back_names(session):
+    # Ids read after interning may belong to the names this transaction added, which are gone now
+    if session.info.pop('exercise_catalog_interned', None):
+        exercise_catalog.clear()
+
+
+def seed_exercise_catalog():
+    """
+    Adds the bundled library exercises and aliases that are missing from
+    the catalog, leaving everything else alone. Returns the number of
+    aliases added.
+    """
+    exercises, aliases = Exercise.__table__, ExerciseAlias.__table__
+    upsert_insert = UPSERT_INSERTS[db.session.get_bind().dialect.name]
+    library = {canonical_key(exercise.name): exercise.name for exercise in load_exercise_library()}
+    db.session.execute(upsert_insert(exercises).values(
+        [{'key': key, 'name': name} for key, name in library.items()]
+    ).on_conflict_do_nothing())
+    ids = dict(db.session.execute(select(exercises.c.key, exercises.c.id).where(exercises.c.key.in_(library))).all())
+
+    rows = {key: ids[key] for key in library}
+    for alias, name in load_aliases():
+        rows.setdefault(canonical_key(alias), ids[canonical_key(name)])
+    result = db.session.execute(upsert_insert(aliases).values(
+        [{'alias': alias, 'exercise_id': exercise_id} for alias, exercise_id in rows.items()]
+    ).on_conflict_do_nothing())
+    db.session.commit()
+    return result.rowcount
+
+
+@click.command('seed-exercise-catalog')
+@with_appcontext
+def seed_exercise_catalog_command():
+    """Adds new bundled exercises and aliases to the exercise catalog."""
+    added = seed_exercise_catalog()
+    click.echo(f"Added {added} exercise aliases.")
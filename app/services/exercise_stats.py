@@ -0,0 +1,208 @@
+# app/services/exercise_stats.py
+
+import logging
+from collections import defaultdict
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import case, delete, event, insert, inspect, select
+from sqlalchemy.orm import Session, object_session
+from app.models import db, User, ExerciseEntry, ExerciseStats, WorkoutLog
+from .nutrition_rollup import UPSERT_INSERTS
+
+logger = logging.getLogger(__name__)
+
+SUM_COLUMNS = ('session_count', 'total_sets', 'total_reps', 'total_volume')
+
+# Taken from whichever side was performed last
+LAST_COLUMNS = ('last_performed_at', 'last_workout_log_id', 'last_session')
+
+# Each record and the columns that describe when and how it was set
+BEST_COLUMNS = {
+    'best_weight': ('best_weight_reps', 'best_weight_at'),
+    'best_e1rm': ('best_e1rm_at',),
+}
+
+
+def estimated_one_rep_max(weight, reps):
+    """Epley's estimate; a single is its own one-rep max."""
+    if reps <= 1:
+        return weight
+    return round(weight * (1 + reps / 30), 2)
+
+
+def summarize(sessions):
+    """
+    Folds the sessions of one exercise into the columns of its exercise_stats
+    row. `sessions` are (workout_log_id, performed_at, entries) tuples in the
+    order they were performed, each entry a (sets, reps, weight) tuple.
+    """
+    row = dict.fromkeys(SUM_COLUMNS, 0)
+    for workout_log_id, performed_at, entries in sessions:
+        row['session_count'] += 1
+        for sets, reps, weight in entries:
+            row['total_sets'] += sets
+            row['total_reps'] += sets * reps
+            row['total_volume'] += sets * reps * weight
+            if 'best_weight' not in row or weight > row['best_weight']:
+                row.update(best_weight=weight, best_weight_reps=reps, best_weight_at=performed_at)
+            e1rm = estimated_one_rep_max(weight, reps)
+            if 'best_e1rm' not in row or e1rm > row['best_e1rm']:
+                row.update(best_e1rm=e1rm, best_e1rm_at=performed_at)
+        row.update(
+            last_performed_at=performed_at, last_workout_log_id=workout_log_id,
+            last_session=[{'sets': sets, 'reps': reps, 'weight': weight} for sets, reps, weight in entries]
+        )
+    return row
+
+
+def _load_sessions(connection, condition):
+    """The sessions of the entries matching `condition`, by (user_id, client_id, exercise_id)."""
+    entries, logs = ExerciseEntry.__table__, WorkoutLog.__table__
+    rows = connection.execute(
+        select(logs.c.user_id, logs.c.client_id, logs.c.id, logs.c.date,
+               entries.c.exercise_id, entries.c.sets, entries.c.reps, entries.c.weight)
+        .join_from(entries, logs, entries.c.workout_log_id == logs.c.id)
+        .where(condition)
+        .order_by(logs.c.user_id, logs.c.date, logs.c.id, entries.c.id)
+    )
+    grouped = defaultdict(list)
+    for row in rows:
+        sessions = grouped[(row.user_id, row.client_id, row.exercise_id)]
+        if not sessions or sessions[-1][0] != row.id:
+            sessions.append((row.id, row.date, []))
+        sessions[-1][2].append((row.sets, row.reps, row.weight))
+    return grouped
+
+
+def _stats_rows(grouped):
+    return [dict(summarize(sessions), user_id=user_id, client_id=client_id, exercise_id=exercise_id)
+            for (user_id, client_id, exercise_id), sessions in grouped.items()]
+
+
+def add_entries(connection, entry_ids):
+    """
+    Folds newly logged entries into their exercise_stats rows with one
+    atomic upsert: totals are added, the last session and the records are
+    replaced only where the new entries are later or better.
+    """
+    rows = _stats_rows(_load_sessions(connection, ExerciseEntry.__table__.c.id.in_(entry_ids)))
+    if not rows:
+        return 0
+
+    table = ExerciseStats.__table__
+    statement = UPSERT_INSERTS[connection.dialect.name](table).values(rows)
+    excluded = statement.excluded
+    newer = excluded.last_performed_at >= table.c.last_performed_at
+    set_ = {column: table.c[column] + excluded[column] for column in SUM_COLUMNS}
+    set_.update({column: case((newer, excluded[column]), else_=table.c[column]) for column in LAST_COLUMNS})
+    for best, companions in BEST_COLUMNS.items():
+        better = excluded[best] > table.c[best]
+        set_.update({column: case((better, excluded[column]), else_=table.c[column])
+                     for column in (best, *companions)})
+    connection.execute(statement.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.exercise_id], set_=set_
+    ))
+    return len(rows)
+
+
+def refresh_user_stats(connection, user_ids):
+    """Recomputes every exercise_stats row of the given users from their workout history."""
+    table = ExerciseStats.__table__
+    connection.execute(delete(table).where(table.c.user_id.in_(user_ids)))
+    rows = _stats_rows(_load_sessions(connection, WorkoutLog.__table__.c.user_id.in_(user_ids)))
+    if rows:
+        connection.execute(insert(table), rows)
+    return len(rows)
+
+
+def _changes(target):
+    return object_session(target).info.setdefault(
+        'exercise_stats_changes', {'entries': set(), 'logs': set(), 'users': set()}
+    )
+
+
+def _record_new_entry(mapper, connection, target):
+    _changes(target)['entries'].add(target.id)
+
+
+def _record_removed_entry(mapper, connection, target):
+    # Records can't be taken back incrementally, so an edited or removed entry recomputes its user
+    attrs = inspect(target).attrs
+    _changes(target)['logs'].update({target.workout_log_id, *attrs.workout_log_id.history.deleted} - {None})
+
+
+def _record_changed_entry(mapper, connection, target):
+    if object_session(target).is_modified(target, include_collections=False):
+        _record_removed_entry(mapper, connection, target)
+
+
+def _record_removed_log(mapper, connection, target):
+    attrs = inspect(target).attrs
+    _changes(target)['users'].update({target.user_id, *attrs.user_id.history.deleted} - {None})
+
+
+def _record_changed_log(mapper, connection, target):
+    # after_update also fires when only the workout's exercises changed
+    attrs = inspect(target).attrs
+    if attrs.date.history.deleted or attrs.user_id.history.deleted:
+        _record_removed_log(mapper, connection, target)
+
+
+event.listen(ExerciseEntry, 'after_insert', _record_new_entry)
+event.listen(ExerciseEntry, 'after_update', _record_changed_entry)
+event.listen(ExerciseEntry, 'after_delete', _record_removed_entry)
+event.listen(WorkoutLog, 'after_update', _record_changed_log)
+event.listen(WorkoutLog, 'after_delete', _record_removed_log)
+
+
+@event.listens_for(Session, 'after_flush')
+def _update_exercise_stats(session, flush_context):
+    changes = session.info.pop('exercise_stats_changes', None)
+    if not changes:
+        return
+    connection = session.connection()
+    users = set(changes['users'])
+    if changes['logs']:
+        # Entries removed together with their workout are covered by the workout's own delete event
+        logs = WorkoutLog.__table__
+        users.update(connection.scalars(select(logs.c.user_id).where(logs.c.id.in_(changes['logs']))))
+    if users:
+        refresh_user_stats(connection, users)
+
+    entry_ids = changes['entries']
+    if users and entry_ids:
+        # The users just recomputed already include their new entries
+        entries, logs = ExerciseEntry.__table__, WorkoutLog.__table__
+        entry_ids = set(connection.scalars(
+            select(entries.c.id).join_from(entries, logs, entries.c.workout_log_id == logs.c.id)
+            .where(entries.c.id.in_(entry_ids), logs.c.user_id.notin_(users))
+        ))
+    if entry_ids:
+        add_entries(connection, entry_ids)
+
+
+def rebuild_exercise_stats(user_ids=None):
+    """
+    Recomputes exercise_stats for the given users, or for everyone. Use it to
+    backfill, or after workout rows were changed with bulk statements that
+    bypass the flush hooks above. Returns the number of rows written.
+    """
+    users = db.session.query(User.id).order_by(User.id.asc())
+    if user_ids is not None:
+        users = users.filter(User.id.in_(user_ids))
+
+    connection = db.session.connection()
+    written = 0
+    for user_id, in users.all():
+        written += refresh_user_stats(connection, [user_id])
+    db.session.commit()
+    return written
+
+
+@click.command('rebuild-exercise-stats')
+@click.option('--user-id', 'user_ids', type=int, multiple=True, help='Only rebuild these users (repeatable).')
+@with_appcontext
+def rebuild_exercise_stats_command(user_ids):
+    """Recomputes the per-exercise records and totals from the workout logs."""
+    rows = rebuild_exercise_stats(list(user_ids) or None)
+    click.echo(f"Rebuilt {rows} exercise_stats rows.")
@@ -0,0 +1,253 @@
+# app/services/llm_gateway.py
+
+import json
+import logging
+import threading
+import time
+from flask import current_app
+import google.generativeai as genai
+
+logger = logging.getLogger(__name__)
+
+
+class LLMUnavailableError(Exception):
+    """Raised when the gateway refuses a call; retry_after is a hint in seconds."""
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = max(1, int(retry_after))
+
+
+class LLMOverloadedError(LLMUnavailableError):
+    """Raised when too many calls are already waiting for a free slot."""
+
+
+def _default_model_factory(model_name):
+    return genai.GenerativeModel(model_name)
+
+
+class LLMGateway:
+    """
+    The single process-wide entry point for LLM calls.
+
+    It configures the Gemini client once and reuses one model instance per
+    model name. At most max_in_flight calls run at a time; callers beyond that
+    wait for a slot, and once max_queue callers are already waiting new calls
+    are shed immediately. A circuit breaker opens after breaker_threshold
+    consecutive failures and rejects calls until breaker_cooldown has passed,
+    after which a single trial call decides whether it closes again.
+    """
+    def __init__(self, model_name='gemini-2.5-pro', max_in_flight=4, max_queue=16, queue_timeout=30,
+                 breaker_threshold=5, breaker_cooldown=60, retry_after=5):
+        self._lock = threading.Lock()
+        self._model_factory = _default_model_factory
+        self._fake = False
+        self._reset(model_name, max_in_flight, max_queue, queue_timeout,
+                    breaker_threshold, breaker_cooldown, retry_after)
+
+    def _reset(self, model_name, max_in_flight, max_queue, queue_timeout,
+               breaker_threshold, breaker_cooldown, retry_after):
+        self.model_name = model_name
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.retry_after = retry_after
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._models = {}
+        self._configured_key = None
+        self._waiting = 0
+        self._in_flight = 0
+        self._consecutive_failures = 0
+        self._open_until = 0.0
+        self._trial_in_progress = False
+        self.calls = 0
+        self.failures = 0
+        self.shed = 0
+
+    def init_app(self, app):
+        """Reads the model and limit settings from the app config and resets the gateway."""
+        with self._lock:
+            self._reset(
+                model_name=app.config.get('LLM_MODEL_NAME', 'gemini-2.5-pro'),
+                max_in_flight=app.config.get('LLM_MAX_IN_FLIGHT', 4),
+                max_queue=app.config.get('LLM_MAX_QUEUE', 16),
+                queue_timeout=app.config.get('LLM_QUEUE_TIMEOUT', 30),
+                breaker_threshold=app.config.get('LLM_BREAKER_THRESHOLD', 5),
+                breaker_cooldown=app.config.get('LLM_BREAKER_COOLDOWN', 60),
+                retry_after=app.config.get('LLM_RETRY_AFTER', 5)
+            )
+
+    def use_model_factory(self, factory):
+        """
+        Replaces how model instances are built, e.g. with a local fake model in tests.
+        Passing None restores the real Gemini client.
+        """
+        with self._lock:
+            self._model_factory = factory or _default_model_factory
+            self._fake = factory is not None
+            self._models = {}
+
+    def is_configured(self):
+        return self._fake or bool(current_app.config.get('GEMINI_API_KEY'))
+
+    def _get_model(self, model_name):
+        with self._lock:
+            if not self._fake:
+                api_key = current_app.config.get('GEMINI_API_KEY')
+                if not api_key:
+                    raise ValueError("GEMINI_API_KEY not configured.")
+                if api_key != self._configured_key:
+                    genai.configure(api_key=api_key)
+                    self._configured_key = api_key
+                    self._models = {}
+            model = self._models.get(model_name)
+            if model is None:
+                model = self._model_factory(model_name)
+                self._models[model_name] = model
+            return model
+
+    def admission_error(self):
+        """
+        Returns the LLMUnavailableError a new call would fail with right now, or None.
+        Routes use it to shed load before queueing any work.
+        """
+        with self._lock:
+            return self._admission_error_locked(time.monotonic())
+
+    def _admission_error_locked(self, now):
+        if self._open_until and now < self._open_until:
+            return LLMUnavailableError("The plan generator is temporarily unavailable.",
+                                       retry_after=self._open_until - now)
+        if self._open_until and self._trial_in_progress:
+            return LLMUnavailableError("The plan generator is recovering. Please retry shortly.",
+                                       retry_after=self.retry_after)
+        if self._waiting >= self.max_queue:
+            return LLMOverloadedError("The plan generator is busy. Please retry shortly.",
+                                      retry_after=self.retry_after)
+        return None
+
+    def _acquire_slot(self):
+        """Admits one call and waits for a free slot. Returns whether the call is the breaker's trial."""
+        with self._lock:
+            error = self._admission_error_locked(time.monotonic())
+            if error:
+                self.shed += 1
+                raise error
+            is_trial = bool(self._open_until)
+            if is_trial:
+                # Breaker cooled down: let exactly one half-open trial call through
+                self._trial_in_progress = True
+            self._waiting += 1
+
+        acquired = self._slots.acquire(timeout=self.queue_timeout)
+        with self._lock:
+            self._waiting -= 1
+            if acquired:
+                self._in_flight += 1
+            else:
+                self.shed += 1
+                if is_trial:
+                    self._trial_in_progress = False
+        if not acquired:
+            raise LLMOverloadedError("Timed out waiting for the plan generator.", retry_after=self.retry_after)
+        return is_trial
+
+    def _release_slot(self, is_trial):
+        with self._lock:
+            self._in_flight -= 1
+            if is_trial:
+                self._trial_in_progress = False
+        self._slots.release()
+
+    @staticmethod
+    def _generation_config(json_response):
+        if json_response:
+            return genai.GenerationConfig(response_mime_type="application/json")
+        return None
+
+    def generate(self, prompt, json_response=False, model_name=None):
+        """Runs one generation through the gateway and returns the response text."""
+        model_name = model_name or self.model_name
+        is_trial = self._acquire_slot()
+        try:
+            model = self._get_model(model_name)
+            try:
+                generation_config = self._generation_config(json_response)
+                if generation_config:
+                    response = model.generate_content(prompt, generation_config=generation_config)
+                else:
+                    response = model.generate_content(prompt)
+                text = response.text
+            except Exception as e:
+                self._record_failure(e)
+                raise
+            self._record_success()
+            return text
+        finally:
+            self._release_slot(is_trial)
+
+    def stream(self, prompt, json_response=False, model_name=None):
+        """
+        Runs one streaming generation through the gateway and yields the response text chunk by chunk.
+        The call holds its slot until the stream is exhausted or closed.
+        """
+        model_name = model_name or self.model_name
+        is_trial = self._acquire_slot()
+        try:
+            model = self._get_model(model_name)
+            try:
+                generation_config = self._generation_config(json_response)
+                if generation_config:
+                    response = model.generate_content(prompt, generation_config=generation_config, stream=True)
+                else:
+                    response = model.generate_content(prompt, stream=True)
+                for chunk in response:
+                    if chunk.text:
+                        yield chunk.text
+            except GeneratorExit:
+                # The consumer stopped reading (e.g. the client disconnected); that is not an LLM failure
+                raise
+            except Exception as e:
+                self._record_failure(e)
+                raise
+            self._record_success()
+        finally:
+            self._release_slot(is_trial)
+
+    def generate_json(self, prompt, model_name=None):
+        """Runs a generation that must answer with JSON and returns the parsed object."""
+        return json.loads(self.generate(prompt, json_response=True, model_name=model_name))
+
+    def _record_success(self):
+        with self._lock:
+            self.calls += 1
+            self._consecutive_failures = 0
+            self._open_until = 0.0
+
+    def _record_failure(self, error):
+        with self._lock:
+            self.calls += 1
+            self.failures += 1
+            self._consecutive_failures += 1
+            if self._open_until or self._consecutive_failures >= self.breaker_threshold:
+                self._open_until = time.monotonic() + self.breaker_cooldown
+                logger.error(f"LLM circuit breaker opened after {self._consecutive_failures} "
+                             f"consecutive failures: {error}")
+
+    def stats(self):
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "model_name": self.model_name,
+                "in_flight": self._in_flight,
+                "waiting": self._waiting,
+                "calls": self.calls,
+                "failures": self.failures,
+                "shed": self.shed,
+                "breaker_open": bool(self._open_until and now < self._open_until),
+                "consecutive_failures": self._consecutive_failures
+            }
+
+
+llm_gateway = LLMGateway()
@@ -0,0 +1,145 @@
+# app/services/nutrition_rollup.py
+
+import logging
+from datetime import timezone
+from types import SimpleNamespace
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event, func, insert, inspect, select, update, delete
+from sqlalchemy.dialects import postgresql, sqlite
+from app.models import db, DietLog, DailyNutrition
+
+logger = logging.getLogger(__name__)
+
+TOTAL_COLUMNS = ('calories', 'protein_g', 'carbs_g', 'fat_g', 'meal_count')
+# The DietLog attributes a meal's contribution to daily_nutrition depends on
+ROLLUP_ATTRIBUTES = ('user_id', 'date', 'calories', 'protein_g', 'carbs_g', 'fat_g')
+
+# Dialects whose INSERT supports ON CONFLICT DO UPDATE
+UPSERT_INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+
+def rollup_day(logged_at):
+    """The daily_nutrition day a meal logged at `logged_at` counts towards (its UTC date)."""
+    if logged_at.tzinfo is not None:
+        logged_at = logged_at.astimezone(timezone.utc)
+    return logged_at.date()
+
+
+def _meal_totals(log):
+    return {
+        'calories': log.calories or 0,
+        'protein_g': log.protein_g or 0,
+        'carbs_g': log.carbs_g or 0,
+        'fat_g': log.fat_g or 0,
+        'meal_count': 1
+    }
+
+
+def _add_meal(connection, log):
+    """Adds one meal to its day's row with a single atomic upsert."""
+    table = DailyNutrition.__table__
+    totals = _meal_totals(log)
+    statement = UPSERT_INSERTS[connection.dialect.name](table).values(
+        user_id=log.user_id, day=rollup_day(log.date), client_id=log.client_id, **totals
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.day],
+        set_={column: table.c[column] + statement.excluded[column] for column in TOTAL_COLUMNS}
+    )
+    connection.execute(statement)
+
+
+def _remove_meal(connection, log):
+    table = DailyNutrition.__table__
+    totals = _meal_totals(log)
+    connection.execute(
+        update(table)
+        .where(table.c.user_id == log.user_id, table.c.day == rollup_day(log.date))
+        .values({column: table.c[column] - totals[column] for column in TOTAL_COLUMNS})
+    )
+
+
+@event.listens_for(DietLog, 'after_insert')
+def _rollup_inserted_meal(mapper, connection, target):
+    # Runs inside the flush, so the rollup commits or rolls back together with the meal
+    _add_meal(connection, target)
+
+
+@event.listens_for(DietLog, 'after_delete')
+def _rollup_deleted_meal(mapper, connection, target):
+    _remove_meal(connection, target)
+
+
+def _previous_values(target):
+    """The meal as it was before this flush's changes, or None if none of them affect the rollup."""
+    attrs = inspect(target).attrs
+    histories = {name: attrs[name].history for name in ROLLUP_ATTRIBUTES}
+    if not any(history.has_changes() for history in histories.values()):
+        return None
+    return SimpleNamespace(**{
+        name: history.deleted[0] if history.deleted else (None if history.added else getattr(target, name))
+        for name, history in histories.items()
+    })
+
+
+@event.listens_for(DietLog, 'after_update')
+def _rollup_updated_meal(mapper, connection, target):
+    # An edited meal comes out of its old day's totals and goes into its new day's
+    previous = _previous_values(target)
+    if previous is not None:
+        _remove_meal(connection, previous)
+        _add_meal(connection, target)
+
+
+def _load_replaced_value(target, value, oldvalue, initiator):
+    pass
+
+
+# Without active history, setting an expired attribute doesn't load the value it replaces,
+# and _previous_values couldn't take the old amounts back out
+for _attribute in ROLLUP_ATTRIBUTES:
+    event.listen(getattr(DietLog, _attribute), 'set', _load_replaced_value, active_history=True)
+
+
+def rebuild_daily_nutrition(user_ids=None):
+    """
+    Recomputes daily_nutrition from diet_log, for the given users or for everyone.
+    Use it to backfill, or after diet_log rows were changed with bulk statements
+    that bypass the ORM events above. Returns the number of rollup rows written.
+    """
+    table = DailyNutrition.__table__
+    day = func.date(DietLog.date)
+    totals = select(
+        DietLog.user_id,
+        day,
+        func.max(DietLog.client_id),
+        func.coalesce(func.sum(DietLog.calories), 0),
+        func.coalesce(func.sum(DietLog.protein_g), 0),
+        func.coalesce(func.sum(DietLog.carbs_g), 0),
+        func.coalesce(func.sum(DietLog.fat_g), 0),
+        func.count(DietLog.id)
+    ).group_by(DietLog.user_id, day)
+    clear = delete(table)
+    if user_ids is not None:
+        totals = totals.where(DietLog.user_id.in_(user_ids))
+        clear = clear.where(table.c.user_id.in_(user_ids))
+
+    db.session.execute(clear)
+    result = db.session.execute(insert(table).from_select(
+        ['user_id', 'day', 'client_id', *TOTAL_COLUMNS], totals
+    ))
+    db.session.commit()
+    return result.rowcount
+
+
+@click.command('rebuild-daily-nutrition')
+@click.option('--user-id', 'user_ids', type=int, multiple=True, help='Only rebuild these users (repeatable).')
+@with_appcontext
+def rebuild_daily_nutrition_command(user_ids):
+    """Recomputes the daily_nutrition rollup from diet_log."""
+    rows = rebuild_daily_nutrition(list(user_ids) or None)
+    click.echo(f"Rebuilt {rows} daily_nutrition rows.")
@@ -0,0 +1,168 @@
+# app/services/plan_cache.py
+
+import hashlib
+import json
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from app.models import db, PlanCacheEntry
+
+logger = logging.getLogger(__name__)
+
+
+def _utcnow():
+    # plan_cache timestamps are naive columns holding UTC values
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def normalize_text(value):
+    """Lower-cases and collapses whitespace so trivially different inputs share a key."""
+    return " ".join(str(value or '').lower().split())
+
+
+def normalize_list(values):
+    """Normalizes a list (or comma-separated string) into a sorted, de-duplicated list."""
+    if isinstance(values, str):
+        values = values.split(',')
+    items = {normalize_text(v) for v in (values or [])}
+    return sorted(v for v in items if v and v not in ('none', 'string'))
+
+
+def make_cache_key(kind, inputs):
+    """Hashes the normalized generation inputs into a stable content address."""
+    payload = json.dumps({"kind": kind, "inputs": inputs}, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class PlanCache:
+    """
+    A database-backed cache of generated plans keyed by a hash of the
+    normalized prompt inputs, so users with identical inputs skip the LLM.
+    Entries expire after a TTL, and the least recently used entries are
+    evicted once the table grows past its size limit.
+
+    The cache never commits the caller's session: entries are written, and
+    hits recorded, in short transactions of their own. Hits are batched and
+    written at most once per touch interval.
+    """
+    def __init__(self, enabled=True, ttl=timedelta(days=30), max_entries=5000, calorie_bucket=50,
+                 touch_interval=timedelta(minutes=1)):
+        self._lock = threading.Lock()
+        self.enabled = enabled
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.calorie_bucket = calorie_bucket
+        self.touch_interval = touch_interval
+        self.hits = 0
+        self.misses = 0
+        self._pending_hits = {}
+        self._last_touch = datetime.min
+
+    def init_app(self, app):
+        self.enabled = app.config.get('PLAN_CACHE_ENABLED', True)
+        self.ttl = timedelta(days=app.config.get('PLAN_CACHE_TTL_DAYS', 30))
+        self.max_entries = app.config.get('PLAN_CACHE_MAX_ENTRIES', 5000)
+        self.calorie_bucket = app.config.get('PLAN_CACHE_CALORIE_BUCKET', 50)
+        self.touch_interval = timedelta(seconds=app.config.get('PLAN_CACHE_TOUCH_INTERVAL_SECONDS', 60))
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self._pending_hits = {}
+            self._last_touch = datetime.min
+
+    def bucket_calories(self, calories):
+        """Rounds a calorie target to the nearest bucket so close targets share plans."""
+        return int(round(calories / self.calorie_bucket) * self.calorie_bucket)
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key):
+        """Returns the cached plan for a key, or None on a miss or an expired entry."""
+        if not self.enabled:
+            return None
+
+        # A lookup must not flush the caller's pending changes; expired entries are left to _evict
+        with db.session.no_autoflush:
+            entry = db.session.get(PlanCacheEntry, key)
+        now = _utcnow()
+        if not entry or entry.created_at < now - self.ttl:
+            self._count(hit=False)
+            return None
+
+        self._count(hit=True)
+        self._record_hit(key, now)
+        return entry.plan
+
+    def put(self, kind, key, plan):
+        """Stores a freshly generated plan and evicts expired entries and the least recently used overflow."""
+        if not self.enabled:
+            return
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(insert(PlanCacheEntry).values(key=key, kind=kind, plan=plan))
+        except IntegrityError:
+            # Another worker cached the same inputs first
+            return
+        self._evict()
+
+    def _take_pending_hits(self, now, force=False):
+        with self._lock:
+            if not self._pending_hits or (not force and now - self._last_touch < self.touch_interval):
+                return {}
+            pending, self._pending_hits = self._pending_hits, {}
+            self._last_touch = now
+            return pending
+
+    def _write_hits(self, conn, pending, now):
+        if pending:
+            conn.execute(
+                update(PlanCacheEntry).where(PlanCacheEntry.key == bindparam('entry_key')).values(
+                    hit_count=PlanCacheEntry.hit_count + bindparam('hits'), last_used_at=now),
+                [{'entry_key': key, 'hits': hits} for key, hits in pending.items()]
+            )
+
+    def _record_hit(self, key, now):
+        with self._lock:
+            self._pending_hits[key] = self._pending_hits.get(key, 0) + 1
+        pending = self._take_pending_hits(now)
+        if not pending:
+            return
+        try:
+            with db.engine.begin() as conn:
+                self._write_hits(conn, pending, now)
+        except SQLAlchemyError as e:
+            # Hit counts only steer eviction, so losing a batch is not worth failing the request
+            logger.warning(f"Could not record plan cache hits: {e}")
+
+    def _evict(self):
+        now = _utcnow()
+        with db.engine.begin() as conn:
+            # Recent hits decide which entries are least recently used, so write them first
+            self._write_hits(conn, self._take_pending_hits(now, force=True), now)
+            conn.execute(delete(PlanCacheEntry).where(PlanCacheEntry.created_at < now - self.ttl))
+            overflow = conn.execute(select(func.count()).select_from(PlanCacheEntry)).scalar() - self.max_entries
+            if overflow <= 0:
+                return
+            stale_keys = conn.execute(
+                select(PlanCacheEntry.key).order_by(PlanCacheEntry.last_used_at.asc()).limit(overflow)
+            ).scalars().all()
+            conn.execute(delete(PlanCacheEntry).where(PlanCacheEntry.key.in_(stale_keys)))
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+plan_cache = PlanCache()
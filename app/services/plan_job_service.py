@@ -0,0 +1,171 @@
+# app/services/plan_job_service.py
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import SQLAlchemyError
+from app.models import db, User, PlanJob, DietPlan, WorkoutPlan
+from .diet_planner import DietPlannerService
+from .workout_planner_service import WorkoutPlannerService
+
+logger = logging.getLogger(__name__)
+
+# Maps a job kind to the planner that generates it and the model that stores the result
+PLAN_KINDS = {
+    'diet': (DietPlannerService, DietPlan),
+    'workout': (WorkoutPlannerService, WorkoutPlan),
+}
+
+
+STALE_JOB_ERROR = "The job did not finish in time; the worker running it was probably restarted. Please retry."
+
+
+class JobQueueFullError(Exception):
+    """Raised when the worker pool already has the maximum number of pending jobs."""
+
+
+class PlanJobService:
+    """
+    Runs plan generation outside the request on a small, bounded pool of
+    worker threads. Routes enqueue a PlanJob row and return immediately;
+    a worker generates the plan, stores the DietPlan/WorkoutPlan and records
+    the outcome on the job row, which clients poll via /api/jobs/<id>.
+    """
+    def __init__(self, max_workers=2, max_pending=50, job_timeout=900):
+        self._lock = threading.Lock()
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.job_timeout = job_timeout
+        self._executor = None
+        self._pending = 0
+
+    def init_app(self, app):
+        """
+        Reads the pool size from the app config and fails the jobs a previous
+        process left behind. The pool itself is created lazily.
+        """
+        self.max_workers = app.config.get('PLAN_JOB_WORKERS', 2)
+        self.max_pending = app.config.get('PLAN_JOB_MAX_PENDING', 50)
+        self.job_timeout = app.config.get('PLAN_JOB_TIMEOUT_SECONDS', 900)
+
+        with app.app_context():
+            try:
+                expired = self.expire_stale_jobs()
+                if expired:
+                    logger.warning(f"Failed {expired} plan jobs left unfinished by a previous worker.")
+            except SQLAlchemyError as e:
+                # e.g. plan_job doesn't exist yet because `flask db upgrade` hasn't run
+                db.session.rollback()
+                logger.warning(f"Could not check for unfinished plan jobs: {e}")
+            finally:
+                db.session.remove()
+
+    def expire_stale_jobs(self, job_id=None):
+        """
+        Fails queued jobs created, and running jobs started, more than
+        job_timeout seconds ago (just job_id, if given). Jobs only live in the
+        pool of the process that queued them, so these were lost with a
+        restarted worker and would otherwise be polled forever. Other
+        processes may still be running younger jobs, so those are left alone.
+        Returns the number of jobs failed.
+        """
+        now = datetime.now(timezone.utc)
+        cutoff = now - timedelta(seconds=self.job_timeout)
+        query = PlanJob.query.filter(or_(
+            and_(PlanJob.status == 'queued', PlanJob.created_at < cutoff),
+            and_(PlanJob.status == 'running', PlanJob.started_at < cutoff),
+        ))
+        if job_id is not None:
+            query = query.filter(PlanJob.id == job_id)
+        expired = query.update({PlanJob.status: 'failed', PlanJob.error: STALE_JOB_ERROR, PlanJob.finished_at: now},
+                               synchronize_session=False)
+        db.session.commit()
+        return expired
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='plan-job')
+            return self._executor
+
+    def enqueue(self, app, kind, user_id, client_id, form_data):
+        """
+        Creates a queued job and hands it to the worker pool.
+        Raises JobQueueFullError if too many jobs are already waiting.
+        """
+        if kind not in PLAN_KINDS:
+            raise ValueError(f"Unknown plan kind '{kind}'.")
+
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise JobQueueFullError("Too many plan generations are already queued. Please retry shortly.")
+            self._pending += 1
+
+        try:
+            job = PlanJob(client_id=client_id, user_id=user_id, kind=kind, form_data=form_data)
+            db.session.add(job)
+            db.session.commit()
+            self._get_executor().submit(self._run, app, job.id)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        return job
+
+    def _run(self, app, job_id):
+        try:
+            with app.app_context():
+                self.run_job(job_id)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def run_job(self, job_id):
+        """Generates and stores the plan for one job. Must be called inside an app context."""
+        job = db.session.get(PlanJob, job_id)
+        if not job or job.status != 'queued':
+            return
+
+        job.status = 'running'
+        job.started_at = datetime.now(timezone.utc)
+        db.session.commit()
+
+        try:
+            planner_cls, plan_model = PLAN_KINDS[job.kind]
+            user = db.session.get(User, job.user_id)
+            result = planner_cls(user=user, form_data=job.form_data or {}).generate_plan()
+
+            if result.get("success"):
+                new_plan = plan_model(
+                    client_id=job.client_id,
+                    user_id=job.user_id,
+                    generated_plan=result['plan']
+                )
+                db.session.add(new_plan)
+                db.session.flush()
+                job.plan_id = new_plan.id
+                job.status = 'succeeded'
+            else:
+                job.status = 'failed'
+                job.error = result.get("error")
+        except Exception as e:
+            db.session.rollback()
+            job = db.session.get(PlanJob, job_id)
+            job.status = 'failed'
+            job.error = str(e)
+            logger.error(f"Plan job {job_id} failed: {e}")
+
+        job.finished_at = datetime.now(timezone.utc)
+        db.session.commit()
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=wait)
+
+
+plan_job_service = PlanJobService()
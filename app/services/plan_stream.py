@@ -0,0 +1,83 @@
+# app/services/plan_stream.py
+
+import json
+from .llm_gateway import llm_gateway
+
+DAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+
+class JsonMemberStream:
+    """
+    Scans a JSON document as it arrives and returns the members whose key is
+    in `keys` as soon as their value (an object or array) is closed.
+
+    Only strings, brackets, colons and commas matter for finding where a
+    value starts and ends, so the scanner keeps a stack of open containers
+    and the key each one belongs to; a completed value is sliced out of the
+    text received so far and parsed on its own.
+    """
+    def __init__(self, keys):
+        self.keys = frozenset(keys)
+        self.text = ''
+        self._position = 0
+        self._in_string = False
+        self._escaped = False
+        self._string_start = 0
+        self._last_string = None
+        self._pending_key = None
+        self._stack = []  # (bracket, key the container is the value of, start offset)
+
+    def feed(self, chunk):
+        """Adds a chunk of text and returns the (key, value) members it completed, in order."""
+        self.text += chunk
+        completed = []
+        text = self.text
+        for index in range(self._position, len(text)):
+            char = text[index]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    self._last_string = text[self._string_start:index + 1]
+            elif char == '"':
+                self._in_string = True
+                self._string_start = index
+            elif char == ':':
+                if self._stack and self._stack[-1][0] == '{':
+                    self._pending_key = json.loads(self._last_string)
+            elif char in '{[':
+                self._stack.append((char, self._pending_key, index))
+                self._pending_key = None
+            elif char in '}]':
+                if not self._stack:
+                    raise ValueError("Unbalanced JSON in the streamed plan.")
+                _, key, start = self._stack.pop()
+                if key in self.keys:
+                    completed.append((key, json.loads(text[start:index + 1])))
+            elif char == ',':
+                self._pending_key = None
+        self._position = len(text)
+        return completed
+
+
+def stream_llm_plan(prompt):
+    """
+    Streams a plan from the LLM. Yields ('day', name, value) for each weekday
+    as soon as its JSON object is closed, then ('plan', None, plan) with the
+    whole parsed plan once the stream ends.
+    """
+    parser = JsonMemberStream(DAYS)
+    for chunk in llm_gateway.stream(prompt, json_response=True):
+        for name, value in parser.feed(chunk):
+            yield 'day', name, value
+    yield 'plan', None, json.loads(parser.text)
+
+
+def replay_plan(plan, schedule_key):
+    """Yields a plan that is already complete (cached or template-built) as the same events."""
+    for name, value in (plan.get(schedule_key) or {}).items():
+        yield 'day', name, value
+    yield 'plan', None, plan
@@ -0,0 +1,255 @@
+# app/services/progress_buckets.py
+
+import logging
+from collections import defaultdict
+from datetime import datetime, time, timedelta, timezone
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import delete, event, insert, inspect, select
+from sqlalchemy.orm import Session, object_session
+from app.models import db, User, DailyNutrition, DietLog, WorkoutLog, WeightEntry, ProgressBucket
+from .nutrition_rollup import rollup_day
+
+logger = logging.getLogger(__name__)
+
+GRAINS = ('day', 'week', 'month')
+
+SUM_COLUMNS = ('calories', 'protein_g', 'carbs_g', 'fat_g', 'meal_count', 'logged_days',
+               'workouts', 'weigh_ins', 'weight_sum')
+
+# The logs the buckets are computed from
+TRACKED_MODELS = (DietLog, WorkoutLog, WeightEntry)
+
+
+def next_month(day):
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+BUCKET_START = {
+    'day': lambda day: day,
+    'week': lambda day: day - timedelta(days=day.weekday()),  # ISO weeks start on Monday
+    'month': lambda day: day.replace(day=1),
+}
+
+BUCKET_END = {
+    'day': lambda start: start + timedelta(days=1),
+    'week': lambda start: start + timedelta(days=7),
+    'month': next_month,
+}
+
+
+def covering_buckets(start, end):
+    """
+    The fewest day, week and month buckets that exactly cover the days
+    [start, end): whole months wherever they fit, whole ISO weeks that do not
+    cut into a month that fits, and single days for the rest.
+    """
+    buckets = []
+    day = start
+    while day < end:
+        month_end = next_month(day)
+        week_end = day + timedelta(days=7)
+        if day.day == 1 and month_end <= end:
+            buckets.append(('month', day))
+            day = month_end
+        elif day.weekday() == 0 and week_end <= end and not (
+                month_end < week_end and next_month(month_end) <= end):
+            buckets.append(('week', day))
+            day = week_end
+        else:
+            buckets.append(('day', day))
+            day += timedelta(days=1)
+    return buckets
+
+
+def empty_totals():
+    totals = dict.fromkeys(SUM_COLUMNS, 0)
+    totals.update(weight_min=None, weight_max=None, first_weight=None, first_weighed_at=None,
+                  last_weight=None, last_weighed_at=None)
+    return totals
+
+
+def merge_totals(buckets):
+    """Combines the totals of buckets that cover disjoint spans of days into one."""
+    totals = empty_totals()
+    for bucket in buckets:
+        for column in SUM_COLUMNS:
+            totals[column] += bucket[column]
+        if not bucket['weigh_ins']:
+            continue
+        if totals['weight_min'] is None or bucket['weight_min'] < totals['weight_min']:
+            totals['weight_min'] = bucket['weight_min']
+        if totals['weight_max'] is None or bucket['weight_max'] > totals['weight_max']:
+            totals['weight_max'] = bucket['weight_max']
+        if totals['first_weighed_at'] is None or bucket['first_weighed_at'] < totals['first_weighed_at']:
+            totals['first_weight'] = bucket['first_weight']
+            totals['first_weighed_at'] = bucket['first_weighed_at']
+        if totals['last_weighed_at'] is None or bucket['last_weighed_at'] >= totals['last_weighed_at']:
+            totals['last_weight'] = bucket['last_weight']
+            totals['last_weighed_at'] = bucket['last_weighed_at']
+    return totals
+
+
+def _weigh_in(weighed_at, weight_kg):
+    totals = empty_totals()
+    totals.update(weigh_ins=1, weight_sum=weight_kg, weight_min=weight_kg, weight_max=weight_kg,
+                  first_weight=weight_kg, first_weighed_at=weighed_at,
+                  last_weight=weight_kg, last_weighed_at=weighed_at)
+    return totals
+
+
+def _has_activity(totals):
+    return bool(totals['meal_count'] or totals['workouts'] or totals['weigh_ins'])
+
+
+def _day_totals(connection, user_id, start, end):
+    """Per-day totals for the days [start, end), from daily_nutrition, workout_log and weight_entry."""
+    days = defaultdict(empty_totals)
+
+    nutrition = DailyNutrition.__table__
+    rows = connection.execute(select(
+        nutrition.c.day, nutrition.c.calories, nutrition.c.protein_g, nutrition.c.carbs_g,
+        nutrition.c.fat_g, nutrition.c.meal_count
+    ).where(
+        nutrition.c.user_id == user_id, nutrition.c.day >= start, nutrition.c.day < end,
+        nutrition.c.meal_count > 0
+    ))
+    for row in rows:
+        days[row.day].update(calories=row.calories, protein_g=row.protein_g, carbs_g=row.carbs_g,
+                             fat_g=row.fat_g, meal_count=row.meal_count, logged_days=1)
+
+    window_start = datetime.combine(start, time.min, timezone.utc)
+    window_end = datetime.combine(end, time.min, timezone.utc)
+
+    workouts = WorkoutLog.__table__
+    rows = connection.execute(select(workouts.c.date).where(
+        workouts.c.user_id == user_id, workouts.c.date >= window_start, workouts.c.date < window_end
+    ))
+    for logged_at, in rows:
+        days[rollup_day(logged_at)]['workouts'] += 1
+
+    weights = WeightEntry.__table__
+    rows = connection.execute(select(weights.c.date, weights.c.weight_kg).where(
+        weights.c.user_id == user_id, weights.c.date >= window_start, weights.c.date < window_end
+    ).order_by(weights.c.date.asc(), weights.c.id.asc()))
+    for weighed_at, weight_kg in rows:
+        day = rollup_day(weighed_at)
+        days[day] = merge_totals([days[day], _weigh_in(weighed_at, weight_kg)])
+
+    return days
+
+
+def refresh_buckets(connection, user_id, client_id, days):
+    """
+    Recomputes the day, week and month buckets that contain `days` for one
+    user. The logs are read once over the whole weeks and months involved
+    and rolled up in Python. Returns the number of bucket rows written.
+    """
+    keys = {(grain, BUCKET_START[grain](day)) for day in days for grain in GRAINS}
+    start = min(bucket_start for _, bucket_start in keys)
+    end = max(BUCKET_END[grain](bucket_start) for grain, bucket_start in keys)
+
+    grouped = defaultdict(list)
+    for day, totals in _day_totals(connection, user_id, start, end).items():
+        for grain in GRAINS:
+            key = (grain, BUCKET_START[grain](day))
+            if key in keys:
+                grouped[key].append(totals)
+
+    rows = []
+    for (grain, bucket_start), day_totals in grouped.items():
+        totals = merge_totals(day_totals)
+        if _has_activity(totals):
+            rows.append(dict(totals, user_id=user_id, grain=grain, start=bucket_start, client_id=client_id))
+
+    table = ProgressBucket.__table__
+    for grain in GRAINS:
+        connection.execute(delete(table).where(
+            table.c.user_id == user_id,
+            table.c.grain == grain,
+            table.c.start.in_([bucket_start for key_grain, bucket_start in keys if key_grain == grain])
+        ))
+    if rows:
+        connection.execute(insert(table), rows)
+    return len(rows)
+
+
+def _touch_days(mapper, connection, target):
+    """Notes the days of a tracked log this flush added, changed or removed, for the after_flush hook."""
+    touched = object_session(target).info.setdefault('progress_bucket_days', defaultdict(set))
+    attrs = inspect(target).attrs
+    # An edited log counts towards both its old and its new day
+    dates = {target.date, *attrs.date.history.deleted}
+    user_ids = {target.user_id, *attrs.user_id.history.deleted}
+    for user_id in user_ids:
+        for logged_at in dates:
+            if user_id is not None and logged_at is not None:
+                touched[(user_id, target.client_id)].add(rollup_day(logged_at))
+
+
+def _touch_changed_days(mapper, connection, target):
+    # after_update also fires for relationship-only changes, like exercises added to a workout
+    if object_session(target).is_modified(target, include_collections=False):
+        _touch_days(mapper, connection, target)
+
+
+for _model in TRACKED_MODELS:
+    event.listen(_model, 'after_insert', _touch_days)
+    event.listen(_model, 'after_update', _touch_changed_days)
+    event.listen(_model, 'after_delete', _touch_days)
+
+
+@event.listens_for(Session, 'after_flush')
+def _refresh_touched_buckets(session, flush_context):
+    # Runs inside the flush's transaction, after the DietLog mapper events have updated daily_nutrition
+    touched = session.info.pop('progress_bucket_days', None)
+    if not touched:
+        return
+    connection = session.connection()
+    for (user_id, client_id), days in touched.items():
+        refresh_buckets(connection, user_id, client_id, days)
+
+
+def _logged_days(connection, user_id):
+    nutrition = DailyNutrition.__table__
+    days = set(connection.scalars(select(nutrition.c.day).where(
+        nutrition.c.user_id == user_id, nutrition.c.meal_count > 0
+    )))
+    for model in (WorkoutLog, WeightEntry):
+        table = model.__table__
+        days.update(rollup_day(logged_at) for logged_at in connection.scalars(
+            select(table.c.date).where(table.c.user_id == user_id)
+        ))
+    return days
+
+
+def rebuild_progress_buckets(user_ids=None):
+    """
+    Recomputes every bucket of the given users, or of everyone. Use it to
+    backfill, or after log rows were changed with bulk statements that bypass
+    the flush hooks above. Diet totals come from daily_nutrition, so rebuild
+    that first if it is stale too. Returns the number of bucket rows written.
+    """
+    users = db.session.query(User.id, User.client_id).order_by(User.id.asc())
+    if user_ids is not None:
+        users = users.filter(User.id.in_(user_ids))
+
+    connection = db.session.connection()
+    table = ProgressBucket.__table__
+    written = 0
+    for user_id, client_id in users.all():
+        connection.execute(delete(table).where(table.c.user_id == user_id))
+        days = _logged_days(connection, user_id)
+        if days:
+            written += refresh_buckets(connection, user_id, client_id, days)
+    db.session.commit()
+    return written
+
+
+@click.command('rebuild-progress-buckets')
+@click.option('--user-id', 'user_ids', type=int, multiple=True, help='Only rebuild these users (repeatable).')
+@with_appcontext
+def rebuild_progress_buckets_command(user_ids):
+    """Recomputes the day, week and month progress buckets from the logs."""
+    rows = rebuild_progress_buckets(list(user_ids) or None)
+    click.echo(f"Rebuilt {rows} progress_bucket rows.")
@@ -1,93 +1,156 @@
 # app/services/reporting_service.py
-from app.models import User, DietLog, WorkoutLog, WeightEntry, db
-from datetime import datetime, timezone, timedelta
-from sqlalchemy import func
+import logging
+from functools import cached_property
+import numpy as np
+from app.models import User, DailyNutrition, WorkoutLog, WeightEntry, WeightTrend, ProgressBucket, db
+from app.services.progress_buckets import GRAINS, BUCKET_END, BUCKET_START, covering_buckets, merge_totals
+from app.services.weight_trend import SUM_COLUMNS, slope_per_day
+from app.utils.report_cache import report_cache
+from datetime import date, datetime, time, timezone, timedelta
+from sqlalchemy import and_, func, or_, select
 from flask import abort
 
+logger = logging.getLogger(__name__)
+
+
+WEEKLY_REPORT_DAYS = 7
+
+
+def weekly_window(now=None):
+    """
+    The window every weekly report covers: the last 7 UTC calendar days,
+    today included, as (start, end) datetimes. It only moves at midnight,
+    which is what lets a report be cached for the rest of the day.
+    """
+    end_date = now or datetime.now(timezone.utc)
+    start_date = datetime.combine(end_date.date() - timedelta(days=WEEKLY_REPORT_DAYS - 1), time.min, timezone.utc)
+    return start_date, end_date
+
+
+def calculate_target_calories(user):
+    """
+    Calculates a robust TDEE based on the user's stored profile data.
+    """
+    # 1. Calculate BMR (no change here)
+    if user.gender.lower() == 'male':
+        bmr = 10 * user.weight_kg + 6.25 * user.height_cm - 5 * user.age + 5
+    else:
+        bmr = 10 * user.weight_kg + 6.25 * user.height_cm - 5 * user.age - 161
+
+    # 2. Get the correct TDEE multiplier based on the user's activity level
+    activity_multipliers = {
+        'sedentary': 1.2,
+        'lightlyactive': 1.375,
+        'moderatelyactive': 1.55,
+        'veryactive': 1.725,
+        'extraactive': 1.9
+    }
+
+    # Use the user's stored activity_level, defaulting to sedentary if not set
+    user_activity_level = (user.activity_level or 'sedentary').lower().replace(" ", "")
+    multiplier = activity_multipliers.get(user_activity_level, 1.2)
+    tdee = bmr * multiplier
+
+    # 3. Adjust for fitness goal (no change here)
+    goal = user.fitness_goals.lower()
+    if 'loss' in goal:
+        return tdee - 500
+    elif 'gain' in goal:
+        return tdee + 500
+    else: # maintainWeight
+        return tdee
+
+
+def adherence_score(daily_calories, target_calories):
+    """Averages the per-day adherence of a list of daily calorie totals against the target."""
+    if not daily_calories:
+        return 0
+
+    total_adherence = 0
+    for actual_calories in daily_calories:
+        # Calculate adherence for the day (max score 100)
+        # Score decreases as you move away from the target
+        day_adherence = max(0, 100 - abs(actual_calories - target_calories) / target_calories * 100)
+        total_adherence += day_adherence
+
+    return round(total_adherence / len(daily_calories), 2)
+
+
+def smoothed_weight_changes(sums):
+    """
+    The week's weight change read off the smoothed trend (its regression
+    slope over WEEKLY_REPORT_DAYS) rather than the noisy first-to-last
+    difference, for an array of weight_trend sums, one row per user.
+    """
+    sums = np.asarray(sums, dtype=float).reshape(-1, len(SUM_COLUMNS))
+    # + 0.0 turns a rounded -0.0 into 0.0
+    return np.round(slope_per_day(*sums.T) * WEEKLY_REPORT_DAYS, 2) + 0.0
+
+
+def build_weekly_report(user, start_date, end_date, weight_change_kg, workouts_completed,
+                        diet_adherence_score, target_calories):
+    """Assembles the weekly report dict shared by the per-user and batch reporting paths."""
+    return {
+        "user_name": user.name,
+        "period": f"{start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}",
+        "summary": {
+            "weight_change_kg": weight_change_kg, # Use the numeric value
+            "workouts_completed": workouts_completed,
+            "diet_adherence_score": diet_adherence_score,
+            "target_daily_calories": round(target_calories)
+        }
+    }
+
+
 class ReportingService:
     def __init__(self, user_id):
         # FIX 1: Replaced deprecated get_or_404 with db.session.get
         self.user = db.session.get(User, user_id)
         if not self.user:
             abort(404, description=f"User with id {user_id} not found.")
-        self.target_calories = self._calculate_target_calories()
+
+    @cached_property
+    def target_calories(self):
+        # Only needed when a report is actually computed, not when it is served from report_cache
+        return self._calculate_target_calories()
 
     def _calculate_target_calories(self):
-        """
-        Calculates a robust TDEE based on the user's stored profile data.
-        """
-        # 1. Calculate BMR (no change here)
-        if self.user.gender.lower() == 'male':
-            bmr = 10 * self.user.weight_kg + 6.25 * self.user.height_cm - 5 * self.user.age + 5
-        else:
-            bmr = 10 * self.user.weight_kg + 6.25 * self.user.height_cm - 5 * self.user.age - 161
-        
-        # 2. Get the correct TDEE multiplier based on the user's activity level
-        activity_multipliers = {
-            'sedentary': 1.2,
-            'lightlyactive': 1.375,
-            'moderatelyactive': 1.55,
-            'veryactive': 1.725,
-            'extraactive': 1.9
-        }
-        
-        # Use the user's stored activity_level, defaulting to sedentary if not set
-        user_activity_level = (self.user.activity_level or 'sedentary').lower().replace(" ", "")
-        multiplier = activity_multipliers.get(user_activity_level, 1.2)
-        tdee = bmr * multiplier
-
-        # 3. Adjust for fitness goal (no change here)
-        goal = self.user.fitness_goals.lower()
-        if 'loss' in goal:
-            return tdee - 500
-        elif 'gain' in goal:
-            return tdee + 500
-        else: # maintainWeight
-            return tdee
+        return calculate_target_calories(self.user)
 
     def get_diet_adherence_score(self, days=7):
-        """Calculates the diet adherence score over a given period."""
-        end_date = datetime.now(timezone.utc)
-        start_date = end_date - timedelta(days=days)
+        """Calculates the diet adherence score over the last `days` days, today included."""
+        start_day = datetime.now(timezone.utc).date() - timedelta(days=days - 1)
 
-        daily_logs = db.session.query(
-            func.date(DietLog.date),
-            func.sum(DietLog.calories)
-        ).filter(
-            DietLog.user_id == self.user.id,
-            DietLog.date >= start_date
-        ).group_by(func.date(DietLog.date)).all()
-
-        if not daily_logs:
-            return 0
-
-        total_adherence = 0
-        for day_log in daily_logs:
-            actual_calories = day_log[1]
-            # Calculate adherence for the day (max score 100)
-            # Score decreases as you move away from the target
-            day_adherence = max(0, 100 - abs(actual_calories - self.target_calories) / self.target_calories * 100)
-            total_adherence += day_adherence
-        
-        return round(total_adherence / len(daily_logs), 2)
+        # One pre-aggregated daily_nutrition row per logged day, read straight off its primary key
+        daily_calories = db.session.query(DailyNutrition.calories).filter(
+            DailyNutrition.user_id == self.user.id,
+            DailyNutrition.day >= start_day,
+            DailyNutrition.meal_count > 0
+        ).all()
+
+        return adherence_score([calories for calories, in daily_calories], self.target_calories)
 
     def get_weekly_report(self):
-        """Gathers all data needed for a weekly summary report."""
-        # FIX 2: Replaced deprecated utcnow() with datetime.now(timezone.utc)
-        end_date = datetime.now(timezone.utc)
-        start_date = end_date - timedelta(days=7)
+        """
+        Returns the weekly summary report, served from report_cache while none
+        of the user's logs or profile have changed since it was computed today.
+        """
+        start_date, end_date = weekly_window()
+        return report_cache.get_or_build(self.user.id, 'weekly', start_date.date().isoformat(),
+                                         lambda: self._build_weekly_report(start_date, end_date))
 
-        # 1. Weight Trend (now as a number)
-        weight_history = WeightEntry.query.filter(
+    def _build_weekly_report(self, start_date, end_date):
+        """Gathers all data needed for a weekly summary report."""
+        # 1. Weight Trend (now as a number), once the week has at least two weigh-ins
+        weigh_ins = WeightEntry.query.filter(
             WeightEntry.user_id == self.user.id,
             WeightEntry.date >= start_date
-        ).order_by(WeightEntry.date.asc()).all()
-        
+        ).count()
+
         weight_change_kg = 0.0 # Default to a number
-        if len(weight_history) >= 2:
-            start_weight = weight_history[0].weight_kg
-            end_weight = weight_history[-1].weight_kg
-            weight_change_kg = round(end_weight - start_weight, 2)
+        trend = db.session.get(WeightTrend, self.user.id) if weigh_ins >= 2 else None
+        if trend is not None:
+            weight_change_kg = float(smoothed_weight_changes([getattr(trend, column) for column in SUM_COLUMNS])[0])
 
         # 2. Workout Performance
         workouts_completed = WorkoutLog.query.filter(
@@ -96,17 +159,240 @@ class ReportingService:
         ).count()
 
         # 3. Diet Adherence
-        adherence_score = self.get_diet_adherence_score(days=7)
+        diet_adherence = self.get_diet_adherence_score(days=WEEKLY_REPORT_DAYS)
 
         # 4. Assemble the report with raw numbers
-        report = {
-            "user_name": self.user.name,
-            "period": f"{start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}",
-            "summary": {
-                "weight_change_kg": weight_change_kg, # Use the numeric value
-                "workouts_completed": workouts_completed,
-                "diet_adherence_score": adherence_score,
-                "target_daily_calories": round(self.target_calories)
-            }
+        return build_weekly_report(self.user, start_date, end_date, weight_change_kg,
+                                   workouts_completed, diet_adherence, self.target_calories)
+
+
+class BatchReportingService:
+    """
+    Builds the same weekly reports as ReportingService.get_weekly_report()
+    for many users at once. Users are read in id-ordered chunks, and each
+    chunk's weight change, workout count and daily calorie totals come from
+    one grouped query per metric instead of several queries per user.
+    """
+    def __init__(self, chunk_size=1000):
+        self.chunk_size = chunk_size
+
+    def iter_user_chunks(self):
+        """
+        Yields lists of users in id order, chunk_size at a time.
+        Seeks past the last id instead of holding a cursor open, so callers
+        may commit between chunks.
+        """
+        last_id = 0
+        while True:
+            users = User.query.filter(User.id > last_id).order_by(User.id.asc()).limit(self.chunk_size).all()
+            if not users:
+                return
+            yield users
+            last_id = users[-1].id
+
+    def iter_weekly_reports(self):
+        """
+        Yields (user, report) for every user. report is None when the user's
+        profile is too incomplete to compute a calorie target.
+        """
+        for users in self.iter_user_chunks():
+            reports = self.get_weekly_reports(users)
+            for user in users:
+                yield user, reports.get(user.id)
+
+    def get_weekly_reports(self, users):
+        """
+        Returns {user_id: report} for a chunk of users, skipping incomplete
+        profiles. Reports still in report_cache for the users' current data
+        versions are reused; only the rest are computed, and then cached.
+        """
+        start_date, end_date = weekly_window()
+        window = start_date.date().isoformat()
+
+        reports = {}
+        for user in users:
+            cached = report_cache.get(user.id, 'weekly', window, user.data_version)
+            if cached is not None:
+                reports[user.id] = cached
+        users = [user for user in users if user.id not in reports]
+        if not users:
+            return reports
+        user_ids = [user.id for user in users]
+
+        weight_changes = self._weight_changes(user_ids, start_date)
+        workout_counts = self._workout_counts(user_ids, start_date)
+        daily_calories = self._daily_calories(user_ids, start_date)
+
+        for user in users:
+            try:
+                target_calories = calculate_target_calories(user)
+                reports[user.id] = build_weekly_report(
+                    user, start_date, end_date,
+                    weight_changes.get(user.id, 0.0),
+                    workout_counts.get(user.id, 0),
+                    adherence_score(daily_calories.get(user.id, []), target_calories),
+                    target_calories
+                )
+                report_cache.put(user.id, 'weekly', window, user.data_version, reports[user.id])
+            except Exception as e:
+                logger.warning(f"Could not build weekly report for user {user.id}: {e}")
+        return reports
+
+    def _weight_changes(self, user_ids, start_date):
+        """Smoothed weight change for users with at least two weigh-ins in the window."""
+        weighed = db.session.query(WeightEntry.user_id).filter(
+            WeightEntry.user_id.in_(user_ids),
+            WeightEntry.date >= start_date
+        ).group_by(WeightEntry.user_id).having(func.count() >= 2).subquery()
+
+        rows = db.session.query(
+            WeightTrend.user_id, *(getattr(WeightTrend, column) for column in SUM_COLUMNS)
+        ).join(weighed, weighed.c.user_id == WeightTrend.user_id).all()
+        if not rows:
+            return {}
+        changes = smoothed_weight_changes([row[1:] for row in rows])
+        return {row.user_id: float(change) for row, change in zip(rows, changes)}
+
+    def _workout_counts(self, user_ids, start_date):
+        rows = db.session.query(
+            WorkoutLog.user_id, func.count(WorkoutLog.id)
+        ).filter(
+            WorkoutLog.user_id.in_(user_ids),
+            WorkoutLog.date >= start_date
+        ).group_by(WorkoutLog.user_id).yield_per(self.chunk_size)
+        return {user_id: count for user_id, count in rows}
+
+    def _daily_calories(self, user_ids, start_date):
+        """Per-user lists of daily calorie totals, read from the rollup like get_diet_adherence_score."""
+        rows = db.session.query(
+            DailyNutrition.user_id, DailyNutrition.calories
+        ).filter(
+            DailyNutrition.user_id.in_(user_ids),
+            DailyNutrition.day >= start_date.date(),
+            DailyNutrition.meal_count > 0
+        ).yield_per(self.chunk_size)
+
+        totals = {}
+        for user_id, calories in rows:
+            totals.setdefault(user_id, []).append(calories)
+        return totals
+
+
+DEFAULT_REPORT_DAYS = 30
+MAX_REPORT_DAYS = 3 * 366
+
+
+def default_granularity(days):
+    if days <= 31:
+        return 'day'
+    if days <= 182:
+        return 'week'
+    return 'month'
+
+
+def parse_report_range(args):
+    """
+    Reads 'from' (inclusive), 'to' (exclusive) and 'granularity' from the query
+    string. Dates are UTC days in YYYY-MM-DD format; by default the report
+    covers the last 30 days, today included. Raises ValueError on bad input.
+    """
+    try:
+        end = date.fromisoformat(args['to']) if args.get('to') else \
+            datetime.now(timezone.utc).date() + timedelta(days=1)
+        start = date.fromisoformat(args['from']) if args.get('from') else \
+            end - timedelta(days=DEFAULT_REPORT_DAYS)
+    except ValueError:
+        raise ValueError("'from' and 'to' must be dates in YYYY-MM-DD format.")
+    if start >= end:
+        raise ValueError("'from' must be before 'to'.")
+    if (end - start).days > MAX_REPORT_DAYS:
+        raise ValueError(f"A report can span at most {MAX_REPORT_DAYS} days.")
+
+    granularity = args.get('granularity') or default_granularity((end - start).days)
+    if granularity not in GRAINS:
+        raise ValueError(f"'granularity' must be one of: {', '.join(GRAINS)}.")
+    return start, end, granularity
+
+
+def report_periods(start, end, granularity):
+    """Splits the days [start, end) into day, ISO-week or month periods, clipping the first and last."""
+    periods = []
+    period_start = start
+    while period_start < end:
+        period_end = min(BUCKET_END[granularity](BUCKET_START[granularity](period_start)), end)
+        periods.append((period_start, period_end))
+        period_start = period_end
+    return periods
+
+
+def progress_summary(totals):
+    """Turns merged bucket totals into the nutrition, workout and weight figures of a report period."""
+    weigh_ins = totals['weigh_ins']
+    logged_days = totals['logged_days']
+    return {
+        "nutrition": {
+            "calories": totals['calories'],
+            "avg_daily_calories": round(totals['calories'] / logged_days) if logged_days else None,
+            "protein_g": round(totals['protein_g'], 1),
+            "carbs_g": round(totals['carbs_g'], 1),
+            "fat_g": round(totals['fat_g'], 1),
+            "meals": totals['meal_count'],
+            "days_logged": logged_days
+        },
+        "workouts": totals['workouts'],
+        "weight": {
+            "weigh_ins": weigh_ins,
+            "start_kg": totals['first_weight'],
+            "end_kg": totals['last_weight'],
+            "change_kg": round(totals['last_weight'] - totals['first_weight'], 2) if weigh_ins else None,
+            "min_kg": totals['weight_min'],
+            "max_kg": totals['weight_max'],
+            "avg_kg": round(totals['weight_sum'] / weigh_ins, 2) if weigh_ins else None
         }
-        return report
\ No newline at end of file
+    }
+
+
+class ProgressReportService:
+    """
+    Reports progress over any range of UTC days from the day, week and month
+    buckets in progress_bucket. Each period is read as the coarsest buckets
+    that cover it, all in one query, so a year by month costs about a dozen
+    rows however many meals, workouts and weigh-ins it holds.
+    """
+    def __init__(self, user_id):
+        self.user_id = user_id
+
+    def get_report(self, start, end, granularity):
+        periods = [(period_start, period_end, covering_buckets(period_start, period_end))
+                   for period_start, period_end in report_periods(start, end, granularity)]
+        buckets = self._read_buckets({key for _, _, keys in periods for key in keys})
+
+        period_totals = []
+        for period_start, period_end, keys in periods:
+            totals = merge_totals(buckets[key] for key in keys if key in buckets)
+            period_totals.append((period_start, period_end, totals))
+
+        return {
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "granularity": granularity,
+            "summary": progress_summary(merge_totals(totals for _, _, totals in period_totals)),
+            "periods": [
+                {"start": period_start.isoformat(), "end": period_end.isoformat(), **progress_summary(totals)}
+                for period_start, period_end, totals in period_totals
+            ]
+        }
+
+    def _read_buckets(self, keys):
+        """{(grain, start): totals} for the stored buckets among `keys`; missing ones had no activity."""
+        starts = {}
+        for grain, bucket_start in keys:
+            starts.setdefault(grain, []).append(bucket_start)
+
+        table = ProgressBucket.__table__
+        rows = db.session.execute(select(table).where(
+            table.c.user_id == self.user_id,
+            or_(*(and_(table.c.grain == grain, table.c.start.in_(grain_starts))
+                  for grain, grain_starts in starts.items()))
+        ))
+        return {(row.grain, row.start): row._mapping for row in rows}
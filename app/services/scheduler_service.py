@@ -0,0 +1,181 @@
+# app/services/scheduler_service.py
+
+import atexit
+import logging
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.schedulers.blocking import BlockingScheduler
+from sqlalchemy import insert, update, delete, or_, case
+from sqlalchemy.exc import IntegrityError
+from app.models import db, SchedulerLease
+
+logger = logging.getLogger(__name__)
+
+LEASE_NAME = 'scheduled-jobs'
+
+
+def _utcnow():
+    # scheduler_lease timestamps are naive columns holding UTC values
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def make_holder_id():
+    """Identifies this process uniquely across hosts, and across pid reuse."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class LeaderLease:
+    """
+    A lease row that at most one process holds at a time.
+
+    Acquiring is a single conditional UPDATE that succeeds only if this
+    holder already owns the lease or the current one has expired, so it is
+    atomic on both Postgres (row lock) and SQLite (database lock). The
+    holder renews by acquiring again before the TTL runs out; if it dies,
+    another process takes over once the lease expires.
+    """
+    def __init__(self, name=LEASE_NAME, holder=None, ttl=60, engine=None):
+        self.name = name
+        self.holder = holder or make_holder_id()
+        self.ttl = timedelta(seconds=ttl)
+        self._engine = engine
+
+    @property
+    def engine(self):
+        return self._engine or db.engine
+
+    def try_acquire(self):
+        """Takes or renews the lease. Returns True if this process holds it afterwards."""
+        table = SchedulerLease.__table__
+        now = _utcnow()
+        with self.engine.begin() as conn:
+            result = conn.execute(
+                update(table)
+                .where(table.c.name == self.name,
+                       or_(table.c.holder == self.holder, table.c.expires_at < now))
+                .values(acquired_at=case((table.c.holder == self.holder, table.c.acquired_at), else_=now),
+                        holder=self.holder,
+                        expires_at=now + self.ttl)
+            )
+            if result.rowcount == 1:
+                return True
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(insert(table).values(name=self.name, holder=self.holder,
+                                                  acquired_at=now, expires_at=now + self.ttl))
+            return True
+        except IntegrityError:
+            # The row exists and is held by someone else
+            return False
+
+    def release(self):
+        """Gives the lease up early so another process can take over without waiting for expiry."""
+        table = SchedulerLease.__table__
+        with self.engine.begin() as conn:
+            conn.execute(delete(table).where(table.c.name == self.name, table.c.holder == self.holder))
+
+    def current_holder(self):
+        table = SchedulerLease.__table__
+        with self.engine.connect() as conn:
+            row = conn.execute(table.select().where(table.c.name == self.name)).first()
+        if not row or row.expires_at < _utcnow():
+            return None
+        return row.holder
+
+
+class LeaderScheduler:
+    """
+    Runs the app's scheduled jobs in exactly one process per cluster.
+
+    Every process that starts the scheduler competes for a LeaderLease and
+    renews it on a heartbeat; a scheduled job only runs in the process that
+    holds the lease when it fires. Web processes can embed the scheduler
+    (SCHEDULER_MODE='embedded') or leave it to a dedicated node running
+    scheduler.py (SCHEDULER_MODE='off' on the web nodes).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.app = None
+        self.lease = None
+        self.scheduler = None
+        self.is_leader = False
+        self.mode = 'embedded'
+        self.renew_seconds = 15
+
+    def init_app(self, app):
+        self.mode = app.config.get('SCHEDULER_MODE', 'embedded')
+        self.renew_seconds = app.config.get('SCHEDULER_LEASE_RENEW_SECONDS', 15)
+        self.lease = LeaderLease(ttl=app.config.get('SCHEDULER_LEASE_TTL_SECONDS', 60))
+        self.app = app
+
+    def _add_jobs(self, scheduler):
+        from .adaptive_planner_service import run_weekly_adaptive_planning
+
+        scheduler.add_job(self.heartbeat, 'interval', seconds=self.renew_seconds,
+                          id='scheduler_lease_heartbeat', next_run_time=datetime.now(timezone.utc))
+        scheduler.add_job(self.run_if_leader, 'cron', day_of_week='sun', hour=2,
+                          args=[run_weekly_adaptive_planning], id='weekly_adaptive_planning')
+
+    def heartbeat(self):
+        """Takes or renews the lease; logs when leadership changes hands."""
+        with self.app.app_context():
+            try:
+                leader = self.lease.try_acquire()
+            except Exception as e:
+                logger.error(f"Scheduler lease heartbeat failed: {e}")
+                leader = False
+        with self._lock:
+            if leader != self.is_leader:
+                logger.info(f"Scheduler {self.lease.holder} "
+                            f"{'became' if leader else 'is no longer'} the leader")
+            self.is_leader = leader
+        return leader
+
+    def run_if_leader(self, job, *args):
+        """Runs a scheduled job only if this process holds the lease right now."""
+        if not self.heartbeat():
+            logger.info(f"Skipping {job.__name__}: another process is the scheduler leader")
+            return None
+        return job(self.app, *args)
+
+    def start(self):
+        """Starts the scheduler on a background thread inside a web process."""
+        with self._lock:
+            if self.scheduler is not None:
+                return
+            self.scheduler = BackgroundScheduler(daemon=True)
+        self._add_jobs(self.scheduler)
+        self.scheduler.start()
+        atexit.register(self.shutdown)
+
+    def run_forever(self):
+        """Runs the scheduler in the foreground, for a dedicated scheduler node."""
+        with self._lock:
+            self.scheduler = BlockingScheduler()
+        self._add_jobs(self.scheduler)
+        try:
+            self.scheduler.start()
+        except (KeyboardInterrupt, SystemExit):
+            pass
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        with self._lock:
+            scheduler, self.scheduler = self.scheduler, None
+            was_leader, self.is_leader = self.is_leader, False
+        if scheduler and scheduler.running:
+            scheduler.shutdown(wait=False)
+        if was_leader:
+            try:
+                with self.app.app_context():
+                    self.lease.release()
+            except Exception as e:
+                logger.error(f"Could not release the scheduler lease: {e}")
+
+
+leader_scheduler = LeaderScheduler()
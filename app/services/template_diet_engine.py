@@ -0,0 +1,281 @@
+# app/services/template_diet_engine.py
+
+import csv
+import math
+import os
+from collections import namedtuple
+from functools import lru_cache
+import numpy as np
+from .plan_cache import normalize_list, normalize_text
+
+FOOD_TABLE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                               'data', 'indian_food_table.csv')
+
+DAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+# (plan key, food-table slot, share of the day's calories)
+MEAL_SLOTS = (
+    ('Breakfast', 'breakfast', 0.25),
+    ('Lunch', 'lunch', 0.30),
+    ('Snack1', 'snack', 0.10),
+    ('Dinner', 'dinner', 0.25),
+    ('Snack2', 'snack', 0.10),
+)
+
+PORTION_MULTIPLIERS = (0.5, 0.75, 1.0, 1.25, 1.5, 2.0)
+
+# Words a user may write for each allergen tag in the food table
+ALLERGEN_SYNONYMS = {
+    'dairy': ('dairy', 'milk', 'lactose', 'paneer', 'curd', 'cheese', 'ghee', 'butter'),
+    'gluten': ('gluten', 'wheat', 'maida', 'bread', 'semolina'),
+    'nuts': ('nut', 'nuts', 'peanut', 'peanuts', 'almond', 'almonds', 'cashew', 'tree nuts'),
+    'egg': ('egg', 'eggs'),
+    'fish': ('fish', 'seafood', 'shellfish', 'prawn', 'prawns'),
+    'soy': ('soy', 'soya', 'soybean'),
+}
+
+# Objective weights for the per-day solver
+SHARE_WEIGHT = 1.0       # keep each meal close to its share of the day
+COST_WEIGHT_STEPS = (1.0, 4.0, 16.0, 64.0)  # per day's budget spent, steepened while over budget
+REPEAT_WEIGHT = 0.6      # per earlier use of the same dish this week
+PROTEIN_WEIGHT = 0.8     # reward protein-dense choices
+TARGET_WEIGHT = 10.0     # per fraction of the day's target missed
+CUISINE_WEIGHT = 0.5     # reward the optional cuisines the user asked for, up to MAX_FOREIGN_MEALS
+MAX_FOREIGN_MEALS = 3    # non-Indian meals per week, matching the LLM prompt's "2-3 meals"
+
+FoodItem = namedtuple('FoodItem', ['name', 'slots', 'portion', 'grams', 'kcal', 'protein_g', 'carbs_g', 'fat_g',
+                                   'cost_inr', 'diet', 'cuisine', 'allergens', 'ingredients'])
+
+SlotOptions = namedtuple('SlotOptions', ['options', 'food_ids', 'kcal', 'units', 'cost', 'protein_density',
+                                         'foreign'])
+
+
+@lru_cache(maxsize=None)
+def load_food_table(path=FOOD_TABLE_PATH):
+    """Reads the bundled food table once per process."""
+    with open(path, newline='', encoding='utf-8') as f:
+        return tuple(
+            FoodItem(
+                name=row['name'],
+                slots=frozenset(row['slots'].split(';')),
+                portion=row['portion'],
+                grams=float(row['grams']),
+                kcal=float(row['kcal']),
+                protein_g=float(row['protein_g']),
+                carbs_g=float(row['carbs_g']),
+                fat_g=float(row['fat_g']),
+                cost_inr=float(row['cost_inr']),
+                diet=row['diet'],
+                cuisine=row['cuisine'],
+                allergens=frozenset(a for a in row['allergens'].split(';') if a),
+                ingredients=tuple(i for i in row['ingredients'].split(';') if i)
+            )
+            for row in csv.DictReader(f)
+        )
+
+
+def _singular(term):
+    return term[:-1] if len(term) > 3 and term.endswith('s') else term
+
+
+class TemplateDietEngine:
+    """
+    Builds a 7-day diet plan from the bundled food table without an LLM.
+
+    Each day is a small multiple-choice knapsack: every meal slot picks one
+    dish at one portion size, and a dynamic program over the day's calories
+    (vectorized with NumPy) finds the cheapest-scoring combination whose
+    total lands within the tolerance of the target. The score keeps meals
+    near their share of the day, favours protein, penalises cost against
+    the daily budget and dishes already used this week.
+    """
+    def __init__(self, foods=None, tolerance=0.05, kcal_step=20):
+        self.foods = foods if foods is not None else load_food_table()
+        self.tolerance = tolerance
+        self.kcal_step = kcal_step
+
+    def _is_excluded(self, item, avoid_terms, allergen_tags):
+        if item.allergens & allergen_tags:
+            return True
+        text = normalize_text(item.name + ' ' + ' '.join(item.ingredients))
+        return any(term in text or _singular(term) in text for term in avoid_terms)
+
+    def _candidates(self, diet_type, cuisines, disliked_foods, allergies):
+        allergies = normalize_list(allergies)
+        avoid_terms = normalize_list(disliked_foods) + allergies
+        allergen_tags = {tag for tag, words in ALLERGEN_SYNONYMS.items()
+                         if any(a in words or _singular(a) in words for a in allergies)}
+
+        candidates = {}
+        for plan_key, slot, _ in MEAL_SLOTS:
+            items = [
+                item for item in self.foods
+                if slot in item.slots
+                and (diet_type == 'non-veg' or item.diet == 'veg')
+                and (item.cuisine == 'indian' or item.cuisine in cuisines)
+                and not self._is_excluded(item, avoid_terms, allergen_tags)
+            ]
+            if not items:
+                raise ValueError(f"No foods left for {plan_key} after applying the diet type, "
+                                 f"dislikes and allergies.")
+            candidates[plan_key] = items
+        return candidates
+
+    def _slot_options(self, items, food_index):
+        """Precomputes one slot's (dish, portion) options as arrays the solver can score in one go."""
+        options = [(item, multiplier) for item in items for multiplier in PORTION_MULTIPLIERS]
+        kcal = np.array([item.kcal * m for item, m in options])
+        return SlotOptions(
+            options=options,
+            food_ids=np.array([food_index[item.name] for item, _ in options]),
+            kcal=kcal,
+            units=np.maximum(1, np.round(kcal / self.kcal_step)).astype(int),
+            cost=np.array([item.cost_inr * m for item, m in options]),
+            protein_density=np.array([item.protein_g * 4 / item.kcal for item, _ in options]),
+            foreign=np.array([item.cuisine != 'indian' for item, _ in options])
+        )
+
+    @staticmethod
+    def _weights(slot, slot_target, daily_budget, cost_weight, uses, allow_foreign, banned):
+        weights = (
+            SHARE_WEIGHT * np.abs(slot.kcal - slot_target) / slot_target
+            + cost_weight * slot.cost / daily_budget
+            + REPEAT_WEIGHT * uses[slot.food_ids]
+            - PROTEIN_WEIGHT * slot.protein_density
+        )
+        if allow_foreign:
+            weights[slot.foreign] -= CUISINE_WEIGHT
+        else:
+            weights[slot.foreign] = np.inf
+        if banned:
+            weights[np.isin(slot.food_ids, list(banned))] = np.inf
+        return weights
+
+    def _solve_day(self, slot_options, target_calories):
+        """Multiple-choice knapsack over the day's calories; returns one option index per slot."""
+        max_units = int(target_calories * (1 + self.tolerance) / self.kcal_step)
+        min_units = math.ceil(target_calories * (1 - self.tolerance) / self.kcal_step)
+
+        states = np.arange(max_units + 1)
+        best = np.full(max_units + 1, np.inf)
+        best[0] = 0.0
+        choices = []
+        for units, weights in slot_options:
+            # scores[o, c]: best score reaching c calorie units when this slot takes option o.
+            # best is padded with unreachable states so every lookup below zero lands on inf.
+            padded = np.concatenate((np.full(units.max(), np.inf), best))
+            scores = padded[states[None, :] - units[:, None] + units.max()] + weights[:, None]
+            choice = np.argmin(scores, axis=0)
+            choices.append(choice)
+            best = scores[choice, states]
+
+        # Among feasible totals, prefer the ones closest to the target
+        target_units = target_calories / self.kcal_step
+        feasible = best[min_units:] + TARGET_WEIGHT * np.abs(states[min_units:] - target_units) / target_units
+        if np.isfinite(feasible).any():
+            end = min_units + int(np.argmin(feasible))
+        else:
+            # The target is out of reach with these foods: get as close as possible
+            reachable = np.flatnonzero(np.isfinite(best))
+            end = int(reachable[np.argmin(np.abs(reachable - target_units))])
+
+        picks = []
+        for (units, _), choice in zip(reversed(slot_options), reversed(choices)):
+            index = int(choice[end])
+            picks.append(index)
+            end -= units[index]
+        return list(reversed(picks))
+
+    def _plan_day(self, slots, target_calories, daily_budget, uses, allow_foreign):
+        """Solves one day, re-solving to remove same-day repeats and to get back under budget."""
+        for cost_weight in COST_WEIGHT_STEPS:
+            banned = [set() for _ in MEAL_SLOTS]
+            for _ in MEAL_SLOTS:
+                slot_options = [
+                    (slot.units, self._weights(slot, target_calories * share, daily_budget, cost_weight,
+                                               uses, allow_foreign, banned[position]))
+                    for position, (slot, (_, _, share)) in enumerate(zip(slots, MEAL_SLOTS))
+                ]
+                picks = self._solve_day(slot_options, target_calories)
+                picked_ids = [int(slot.food_ids[index]) for slot, index in zip(slots, picks)]
+
+                # A dish already eaten earlier in the day is banned from the later slot
+                repeat = next((position for position, food_id in enumerate(picked_ids)
+                               if food_id in picked_ids[:position]), None)
+                if repeat is None or len(banned[repeat]) + 1 >= len(set(slots[repeat].food_ids)):
+                    break
+                banned[repeat].add(picked_ids[repeat])
+
+            # Over budget: steepen the cost penalty and solve again
+            if sum(slot.cost[index] for slot, index in zip(slots, picks)) <= daily_budget:
+                break
+        return [slot.options[index] for slot, index in zip(slots, picks)]
+
+    @staticmethod
+    def _meal(item, multiplier):
+        if multiplier == 1:
+            portion = f"{item.portion} ({item.grams:.0f} g)"
+        else:
+            portion = f"{multiplier:g} x {item.portion} ({item.grams * multiplier:.0f} g)"
+        return {
+            "items": item.name,
+            "portion": portion,
+            "calories": int(round(item.kcal * multiplier)),
+            "protein_g": round(item.protein_g * multiplier, 1),
+            "carbs_g": round(item.carbs_g * multiplier, 1),
+            "fat_g": round(item.fat_g * multiplier, 1)
+        }
+
+    def build_plan(self, target_calories, diet_type='veg', monthly_budget=5000, optional_cuisines=None,
+                   disliked_foods=None, allergies=None, goal='', weight_kg=None):
+        """Returns a plan in the same weekly_plan/summary shape the LLM produces."""
+        diet_type = normalize_text(diet_type) or 'veg'
+        cuisines = [c for c in normalize_list(optional_cuisines) if c != 'indian']
+        daily_budget = max(float(monthly_budget), 1.0) / 30
+        candidates = self._candidates(diet_type, cuisines, disliked_foods, allergies)
+        food_index = {item.name: position for position, item in enumerate(self.foods)}
+        slots = [self._slot_options(candidates[plan_key], food_index) for plan_key, _, _ in MEAL_SLOTS]
+
+        weekly_plan = {}
+        uses = np.zeros(len(self.foods))
+        foreign_meals = 0
+        totals = {"calories": 0.0, "protein_g": 0.0, "carbs_g": 0.0, "fat_g": 0.0, "cost_inr": 0.0}
+        for day in DAYS:
+            picked = self._plan_day(slots, target_calories, daily_budget, uses,
+                                    allow_foreign=foreign_meals < MAX_FOREIGN_MEALS)
+            weekly_plan[day] = {}
+            for (plan_key, _, _), (item, multiplier) in zip(MEAL_SLOTS, picked):
+                weekly_plan[day][plan_key] = self._meal(item, multiplier)
+                uses[food_index[item.name]] += 1
+                foreign_meals += item.cuisine != 'indian'
+                totals["calories"] += item.kcal * multiplier
+                totals["protein_g"] += item.protein_g * multiplier
+                totals["carbs_g"] += item.carbs_g * multiplier
+                totals["fat_g"] += item.fat_g * multiplier
+                totals["cost_inr"] += item.cost_inr * multiplier
+
+        if cuisines:
+            cuisine_summary = f"Primarily Indian with some {', '.join(c.title() for c in cuisines)} options."
+        else:
+            cuisine_summary = "Strictly Indian"
+
+        protein_per_kg = 1.6 if ('gain' in normalize_text(goal) or 'muscle' in normalize_text(goal)) else 1.2
+        estimated_monthly_cost = round(totals["cost_inr"] / len(DAYS) * 30)
+        return {
+            "weekly_plan": weekly_plan,
+            "summary": {
+                "primary_goal": goal,
+                "target_daily_calories": f"{target_calories:.0f}",
+                "cuisine_focus": cuisine_summary,
+                "dietary_preference": diet_type.capitalize(),
+                "engine": "template",
+                "average_daily_calories": round(totals["calories"] / len(DAYS)),
+                "average_daily_macros_g": {
+                    key: round(totals[key] / len(DAYS), 1) for key in ("protein_g", "carbs_g", "fat_g")
+                },
+                "protein_target_g": round(weight_kg * protein_per_kg) if weight_kg else None,
+                "estimated_monthly_cost": estimated_monthly_cost,
+                "monthly_budget": round(float(monthly_budget)),
+                "within_budget": estimated_monthly_cost <= float(monthly_budget)
+            }
+        }
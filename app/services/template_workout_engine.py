@@ -0,0 +1,251 @@
+# app/services/template_workout_engine.py
+
+import csv
+import os
+import re
+from collections import Counter, namedtuple
+from functools import lru_cache
+from .plan_cache import normalize_text
+
+EXERCISE_LIBRARY_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                     'data', 'exercise_library.csv')
+
+DAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+LEVELS = ('beginner', 'intermediate', 'advanced')
+
+# GenerateWorkoutPlanSchema's equipment choices, and the library's equipment column, as tiers
+EQUIPMENT_TIERS = {'bodyweight only': 0, 'home gym': 1, 'gym access': 2}
+LIBRARY_EQUIPMENT = {'bodyweight': 0, 'home': 1, 'gym': 2}
+
+# Which weekdays train for each workouts-per-week value, spread so rest days fall in between
+TRAINING_DAYS = {
+    1: (0,),
+    2: (0, 3),
+    3: (0, 2, 4),
+    4: (0, 1, 3, 4),
+    5: (0, 1, 2, 4, 5),
+    6: (0, 1, 2, 3, 4, 5),
+    7: (0, 1, 2, 3, 4, 5, 6),
+}
+
+# Workout-type split per workouts-per-week value; beginners stay on full-body work
+SPLITS = {
+    1: ('Full Body',),
+    2: ('Full Body', 'Full Body'),
+    3: ('Push', 'Pull', 'Legs'),
+    4: ('Upper', 'Lower', 'Upper', 'Lower'),
+    5: ('Push', 'Pull', 'Legs', 'Upper', 'Lower'),
+    6: ('Push', 'Pull', 'Legs', 'Push', 'Pull', 'Legs'),
+    7: ('Push', 'Pull', 'Legs', 'Cardio & Core', 'Push', 'Pull', 'Legs'),
+}
+BEGINNER_SPLITS = {
+    3: ('Full Body', 'Full Body', 'Full Body'),
+    5: ('Full Body', 'Cardio & Core', 'Full Body', 'Cardio & Core', 'Full Body'),
+    6: ('Full Body', 'Cardio & Core', 'Full Body', 'Cardio & Core', 'Full Body', 'Cardio & Core'),
+    7: ('Full Body', 'Cardio & Core', 'Full Body', 'Cardio & Core', 'Full Body', 'Cardio & Core', 'Full Body'),
+}
+
+# Movement patterns each workout type trains, in the order they are performed
+DAY_PATTERNS = {
+    'Full Body': ('squat', 'push_h', 'pull_h', 'hinge', 'push_v', 'core', 'lunge'),
+    'Push': ('push_h', 'push_v', 'shoulders', 'triceps', 'push_h', 'core', 'triceps'),
+    'Pull': ('pull_v', 'pull_h', 'hinge', 'biceps', 'pull_h', 'core', 'biceps'),
+    'Legs': ('squat', 'hinge', 'lunge', 'calves', 'core', 'squat', 'hinge'),
+    'Upper': ('push_h', 'pull_h', 'push_v', 'pull_v', 'biceps', 'triceps', 'shoulders'),
+    'Lower': ('squat', 'hinge', 'lunge', 'calves', 'core', 'hinge', 'core'),
+    'Cardio & Core': ('cardio', 'core', 'cardio', 'core', 'cardio', 'core', 'hinge'),
+}
+# Used to fill a day when health conditions rule out a pattern it normally trains
+FALLBACK_PATTERNS = ('core', 'shoulders', 'biceps', 'triceps', 'hinge', 'cardio')
+COMPOUND_PATTERNS = frozenset({'push_h', 'push_v', 'pull_h', 'pull_v', 'squat', 'hinge', 'lunge'})
+
+# Keywords in a user's health_conditions and the library contraindication tag they map to
+CONDITION_KEYWORDS = {
+    'knee': ('knee', 'acl', 'mcl', 'meniscus', 'patella', 'patellar'),
+    'lower_back': ('back', 'spine', 'spinal', 'disc', 'sciatica', 'lumbar'),
+    'shoulder': ('shoulder', 'rotator cuff', 'impingement'),
+    'wrist': ('wrist', 'carpal'),
+    'elbow': ('elbow', 'tendinitis', 'tendonitis'),
+    'ankle': ('ankle', 'achilles', 'plantar'),
+    'neck': ('neck', 'cervical'),
+    'hypertension': ('hypertension', 'blood pressure', 'bp', 'heart', 'cardiac'),
+}
+
+# (goal focus, keywords in fitness_goals), checked in order
+GOAL_KEYWORDS = (
+    ('strength', ('strength', 'strong', 'power')),
+    ('muscle', ('gain', 'muscle', 'bulk', 'hypertrophy', 'mass')),
+    ('fat_loss', ('loss', 'lose', 'fat', 'lean', 'cut', 'tone')),
+    ('endurance', ('endurance', 'stamina', 'cardio', 'run')),
+)
+
+Prescription = namedtuple('Prescription', ['compound_reps', 'accessory_reps', 'compound_rest',
+                                           'accessory_rest', 'hold_seconds'])
+PRESCRIPTIONS = {
+    'strength': Prescription(5, 10, 150, 75, 30),
+    'muscle': Prescription(8, 12, 90, 60, 40),
+    'fat_loss': Prescription(12, 15, 45, 30, 45),
+    'endurance': Prescription(15, 20, 30, 30, 60),
+    'general': Prescription(10, 12, 60, 45, 40),
+}
+LEVEL_SETS = {'beginner': 3, 'intermediate': 4, 'advanced': 4}
+
+WARMUP_MINUTES = 8
+WORK_SECONDS = 40        # rough time under load per set, for fitting a session into its duration
+MAX_EXERCISES = 7
+MIN_EXERCISES = 5        # matches the LLM prompt's "5-7 exercises"
+SHORT_SESSION_EXERCISES = 4
+LEVEL_GAP_PENALTY = 0.5  # an easier exercise costs less than leaving equipment unused
+
+Exercise = namedtuple('Exercise', ['name', 'pattern', 'muscle_group', 'equipment', 'level', 'timed',
+                                   'contraindications', 'form_guidance'])
+
+
+@lru_cache(maxsize=None)
+def load_exercise_library(path=EXERCISE_LIBRARY_PATH):
+    """Reads the bundled exercise library once per process."""
+    with open(path, newline='', encoding='utf-8') as f:
+        return tuple(
+            Exercise(
+                name=row['name'],
+                pattern=row['pattern'],
+                muscle_group=row['muscle_group'],
+                equipment=LIBRARY_EQUIPMENT[row['equipment']],
+                level=LEVELS.index(row['level']),
+                timed=row['timed'] == '1',
+                contraindications=frozenset(c for c in row['contraindications'].split(';') if c),
+                form_guidance=row['form_guidance']
+            )
+            for row in csv.DictReader(f)
+        )
+
+
+def condition_tags(health_conditions):
+    """Maps free-text health conditions to the library's contraindication tags."""
+    text = normalize_text(health_conditions)
+    return frozenset(
+        tag for tag, words in CONDITION_KEYWORDS.items()
+        if any(re.search(rf"\b{re.escape(word)}(s|es)?\b", text) for word in words)
+    )
+
+
+def goal_focus(goal):
+    text = normalize_text(goal)
+    return next((focus for focus, words in GOAL_KEYWORDS if any(word in text for word in words)), 'general')
+
+
+def parse_workouts_per_week(value, default=3):
+    """Reads values like '4', '3-4' or '5+' as a number of training days from 1 to 7."""
+    match = re.search(r'\d+', str(value or ''))
+    return min(max(int(match.group()), 1), 7) if match else default
+
+
+class TemplateWorkoutEngine:
+    """
+    Builds a 7-day workout plan from the bundled exercise library without an LLM.
+
+    The week follows a fixed split for the number of training days; each
+    workout type lists the movement patterns it trains, and every pattern
+    is filled with the eligible exercise that best matches the user's
+    equipment and level while rotating away from ones already used this
+    week. Exercises contraindicated by the user's health conditions are
+    never eligible. Sets, reps and rest come from the goal and level, and
+    the number of exercises is fitted to the session duration.
+    """
+    def __init__(self, exercises=None):
+        self.exercises = exercises if exercises is not None else load_exercise_library()
+
+    def _pools(self, level, equipment, avoided):
+        """Eligible exercises per pattern, each with a penalty for being below the user's equipment and level."""
+        pools = {}
+        for order, exercise in enumerate(self.exercises):
+            if exercise.equipment > equipment or exercise.level > level or exercise.contraindications & avoided:
+                continue
+            penalty = (equipment - exercise.equipment) + LEVEL_GAP_PENALTY * (level - exercise.level)
+            pools.setdefault(exercise.pattern, []).append((penalty, order, exercise))
+        return pools
+
+    @staticmethod
+    def _session_shape(duration, sets, rest):
+        """Fits (exercise count, sets) into the session: drops exercises first, then sets."""
+        available = max(duration - WARMUP_MINUTES, 10) * 60
+        shapes = [(count, sets) for count in range(MAX_EXERCISES, MIN_EXERCISES - 1, -1)]
+        shapes += [(MIN_EXERCISES, fewer) for fewer in range(sets - 1, 1, -1)]
+        shapes.append((SHORT_SESSION_EXERCISES, 2))
+        return next((shape for shape in shapes if shape[0] * shape[1] * (WORK_SECONDS + rest) <= available),
+                    shapes[-1])
+
+    def _pick_exercises(self, workout_type, count, pools, uses):
+        picked = []
+        for pattern in DAY_PATTERNS[workout_type] + FALLBACK_PATTERNS:
+            if len(picked) == count:
+                break
+            options = [option for option in pools.get(pattern, ()) if option[2] not in picked]
+            if options:
+                picked.append(min(options, key=lambda option: (uses[option[2].name] + option[0], option[1]))[2])
+        for exercise in picked:
+            uses[exercise.name] += 1
+        return picked
+
+    @staticmethod
+    def _prescribe(exercise, sets, prescription, level):
+        compound = exercise.pattern in COMPOUND_PATTERNS
+        if exercise.timed:
+            hold = prescription.hold_seconds if level else min(prescription.hold_seconds, 30)
+            reps = f"{hold} seconds"
+        else:
+            reps = prescription.compound_reps if compound else prescription.accessory_reps
+        return {
+            "name": exercise.name,
+            "sets": sets if compound else max(sets - 1, 2),
+            "reps": reps,
+            "rest_seconds": prescription.compound_rest if compound else prescription.accessory_rest,
+            "form_guidance": exercise.form_guidance
+        }
+
+    def build_plan(self, fitness_level='beginner', equipment='bodyweight only', workouts_per_week=3,
+                   workout_duration=45, health_conditions=None, goal=''):
+        """Returns a plan in the same plan_name/weekly_schedule shape the LLM produces."""
+        level_name = normalize_text(fitness_level) if normalize_text(fitness_level) in LEVELS else 'beginner'
+        level = LEVELS.index(level_name)
+        equipment_tier = EQUIPMENT_TIERS.get(normalize_text(equipment), 0)
+        days_per_week = parse_workouts_per_week(workouts_per_week)
+        duration = int(workout_duration or 45)
+        avoided = condition_tags(health_conditions)
+        focus = goal_focus(goal)
+        prescription = PRESCRIPTIONS[focus]
+
+        split = SPLITS[days_per_week]
+        if level_name == 'beginner':
+            split = BEGINNER_SPLITS.get(days_per_week, split)
+        count, sets = self._session_shape(duration, LEVEL_SETS[level_name], prescription.compound_rest)
+        pools = self._pools(level, equipment_tier, avoided)
+
+        weekly_schedule = {day: {"day_type": "Rest"} for day in DAYS}
+        uses = Counter()
+        for day_index, workout_type in zip(TRAINING_DAYS[days_per_week], split):
+            picked = self._pick_exercises(workout_type, count, pools, uses)
+            if not picked:
+                raise ValueError(f"No exercises left for a {workout_type} day after applying the "
+                                 f"equipment, fitness level and health conditions.")
+            exercises = [self._prescribe(exercise, sets, prescription, level) for exercise in picked]
+            weekly_schedule[DAYS[day_index]] = {
+                "day_type": f"{workout_type} Day",
+                "exercises": exercises
+            }
+
+        return {
+            "plan_name": f"Weekly Plan for {goal}",
+            "weekly_schedule": weekly_schedule,
+            "summary": {
+                "engine": "template",
+                "split": " / ".join(dict.fromkeys(split)),
+                "goal_focus": focus,
+                "fitness_level": level_name,
+                "equipment": equipment,
+                "workouts_per_week": days_per_week,
+                "session_minutes": duration,
+                "avoided_conditions": sorted(avoided)
+            }
+        }
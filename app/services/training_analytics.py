@@ -0,0 +1,192 @@
+# app/services/training_analytics.py
+
+from datetime import date, datetime, time, timedelta, timezone
+import numpy as np
+from sqlalchemy import select
+from app.models import db, Exercise, ExerciseEntry, WorkoutLog
+from app.utils.report_cache import report_cache
+
+DEFAULT_ANALYTICS_WEEKS = 12
+MAX_ANALYTICS_WEEKS = 5 * 53
+
+# Acute:chronic workload ratio: the last week's tonnage against the weekly average of the last four
+ACUTE_DAYS = 7
+CHRONIC_DAYS = 28
+
+EPOCH = date(1970, 1, 1)
+
+
+def parse_analytics_weeks(args):
+    """Reads ?weeks=, the number of ISO weeks analysed, this one included. Raises ValueError on bad input."""
+    try:
+        weeks = int(args.get('weeks', DEFAULT_ANALYTICS_WEEKS))
+    except ValueError:
+        raise ValueError("'weeks' must be a whole number.")
+    if not 1 <= weeks <= MAX_ANALYTICS_WEEKS:
+        raise ValueError(f"'weeks' must be between 1 and {MAX_ANALYTICS_WEEKS}.")
+    return weeks
+
+
+def week_starts(days):
+    """The Monday starting the ISO week of each day, as days since 1970-01-01 (a Thursday)."""
+    return days - (days + 3) % 7
+
+
+def estimated_one_rep_maxes(weights, reps):
+    """Epley's estimate per set, as exercise_stats.estimated_one_rep_max computes it for one."""
+    return np.where(reps <= 1, weights, np.round(weights * (1 + reps / 30), 2))
+
+
+def _day(days):
+    return (EPOCH + timedelta(days=int(days))).isoformat()
+
+
+class TrainingHistory:
+    """
+    A user's exercise entries since a given day as parallel arrays, one
+    element per entry, read with a single query. Everything below is
+    computed on these arrays, never row by row.
+    """
+
+    def __init__(self, workout_ids, days, exercise_ids, sets, reps, weights):
+        self.workout_ids = workout_ids
+        self.days = days  # UTC day of the workout, as days since 1970-01-01
+        self.exercise_ids = exercise_ids
+        self.sets = sets
+        self.reps = reps
+        self.weights = weights
+
+    @classmethod
+    def load(cls, connection, user_id, since):
+        entries, logs = ExerciseEntry.__table__, WorkoutLog.__table__
+        rows = connection.execute(
+            select(logs.c.id, logs.c.date, entries.c.exercise_id, entries.c.sets, entries.c.reps, entries.c.weight)
+            .join_from(entries, logs, entries.c.workout_log_id == logs.c.id)
+            .where(logs.c.user_id == user_id, logs.c.date >= datetime.combine(since, time.min, timezone.utc))
+        ).all()
+        if not rows:
+            empty = np.zeros(0, dtype=np.int64)
+            return cls(empty, empty, empty, empty, empty, np.zeros(0))
+
+        workout_ids, dates, exercise_ids, sets, reps, weights = zip(*rows)
+        return cls(
+            np.array(workout_ids, dtype=np.int64),
+            np.fromiter((moment.toordinal() for moment in dates), np.int64, len(dates)) - EPOCH.toordinal(),
+            np.array(exercise_ids, dtype=np.int64),
+            np.array(sets, dtype=np.int64),
+            np.array(reps, dtype=np.int64),
+            np.array(weights, dtype=np.float64),
+        )
+
+    @property
+    def tonnage(self):
+        return self.sets * self.reps * self.weights
+
+
+class TrainingAnalyticsService:
+    """
+    Training volume analytics over a user's workout history: weekly tonnage
+    (sets x reps x weight), per-exercise frequency and progression, and the
+    acute:chronic workload ratio. Results are served from report_cache until
+    the user's workouts change or the day rolls over.
+    """
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+
+    def get_analytics(self, weeks=DEFAULT_ANALYTICS_WEEKS, today=None):
+        today = today or datetime.now(timezone.utc).date()
+        return report_cache.get_or_build(self.user_id, 'training', f"{today.isoformat()}/{weeks}",
+                                         lambda: self._build_analytics(weeks, today))
+
+    def _build_analytics(self, weeks, today):
+        today_days = (today - EPOCH).days
+        first_week = week_starts(today_days) - 7 * (weeks - 1)
+        since = min(first_week, today_days - CHRONIC_DAYS + 1)
+        history = TrainingHistory.load(db.session.connection(), self.user_id, EPOCH + timedelta(days=since))
+
+        in_window = (history.days >= first_week) & (history.days <= today_days)
+        week_index = (week_starts(history.days[in_window]) - first_week) // 7
+        week_labels = [_day(first_week + 7 * week) for week in range(weeks)]
+        return {
+            "weeks": weeks,
+            "from": _day(first_week),
+            "to": today.isoformat(),
+            "weekly": self._weekly_volume(history, in_window, week_index, week_labels),
+            "exercises": self._exercise_progression(history, in_window, week_index, week_labels),
+            "workload": self._workload(history, today_days),
+        }
+
+    def _weekly_volume(self, history, in_window, week_index, week_labels):
+        weeks = len(week_labels)
+        tonnage = np.bincount(week_index, weights=history.tonnage[in_window], minlength=weeks)
+        sets = np.bincount(week_index, weights=history.sets[in_window], minlength=weeks)
+        # Every entry of a workout falls in the same week, so count each workout at its first entry
+        _, first_entries = np.unique(history.workout_ids[in_window], return_index=True)
+        workouts = np.bincount(week_index[first_entries], minlength=weeks)
+        return [
+            {"week_start": label, "tonnage": week_tonnage, "sets": int(week_sets), "workouts": week_workouts}
+            for label, week_tonnage, week_sets, week_workouts
+            in zip(week_labels, tonnage.round(2).tolist(), sets.tolist(), workouts.tolist())
+        ]
+
+    def _exercise_progression(self, history, in_window, week_index, week_labels):
+        weeks = len(week_labels)
+        workout_ids = history.workout_ids[in_window]
+        if not len(workout_ids):
+            return []
+        exercise_ids, exercise_index = np.unique(history.exercise_ids[in_window], return_inverse=True)
+        weights, reps, days = history.weights[in_window], history.reps[in_window], history.days[in_window]
+
+        # Sessions: distinct (exercise, workout) pairs
+        stride = int(workout_ids.max()) + 1
+        pairs = np.unique(exercise_index * stride + workout_ids)
+        sessions = np.bincount(pairs // stride, minlength=len(exercise_ids))
+        last_days = np.full(len(exercise_ids), np.iinfo(np.int64).min)
+        np.maximum.at(last_days, exercise_index, days)
+
+        # One point per (exercise, week) the exercise was done in
+        points, point_index = np.unique(exercise_index * weeks + week_index, return_inverse=True)
+        point_tonnage = np.bincount(point_index, weights=history.tonnage[in_window], minlength=len(points))
+        best_e1rm = np.full(len(points), -np.inf)
+        np.maximum.at(best_e1rm, point_index, estimated_one_rep_maxes(weights, reps))
+        top_weight = np.full(len(points), -np.inf)
+        np.maximum.at(top_weight, point_index, weights)
+        point_exercise, point_week = np.divmod(points, weeks)
+        bounds = np.searchsorted(point_exercise, np.arange(len(exercise_ids) + 1)).tolist()
+        # Plain lists from here on: indexing them is much cheaper than indexing arrays element by element
+        progression = list(zip([week_labels[week] for week in point_week.tolist()], best_e1rm.round(2).tolist(),
+                               top_weight.tolist(), point_tonnage.round(2).tolist()))
+
+        names = dict(db.session.execute(
+            select(Exercise.id, Exercise.name).where(Exercise.id.in_(exercise_ids.tolist()))
+        ).all())
+        exercises = [
+            {
+                "exercise_id": int(exercise_id),
+                "exercise": names.get(int(exercise_id)),
+                "sessions": int(sessions[index]),
+                "sessions_per_week": round(float(sessions[index]) / weeks, 2),
+                "last_performed": _day(last_days[index]),
+                "progression": [
+                    {"week_start": label, "best_e1rm": week_e1rm, "top_weight": week_top, "tonnage": week_tonnage}
+                    for label, week_e1rm, week_top, week_tonnage in progression[bounds[index]:bounds[index + 1]]
+                ]
+            }
+            for index, exercise_id in enumerate(exercise_ids)
+        ]
+        exercises.sort(key=lambda exercise: (-exercise["sessions"], exercise["exercise"] or ''))
+        return exercises
+
+    def _workload(self, history, today_days):
+        age = today_days - history.days
+        tonnage = history.tonnage
+        acute = float(tonnage[(age >= 0) & (age < ACUTE_DAYS)].sum())
+        chronic = float(tonnage[(age >= 0) & (age < CHRONIC_DAYS)].sum()) * ACUTE_DAYS / CHRONIC_DAYS
+        return {
+            "acute_days": ACUTE_DAYS,
+            "chronic_days": CHRONIC_DAYS,
+            "acute_load": round(acute, 2),
+            "chronic_load": round(chronic, 2),
+            "acute_chronic_ratio": round(acute / chronic, 2) if chronic else None,
+        }
@@ -0,0 +1,257 @@
+# app/services/weight_trend.py
+
+import logging
+import math
+from datetime import timedelta, timezone
+import click
+import numpy as np
+from flask.cli import with_appcontext
+from sqlalchemy import delete, event, inspect, insert, select
+from sqlalchemy.orm import Session, object_session
+from app.models import db, User, WeightEntry, WeightTrend
+
+logger = logging.getLogger(__name__)
+
+# How fast old weigh-ins fade: a weigh-in counts half as much this many days later
+EWMA_HALF_LIFE_DAYS = 7
+SLOPE_HALF_LIFE_DAYS = 14
+
+SUM_COLUMNS = ('sum_w', 'sum_t', 'sum_tt', 'sum_kg', 'sum_t_kg')
+
+# A goal within this distance of the trend counts as reached
+GOAL_TOLERANCE_KG = 0.1
+# Projections further out than this are not reported
+MAX_PROJECTION_DAYS = 3 * 365
+
+
+def _naive_utc(moment):
+    """Weigh-in times as stored: naive UTC, whether they come from the database or a new entry."""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def _days_between(earlier, later):
+    return (_naive_utc(later) - _naive_utc(earlier)).total_seconds() / 86400
+
+
+def _decay(days, half_life):
+    return 0.5 ** (days / half_life)
+
+
+def advance(state, at, weight_kg):
+    """
+    Folds one weigh-in, no earlier than state['last_at'], into a trend state
+    and returns the new state: a constant amount of work however long the
+    history is. `state` is None for a user's first weigh-in.
+    """
+    at = _naive_utc(at)
+    if state is None:
+        return {'entries': 1, 'last_at': at, 'last_kg': weight_kg, 'ewma_kg': weight_kg,
+                'sum_w': 1.0, 'sum_t': 0.0, 'sum_tt': 0.0, 'sum_kg': weight_kg, 'sum_t_kg': 0.0}
+
+    elapsed = _days_between(state['last_at'], at)
+    ewma_kg = state['ewma_kg'] + (1 - _decay(elapsed, EWMA_HALF_LIFE_DAYS)) * (weight_kg - state['ewma_kg'])
+
+    # Move the time origin to the new weigh-in, then fade the older ones
+    decay = _decay(elapsed, SLOPE_HALF_LIFE_DAYS)
+    sum_w, sum_t, sum_kg = state['sum_w'], state['sum_t'], state['sum_kg']
+    return {
+        'entries': state['entries'] + 1, 'last_at': at, 'last_kg': weight_kg, 'ewma_kg': ewma_kg,
+        'sum_w': decay * sum_w + 1,
+        'sum_t': decay * (sum_t - elapsed * sum_w),
+        'sum_tt': decay * (state['sum_tt'] - 2 * elapsed * sum_t + elapsed ** 2 * sum_w),
+        'sum_kg': decay * sum_kg + weight_kg,
+        'sum_t_kg': decay * (state['sum_t_kg'] - elapsed * sum_kg),
+    }
+
+
+def trend_from_history(moments, weights):
+    """
+    The state advance() arrives at after every weigh-in of a history sorted
+    by time, computed in closed form over the whole history at once.
+    """
+    if not len(moments):
+        return None
+    weights = np.asarray(weights, dtype=float)
+    times = np.array([_naive_utc(moment) for moment in moments], dtype='datetime64[us]')
+    age = (times[-1] - times) / np.timedelta64(1, 'D')
+
+    # Each weigh-in moved the average by 1 - decay(gap) towards itself and has faded since
+    gaps = -np.diff(age)
+    ewma_weights = np.concatenate(([1.0], 1 - _decay(gaps, EWMA_HALF_LIFE_DAYS))) * _decay(age, EWMA_HALF_LIFE_DAYS)
+
+    faded = _decay(age, SLOPE_HALF_LIFE_DAYS)
+    return {
+        'entries': len(weights), 'last_at': _naive_utc(moments[-1]), 'last_kg': float(weights[-1]),
+        'ewma_kg': float(ewma_weights @ weights),
+        'sum_w': float(faded.sum()),
+        'sum_t': float(-(faded @ age)),
+        'sum_tt': float(faded @ age ** 2),
+        'sum_kg': float(faded @ weights),
+        'sum_t_kg': float(-(faded * age) @ weights),
+    }
+
+
+def slope_per_day(sum_w, sum_t, sum_tt, sum_kg, sum_t_kg):
+    """
+    The weighted least-squares slope in kg per day, 0 where the weigh-ins
+    don't span any time. Takes scalars or arrays of many users' sums.
+    """
+    sum_w, sum_t, sum_tt, sum_kg, sum_t_kg = (np.asarray(value, dtype=float)
+                                              for value in (sum_w, sum_t, sum_tt, sum_kg, sum_t_kg))
+    spread = sum_w * sum_tt - sum_t ** 2
+    spans_time = spread > 1e-9 * np.maximum(sum_w * sum_tt, 1)
+    return np.where(spans_time, (sum_w * sum_t_kg - sum_t * sum_kg) / np.where(spans_time, spread, 1), 0.0)
+
+
+def project_goal(trend_kg, slope, target_kg, from_day):
+    """When the trend reaches target_kg at its current rate, starting from from_day."""
+    if target_kg is None:
+        return {"status": "no_target", "projected_date": None, "days_to_goal": None}
+    remaining = target_kg - trend_kg
+    if abs(remaining) <= GOAL_TOLERANCE_KG:
+        return {"status": "reached", "projected_date": from_day.isoformat(), "days_to_goal": 0}
+    if slope * remaining <= 0:
+        return {"status": "not_trending_towards_goal", "projected_date": None, "days_to_goal": None}
+    days = math.ceil(remaining / slope)
+    if days > MAX_PROJECTION_DAYS:
+        return {"status": "beyond_projection_horizon", "projected_date": None, "days_to_goal": None}
+    return {"status": "on_track", "projected_date": (from_day + timedelta(days=days)).isoformat(),
+            "days_to_goal": days}
+
+
+def describe_trend(state, target_kg):
+    """The trend and goal projection as served by the API, from a weight_trend row or state."""
+    if state is None:
+        return {"entries": 0, "last_weigh_in": None, "trend_kg": None, "slope_kg_per_week": None,
+                "target_weight_kg": target_kg,
+                "goal": {"status": "no_weigh_ins", "projected_date": None, "days_to_goal": None}}
+    slope = float(slope_per_day(*(state[column] for column in SUM_COLUMNS)))
+    return {
+        "entries": state['entries'],
+        "last_weigh_in": {"date": state['last_at'].isoformat(), "weight_kg": state['last_kg']},
+        "trend_kg": round(state['ewma_kg'], 2),
+        "slope_kg_per_week": round(slope * 7, 3),
+        "target_weight_kg": target_kg,
+        "goal": project_goal(state['ewma_kg'], slope, target_kg, state['last_at'].date()),
+    }
+
+
+def _load_state(connection, user_id):
+    table = WeightTrend.__table__
+    row = connection.execute(select(table).where(table.c.user_id == user_id).with_for_update()).first()
+    return dict(row._mapping) if row else None
+
+
+def _history(connection, user_id):
+    table = WeightEntry.__table__
+    rows = connection.execute(
+        select(table.c.date, table.c.weight_kg).where(table.c.user_id == user_id)
+        .order_by(table.c.date.asc(), table.c.id.asc())
+    ).all()
+    return [row.date for row in rows], [row.weight_kg for row in rows]
+
+
+def refresh_user_trend(connection, user_id, client_id):
+    """Recomputes one user's weight_trend row from their whole weight history."""
+    table = WeightTrend.__table__
+    connection.execute(delete(table).where(table.c.user_id == user_id))
+    state = trend_from_history(*_history(connection, user_id))
+    if state is not None:
+        connection.execute(insert(table).values(user_id=user_id, client_id=client_id, **state))
+    return state
+
+
+def append_weigh_ins(connection, user_id, client_id, entries):
+    """
+    Advances the user's trend by newly logged weigh-ins, in O(1) each. Falls
+    back to recomputing from the history when one of them is back-dated
+    before the latest weigh-in or the user has no trend yet.
+    """
+    state = _load_state(connection, user_id)
+    entries = sorted(entries, key=lambda entry: _naive_utc(entry.date))
+    if state is None or _naive_utc(entries[0].date) < state['last_at']:
+        return refresh_user_trend(connection, user_id, client_id)
+
+    for entry in entries:
+        state = advance(state, entry.date, entry.weight_kg)
+    table = WeightTrend.__table__
+    connection.execute(table.update().where(table.c.user_id == user_id).values(
+        {column: value for column, value in state.items() if column not in ('user_id', 'client_id')}
+    ))
+    return state
+
+
+def _changes(target):
+    return object_session(target).info.setdefault('weight_trend_changes', {'appended': {}, 'recompute': {}})
+
+
+def _record_new_entry(mapper, connection, target):
+    _changes(target)['appended'].setdefault((target.user_id, target.client_id), []).append(target)
+
+
+def _record_removed_entry(mapper, connection, target):
+    # Faded sums can't take a weigh-in back out, so edits and deletes recompute the user
+    attrs = inspect(target).attrs
+    recompute = _changes(target)['recompute']
+    for user_id in {target.user_id, *attrs.user_id.history.deleted} - {None}:
+        recompute[user_id] = target.client_id
+
+
+def _record_changed_entry(mapper, connection, target):
+    if object_session(target).is_modified(target, include_collections=False):
+        _record_removed_entry(mapper, connection, target)
+
+
+event.listen(WeightEntry, 'after_insert', _record_new_entry)
+event.listen(WeightEntry, 'after_update', _record_changed_entry)
+event.listen(WeightEntry, 'after_delete', _record_removed_entry)
+
+
+@event.listens_for(Session, 'after_flush')
+def _update_weight_trends(session, flush_context):
+    changes = session.info.pop('weight_trend_changes', None)
+    if not changes:
+        return
+    connection = session.connection()
+    for user_id, client_id in changes['recompute'].items():
+        refresh_user_trend(connection, user_id, client_id)
+    for (user_id, client_id), entries in changes['appended'].items():
+        if user_id not in changes['recompute']:
+            append_weigh_ins(connection, user_id, client_id, entries)
+
+
+def get_weight_trend(user):
+    """The user's smoothed weight, its weekly rate and the projected date of their target weight."""
+    row = db.session.get(WeightTrend, user.id)
+    state = {column.key: getattr(row, column.key) for column in WeightTrend.__table__.columns} if row else None
+    return describe_trend(state, user.target_weight_kg)
+
+
+def rebuild_weight_trend(user_ids=None):
+    """
+    Recomputes weight_trend for the given users, or for everyone. Use it to
+    backfill, or after weight_entry rows were changed with bulk statements
+    that bypass the flush hooks above. Returns the number of rows written.
+    """
+    users = db.session.query(User.id, User.client_id).order_by(User.id.asc())
+    if user_ids is not None:
+        users = users.filter(User.id.in_(user_ids))
+
+    connection = db.session.connection()
+    written = 0
+    for user_id, client_id in users.all():
+        if refresh_user_trend(connection, user_id, client_id) is not None:
+            written += 1
+    db.session.commit()
+    return written
+
+
+@click.command('rebuild-weight-trend')
+@click.option('--user-id', 'user_ids', type=int, multiple=True, help='Only rebuild these users (repeatable).')
+@with_appcontext
+def rebuild_weight_trend_command(user_ids):
+    """Recomputes the smoothed weight trends from the weight history."""
+    rows = rebuild_weight_trend(list(user_ids) or None)
+    click.echo(f"Rebuilt {rows} weight_trend rows.")
@@ -1,11 +1,28 @@
 # app/services/workout_planner_service.py
-import google.generativeai as genai
 import json
+import logging
+from app.models import db, Client
+from .llm_gateway import llm_gateway
+from .plan_cache import plan_cache, make_cache_key, normalize_text, normalize_list
+from .template_workout_engine import TemplateWorkoutEngine
+from .plan_stream import stream_llm_plan, replay_plan
+
+logger = logging.getLogger(__name__)
 
 class WorkoutPlannerService:
-    def __init__(self, user, form_data):
+    def __init__(self, user, form_data, engine=None):
         self.user = user
         self.form_data = form_data
+        # 'llm', 'template', or 'refine' (template draft polished by the LLM);
+        # looked up from the user's tenant when not given
+        self.engine = engine
+
+    @property
+    def plan_engine(self):
+        if self.engine is None:
+            client = db.session.get(Client, self.user.client_id)
+            self.engine = client.workout_engine if client else 'llm'
+        return self.engine
 
     def _generate_llm_prompt(self):
         # Using details from the user's profile and the request form
@@ -48,16 +65,136 @@ class WorkoutPlannerService:
         """
         return prompt
 
+    def _generate_template_plan(self):
+        """Builds the plan locally from the bundled exercise library instead of asking the LLM."""
+        return TemplateWorkoutEngine().build_plan(
+            fitness_level=self.form_data.get('fitnessLevel', 'beginner'),
+            equipment=self.form_data.get('equipment', 'bodyweight only'),
+            workouts_per_week=self.user.workouts_per_week,
+            workout_duration=self.user.workout_duration,
+            health_conditions=self.user.health_conditions,
+            goal=self.user.fitness_goals
+        )
+
+    def _generate_refine_prompt(self, draft_plan):
+        prompt = f"""
+        Below is a draft 7-day workout plan built from a fixed exercise library.
+        Refine it for this user and return the improved plan. The output MUST be only a valid JSON object.
+
+        **User Profile & Goals:**
+        - Primary Goal: {self.user.fitness_goals}
+        - Fitness Level: {self.form_data.get('fitnessLevel', 'beginner')}
+        - Workouts Per Week: {self.user.workouts_per_week}
+        - Preferred Duration: {self.user.workout_duration} minutes per session
+        - Equipment Availability: {self.form_data.get('equipment', 'bodyweight only')}
+        - Existing Injuries or Conditions: {self.user.health_conditions}
+
+        **Refinement Rules:**
+        - Keep the same training days, rest days and day types unless they clearly conflict with the profile.
+        - You may swap exercises, adjust sets, reps and rest, and make the form guidance more specific.
+        - Never add exercises that are unsafe for the user's injuries or conditions.
+        - Keep exactly the same JSON structure as the draft, including the "summary" object.
+
+        **Draft Plan:**
+        {json.dumps(draft_plan)}
+        """
+        return prompt
+
     def _call_llm_api(self, prompt):
-        model = genai.GenerativeModel('gemini-2.5-pro')
-        generation_config = genai.GenerationConfig(response_mime_type="application/json")
-        response = model.generate_content(prompt, generation_config=generation_config)
-        return json.loads(response.text)
+        # Goes through the shared gateway, which owns the model and enforces concurrency limits
+        return llm_gateway.generate_json(prompt)
+
+    def _cache_key(self):
+        """Hashes the normalized inputs _generate_llm_prompt turns into a plan."""
+        inputs = {
+            "client_id": self.user.client_id,
+            "goal": normalize_text(self.user.fitness_goals),
+            "fitness_level": normalize_text(self.form_data.get('fitnessLevel', 'beginner')),
+            "equipment": normalize_text(self.form_data.get('equipment', 'bodyweight only')),
+            "workouts_per_week": normalize_text(self.user.workouts_per_week),
+            "workout_duration": self.user.workout_duration,
+            "health_conditions": normalize_list(self.user.health_conditions)
+        }
+        if self.plan_engine == 'refine':
+            # Refined plans start from the template draft, so they never share entries with plain LLM plans
+            inputs["engine"] = 'refine'
+        return make_cache_key('workout', inputs)
+
+    def get_cached_plan(self):
+        """Returns a previously generated plan for identical inputs, or None."""
+        if self.plan_engine == 'template':
+            # Template plans are cheaper to rebuild than to look up
+            return None
+        try:
+            return plan_cache.get(self._cache_key())
+        except Exception:
+            return None
 
     def generate_plan(self):
         try:
+            if self.plan_engine == 'template':
+                return {"success": True, "plan": self._generate_template_plan(), "engine": "template"}
+
+            cache_key = self._cache_key()
+            cached_plan = plan_cache.get(cache_key)
+            if cached_plan is not None:
+                return {"success": True, "plan": cached_plan, "cached": True}
+
+            if self.plan_engine == 'refine':
+                draft_plan = self._generate_template_plan()
+                try:
+                    final_plan = self._call_llm_api(self._generate_refine_prompt(draft_plan))
+                except Exception as e:
+                    # The draft is a complete plan by itself, so it beats failing the request
+                    logger.warning(f"Workout plan refinement failed, returning the template draft: {e}")
+                    return {"success": True, "plan": draft_plan, "engine": "template"}
+                if isinstance(final_plan.get("summary"), dict):
+                    final_plan["summary"]["engine"] = "refine"
+                plan_cache.put('workout', cache_key, final_plan)
+                return {"success": True, "plan": final_plan, "engine": "refine"}
+
             prompt = self._generate_llm_prompt()
             final_plan = self._call_llm_api(prompt)
+            plan_cache.put('workout', cache_key, final_plan)
             return {"success": True, "plan": final_plan}
         except Exception as e:
-            return {"success": False, "error": str(e)}
\ No newline at end of file
+            return {"success": False, "error": str(e)}
+
+    def stream_plan(self):
+        """
+        Like generate_plan, but yields ('day', name, schedule) as each day becomes
+        available and finally ('plan', None, plan). Errors are raised, not returned.
+        """
+        if self.plan_engine == 'template':
+            yield from replay_plan(self._generate_template_plan(), 'weekly_schedule')
+            return
+
+        cache_key = self._cache_key()
+        cached_plan = plan_cache.get(cache_key)
+        if cached_plan is not None:
+            yield from replay_plan(cached_plan, 'weekly_schedule')
+            return
+
+        if self.plan_engine == 'refine':
+            yield from self._stream_refined_plan(cache_key)
+            return
+
+        for kind, name, value in stream_llm_plan(self._generate_llm_prompt()):
+            if kind == 'plan':
+                plan_cache.put('workout', cache_key, value)
+            yield kind, name, value
+
+    def _stream_refined_plan(self, cache_key):
+        """stream_plan for the refine engine: falls back to the template draft like generate_plan does."""
+        draft_plan = self._generate_template_plan()
+        try:
+            for kind, name, value in stream_llm_plan(self._generate_refine_prompt(draft_plan)):
+                if kind == 'plan':
+                    if isinstance(value.get("summary"), dict):
+                        value["summary"]["engine"] = "refine"
+                    plan_cache.put('workout', cache_key, value)
+                yield kind, name, value
+        except Exception as e:
+            # Days the model already sent are sent again from the draft, so the client ends up with the draft
+            logger.warning(f"Workout plan refinement failed, streaming the template draft: {e}")
+            yield from replay_plan(draft_plan, 'weekly_schedule')
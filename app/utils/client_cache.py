@@ -0,0 +1,96 @@
+# app/utils/client_cache.py
+
+import threading
+from collections import namedtuple
+from cachetools import TTLCache
+from sqlalchemy import event
+from app.models import Client
+
+# A detached, read-only view of a Client row. It is safe to keep across
+# requests and threads because it holds no reference to a DB session.
+ClientSnapshot = namedtuple('ClientSnapshot', ['id', 'company_name', 'api_key', 'referral_code', 'plan_engine',
+                                               'workout_engine'])
+
+
+class ClientCache:
+    """
+    A bounded, TTL-evicting cache that resolves an API key to a ClientSnapshot.
+    Entries are dropped as soon as the matching Client row is updated or deleted
+    in this process; the TTL bounds how long other workers can serve a stale entry.
+    """
+    def __init__(self, maxsize=1024, ttl=300):
+        self._lock = threading.Lock()
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        """Re-sizes the cache from the app config and resets it."""
+        with self._lock:
+            self._cache = TTLCache(
+                maxsize=app.config.get('CLIENT_CACHE_MAXSIZE', 1024),
+                ttl=app.config.get('CLIENT_CACHE_TTL', 300)
+            )
+            self.hits = 0
+            self.misses = 0
+
+    def get(self, api_key):
+        """
+        Returns the ClientSnapshot for an API key, or None if the key is unknown.
+        Unknown keys are never cached, so a newly created client works immediately.
+        """
+        with self._lock:
+            snapshot = self._cache.get(api_key)
+            if snapshot is not None:
+                self.hits += 1
+                return snapshot
+            self.misses += 1
+
+        client = Client.query.filter_by(api_key=api_key).first()
+        if not client:
+            return None
+
+        snapshot = ClientSnapshot(
+            id=client.id,
+            company_name=client.company_name,
+            api_key=client.api_key,
+            referral_code=client.referral_code,
+            plan_engine=client.plan_engine,
+            workout_engine=client.workout_engine
+        )
+        with self._lock:
+            self._cache[api_key] = snapshot
+        return snapshot
+
+    def invalidate_client(self, client_id):
+        """Drops every cached entry that belongs to the given client id."""
+        with self._lock:
+            stale_keys = [key for key, snapshot in self._cache.items() if snapshot.id == client_id]
+            for key in stale_keys:
+                self._cache.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self):
+        """Returns the hit/miss counters and current size of the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "size": len(self._cache),
+                "maxsize": self._cache.maxsize,
+                "ttl": self._cache.ttl
+            }
+
+
+client_cache = ClientCache()
+
+
+@event.listens_for(Client, 'after_update')
+@event.listens_for(Client, 'after_delete')
+def _invalidate_changed_client(mapper, connection, target):
+    client_cache.invalidate_client(target.id)
@@ -2,7 +2,10 @@
 
 from functools import wraps
 from flask import request, g, jsonify, current_app
-from app.models import Client, User, TokenBlocklist
+from app.models import db, User
+from app.utils.client_cache import client_cache
+from app.utils.token_revocation import revocation_filter
+from app.utils.user_cache import user_cache
 import jwt
 
 def require_api_key(f):
@@ -15,7 +18,7 @@ def require_api_key(f):
         if not api_key:
             return jsonify({"error": "API key is missing"}), 401
 
-        client = Client.query.filter_by(api_key=api_key).first()
+        client = client_cache.get(api_key)
         if not client:
             return jsonify({"error": "API key is invalid or unauthorized"}), 403
 
@@ -36,7 +39,7 @@ def require_jwt(f):
         if not api_key:
             return jsonify({"error": "API key is missing"}), 401
 
-        client = Client.query.filter_by(api_key=api_key).first()
+        client = client_cache.get(api_key)
         if not client:
             return jsonify({"error": "API key is invalid or unauthorized"}), 403
         
@@ -54,16 +57,18 @@ def require_jwt(f):
             
             # --- NEW: Check if the token has been blocklisted ---
             jti = data.get('jti')
-            if not jti or TokenBlocklist.query.filter_by(jti=jti).first():
+            if not jti or revocation_filter.is_revoked(jti):
                 return jsonify({"error": "Token has been revoked"}), 401
 
-            user = User.query.get(data['user_id'])
+            identity = user_cache.get(data['user_id'])
 
             # 3. Finally, verify the user belongs to the client
-            if not user or user.client_id != client.id:
+            if not identity or identity.client_id != client.id:
                 return jsonify({"error": "User not found or does not belong to this client"}), 404
 
-            g.current_user = user
+            # Only the lightweight identity is attached; see get_current_user()
+            g.identity = identity
+            g.pop('current_user', None)
             g.client = client # Also attach the client for consistency
             g.decoded_token = data # Store decoded token for access in the logout route
 
@@ -74,3 +79,20 @@ def require_jwt(f):
 
         return f(*args, **kwargs)
     return decorated_function
+
+
+def get_current_user():
+    """
+    Returns the full User row for the JWT-authenticated request.
+    It is loaded on first use and reused for the rest of the request.
+    """
+    if 'current_user' not in g:
+        g.current_user = db.session.get(User, g.identity.id)
+    return g.current_user
+
+
+def service_unavailable(message, retry_after):
+    """Builds a 503 response telling the client when it is worth retrying."""
+    response = jsonify({"error": message})
+    response.headers['Retry-After'] = str(int(retry_after))
+    return response, 503
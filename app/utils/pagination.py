@@ -0,0 +1,87 @@
+# app/utils/pagination.py
+
+import base64
+import json
+from datetime import datetime
+from flask import jsonify
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 200
+
+
+def encode_cursor(row_date, row_id):
+    """Packs a (date, id) position into an opaque, URL-safe cursor string."""
+    payload = json.dumps([row_date.isoformat(), row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Unpacks a cursor produced by encode_cursor. Raises ValueError if it is malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        row_date, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(row_date), int(row_id)
+    except Exception:
+        raise ValueError("Invalid pagination cursor.")
+
+
+def parse_page_args(args):
+    """
+    Reads 'limit' and 'cursor' from the query string.
+    Returns (limit, position) where position is None for the first page.
+    """
+    try:
+        limit = int(args.get('limit', DEFAULT_PAGE_LIMIT))
+    except (TypeError, ValueError):
+        raise ValueError("'limit' must be an integer.")
+    if limit < 1 or limit > MAX_PAGE_LIMIT:
+        raise ValueError(f"'limit' must be between 1 and {MAX_PAGE_LIMIT}.")
+
+    cursor = args.get('cursor')
+    return limit, decode_cursor(cursor) if cursor else None
+
+
+def paginate_by_date(query, model, limit, position=None, descending=True):
+    """
+    Applies keyset pagination on (model.date, model.id) to a query that is
+    already filtered by user_id, so each page is a range read on the
+    (user_id, date) index no matter how deep it is.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    if position is not None:
+        last_date, last_id = position
+        # The redundant bound on date alone keeps the predicate sargable on the index
+        if descending:
+            query = query.filter(
+                model.date <= last_date,
+                or_(model.date < last_date, and_(model.date == last_date, model.id < last_id))
+            )
+        else:
+            query = query.filter(
+                model.date >= last_date,
+                or_(model.date > last_date, and_(model.date == last_date, model.id > last_id))
+            )
+
+    if descending:
+        query = query.order_by(model.date.desc(), model.id.desc())
+    else:
+        query = query.order_by(model.date.asc(), model.id.asc())
+
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].date, rows[-1].id)
+    return rows, next_cursor
+
+
+def page_response(items, next_cursor):
+    """
+    Returns the page as a plain JSON list, keeping the existing response shape.
+    The cursor for the next page travels in the X-Next-Cursor header.
+    """
+    response = jsonify(items)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
@@ -0,0 +1,170 @@
+# app/utils/report_cache.py
+
+import threading
+from cachetools import TTLCache
+from sqlalchemy import event, inspect, select, update
+from sqlalchemy.orm import Session, object_session
+from sqlalchemy.orm.util import identity_key
+from app.models import db, User, DietLog, WorkoutLog, ExerciseEntry, WeightEntry
+
+# Logs that reports are computed from; writing any of them bumps the owner's data_version
+REPORT_INPUTS = (DietLog, WorkoutLog, WeightEntry)
+# Entries of a workout, whose owner is found through the workout (see training_analytics)
+REPORT_ENTRY_INPUTS = (ExerciseEntry,)
+
+
+class ReportCache:
+    """
+    A per-process cache of computed reports keyed by (user_id, report kind,
+    window, data version).
+
+    user.data_version is bumped in the same transaction as every write that
+    can change a user's reports (see the flush hooks below), so a lookup made
+    with the current version can only hit a report built from the data as it
+    is now, in every worker. Entries for older versions are never asked for
+    again and age out; the TTL bounds memory, not staleness.
+    """
+    def __init__(self, maxsize=10000, ttl=86400):
+        self._lock = threading.Lock()
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        """Re-sizes the cache from the app config and resets it."""
+        with self._lock:
+            self._cache = TTLCache(
+                maxsize=app.config.get('REPORT_CACHE_MAXSIZE', 10000),
+                ttl=app.config.get('REPORT_CACHE_TTL', 86400)
+            )
+            self.hits = 0
+            self.misses = 0
+
+    def current_version(self, user_id):
+        """The user's data_version as committed, or None if the user does not exist."""
+        return db.session.query(User.data_version).filter(User.id == user_id).scalar()
+
+    def get(self, user_id, kind, window, version):
+        """Returns the cached report, or None. Callers must treat it as read-only."""
+        with self._lock:
+            report = self._cache.get((user_id, kind, window, version))
+            if report is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return report
+
+    def put(self, user_id, kind, window, version, report):
+        with self._lock:
+            self._cache[(user_id, kind, window, version)] = report
+
+    def get_or_build(self, user_id, kind, window, build):
+        """
+        Returns the report for the user's current data version, calling
+        build() to compute and cache it on a miss. The version is read before
+        build() runs, so a write that lands mid-build moves readers on to a
+        new key instead of leaving them a stale entry.
+        """
+        version = self.current_version(user_id)
+        if version is None:
+            return build()
+
+        report = self.get(user_id, kind, window, version)
+        if report is None:
+            report = build()
+            self.put(user_id, kind, window, version, report)
+        return report
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self):
+        """Returns the hit/miss counters and current size of the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "size": len(self._cache),
+                "maxsize": self._cache.maxsize,
+                "ttl": self._cache.ttl
+            }
+
+
+report_cache = ReportCache()
+
+
+def _changed_users(target):
+    return object_session(target).info.setdefault('report_cache_users', set())
+
+
+def _columns_changed(target):
+    # after_update also fires for relationship-only changes, like exercises added to a workout
+    return object_session(target).is_modified(target, include_collections=False)
+
+
+def _touch_log_owner(mapper, connection, target):
+    _changed_users(target).add(target.user_id)
+
+
+def _touch_changed_log_owner(mapper, connection, target):
+    if _columns_changed(target):
+        _changed_users(target).add(target.user_id)
+
+
+def _touch_entry_workout(mapper, connection, target):
+    session = object_session(target)
+    for workout_id in {target.workout_log_id, *inspect(target).attrs.workout_log_id.history.deleted} - {None}:
+        workout = session.identity_map.get(identity_key(WorkoutLog, workout_id))
+        if workout is not None:
+            _changed_users(target).add(workout.user_id)
+        else:
+            session.info.setdefault('report_cache_workouts', set()).add(workout_id)
+
+
+def _touch_changed_entry_workout(mapper, connection, target):
+    if _columns_changed(target):
+        _touch_entry_workout(mapper, connection, target)
+
+
+def _touch_profile(mapper, connection, target):
+    # Weight, age, activity level and goal all feed the calorie target
+    if _columns_changed(target):
+        _changed_users(target).add(target.id)
+
+
+for _model in REPORT_INPUTS:
+    event.listen(_model, 'after_insert', _touch_log_owner)
+    event.listen(_model, 'after_update', _touch_changed_log_owner)
+    event.listen(_model, 'after_delete', _touch_log_owner)
+for _model in REPORT_ENTRY_INPUTS:
+    event.listen(_model, 'after_insert', _touch_entry_workout)
+    event.listen(_model, 'after_update', _touch_changed_entry_workout)
+    event.listen(_model, 'after_delete', _touch_entry_workout)
+event.listen(User, 'after_update', _touch_profile)
+
+
+@event.listens_for(Session, 'after_flush_postexec')
+def _bump_data_versions(session, flush_context):
+    # Same transaction as the writes themselves: the new version becomes visible exactly when they do
+    user_ids = session.info.pop('report_cache_users', None) or set()
+    workout_ids = session.info.pop('report_cache_workouts', None)
+    if workout_ids:
+        # Entries removed together with their workout are covered by the workout's own delete event
+        workouts = WorkoutLog.__table__
+        user_ids.update(session.connection().scalars(
+            select(workouts.c.user_id).where(workouts.c.id.in_(workout_ids))
+        ))
+    if not user_ids:
+        return
+    users = User.__table__
+    session.connection().execute(
+        update(users).where(users.c.id.in_(user_ids)).values(data_version=users.c.data_version + 1)
+    )
+    # Loaded User objects would otherwise keep reporting the old version until the next commit
+    for user_id in user_ids:
+        user = session.identity_map.get(identity_key(User, user_id))
+        if user is not None:
+            session.expire(user, ['data_version'])
@@ -0,0 +1,46 @@
+# app/utils/sse.py
+
+import json
+import logging
+from flask import Response, stream_with_context
+from app.models import db
+from app.services.llm_gateway import LLMUnavailableError
+
+logger = logging.getLogger(__name__)
+
+
+def sse_event(event, data):
+    """Formats one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def plan_event_stream(events, store_plan):
+    """
+    Turns a planner's stream_plan() events into a text/event-stream response.
+
+    Each completed day is sent as a `day` event the moment it is available.
+    Once the whole plan has arrived it is stored with store_plan(plan), which
+    returns the saved row, and a final `done` event carries its id and the
+    full plan. Failures after the stream has started are sent as an `error`
+    event, since the status code has already gone out.
+    """
+    def generate():
+        try:
+            for kind, name, value in events:
+                if kind == 'day':
+                    yield sse_event('day', {"day": name, "plan": value})
+                else:
+                    saved = store_plan(value)
+                    yield sse_event('done', {"plan_id": saved.id, "plan": value})
+        except LLMUnavailableError as e:
+            yield sse_event('error', {"error": str(e), "retry_after": e.retry_after})
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Streaming plan generation failed: {e}")
+            yield sse_event('error', {"error": "Plan generation failed", "details": str(e)})
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop reverse proxies from buffering the stream until it ends
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
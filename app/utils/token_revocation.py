@@ -0,0 +1,172 @@
+# app/utils/token_revocation.py
+
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete
+from app.models import db, TokenBlocklist
+
+
+def _utcnow():
+    # TokenBlocklist.created_at is a naive column holding UTC values
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class BloomFilter:
+    """
+    A fixed-size Bloom filter over strings. Membership tests can return false
+    positives but never false negatives.
+    """
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(int(capacity), 1)
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.capacity = capacity
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, item):
+        # Kirsch-Mitzenmacher double hashing from a single digest
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:], 'big') | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item):
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class RevocationFilter:
+    """
+    Keeps the jtis of revoked access tokens in memory so require_jwt does not
+    query token_blocklist on every request.
+
+    A Bloom filter answers "definitely not revoked" for almost every token.
+    Filter hits are confirmed against an exact jti -> revoked_at map, and only a
+    false positive falls through to the database. Each worker pulls new rows
+    incrementally using a created_at watermark, and entries are forgotten once
+    the access-token lifetime has passed, since the token can no longer decode.
+    """
+    # Rows are stamped before they commit, so each refresh re-reads a short
+    # window behind the watermark to catch late-committing revocations.
+    WATERMARK_OVERLAP = timedelta(seconds=30)
+
+    def __init__(self, token_lifetime=timedelta(minutes=15), refresh_interval=2,
+                 purge_interval=600, capacity=10000, error_rate=0.01):
+        self._lock = threading.Lock()
+        self.token_lifetime = token_lifetime
+        self.refresh_interval = refresh_interval
+        self.purge_interval = purge_interval
+        self.error_rate = error_rate
+        self._min_capacity = capacity
+        self._reset()
+
+    def _reset(self):
+        self._revoked = {}
+        self._bloom = BloomFilter(self._min_capacity, self.error_rate)
+        self._watermark = None
+        self._last_refresh = 0.0
+        self._last_purge = time.monotonic()
+        self.db_checks = 0
+
+    def init_app(self, app):
+        """Reads the lifetime and refresh settings from the app config and resets the filter."""
+        with self._lock:
+            self.token_lifetime = timedelta(minutes=app.config.get('ACCESS_TOKEN_EXPIRES_MINUTES', 15))
+            self.refresh_interval = app.config.get('REVOCATION_REFRESH_SECONDS', 2)
+            self.purge_interval = app.config.get('REVOCATION_PURGE_SECONDS', 600)
+            self._min_capacity = app.config.get('REVOCATION_FILTER_CAPACITY', 10000)
+            self._reset()
+
+    def _add_locked(self, jti, revoked_at):
+        self._revoked[jti] = revoked_at
+        if len(self._revoked) > self._bloom.capacity:
+            self._rebuild_locked()
+        else:
+            self._bloom.add(jti)
+
+    def _rebuild_locked(self):
+        capacity = max(self._min_capacity, len(self._revoked) * 2)
+        self._bloom = BloomFilter(capacity, self.error_rate)
+        for jti in self._revoked:
+            self._bloom.add(jti)
+
+    def _expire_locked(self, now):
+        cutoff = now - self.token_lifetime
+        expired = [jti for jti, revoked_at in self._revoked.items() if revoked_at < cutoff]
+        if expired:
+            for jti in expired:
+                del self._revoked[jti]
+            # Bloom filters cannot delete, so rebuild from the surviving jtis
+            self._rebuild_locked()
+
+    def refresh(self, force=False):
+        """
+        Loads blocklist rows created since the last watermark and drops
+        entries that outlived the access-token lifetime.
+        """
+        with self._lock:
+            if not force and time.monotonic() - self._last_refresh < self.refresh_interval:
+                return
+            now = _utcnow()
+            cutoff = now - self.token_lifetime
+            # Re-reading rows behind the watermark is idempotent thanks to the dict
+            since = max(self._watermark - self.WATERMARK_OVERLAP, cutoff) if self._watermark else cutoff
+
+            rows = db.session.query(TokenBlocklist.jti, TokenBlocklist.created_at).filter(
+                TokenBlocklist.created_at >= since
+            ).all()
+            for jti, created_at in rows:
+                self._add_locked(jti, created_at)
+                if self._watermark is None or created_at > self._watermark:
+                    self._watermark = created_at
+
+            self._expire_locked(now)
+            self._last_refresh = time.monotonic()
+            purge_due = time.monotonic() - self._last_purge >= self.purge_interval
+            if purge_due:
+                self._last_purge = time.monotonic()
+
+        if purge_due:
+            self.purge_expired()
+
+    def revoke(self, jti, revoked_at=None):
+        """Records a jti revoked by this process so it takes effect here immediately."""
+        with self._lock:
+            self._add_locked(jti, revoked_at or _utcnow())
+
+    def is_revoked(self, jti):
+        self.refresh()
+        with self._lock:
+            if jti not in self._bloom:
+                return False
+            if jti in self._revoked:
+                return True
+            self.db_checks += 1
+        # A Bloom false positive: confirm against the table
+        return TokenBlocklist.query.filter_by(jti=jti).first() is not None
+
+    def purge_expired(self):
+        """Deletes blocklist rows whose tokens have expired, so the table stops growing."""
+        cutoff = _utcnow() - self.token_lifetime
+        with db.engine.begin() as conn:
+            result = conn.execute(delete(TokenBlocklist).where(TokenBlocklist.created_at < cutoff))
+        return result.rowcount
+
+    def stats(self):
+        with self._lock:
+            return {
+                "revoked_in_memory": len(self._revoked),
+                "bloom_bits": self._bloom.num_bits,
+                "bloom_hashes": self._bloom.num_hashes,
+                "db_checks": self.db_checks,
+                "watermark": self._watermark.isoformat() if self._watermark else None
+            }
+
+
+revocation_filter = RevocationFilter()
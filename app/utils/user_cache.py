@@ -0,0 +1,86 @@
+# app/utils/user_cache.py
+
+import threading
+from collections import namedtuple
+from cachetools import TTLCache
+from app.models import db, User
+
+# The few User columns needed to authorize a request and scope queries to it.
+# Handlers that need the full profile load the ORM row on demand instead.
+UserIdentity = namedtuple('UserIdentity', ['id', 'client_id', 'name', 'email', 'version'])
+
+
+class UserCache:
+    """
+    A versioned, TTL-evicting cache of UserIdentity snapshots keyed by user id.
+
+    Every invalidation bumps the user's version. A lookup that misses records
+    the version before querying and only stores its result if no invalidation
+    happened in the meantime, so a slow read can never re-cache stale data.
+    """
+    def __init__(self, maxsize=10000, ttl=300):
+        self._lock = threading.Lock()
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._versions = {}
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        """Re-sizes the cache from the app config and resets it."""
+        with self._lock:
+            self._cache = TTLCache(
+                maxsize=app.config.get('USER_CACHE_MAXSIZE', 10000),
+                ttl=app.config.get('USER_CACHE_TTL', 300)
+            )
+            self._versions = {}
+            self.hits = 0
+            self.misses = 0
+
+    def get(self, user_id):
+        """Returns the UserIdentity for a user id, or None if the user does not exist."""
+        with self._lock:
+            identity = self._cache.get(user_id)
+            if identity is not None:
+                self.hits += 1
+                return identity
+            self.misses += 1
+            version = self._versions.get(user_id, 0)
+
+        row = db.session.query(User.id, User.client_id, User.name, User.email).filter(
+            User.id == user_id
+        ).first()
+        if not row:
+            return None
+
+        identity = UserIdentity(id=row.id, client_id=row.client_id, name=row.name,
+                                email=row.email, version=version)
+        with self._lock:
+            if self._versions.get(user_id, 0) == version:
+                self._cache[user_id] = identity
+        return identity
+
+    def invalidate(self, user_id):
+        """Drops the cached snapshot for a user and bumps their version."""
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            self._cache.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self):
+        """Returns the hit/miss counters and current size of the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "size": len(self._cache),
+                "maxsize": self._cache.maxsize,
+                "ttl": self._cache.ttl
+            }
+
+
+user_cache = UserCache()
@@ -30,4 +30,62 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
     # --- ADD THIS LINE ---
-    GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
\ No newline at end of file
+    GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
+
+    # --- API-key -> Client resolution cache ---
+    CLIENT_CACHE_MAXSIZE = int(os.environ.get('CLIENT_CACHE_MAXSIZE', 1024))
+    CLIENT_CACHE_TTL = int(os.environ.get('CLIENT_CACHE_TTL', 300))  # seconds
+
+    # --- User id -> identity snapshot cache ---
+    USER_CACHE_MAXSIZE = int(os.environ.get('USER_CACHE_MAXSIZE', 10000))
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 300))  # seconds
+
+    # --- Computed reports, keyed by each user's data_version ---
+    REPORT_CACHE_MAXSIZE = int(os.environ.get('REPORT_CACHE_MAXSIZE', 10000))
+    REPORT_CACHE_TTL = int(os.environ.get('REPORT_CACHE_TTL', 86400))  # seconds; bounds memory only
+
+    # --- Access tokens and the in-memory revocation filter ---
+    ACCESS_TOKEN_EXPIRES_MINUTES = 15
+    REVOCATION_REFRESH_SECONDS = int(os.environ.get('REVOCATION_REFRESH_SECONDS', 2))
+    REVOCATION_PURGE_SECONDS = int(os.environ.get('REVOCATION_PURGE_SECONDS', 600))
+    REVOCATION_FILTER_CAPACITY = int(os.environ.get('REVOCATION_FILTER_CAPACITY', 10000))
+
+    # --- Background plan-generation jobs ---
+    PLAN_JOB_WORKERS = int(os.environ.get('PLAN_JOB_WORKERS', 2))
+    PLAN_JOB_MAX_PENDING = int(os.environ.get('PLAN_JOB_MAX_PENDING', 50))
+    # Queued or running jobs older than this were lost with a restarted worker and are failed
+    PLAN_JOB_TIMEOUT_SECONDS = int(os.environ.get('PLAN_JOB_TIMEOUT_SECONDS', 900))
+
+    # --- Content-addressed cache of generated plans ---
+    PLAN_CACHE_ENABLED = os.environ.get('PLAN_CACHE_ENABLED', 'true').lower() == 'true'
+    PLAN_CACHE_TTL_DAYS = int(os.environ.get('PLAN_CACHE_TTL_DAYS', 30))
+    PLAN_CACHE_MAX_ENTRIES = int(os.environ.get('PLAN_CACHE_MAX_ENTRIES', 5000))
+    PLAN_CACHE_CALORIE_BUCKET = int(os.environ.get('PLAN_CACHE_CALORIE_BUCKET', 50))  # kcal
+    # Cache hits are batched and written to the table at most this often
+    PLAN_CACHE_TOUCH_INTERVAL_SECONDS = int(os.environ.get('PLAN_CACHE_TOUCH_INTERVAL_SECONDS', 60))
+
+    # --- Shared LLM gateway: one model per process, bounded concurrency, circuit breaker ---
+    LLM_MODEL_NAME = os.environ.get('LLM_MODEL_NAME', 'gemini-2.5-pro')
+    LLM_MAX_IN_FLIGHT = int(os.environ.get('LLM_MAX_IN_FLIGHT', 4))
+    LLM_MAX_QUEUE = int(os.environ.get('LLM_MAX_QUEUE', 16))
+    LLM_QUEUE_TIMEOUT = int(os.environ.get('LLM_QUEUE_TIMEOUT', 30))  # seconds
+    LLM_BREAKER_THRESHOLD = int(os.environ.get('LLM_BREAKER_THRESHOLD', 5))
+    LLM_BREAKER_COOLDOWN = int(os.environ.get('LLM_BREAKER_COOLDOWN', 60))  # seconds
+    LLM_RETRY_AFTER = int(os.environ.get('LLM_RETRY_AFTER', 5))  # seconds
+
+    # --- Weekly adaptive planning job ---
+    REPORT_BATCH_SIZE = int(os.environ.get('REPORT_BATCH_SIZE', 1000))  # users per grouped reporting query
+    ADAPTIVE_JOB_WORKERS = int(os.environ.get('ADAPTIVE_JOB_WORKERS', 4))  # users processed concurrently
+    # 'controller' computes calorie adjustments locally in one batch; 'llm' asks the model per user
+    CALORIE_ADJUSTMENT_MODE = os.environ.get('CALORIE_ADJUSTMENT_MODE', 'controller')
+    CALORIE_CONTROLLER_TARGET_RATE_KG = float(os.environ.get('CALORIE_CONTROLLER_TARGET_RATE_KG', 0.5))  # kg/week
+    CALORIE_CONTROLLER_GAIN = float(os.environ.get('CALORIE_CONTROLLER_GAIN', 0.5))
+    CALORIE_CONTROLLER_DEADBAND_KG = float(os.environ.get('CALORIE_CONTROLLER_DEADBAND_KG', 0.1))
+    CALORIE_CONTROLLER_MIN_ADHERENCE = float(os.environ.get('CALORIE_CONTROLLER_MIN_ADHERENCE', 60))
+    CALORIE_CONTROLLER_MAX_ADJUSTMENT = int(os.environ.get('CALORIE_CONTROLLER_MAX_ADJUSTMENT', 300))  # kcal
+    CALORIE_CONTROLLER_STEP = int(os.environ.get('CALORIE_CONTROLLER_STEP', 50))  # kcal
+
+    # --- Scheduled jobs: 'embedded' lets any web process lead, 'off' leaves them to scheduler.py ---
+    SCHEDULER_MODE = os.environ.get('SCHEDULER_MODE', 'embedded')
+    SCHEDULER_LEASE_TTL_SECONDS = int(os.environ.get('SCHEDULER_LEASE_TTL_SECONDS', 60))
+    SCHEDULER_LEASE_RENEW_SECONDS = int(os.environ.get('SCHEDULER_LEASE_RENEW_SECONDS', 15))
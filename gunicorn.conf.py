@@ -1,4 +1,7 @@
 # Gunicorn configuration file
 bind = "0.0.0.0:5000"
 workers = 1
-timeout = 120
\ No newline at end of file
+timeout = 120
+# Streamed plan generation holds a connection open for the whole generation;
+# threads keep one stream from blocking every other request on the worker
+threads = 8
\ No newline at end of file
@@ -0,0 +1,49 @@
+"""add progress_bucket day/week/month aggregates
+
+Revision ID: a3d8f6b2c9e4
+Revises: f2c7e9a4b8d1
+Create Date: 2026-10-18 09:41:15.226804
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3d8f6b2c9e4'
+down_revision = 'f2c7e9a4b8d1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Backfill existing history afterwards with `flask rebuild-progress-buckets`
+    op.create_table('progress_bucket',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('grain', sa.String(length=5), nullable=False),
+    sa.Column('start', sa.Date(), nullable=False),
+    sa.Column('client_id', sa.Integer(), nullable=False),
+    sa.Column('calories', sa.Integer(), nullable=False),
+    sa.Column('protein_g', sa.Float(), nullable=False),
+    sa.Column('carbs_g', sa.Float(), nullable=False),
+    sa.Column('fat_g', sa.Float(), nullable=False),
+    sa.Column('meal_count', sa.Integer(), nullable=False),
+    sa.Column('logged_days', sa.Integer(), nullable=False),
+    sa.Column('workouts', sa.Integer(), nullable=False),
+    sa.Column('weigh_ins', sa.Integer(), nullable=False),
+    sa.Column('weight_sum', sa.Float(), nullable=False),
+    sa.Column('weight_min', sa.Float(), nullable=True),
+    sa.Column('weight_max', sa.Float(), nullable=True),
+    sa.Column('first_weight', sa.Float(), nullable=True),
+    sa.Column('first_weighed_at', sa.DateTime(), nullable=True),
+    sa.Column('last_weight', sa.Float(), nullable=True),
+    sa.Column('last_weighed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['client_id'], ['neondb.clients.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['neondb.user.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'grain', 'start'),
+    schema='neondb'
+    )
+
+
+def downgrade():
+    op.drop_table('progress_bucket', schema='neondb')
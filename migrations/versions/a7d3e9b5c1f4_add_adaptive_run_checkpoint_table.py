@@ -0,0 +1,35 @@
+"""add adaptive_run_checkpoint table for resumable weekly planning runs
+
+Revision ID: a7d3e9b5c1f4
+Revises: f1c6b8e4a2d7
+Create Date: 2026-10-17 14:02:37.551208
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7d3e9b5c1f4'
+down_revision = 'f1c6b8e4a2d7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('adaptive_run_checkpoint',
+    sa.Column('run_key', sa.String(length=16), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('calorie_adjustment', sa.Integer(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('duration_ms', sa.Integer(), nullable=True),
+    sa.Column('processed_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['neondb.user.id'], ),
+    sa.PrimaryKeyConstraint('run_key', 'user_id'),
+    schema='neondb'
+    )
+
+
+def downgrade():
+    op.drop_table('adaptive_run_checkpoint', schema='neondb')
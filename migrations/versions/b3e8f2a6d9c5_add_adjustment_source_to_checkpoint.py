@@ -0,0 +1,28 @@
+"""record calorie adjustment source and inputs on adaptive_run_checkpoint
+
+Revision ID: b3e8f2a6d9c5
+Revises: a7d3e9b5c1f4
+Create Date: 2026-10-17 15:20:11.804317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3e8f2a6d9c5'
+down_revision = 'a7d3e9b5c1f4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('adaptive_run_checkpoint', schema='neondb') as batch_op:
+        batch_op.add_column(sa.Column('adjustment_source', sa.String(length=20), nullable=True))
+        batch_op.add_column(sa.Column('adjustment_inputs', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('adaptive_run_checkpoint', schema='neondb') as batch_op:
+        batch_op.drop_column('adjustment_inputs')
+        batch_op.drop_column('adjustment_source')
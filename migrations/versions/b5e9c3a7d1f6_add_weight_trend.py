@@ -0,0 +1,46 @@
+"""add weight_trend and the user's target weight
+
+Revision ID: b5e9c3a7d1f6
+Revises: c7f3b9d2e5a8
+Create Date: 2026-10-22 08:52:31.447120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5e9c3a7d1f6'
+down_revision = 'c7f3b9d2e5a8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema='neondb') as batch_op:
+        batch_op.add_column(sa.Column('target_weight_kg', sa.Float(), nullable=True))
+
+    # Backfilled by `flask rebuild-weight-trend`
+    op.create_table('weight_trend',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('client_id', sa.Integer(), nullable=False),
+    sa.Column('entries', sa.Integer(), nullable=False),
+    sa.Column('last_at', sa.DateTime(), nullable=False),
+    sa.Column('last_kg', sa.Float(), nullable=False),
+    sa.Column('ewma_kg', sa.Float(), nullable=False),
+    sa.Column('sum_w', sa.Float(), nullable=False),
+    sa.Column('sum_t', sa.Float(), nullable=False),
+    sa.Column('sum_tt', sa.Float(), nullable=False),
+    sa.Column('sum_kg', sa.Float(), nullable=False),
+    sa.Column('sum_t_kg', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['client_id'], ['neondb.clients.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['neondb.user.id'], ),
+    sa.PrimaryKeyConstraint('user_id'),
+    schema='neondb'
+    )
+
+
+def downgrade():
+    op.drop_table('weight_trend', schema='neondb')
+    with op.batch_alter_table('user', schema='neondb') as batch_op:
+        batch_op.drop_column('target_weight_kg')
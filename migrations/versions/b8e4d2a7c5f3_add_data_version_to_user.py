@@ -0,0 +1,26 @@
+"""add data_version to user for the report cache
+
+Revision ID: b8e4d2a7c5f3
+Revises: a3d8f6b2c9e4
+Create Date: 2026-10-18 14:06:52.381740
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e4d2a7c5f3'
+down_revision = 'a3d8f6b2c9e4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema='neondb') as batch_op:
+        batch_op.add_column(sa.Column('data_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema='neondb') as batch_op:
+        batch_op.drop_column('data_version')
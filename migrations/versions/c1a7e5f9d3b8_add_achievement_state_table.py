@@ -0,0 +1,34 @@
+"""add achievement_state for the event-driven achievement rules
+
+Revision ID: c1a7e5f9d3b8
+Revises: b8e4d2a7c5f3
+Create Date: 2026-10-18 16:27:09.548113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c1a7e5f9d3b8'
+down_revision = 'b8e4d2a7c5f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing users' earned achievements are granted by `flask evaluate-achievements`
+    op.create_table('achievement_state',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('client_id', sa.Integer(), nullable=False),
+    sa.Column('state', sa.JSON(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['client_id'], ['neondb.clients.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['neondb.user.id'], ),
+    sa.PrimaryKeyConstraint('user_id'),
+    schema='neondb'
+    )
+
+
+def downgrade():
+    op.drop_table('achievement_state', schema='neondb')
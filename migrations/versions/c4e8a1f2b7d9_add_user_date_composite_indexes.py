@@ -0,0 +1,40 @@
+"""add (user_id, date) composite indexes to log and plan tables
+
+Revision ID: c4e8a1f2b7d9
+Revises: f9b80355be02
+Create Date: 2026-10-17 09:12:44.518302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e8a1f2b7d9'
+down_revision = 'f9b80355be02'
+branch_labels = None
+depends_on = None
+
+
+# (table, column the history/report queries filter or order by)
+USER_DATE_INDEXES = [
+    ('diet_log', 'date'),
+    ('diet_plan', 'created_at'),
+    ('workout_log', 'date'),
+    ('weight_entry', 'date'),
+    ('measurement_log', 'date'),
+    ('workout_plan', 'created_at'),
+    ('achievement', 'unlocked_at'),
+]
+
+
+def upgrade():
+    for table, column in USER_DATE_INDEXES:
+        with op.batch_alter_table(table, schema='neondb') as batch_op:
+            batch_op.create_index(f'ix_neondb_{table}_user_id_{column}', ['user_id', column], unique=False)
+
+
+def downgrade():
+    for table, column in reversed(USER_DATE_INDEXES):
+        with op.batch_alter_table(table, schema='neondb') as batch_op:
+            batch_op.drop_index(f'ix_neondb_{table}_user_id_{column}')
@@ -0,0 +1,214 @@
+"""add the exercise catalog and store exercise ids on entries and stats
+
+Revision ID: c7f3b9d2e5a8
+Revises: e6a2c8d4f1b9
+Create Date: 2026-10-21 10:05:48.213907
+
+"""
+import csv
+import os
+import re
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7f3b9d2e5a8'
+down_revision = 'e6a2c8d4f1b9'
+branch_labels = None
+depends_on = None
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), os.pardir, os.pardir, 'app', 'data')
+
+
+def _canonical_key(name):
+    # Kept in step with app.services.exercise_catalog.canonical_key at the time of writing
+    return ' '.join(re.sub(r'[^0-9a-z]+', ' ', name.lower()).split())
+
+
+# Kept in step with app.services.exercise_stats at the time of writing
+SUM_COLUMNS = ('session_count', 'total_sets', 'total_reps', 'total_volume')
+LAST_COLUMNS = ('last_performed_at', 'last_workout_log_id', 'last_session')
+BEST_COLUMNS = {
+    'best_weight': ('best_weight_reps', 'best_weight_at'),
+    'best_e1rm': ('best_e1rm_at',),
+}
+
+
+def _read_csv(filename):
+    with open(os.path.join(DATA_DIR, filename), newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def _stats_columns(exercise_column):
+    return [
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        exercise_column,
+        sa.Column('client_id', sa.Integer(), nullable=False),
+        sa.Column('session_count', sa.Integer(), nullable=False),
+        sa.Column('total_sets', sa.Integer(), nullable=False),
+        sa.Column('total_reps', sa.Integer(), nullable=False),
+        sa.Column('total_volume', sa.Float(), nullable=False),
+        sa.Column('last_performed_at', sa.DateTime(), nullable=False),
+        sa.Column('last_workout_log_id', sa.Integer(), nullable=False),
+        sa.Column('last_session', sa.JSON(), nullable=False),
+        sa.Column('best_weight', sa.Float(), nullable=False),
+        sa.Column('best_weight_reps', sa.Integer(), nullable=False),
+        sa.Column('best_weight_at', sa.DateTime(), nullable=False),
+        sa.Column('best_e1rm', sa.Float(), nullable=False),
+        sa.Column('best_e1rm_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['client_id'], ['neondb.clients.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['neondb.user.id'], ),
+    ]
+
+
+def _stats_table(exercise_column, *extra_columns):
+    return sa.Table('exercise_stats', sa.MetaData(), *_stats_columns(exercise_column), *extra_columns,
+                    schema='neondb')
+
+
+def _merge_stats(rows, key):
+    """
+    Re-keys exercise_stats rows, merging the ones that now share a key the
+    way exercise_stats.add_entries merges new entries into a row. Rows whose
+    key is None are dropped.
+    """
+    merged = {}
+    for row in rows:
+        row = dict(row._mapping)
+        row_key = key(row)
+        if row_key is None:
+            continue
+        current = merged.get(row_key)
+        if current is None:
+            merged[row_key] = row
+            continue
+        for column in SUM_COLUMNS:
+            current[column] += row[column]
+        if row['last_performed_at'] >= current['last_performed_at']:
+            current.update({column: row[column] for column in LAST_COLUMNS})
+        for best, companions in BEST_COLUMNS.items():
+            if row[best] > current[best]:
+                current.update({column: row[column] for column in (best, *companions)})
+    return merged
+
+
+def upgrade():
+    exercise = op.create_table('exercise',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('key', sa.String(length=150), nullable=False),
+    sa.Column('name', sa.String(length=150), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('key'),
+    schema='neondb'
+    )
+    exercise_alias = op.create_table('exercise_alias',
+    sa.Column('alias', sa.String(length=150), nullable=False),
+    sa.Column('exercise_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['exercise_id'], ['neondb.exercise.id'], ),
+    sa.PrimaryKeyConstraint('alias'),
+    schema='neondb'
+    )
+
+    # Seed the catalog with the bundled library and aliases plus every name already logged
+    bind = op.get_bind()
+    logged_names = bind.execute(sa.text("SELECT DISTINCT name FROM neondb.exercise_entry")).scalars().all()
+    names = {_canonical_key(row['name']): row['name'] for row in _read_csv('exercise_library.csv')}
+    aliases = {_canonical_key(row['alias']): _canonical_key(row['exercise']) for row in _read_csv('exercise_aliases.csv')}
+    for name in sorted(logged_names):
+        key = _canonical_key(name)
+        if key not in aliases:
+            names.setdefault(key, ' '.join(name.split()))
+    op.bulk_insert(exercise, [{'key': key, 'name': name} for key, name in names.items()])
+
+    ids = dict(bind.execute(sa.text("SELECT key, id FROM neondb.exercise")).all())
+    alias_ids = {key: ids[key] for key in names}
+    alias_ids.update({alias: ids[key] for alias, key in aliases.items() if alias not in names})
+    op.bulk_insert(exercise_alias, [{'alias': alias, 'exercise_id': exercise_id}
+                                    for alias, exercise_id in alias_ids.items()])
+
+    with op.batch_alter_table('exercise_entry', schema='neondb') as batch_op:
+        batch_op.add_column(sa.Column('exercise_id', sa.Integer(), nullable=True))
+    if logged_names:
+        # One pass over exercise_entry, looking each row's name up by primary key, rather than
+        # a scan per distinct name: exercise_entry.name has no index
+        name_map = op.create_table('exercise_name_map',
+        sa.Column('name', sa.String(length=150), nullable=False),
+        sa.Column('exercise_id', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('name'),
+        schema='neondb'
+        )
+        op.bulk_insert(name_map, [{'name': name, 'exercise_id': alias_ids[_canonical_key(name)]}
+                                  for name in logged_names])
+        op.execute("""
+            UPDATE neondb.exercise_entry
+            SET exercise_id = (SELECT exercise_name_map.exercise_id FROM neondb.exercise_name_map
+                               WHERE exercise_name_map.name = exercise_entry.name)
+        """)
+        op.drop_table('exercise_name_map', schema='neondb')
+    with op.batch_alter_table('exercise_entry', schema='neondb') as batch_op:
+        batch_op.alter_column('exercise_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_foreign_key('fk_exercise_entry_exercise_id', 'exercise', ['exercise_id'], ['id'],
+                                    referent_schema='neondb')
+        batch_op.create_index(batch_op.f('ix_neondb_exercise_entry_exercise_id'), ['exercise_id'], unique=False)
+        batch_op.drop_column('name')
+
+    # exercise_stats is keyed by the catalog id now. Its rows were keyed by the name lower-cased
+    # with its spacing collapsed, which canonicalizes to the same key as the names it came from
+    def _by_exercise_id(row):
+        exercise_id = alias_ids.get(_canonical_key(row['exercise']))
+        return (row['user_id'], exercise_id) if exercise_id is not None else None
+
+    old_stats = _stats_table(sa.Column('exercise', sa.String(length=150), nullable=False),
+                             sa.Column('name', sa.String(length=150), nullable=False))
+    stats = _merge_stats(bind.execute(sa.select(old_stats)), _by_exercise_id)
+    op.drop_table('exercise_stats', schema='neondb')
+    new_stats = op.create_table('exercise_stats',
+    *_stats_columns(sa.Column('exercise_id', sa.Integer(), nullable=False)),
+    sa.ForeignKeyConstraint(['exercise_id'], ['neondb.exercise.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'exercise_id'),
+    schema='neondb'
+    )
+    if stats:
+        op.bulk_insert(new_stats, [
+            dict({column: value for column, value in row.items() if column not in ('exercise', 'name')},
+                 exercise_id=exercise_id)
+            for (_, exercise_id), row in stats.items()
+        ])
+
+
+def downgrade():
+    # Back to rows keyed by the catalog name lower-cased with its spacing collapsed, as the previous release did
+    bind = op.get_bind()
+    names = dict(bind.execute(sa.text("SELECT id, name FROM neondb.exercise")).all())
+    new_stats = _stats_table(sa.Column('exercise_id', sa.Integer(), nullable=False))
+    stats = _merge_stats(bind.execute(sa.select(new_stats)),
+                         lambda row: (row['user_id'], ' '.join(names[row['exercise_id']].split()).lower()))
+    op.drop_table('exercise_stats', schema='neondb')
+    old_stats = op.create_table('exercise_stats',
+    *_stats_columns(sa.Column('exercise', sa.String(length=150), nullable=False)),
+    sa.Column('name', sa.String(length=150), nullable=False),
+    sa.PrimaryKeyConstraint('user_id', 'exercise'),
+    schema='neondb'
+    )
+    if stats:
+        op.bulk_insert(old_stats, [
+            dict({column: value for column, value in row.items() if column != 'exercise_id'},
+                 exercise=exercise, name=names[row['exercise_id']])
+            for (_, exercise), row in stats.items()
+        ])
+
+    with op.batch_alter_table('exercise_entry', schema='neondb') as batch_op:
+        batch_op.add_column(sa.Column('name', sa.String(length=150), nullable=True))
+    op.execute("""
+        UPDATE neondb.exercise_entry
+        SET name = (SELECT exercise.name FROM neondb.exercise WHERE exercise.id = exercise_entry.exercise_id)
+    """)
+    with op.batch_alter_table('exercise_entry', schema='neondb') as batch_op:
+        batch_op.alter_column('name', existing_type=sa.String(length=150), nullable=False)
+        batch_op.drop_index(batch_op.f('ix_neondb_exercise_entry_exercise_id'))
+        batch_op.drop_constraint('fk_exercise_entry_exercise_id', type_='foreignkey')
+        batch_op.drop_column('exercise_id')
+
+    op.drop_table('exercise_alias', schema='neondb')
+    op.drop_table('exercise', schema='neondb')
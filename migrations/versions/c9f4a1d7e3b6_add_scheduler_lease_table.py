@@ -0,0 +1,31 @@
+"""add scheduler_lease table for single-leader scheduled jobs
+
+Revision ID: c9f4a1d7e3b6
+Revises: b3e8f2a6d9c5
+Create Date: 2026-10-17 16:08:52.117364
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9f4a1d7e3b6'
+down_revision = 'b3e8f2a6d9c5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('scheduler_lease',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('holder', sa.String(length=120), nullable=False),
+    sa.Column('acquired_at', sa.DateTime(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name'),
+    schema='neondb'
+    )
+
+
+def downgrade():
+    op.drop_table('scheduler_lease', schema='neondb')
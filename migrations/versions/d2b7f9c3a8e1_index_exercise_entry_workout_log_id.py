@@ -0,0 +1,26 @@
+"""index exercise_entry.workout_log_id for batched exercise loading
+
+Revision ID: d2b7f9c3a8e1
+Revises: c4e8a1f2b7d9
+Create Date: 2026-10-17 10:03:27.204519
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2b7f9c3a8e1'
+down_revision = 'c4e8a1f2b7d9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('exercise_entry', schema='neondb') as batch_op:
+        batch_op.create_index(batch_op.f('ix_neondb_exercise_entry_workout_log_id'), ['workout_log_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('exercise_entry', schema='neondb') as batch_op:
+        batch_op.drop_index(batch_op.f('ix_neondb_exercise_entry_workout_log_id'))
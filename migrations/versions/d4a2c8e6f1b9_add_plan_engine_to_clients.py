@@ -0,0 +1,26 @@
+"""add per-tenant plan_engine to clients
+
+Revision ID: d4a2c8e6f1b9
+Revises: c9f4a1d7e3b6
+Create Date: 2026-10-17 17:31:45.620914
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a2c8e6f1b9'
+down_revision = 'c9f4a1d7e3b6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('clients', schema='neondb') as batch_op:
+        batch_op.add_column(sa.Column('plan_engine', sa.String(length=20), server_default='llm', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('clients', schema='neondb') as batch_op:
+        batch_op.drop_column('plan_engine')
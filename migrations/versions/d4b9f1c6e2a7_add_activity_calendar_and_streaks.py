@@ -0,0 +1,48 @@
+"""add activity_calendar bitmaps and activity_streak counters
+
+Revision ID: d4b9f1c6e2a7
+Revises: c1a7e5f9d3b8
+Create Date: 2026-10-19 10:12:44.201937
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4b9f1c6e2a7'
+down_revision = 'c1a7e5f9d3b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Backfilled by `flask rebuild-activity-calendar`
+    op.create_table('activity_calendar',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('activity', sa.String(length=10), nullable=False),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('client_id', sa.Integer(), nullable=False),
+    sa.Column('days', sa.LargeBinary(length=46), nullable=False),
+    sa.ForeignKeyConstraint(['client_id'], ['neondb.clients.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['neondb.user.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'activity', 'year'),
+    schema='neondb'
+    )
+    op.create_table('activity_streak',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('activity', sa.String(length=10), nullable=False),
+    sa.Column('client_id', sa.Integer(), nullable=False),
+    sa.Column('current_streak', sa.Integer(), nullable=False),
+    sa.Column('longest_streak', sa.Integer(), nullable=False),
+    sa.Column('last_day', sa.Date(), nullable=True),
+    sa.ForeignKeyConstraint(['client_id'], ['neondb.clients.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['neondb.user.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'activity'),
+    schema='neondb'
+    )
+
+
+def downgrade():
+    op.drop_table('activity_streak', schema='neondb')
+    op.drop_table('activity_calendar', schema='neondb')
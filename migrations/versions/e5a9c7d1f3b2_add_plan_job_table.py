@@ -0,0 +1,45 @@
+"""add plan_job table for asynchronous plan generation
+
+Revision ID: e5a9c7d1f3b2
+Revises: d2b7f9c3a8e1
+Create Date: 2026-10-17 11:20:51.663180
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a9c7d1f3b2'
+down_revision = 'd2b7f9c3a8e1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('plan_job',
+    sa.Column('id', sa.String(length=32), nullable=False),
+    sa.Column('client_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('form_data', sa.JSON(), nullable=True),
+    sa.Column('plan_id', sa.Integer(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['client_id'], ['neondb.clients.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['neondb.user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    schema='neondb'
+    )
+    with op.batch_alter_table('plan_job', schema='neondb') as batch_op:
+        batch_op.create_index('ix_neondb_plan_job_user_id_created_at', ['user_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('plan_job', schema='neondb') as batch_op:
+        batch_op.drop_index('ix_neondb_plan_job_user_id_created_at')
+
+    op.drop_table('plan_job', schema='neondb')
@@ -0,0 +1,46 @@
+"""add exercise_stats for last-performed, personal records and totals per exercise
+
+Revision ID: e6a2c8d4f1b9
+Revises: d4b9f1c6e2a7
+Create Date: 2026-10-20 09:41:17.662018
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6a2c8d4f1b9'
+down_revision = 'd4b9f1c6e2a7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Backfilled by `flask rebuild-exercise-stats`
+    op.create_table('exercise_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('exercise', sa.String(length=150), nullable=False),
+    sa.Column('client_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=150), nullable=False),
+    sa.Column('session_count', sa.Integer(), nullable=False),
+    sa.Column('total_sets', sa.Integer(), nullable=False),
+    sa.Column('total_reps', sa.Integer(), nullable=False),
+    sa.Column('total_volume', sa.Float(), nullable=False),
+    sa.Column('last_performed_at', sa.DateTime(), nullable=False),
+    sa.Column('last_workout_log_id', sa.Integer(), nullable=False),
+    sa.Column('last_session', sa.JSON(), nullable=False),
+    sa.Column('best_weight', sa.Float(), nullable=False),
+    sa.Column('best_weight_reps', sa.Integer(), nullable=False),
+    sa.Column('best_weight_at', sa.DateTime(), nullable=False),
+    sa.Column('best_e1rm', sa.Float(), nullable=False),
+    sa.Column('best_e1rm_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['client_id'], ['neondb.clients.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['neondb.user.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'exercise'),
+    schema='neondb'
+    )
+
+
+def downgrade():
+    op.drop_table('exercise_stats', schema='neondb')
@@ -0,0 +1,26 @@
+"""add per-tenant workout_engine to clients
+
+Revision ID: e7b1d3f9a5c2
+Revises: d4a2c8e6f1b9
+Create Date: 2026-10-17 19:04:12.381544
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b1d3f9a5c2'
+down_revision = 'd4a2c8e6f1b9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('clients', schema='neondb') as batch_op:
+        batch_op.add_column(sa.Column('workout_engine', sa.String(length=20), server_default='llm', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('clients', schema='neondb') as batch_op:
+        batch_op.drop_column('workout_engine')
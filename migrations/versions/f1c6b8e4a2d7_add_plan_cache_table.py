@@ -0,0 +1,38 @@
+"""add plan_cache table for content-addressed plan reuse
+
+Revision ID: f1c6b8e4a2d7
+Revises: e5a9c7d1f3b2
+Create Date: 2026-10-17 12:41:09.318842
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c6b8e4a2d7'
+down_revision = 'e5a9c7d1f3b2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('plan_cache',
+    sa.Column('key', sa.String(length=64), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('plan', sa.JSON(), nullable=False),
+    sa.Column('hit_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('last_used_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('key'),
+    schema='neondb'
+    )
+    with op.batch_alter_table('plan_cache', schema='neondb') as batch_op:
+        batch_op.create_index(batch_op.f('ix_neondb_plan_cache_last_used_at'), ['last_used_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('plan_cache', schema='neondb') as batch_op:
+        batch_op.drop_index(batch_op.f('ix_neondb_plan_cache_last_used_at'))
+
+    op.drop_table('plan_cache', schema='neondb')
@@ -0,0 +1,45 @@
+"""add daily_nutrition rollup of diet_log
+
+Revision ID: f2c7e9a4b8d1
+Revises: e7b1d3f9a5c2
+Create Date: 2026-10-17 20:12:37.904512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c7e9a4b8d1'
+down_revision = 'e7b1d3f9a5c2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('daily_nutrition',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('client_id', sa.Integer(), nullable=False),
+    sa.Column('calories', sa.Integer(), nullable=False),
+    sa.Column('protein_g', sa.Float(), nullable=False),
+    sa.Column('carbs_g', sa.Float(), nullable=False),
+    sa.Column('fat_g', sa.Float(), nullable=False),
+    sa.Column('meal_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['client_id'], ['neondb.clients.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['neondb.user.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'day'),
+    schema='neondb'
+    )
+    # Backfill from the existing history; `flask rebuild-daily-nutrition` does the same later on
+    op.execute("""
+        INSERT INTO neondb.daily_nutrition (user_id, day, client_id, calories, protein_g, carbs_g, fat_g, meal_count)
+        SELECT user_id, date(date), max(client_id), coalesce(sum(calories), 0), coalesce(sum(protein_g), 0),
+               coalesce(sum(carbs_g), 0), coalesce(sum(fat_g), 0), count(*)
+        FROM neondb.diet_log
+        GROUP BY user_id, date(date)
+    """)
+
+
+def downgrade():
+    op.drop_table('daily_nutrition', schema='neondb')
@@ -0,0 +1,22 @@
+# scheduler.py
+"""
+Standalone scheduler for a dedicated worker node.
+
+Run it with `python scheduler.py`, and set SCHEDULER_MODE=off on the web
+nodes so they never compete for scheduled jobs. Several copies can run
+for failover: only the one holding the scheduler lease runs the jobs.
+"""
+from dotenv import load_dotenv
+
+# This loads the environment variables from the .env file
+load_dotenv()
+
+from app import create_app
+from app.services.scheduler_service import leader_scheduler
+
+app = create_app(start_scheduler=False)
+
+
+if __name__ == '__main__':
+    print(f"Scheduler {leader_scheduler.lease.holder} starting...")
+    leader_scheduler.run_forever()
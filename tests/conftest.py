@@ -5,6 +5,11 @@ import json
 import uuid
 from app import create_app
 from app.models import db, Client
+from app.services.diet_planner import DietPlannerService
+from app.services.exercise_catalog import exercise_catalog, seed_exercise_catalog
+from app.services.llm_gateway import llm_gateway
+from app.services.plan_cache import plan_cache
+from app.utils.report_cache import report_cache
 
 @pytest.fixture(scope='session')
 def app():
@@ -21,12 +26,27 @@ def app():
     })
 
     with app.app_context():
+        # SQLite has no schemas, so expose the 'neondb' schema the models use
+        # as an attached in-memory database on the shared test connection.
+        with db.engine.connect() as conn:
+            conn.exec_driver_sql("ATTACH DATABASE ':memory:' AS neondb")
         db.create_all()
+        seed_exercise_catalog()
         yield app
         # The session is removed and tables are dropped at the end of the test session.
         db.session.remove()
         db.drop_all()
 
+@pytest.fixture(autouse=True)
+def fresh_report_cache():
+    """
+    Reports are cached per process by (user id, window, data version), and
+    SQLite hands out the ids of users deleted by earlier tests again.
+    The exercise catalog starts cold too, so tests see its database reads.
+    """
+    report_cache.clear()
+    exercise_catalog.clear()
+
 @pytest.fixture()
 def client(app):
     """A standard, unseeded test client for the app."""
@@ -72,4 +92,48 @@ def test_user(seeded_client):
     # Ensure the user was actually created before the test runs.
     assert response.status_code == 201, f"Failed to create test user: {response.get_data(as_text=True)}"
     
-    return response.get_json()['user_id']
\ No newline at end of file
+    return response.get_json()['user_id']
+
+@pytest.fixture(scope="function")
+def logged_in_user(seeded_client):
+    """
+    Registers a new, unique end-user and logs them in.
+    Returns the user's id and the headers needed for JWT-protected routes.
+    """
+    headers = {'Content-Type': 'application/json', 'X-API-Key': seeded_client.api_key}
+    unique_id = str(uuid.uuid4())[:8]
+    email = f"jwt.user.{unique_id}@example.com"
+    user_data = {
+        "name": f"JWT User {unique_id}",
+        "email": email, "password": "supersecret123",
+        "age": 28, "gender": "Male",
+        "weight_kg": 80, "height_cm": 182,
+        "fitness_goals": "Build muscle", "workouts_per_week": "4",
+        "workout_duration": 60, "sleep_hours": 8, "stress_level": "low"
+    }
+    response = seeded_client.post('/api/auth/register', headers=headers, data=json.dumps(user_data))
+    assert response.status_code == 201, f"Failed to create test user: {response.get_data(as_text=True)}"
+    user_id = response.get_json()['user_id']
+
+    login_data = {"email": email, "password": "supersecret123"}
+    response = seeded_client.post('/api/auth/login', headers=headers, data=json.dumps(login_data))
+    assert response.status_code == 200, f"Failed to log in test user: {response.get_data(as_text=True)}"
+
+    auth_headers = dict(headers, Authorization=f"Bearer {response.get_json()['access_token']}")
+    return {"user_id": user_id, "headers": auth_headers}
+
+@pytest.fixture(scope="function")
+def stubbed_planning(app, monkeypatch):
+    """Answers both LLM calls of the weekly job offline; users listed in `failing` error out."""
+    failing = set()
+
+    def _plan(self, prompt):
+        if self.user.id in failing:
+            raise RuntimeError("model unavailable")
+        return {"weekly_plan": {}}
+
+    monkeypatch.setitem(app.config, 'GEMINI_API_KEY', 'test-key')
+    monkeypatch.setattr(plan_cache, 'enabled', False)
+    monkeypatch.setattr(llm_gateway, 'generate', lambda prompt, **kwargs: "-100")
+    monkeypatch.setattr(DietPlannerService, '_call_llm_api', _plan)
+    return failing
@@ -0,0 +1,214 @@
+# tests/test_achievements.py
+import json
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import event
+from app.models import db, User, Achievement, AchievementState, WeightEntry, WorkoutLog
+from app.services.achievement_engine import AchievementRule, achievement_engine, evaluate_achievements
+from app.services.reporting_service import calculate_target_calories
+
+LOG_TABLES = ('diet_log', 'daily_nutrition', 'workout_log', 'weight_entry', 'achievement_state')
+WORKOUT = {"name": "Session", "exercises": [{"name": "Squat", "sets": 3, "reps": 5, "weight": 100}]}
+
+
+@contextmanager
+def captured_statements():
+    statements = []
+    record = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+
+def _status(client, headers, **params):
+    response = client.get('/api/reward/status/me', headers=headers, query_string=params)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return response.get_json()
+
+
+def _names(client, headers):
+    return [achievement['name'] for achievement in _status(client, headers)['all_achievements']]
+
+
+def _log_weight(client, headers, weight_kg):
+    response = client.post('/api/progress/weight/log', headers=headers, data=json.dumps({"weight_kg": weight_kg}))
+    assert response.status_code == 201, response.get_data(as_text=True)
+
+
+def _log_workout(client, headers):
+    response = client.post('/api/workout/log', headers=headers, data=json.dumps(WORKOUT))
+    assert response.status_code == 201, response.get_data(as_text=True)
+
+
+def test_meals_on_target_unlock_the_cheat_meal_when_logged(app, seeded_client, logged_in_user):
+    headers = logged_in_user['headers']
+    with app.app_context():
+        target = round(calculate_target_calories(db.session.get(User, logged_in_user['user_id'])))
+
+    response = seeded_client.post('/api/diet/log', headers=headers,
+                                  data=json.dumps({"meal_name": "All day", "food_items": "Everything",
+                                                   "calories": target}))
+    assert response.status_code == 201
+
+    with app.app_context():
+        achievement = Achievement.query.filter_by(user_id=logged_in_user['user_id']).one()
+    assert achievement.name == "Cheat Meal Unlocked"
+    assert "100.0% diet adherence" in achievement.description
+
+
+def test_meals_off_target_unlock_nothing(app, seeded_client, logged_in_user):
+    headers = logged_in_user['headers']
+    seeded_client.post('/api/diet/log', headers=headers,
+                       data=json.dumps({"meal_name": "Snack", "food_items": "Apple", "calories": 90}))
+    assert _names(seeded_client, headers) == []
+
+
+def test_weight_loss_milestone_compares_against_the_first_weigh_in(app, seeded_client, logged_in_user):
+    headers = logged_in_user['headers']
+    _log_weight(seeded_client, headers, 80)
+    _log_weight(seeded_client, headers, 77)
+    assert _names(seeded_client, headers) == []
+
+    _log_weight(seeded_client, headers, 76)
+    assert _names(seeded_client, headers) == ["5% Weight Loss Milestone"]
+    with app.app_context():
+        state = db.session.get(AchievementState, logged_in_user['user_id']).state
+    assert state['initial_weight_kg'] == 80
+    assert state['unlocked'] == ["5% Weight Loss Milestone"]
+
+
+def test_workout_milestone_is_granted_once(app, seeded_client, logged_in_user):
+    headers = logged_in_user['headers']
+    for _ in range(9):
+        _log_workout(seeded_client, headers)
+    assert _names(seeded_client, headers) == []
+
+    _log_workout(seeded_client, headers)
+    _log_workout(seeded_client, headers)
+    assert _names(seeded_client, headers) == ["10 Workouts Logged"]
+
+
+def test_status_is_a_single_read_without_writes(app, seeded_client, logged_in_user):
+    headers = logged_in_user['headers']
+    _log_weight(seeded_client, headers, 80)
+    _log_weight(seeded_client, headers, 70)
+
+    with app.app_context(), captured_statements() as statements:
+        status = _status(seeded_client, headers)
+    assert [a['name'] for a in status['all_achievements']] == ["5% Weight Loss Milestone"]
+    assert len([s for s in statements if 'achievement' in s]) == 1
+    assert not [s for s in statements if any(table in s for table in LOG_TABLES)]
+    assert not [s for s in statements if s.lstrip().upper().startswith(('INSERT', 'UPDATE', 'DELETE'))]
+
+
+def test_since_lists_only_newer_unlocks(app, seeded_client, logged_in_user):
+    headers = logged_in_user['headers']
+    first = _status(seeded_client, headers)
+    assert first['newly_unlocked_rewards'] == []
+
+    _log_weight(seeded_client, headers, 80)
+    _log_weight(seeded_client, headers, 70)
+    assert _status(seeded_client, headers, since=first['checked_at'])['newly_unlocked_rewards'] == \
+        ["5% Weight Loss Milestone"]
+
+    later = (datetime.now(timezone.utc) + timedelta(minutes=1)).isoformat()
+    assert _status(seeded_client, headers, since=later)['newly_unlocked_rewards'] == []
+
+    response = seeded_client.get('/api/reward/status/me', headers=headers, query_string={'since': 'yesterday'})
+    assert response.status_code == 400
+
+
+def test_after_id_lists_unlocks_committed_after_the_last_read(app, seeded_client, logged_in_user):
+    headers = logged_in_user['headers']
+    _log_weight(seeded_client, headers, 80)
+    _log_weight(seeded_client, headers, 70)
+    first = _status(seeded_client, headers)
+    assert first['last_id'] > 0
+    assert _status(seeded_client, headers, after_id=0)['newly_unlocked_rewards'] == ["5% Weight Loss Milestone"]
+
+    # Stamped when its transaction flushed, before the previous read, but committed after it
+    stamped = datetime.fromisoformat(first['checked_at']) + timedelta(microseconds=1)
+    with app.app_context():
+        user = db.session.get(User, logged_in_user['user_id'])
+        db.session.add(Achievement(client_id=user.client_id, user_id=user.id, name="Late Commit",
+                                   unlocked_at=stamped))
+        db.session.commit()
+
+    assert _status(seeded_client, headers, after_id=first['last_id'])['newly_unlocked_rewards'] == ["Late Commit"]
+    assert _status(seeded_client, headers, since=first['checked_at'])['newly_unlocked_rewards'] == ["Late Commit"]
+    latest = _status(seeded_client, headers)
+    assert _status(seeded_client, headers, after_id=latest['last_id'])['newly_unlocked_rewards'] == []
+
+    response = seeded_client.get('/api/reward/status/me', headers=headers, query_string={'after_id': 'latest'})
+    assert response.status_code == 400
+
+
+def test_a_failing_rule_does_not_fail_the_write(app, seeded_client, logged_in_user):
+    class Broken(AchievementRule):
+        name = "Broken"
+        events = ('weight_logged',)
+
+        def evaluate(self, context, state):
+            raise KeyError('missing')
+
+    rule = achievement_engine.register(Broken())
+    try:
+        _log_weight(seeded_client, logged_in_user['headers'], 80)
+    finally:
+        achievement_engine.unregister(rule)
+    assert _names(seeded_client, logged_in_user['headers']) == []
+
+
+def test_a_rule_without_evaluate_cannot_be_registered():
+    class Unfinished(AchievementRule):
+        name = "Unfinished"
+        events = ('weight_logged',)
+
+    with pytest.raises(TypeError):
+        achievement_engine.register(Unfinished())
+    assert all(rule.name != "Unfinished" for rule in achievement_engine.rules)
+
+
+def test_new_rules_subscribe_without_touching_the_read_path(app, seeded_client, logged_in_user):
+    class FirstWeighIn(AchievementRule):
+        name = "First Weigh-In"
+        events = ('weight_logged',)
+
+        def evaluate(self, context, state):
+            return f"Logged {context.logs('weight_logged')[-1].weight_kg} kg."
+
+    rule = achievement_engine.register(FirstWeighIn())
+    try:
+        _log_weight(seeded_client, logged_in_user['headers'], 81)
+        _log_weight(seeded_client, logged_in_user['headers'], 80)
+    finally:
+        achievement_engine.unregister(rule)
+
+    achievements = _status(seeded_client, logged_in_user['headers'])['all_achievements']
+    assert [(a['name'], a['description']) for a in achievements] == [("First Weigh-In", "Logged 81.0 kg.")]
+
+
+def test_evaluate_achievements_grants_earned_history(app, logged_in_user):
+    user_id = logged_in_user['user_id']
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        now = datetime.now(timezone.utc)
+        # Written with the engine not yet knowing about any rule, as before an upgrade
+        rules, achievement_engine.rules = achievement_engine.rules, []
+        try:
+            db.session.add(WeightEntry(client_id=user.client_id, user_id=user_id, weight_kg=90,
+                                       date=now - timedelta(days=60)))
+            db.session.add(WeightEntry(client_id=user.client_id, user_id=user_id, weight_kg=84, date=now))
+            for _ in range(10):
+                db.session.add(WorkoutLog(client_id=user.client_id, user_id=user_id, name='Session'))
+            db.session.commit()
+        finally:
+            achievement_engine.rules = rules
+
+        assert evaluate_achievements([user_id]) == 2
+        assert evaluate_achievements([user_id]) == 0
+        names = {a.name for a in Achievement.query.filter_by(user_id=user_id)}
+    assert names == {"5% Weight Loss Milestone", "10 Workouts Logged"}
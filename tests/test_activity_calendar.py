@@ -0,0 +1,162 @@
+# tests/test_activity_calendar.py
+import json
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta, timezone
+from sqlalchemy import event
+from app.models import db, User, Achievement, ActivityCalendar, ActivityStreak, DietLog, WeightEntry
+from app.services.activity_calendar import (bitmap_days, mark_day, read_streak, rebuild_activity_calendar,
+                                            streak_from_days)
+
+LOG_TABLES = ('diet_log', 'daily_nutrition', 'workout_log', 'weight_entry')
+
+
+@contextmanager
+def captured_statements():
+    statements = []
+    record = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+
+def _today():
+    return datetime.now(timezone.utc).date()
+
+
+def _weigh_in(user_id, day, weight_kg=80):
+    """Logs a weigh-in at noon UTC on `day`, in its own flush."""
+    user = db.session.get(User, user_id)
+    entry = WeightEntry(client_id=user.client_id, user_id=user_id, weight_kg=weight_kg,
+                        date=datetime.combine(day, time(12), timezone.utc))
+    db.session.add(entry)
+    db.session.commit()
+    return entry
+
+
+def _streak(user_id, activity='any'):
+    with db.engine.connect() as connection:
+        return read_streak(connection, user_id, activity)
+
+
+def _calendar(user_id):
+    return {(row.activity, row.year): (row.days, row.client_id)
+            for row in ActivityCalendar.query.filter_by(user_id=user_id).all()}
+
+
+def test_bitmaps_and_streaks_from_days():
+    days = [date(2024, 12, 30), date(2024, 12, 31), date(2025, 1, 1), date(2025, 1, 3)]
+    bitmap = None
+    for day in days[:2]:
+        bitmap = mark_day(bitmap, day)
+    assert len(bitmap) == 46
+    assert bitmap_days(2024, bitmap) == days[:2]
+    assert bitmap_days(2024, mark_day(bitmap, days[0], active=False)) == days[1:2]
+    # Runs carry over the new year
+    assert streak_from_days(days) == (1, 3, date(2025, 1, 3))
+    assert streak_from_days([]) == (0, 0, None)
+
+
+def test_logging_through_the_api_marks_today(app, seeded_client, logged_in_user):
+    headers = logged_in_user['headers']
+    seeded_client.post('/api/diet/log', headers=headers,
+                       data=json.dumps({"meal_name": "Lunch", "food_items": "Dal, rice", "calories": 550}))
+    seeded_client.post('/api/workout/log', headers=headers,
+                       data=json.dumps({"name": "Leg day", "exercises": [{"name": "Squat", "sets": 3, "reps": 5,
+                                                                          "weight": 100}]}))
+
+    response = seeded_client.get('/api/progress/calendar/me', headers=headers)
+    assert response.status_code == 200
+    calendar = response.get_json()
+    today = _today()
+    assert calendar['year'] == today.year
+    index = today.timetuple().tm_yday - 1
+    for activity, active in (('meal', True), ('workout', True), ('weight', False), ('any', True)):
+        entry = calendar['activities'][activity]
+        assert len(entry['days']) in (365, 366)
+        assert (entry['days'][index] == '1') is active
+        assert entry['active_days'] == int(active)
+        assert entry['active_days_by_month'][today.month - 1] == int(active)
+        assert entry['current_streak'] == int(active)
+        assert entry['last_active'] == (today.isoformat() if active else None)
+
+
+def test_calendar_reads_no_log_tables(app, seeded_client, logged_in_user):
+    headers = logged_in_user['headers']
+    with app.app_context():
+        _weigh_in(logged_in_user['user_id'], _today())
+
+    with app.app_context(), captured_statements() as statements:
+        response = seeded_client.get('/api/progress/calendar/me', headers=headers)
+    assert response.get_json()['activities']['weight']['active_days'] == 1
+    assert not [s for s in statements if any(table in s for table in LOG_TABLES)]
+
+    assert seeded_client.get('/api/progress/calendar/me?year=abc', headers=headers).status_code == 400
+    assert seeded_client.get('/api/progress/calendar/me?year=12', headers=headers).status_code == 400
+    previous = seeded_client.get(f'/api/progress/calendar/me?year={_today().year - 1}', headers=headers)
+    assert previous.get_json()['activities']['any']['days'].count('1') == 0
+
+
+def test_back_dated_logs_join_runs_and_earn_the_streak_achievement(app, logged_in_user):
+    user_id = logged_in_user['user_id']
+    today = _today()
+    with app.app_context():
+        for offset in (6, 5, 4, 2, 1, 0):
+            _weigh_in(user_id, today - timedelta(days=offset))
+        assert _streak(user_id) == (3, 3, today)
+        assert not Achievement.query.filter_by(user_id=user_id, name="7-Day Logging Streak").first()
+
+        _weigh_in(user_id, today - timedelta(days=3))
+        assert _streak(user_id) == (7, 7, today)
+        assert _streak(user_id, 'weight') == (7, 7, today)
+        assert Achievement.query.filter_by(user_id=user_id, name="7-Day Logging Streak").one()
+
+
+def test_deleting_the_last_log_of_a_day_clears_it(app, logged_in_user):
+    user_id = logged_in_user['user_id']
+    today = _today()
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        for offset in (2, 1, 0):
+            _weigh_in(user_id, today - timedelta(days=offset))
+        second = _weigh_in(user_id, today - timedelta(days=1), weight_kg=79)
+        meal = DietLog(client_id=user.client_id, user_id=user_id, meal_name='Snack',
+                       date=datetime.combine(today - timedelta(days=1), time(9), timezone.utc))
+        db.session.add(meal)
+        db.session.commit()
+
+        db.session.delete(second)
+        db.session.commit()
+        assert _streak(user_id, 'weight') == (3, 3, today)
+
+        first = WeightEntry.query.filter_by(user_id=user_id, weight_kg=80).filter(
+            WeightEntry.date < datetime.combine(today, time.min, timezone.utc),
+            WeightEntry.date >= datetime.combine(today - timedelta(days=1), time.min, timezone.utc)).one()
+        db.session.delete(first)
+        db.session.commit()
+        assert _streak(user_id, 'weight') == (1, 1, today)
+        # The meal still makes yesterday active
+        assert _streak(user_id, 'any') == (3, 3, today)
+
+        db.session.delete(meal)
+        db.session.commit()
+        assert _streak(user_id, 'any') == (1, 1, today)
+
+
+def test_rebuild_matches_the_incremental_state(app, logged_in_user):
+    user_id = logged_in_user['user_id']
+    today = _today()
+    with app.app_context():
+        days = [today - timedelta(days=offset) for offset in (400, 10, 9, 3, 0)]
+        for day in days:
+            _weigh_in(user_id, day)
+        calendar = _calendar(user_id)
+        streaks = {row.activity: (row.current_streak, row.longest_streak, row.last_day)
+                   for row in ActivityStreak.query.filter_by(user_id=user_id).all()}
+        assert {year for _, year in calendar} == {day.year for day in days}
+
+        assert rebuild_activity_calendar([user_id]) == len(calendar)
+        assert _calendar(user_id) == calendar
+        assert {row.activity: (row.current_streak, row.longest_streak, row.last_day)
+                for row in ActivityStreak.query.filter_by(user_id=user_id).all()} == streaks
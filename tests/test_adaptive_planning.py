@@ -0,0 +1,90 @@
+# tests/test_adaptive_planning.py
+import threading
+import uuid
+from datetime import datetime
+from app.models import db, User, AdaptiveRunCheckpoint
+from app.services.adaptive_planner_service import AdaptivePlannerService, RunStats, current_run_key
+
+
+def test_run_processes_every_user_and_checkpoints(app, logged_in_user, stubbed_planning):
+    run_key = uuid.uuid4().hex[:16]
+    with app.app_context():
+        summary = AdaptivePlannerService().run_for_all_users(run_key=run_key, workers=1)
+        assert summary['processed'] + summary['skipped'] == User.query.count()
+        assert summary['failed'] == 0
+        assert summary['users_per_minute'] > 0
+
+        checkpoint = db.session.get(AdaptiveRunCheckpoint, (run_key, logged_in_user['user_id']))
+        assert checkpoint.status == 'succeeded'
+        assert checkpoint.adjustment_source == 'controller'
+
+
+def test_rerun_resumes_and_retries_only_failures(app, logged_in_user, stubbed_planning):
+    run_key = uuid.uuid4().hex[:16]
+    user_id = logged_in_user['user_id']
+    stubbed_planning.add(user_id)
+    with app.app_context():
+        first = AdaptivePlannerService().run_for_all_users(run_key=run_key, workers=1)
+        assert first['failed'] == 1
+        assert db.session.get(AdaptiveRunCheckpoint, (run_key, user_id)).status == 'failed'
+
+        stubbed_planning.clear()
+        second = AdaptivePlannerService().run_for_all_users(run_key=run_key, workers=1)
+        assert second['processed'] == 1
+        assert second['succeeded'] == 1
+        assert second['resumed'] == first['processed'] + first['skipped'] - 1
+        db.session.expire_all()
+        assert db.session.get(AdaptiveRunCheckpoint, (run_key, user_id)).status == 'succeeded'
+
+
+def test_users_are_processed_concurrently(app, logged_in_user, stubbed_planning, monkeypatch):
+    # The tests above use one worker: the test database is a single in-memory
+    # SQLite connection that worker threads can't safely share. Here the
+    # per-user work is stubbed out, so only the pool itself runs in threads.
+    lock = threading.Lock()
+    overlapped = threading.Event()
+    running, threads = [0], set()
+
+    def _run_user(self, app, run_key, user_id, report, calorie_adjustment=None):
+        with lock:
+            running[0] += 1
+            threads.add(threading.current_thread().name)
+            if running[0] >= 2:
+                overlapped.set()
+        overlapped.wait(timeout=5)
+        with lock:
+            running[0] -= 1
+        return 'succeeded', 0.0
+
+    monkeypatch.setattr(AdaptivePlannerService, '_run_user', _run_user)
+    with app.app_context():
+        # A second user with a complete profile, so there are two to overlap
+        user = db.session.get(User, logged_in_user['user_id'])
+        suffix = uuid.uuid4().hex[:8]
+        other = User(client_id=user.client_id, username=f'pool_{suffix}', email=f'pool.{suffix}@example.com',
+                     name='Pool User', age=user.age, gender=user.gender, weight_kg=user.weight_kg,
+                     height_cm=user.height_cm,
+                     fitness_goals=user.fitness_goals, activity_level=user.activity_level)
+        db.session.add(other)
+        db.session.commit()
+        summary = AdaptivePlannerService().run_for_all_users(run_key=uuid.uuid4().hex[:16], workers=3)
+    assert summary['processed'] >= 2
+    assert summary['succeeded'] == summary['processed']
+    assert overlapped.is_set()
+    assert len(threads) >= 2
+
+
+def test_run_stats_percentiles():
+    stats = RunStats('2026-W01')
+    for seconds in range(1, 101):
+        stats.record('succeeded' if seconds % 10 else 'failed', seconds / 10)
+    summary = stats.summary()
+    assert summary['processed'] == 100
+    assert summary['failed'] == 10
+    assert summary['latency_p50_s'] == 5.0
+    assert summary['latency_p95_s'] == 9.5
+    assert summary['latency_max_s'] == 10.0
+
+
+def test_run_key_is_the_iso_week():
+    assert current_run_key(datetime(2026, 10, 17)) == '2026-W42'
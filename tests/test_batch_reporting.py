@@ -0,0 +1,98 @@
+# tests/test_batch_reporting.py
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import event
+from app.models import (db, Client, User, DietLog, DailyNutrition, WorkoutLog, WeightEntry, ProgressBucket,
+                        Achievement, AchievementState, ActivityCalendar, ActivityStreak, WeightTrend)
+from app.services.reporting_service import ReportingService, BatchReportingService
+
+
+@pytest.fixture()
+def report_users(app, seeded_client):
+    """A handful of users with varied weekly histories, including edge cases."""
+    with app.app_context():
+        tenant_id = Client.query.filter_by(api_key=seeded_client.api_key).first().id
+        now = datetime.now(timezone.utc)
+        profiles = [
+            ('Male', 'weight loss', 'sedentary'),
+            ('Female', 'weight gain', 'very active'),
+            ('Female', 'maintain', None),
+            ('Male', 'build muscle', 'moderately active'),
+        ]
+        users = []
+        for n, (gender, goal, activity) in enumerate(profiles):
+            user = User(client_id=tenant_id, username=f'batch_{n}', email=f'batch.{n}@example.com',
+                        name=f'Batch User {n}', age=25 + n, gender=gender, weight_kg=60 + 5 * n,
+                        height_cm=165 + n, fitness_goals=goal, activity_level=activity)
+            db.session.add(user)
+            users.append(user)
+        db.session.flush()
+
+        for n, user in enumerate(users):
+            # User 0 has no logs at all; user 2 has a single weigh-in only
+            if n == 0:
+                continue
+            for day in range(1 if n == 2 else 5):
+                when = now - timedelta(days=day, hours=1)
+                db.session.add(WeightEntry(client_id=tenant_id, user_id=user.id,
+                                           weight_kg=70 + n - 0.3 * day, date=when))
+            for day in range(n * 2):
+                when = now - timedelta(days=day % 6, hours=2)
+                db.session.add(DietLog(client_id=tenant_id, user_id=user.id, meal_name='Meal',
+                                       calories=600 + 150 * day, date=when))
+                db.session.add(WorkoutLog(client_id=tenant_id, user_id=user.id, name='Session', date=when))
+            # Old history outside the window must be ignored
+            db.session.add(WeightEntry(client_id=tenant_id, user_id=user.id, weight_kg=99,
+                                       date=now - timedelta(days=30)))
+            db.session.add(WorkoutLog(client_id=tenant_id, user_id=user.id, name='Old',
+                                      date=now - timedelta(days=30)))
+        db.session.commit()
+        yield users
+
+        ids = [user.id for user in users]
+        for model in (DietLog, DailyNutrition, WorkoutLog, WeightEntry, ProgressBucket,
+                      Achievement, AchievementState, ActivityCalendar, ActivityStreak, WeightTrend):
+            model.query.filter(model.user_id.in_(ids)).delete(synchronize_session=False)
+        User.query.filter(User.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+
+
+def test_batch_reports_match_per_user_reports(app, report_users):
+    with app.app_context():
+        batch = BatchReportingService(chunk_size=3).get_weekly_reports(report_users)
+        for user in report_users:
+            assert batch[user.id] == ReportingService(user.id).get_weekly_report()
+
+
+def test_batch_query_count_does_not_grow_with_users(app, report_users):
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        users = User.query.filter(User.id.in_([user.id for user in report_users])).all()
+        event.listen(db.engine, 'before_cursor_execute', _record)
+        try:
+            BatchReportingService().get_weekly_reports(users)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', _record)
+    assert len(statements) == 3
+
+
+def test_iter_weekly_reports_covers_every_user_in_chunks(app, report_users):
+    with app.app_context():
+        seen = {user.id: report for user, report in BatchReportingService(chunk_size=2).iter_weekly_reports()}
+        assert User.query.count() == len(seen)
+        for user in report_users:
+            assert seen[user.id]['user_name'] == user.name
+
+
+def test_incomplete_profiles_are_skipped(app, report_users):
+    with app.app_context():
+        user = db.session.get(User, report_users[0].id)
+        user.gender = None
+        db.session.commit()
+        reports = BatchReportingService().get_weekly_reports([user, db.session.get(User, report_users[1].id)])
+        assert user.id not in reports
+        assert report_users[1].id in reports
@@ -0,0 +1,86 @@
+# tests/test_calorie_controller.py
+import uuid
+import numpy as np
+from app.models import AdaptiveRunCheckpoint
+from app.services.adaptive_planner_service import AdaptivePlannerService, compare_controller_with_llm
+from app.services.calorie_controller import (CalorieController, GOAL_LOSS, GOAL_MAINTAIN, GOAL_GAIN,
+                                             goal_direction)
+from app.services.llm_gateway import llm_gateway
+
+
+def test_goal_direction_matches_calorie_target_rules():
+    assert goal_direction('Weight Loss') == GOAL_LOSS
+    assert goal_direction('weight gain') == GOAL_GAIN
+    assert goal_direction('Build muscle') == GOAL_MAINTAIN
+    assert goal_direction(None) == GOAL_MAINTAIN
+
+
+def test_controller_adjusts_towards_the_goal():
+    controller = CalorieController()
+    adjustments = controller.compute(
+        directions=[GOAL_LOSS, GOAL_LOSS, GOAL_GAIN, GOAL_MAINTAIN, GOAL_LOSS, GOAL_LOSS],
+        weight_changes=[0.3, -0.5, -0.2, 0.05, -0.2, 1.0],
+        adherence=[90, 90, 90, 90, 90, 40]
+    )
+    assert adjustments.dtype.kind == 'i'
+    # Gained on a loss goal: cut hard (clipped); on track: no change
+    assert adjustments[0] == -300
+    assert adjustments[1] == 0
+    # Lost on a gain goal: add calories
+    assert adjustments[2] > 0
+    # Inside the deadband: no change
+    assert adjustments[3] == 0
+    # Not losing fast enough: a moderate cut, rounded to the step
+    assert adjustments[4] == -150
+    # Poor adherence: the target was not the problem
+    assert adjustments[5] == 0
+
+
+def test_controller_is_vectorized_over_large_batches():
+    rng = np.random.default_rng(0)
+    n = 100_000
+    adjustments = CalorieController().compute(
+        rng.integers(-1, 2, n), rng.normal(0, 0.5, n), rng.uniform(0, 100, n)
+    )
+    assert adjustments.shape == (n,)
+    assert np.all(np.abs(adjustments) <= 300)
+    assert np.all(adjustments % 50 == 0)
+
+
+def test_compare_reports_agreement_with_recorded_llm_outputs():
+    records = [
+        {"fitness_goals": "weight loss", "weight_change_kg": 0.4, "diet_adherence_score": 85, "llm_adjustment": -300},
+        {"fitness_goals": "weight loss", "weight_change_kg": -0.2, "diet_adherence_score": 80, "llm_adjustment": -100},
+        {"fitness_goals": "weight gain", "weight_change_kg": -0.1, "diet_adherence_score": 90, "llm_adjustment": 150},
+        {"fitness_goals": "maintain", "weight_change_kg": 0.0, "diet_adherence_score": 95, "llm_adjustment": 0},
+    ]
+    result = CalorieController().compare(records)
+    assert result["records"] == 4
+    assert result["exact_match_rate"] == 0.5
+    assert result["within_50_kcal_rate"] == 0.75
+    assert result["direction_agreement_rate"] == 1.0
+    assert CalorieController().compare([]) == {"records": 0}
+
+
+def test_llm_mode_records_adjustments_for_the_comparison_harness(app, logged_in_user, monkeypatch,
+                                                                stubbed_planning):
+    run_key = uuid.uuid4().hex[:16]
+    monkeypatch.setitem(app.config, 'CALORIE_ADJUSTMENT_MODE', 'llm')
+    with app.app_context():
+        summary = AdaptivePlannerService().run_for_all_users(run_key=run_key, workers=1)
+        checkpoints = AdaptiveRunCheckpoint.query.filter_by(run_key=run_key, status='succeeded').all()
+        assert len(checkpoints) == summary['succeeded'] > 0
+        assert all(c.adjustment_source == 'llm' and c.calorie_adjustment == -100 for c in checkpoints)
+
+        result = compare_controller_with_llm(run_key)
+        assert result["records"] == len(checkpoints)
+        assert "mean_abs_diff_kcal" in result
+
+
+def test_controller_mode_makes_no_adjustment_llm_calls(app, logged_in_user, monkeypatch, stubbed_planning):
+    def _no_llm(prompt, **kwargs):
+        raise AssertionError("the controller path must not call the LLM for adjustments")
+    monkeypatch.setattr(llm_gateway, 'generate', _no_llm)
+    with app.app_context():
+        summary = AdaptivePlannerService().run_for_all_users(run_key=uuid.uuid4().hex[:16], workers=1)
+        assert summary['failed'] == 0
@@ -0,0 +1,43 @@
+# tests/test_client_cache.py
+import json
+from app.models import db, Client
+from app.utils.client_cache import client_cache
+
+
+def test_repeated_requests_hit_the_client_cache(seeded_client, logged_in_user):
+    """The first API-key lookup misses, every following lookup is served from the cache."""
+    client_cache.clear()
+    before = client_cache.stats()
+
+    for _ in range(3):
+        response = seeded_client.get('/api/user/profile/me', headers=logged_in_user['headers'])
+        assert response.status_code == 200
+
+    after = client_cache.stats()
+    assert after['misses'] - before['misses'] == 1
+    assert after['hits'] - before['hits'] == 2
+
+
+def test_unknown_api_key_is_rejected_and_not_cached(client):
+    """An invalid API key is still rejected and does not occupy a cache slot."""
+    client_cache.clear()
+    headers = {'Content-Type': 'application/json', 'X-API-Key': 'not-a-real-key'}
+    response = client.post('/api/auth/login', headers=headers, data=json.dumps({}))
+    assert response.status_code == 403
+    assert client_cache.stats()['size'] == 0
+
+
+def test_updating_a_client_invalidates_its_snapshot(app, seeded_client):
+    """Changing a Client row drops its cached snapshot so the next lookup sees the new data."""
+    with app.app_context():
+        tenant = Client.query.filter_by(api_key=seeded_client.api_key).first()
+        original_name = tenant.company_name
+
+        assert client_cache.get(seeded_client.api_key).company_name == original_name
+
+        tenant.company_name = f"{original_name} Renamed"
+        db.session.commit()
+        assert client_cache.get(seeded_client.api_key).company_name == f"{original_name} Renamed"
+
+        tenant.company_name = original_name
+        db.session.commit()
@@ -0,0 +1,62 @@
+# tests/test_exercise_catalog.py
+import json
+from contextlib import contextmanager
+from sqlalchemy import event
+from app.models import db, Exercise, ExerciseEntry, WorkoutLog
+from app.services.exercise_catalog import canonical_key, exercise_catalog, seed_exercise_catalog
+
+
+@contextmanager
+def captured_statements():
+    statements = []
+    record = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+
+def test_spellings_and_aliases_resolve_to_the_library_exercise(app):
+    assert canonical_key(" Pull-Up ") == canonical_key("pull   up") == "pull up"
+    with app.app_context():
+        pull_up = exercise_catalog.lookup("Pull-Up")
+        assert pull_up is not None
+        assert exercise_catalog.lookup("PULL UPS") == exercise_catalog.lookup("pullups") == pull_up
+        assert db.session.get(Exercise, pull_up).name == "Pull-Up"
+        assert exercise_catalog.lookup("Underwater Basket Weaving") is None
+        # Seeding again adds nothing
+        assert seed_exercise_catalog() == 0
+
+
+def test_new_names_are_interned_once(app, seeded_client, logged_in_user):
+    headers = logged_in_user['headers']
+    for name in ("Sled  Push", "sled-push"):
+        payload = {"name": "Conditioning", "exercises": [{"name": name, "sets": 4, "reps": 1, "weight": 120}]}
+        response = seeded_client.post('/api/workout/log', headers=headers, data=json.dumps(payload))
+        assert response.status_code == 201
+        assert response.get_json()['workout']['exercises'][0]['name'] == "Sled Push"
+
+    with app.app_context():
+        sled_push = exercise_catalog.lookup("SLED PUSH")
+        assert Exercise.query.filter_by(key="sled push").one().id == sled_push
+        entries = ExerciseEntry.query.join(WorkoutLog).filter(WorkoutLog.user_id == logged_in_user['user_id']).all()
+        assert [entry.exercise_id for entry in entries] == [sled_push, sled_push]
+
+
+def test_rolled_back_names_are_forgotten(app):
+    with app.app_context():
+        carry, = exercise_catalog.resolve(["Zercher Carry"])
+        assert exercise_catalog.lookup("zercher carry") == carry
+        db.session.rollback()
+        assert exercise_catalog.lookup("zercher carry") is None
+        assert not Exercise.query.filter_by(key="zercher carry").first()
+
+
+def test_known_names_resolve_from_memory(app):
+    with app.app_context():
+        first = exercise_catalog.resolve(["Squat", "bench", "Chin-Up"])
+        db.session.commit()
+        with captured_statements() as statements:
+            assert exercise_catalog.resolve(["SQUAT", "Bench", "chin up", "squat"]) == [*first, first[0]]
+        assert statements == []
@@ -0,0 +1,112 @@
+# tests/test_exercise_stats.py
+import json
+from datetime import datetime, timedelta, timezone
+import pytest
+from app.models import db, User, ExerciseEntry, ExerciseStats, WorkoutLog
+from app.services.exercise_catalog import exercise_catalog
+from app.services.exercise_stats import estimated_one_rep_max, rebuild_exercise_stats
+
+
+def _log(client, headers, *exercises):
+    payload = {"name": "Session", "exercises": [
+        {"name": name, "sets": sets, "reps": reps, "weight": weight} for name, sets, reps, weight in exercises
+    ]}
+    response = client.post('/api/workout/log', headers=headers, data=json.dumps(payload))
+    assert response.status_code == 201, response.get_data(as_text=True)
+
+
+def _stats(user_id):
+    return {(row.exercise_id, row.session_count, row.total_sets, row.total_reps, row.total_volume,
+             row.last_performed_at, row.last_workout_log_id, json.dumps(row.last_session),
+             row.best_weight, row.best_weight_reps, row.best_weight_at, row.best_e1rm, row.best_e1rm_at)
+            for row in ExerciseStats.query.filter_by(user_id=user_id).all()}
+
+
+def test_one_rep_max():
+    assert estimated_one_rep_max(100, 1) == 100
+    assert estimated_one_rep_max(100, 5) == 116.67
+
+
+def test_logging_workouts_keeps_last_session_and_records(app, seeded_client, logged_in_user):
+    headers = logged_in_user['headers']
+    _log(seeded_client, headers, ("Bench Press", 3, 5, 80), ("Squat", 5, 5, 100))
+    _log(seeded_client, headers, ("bench  press", 1, 1, 95), ("bench press", 3, 8, 80))
+
+    response = seeded_client.get('/api/workout/exercises/me/BENCH PRESS', headers=headers)
+    assert response.status_code == 200
+    bench = response.get_json()
+    assert bench['exercise'] == "Barbell Bench Press"
+    assert seeded_client.get('/api/workout/exercises/me/bench', headers=headers).get_json() == bench
+    assert bench['sessions'] == 2
+    assert bench['total_sets'] == 7
+    assert bench['total_reps'] == 15 + 1 + 24
+    assert bench['total_volume'] == 15 * 80 + 95 + 24 * 80
+    assert bench['last_session'] == [{"sets": 1, "reps": 1, "weight": 95.0}, {"sets": 3, "reps": 8, "weight": 80.0}]
+    assert bench['best_weight'] == 95
+    assert bench['best_weight_reps'] == 1
+    # 80 x 8 estimates higher than the 95 single
+    assert bench['best_e1rm'] == estimated_one_rep_max(80, 8)
+
+    board = seeded_client.get('/api/workout/exercises/me', headers=headers).get_json()
+    assert [row['exercise'] for row in board] == ["Barbell Back Squat", "Barbell Bench Press"]
+
+    assert seeded_client.get('/api/workout/exercises/me/Deadlift', headers=headers).status_code == 404
+
+
+def test_back_dated_workouts_do_not_replace_the_last_session(app, seeded_client, logged_in_user):
+    headers = logged_in_user['headers']
+    user_id = logged_in_user['user_id']
+    _log(seeded_client, headers, ("Deadlift", 1, 5, 140))
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        old = WorkoutLog(client_id=user.client_id, user_id=user_id, name='Old',
+                         date=datetime.now(timezone.utc) - timedelta(days=30))
+        old.exercises.append(ExerciseEntry(client_id=user.client_id, exercise_id=exercise_catalog.lookup('Deadlift'),
+                                           sets=1, reps=1, weight=180))
+        db.session.add(old)
+        db.session.commit()
+        old_at = db.session.get(WorkoutLog, old.id).date
+
+    deadlift = seeded_client.get('/api/workout/exercises/me/deadlift', headers=headers).get_json()
+    assert deadlift['last_session'] == [{"sets": 1, "reps": 5, "weight": 140.0}]
+    assert deadlift['best_weight'] == 180
+    assert deadlift['best_weight_at'] == old_at.isoformat()
+    assert deadlift['sessions'] == 2
+
+
+@pytest.mark.parametrize('change', ['delete entry', 'delete workout', 'edit weight'])
+def test_edits_and_deletes_recompute_the_records(app, seeded_client, logged_in_user, change):
+    headers = logged_in_user['headers']
+    user_id = logged_in_user['user_id']
+    _log(seeded_client, headers, ("Row", 3, 10, 60))
+    _log(seeded_client, headers, ("Row", 3, 10, 70))
+    with app.app_context():
+        heavy = ExerciseEntry.query.join(WorkoutLog).filter(WorkoutLog.user_id == user_id,
+                                                            ExerciseEntry.weight == 70).one()
+        if change == 'delete entry':
+            db.session.delete(heavy)
+        elif change == 'delete workout':
+            db.session.delete(heavy.workout_log)
+        else:
+            heavy.weight = 50
+        db.session.commit()
+        expected = _stats(user_id)
+
+        row = db.session.get(ExerciseStats, (user_id, exercise_catalog.lookup('row')))
+        assert row.best_weight == 60
+        assert row.session_count == (1 if change.startswith('delete') else 2)
+
+        rebuild_exercise_stats([user_id])
+        assert _stats(user_id) == expected
+
+
+def test_rebuild_matches_the_incremental_stats(app, seeded_client, logged_in_user):
+    headers = logged_in_user['headers']
+    user_id = logged_in_user['user_id']
+    _log(seeded_client, headers, ("Press", 5, 5, 40), ("Chin-up", 3, 8, 0))
+    _log(seeded_client, headers, ("press", 5, 3, 45))
+    _log(seeded_client, headers, ("Chin-up", 3, 10, 0))
+    with app.app_context():
+        incremental = _stats(user_id)
+        assert rebuild_exercise_stats([user_id]) == 2
+        assert _stats(user_id) == incremental
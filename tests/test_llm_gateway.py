@@ -0,0 +1,125 @@
+# tests/test_llm_gateway.py
+import json
+import threading
+import pytest
+from app.services.llm_gateway import LLMGateway, LLMUnavailableError, LLMOverloadedError, llm_gateway
+from app.services.plan_cache import plan_cache
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """Stands in for a Gemini model; fails while `failing` is set."""
+    def __init__(self, name):
+        self.name = name
+        self.failing = False
+        self.prompts = []
+
+    def generate_content(self, prompt, generation_config=None):
+        self.prompts.append(prompt)
+        if self.failing:
+            raise RuntimeError("upstream error")
+        return FakeResponse(json.dumps({"prompt": prompt}))
+
+
+@pytest.fixture()
+def gateway(app):
+    models = []
+
+    def _factory(name):
+        models.append(FakeModel(name))
+        return models[-1]
+
+    gw = LLMGateway(max_in_flight=1, max_queue=1, queue_timeout=0.2,
+                    breaker_threshold=2, breaker_cooldown=60, retry_after=7)
+    gw.use_model_factory(_factory)
+    gw.models = models
+    with app.app_context():
+        yield gw
+
+
+def test_model_is_built_once_and_reused(gateway):
+    assert gateway.generate_json("a") == {"prompt": "a"}
+    assert gateway.generate_json("b") == {"prompt": "b"}
+    assert len(gateway.models) == 1
+    assert gateway.models[0].prompts == ["a", "b"]
+    assert gateway.stats()["calls"] == 2
+
+
+def test_breaker_opens_after_consecutive_failures_and_recovers(gateway):
+    gateway.generate("warm up")
+    gateway.models[0].failing = True
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            gateway.generate("x")
+
+    # Open: calls are rejected without reaching the model
+    with pytest.raises(LLMUnavailableError) as excinfo:
+        gateway.generate("x")
+    assert excinfo.value.retry_after > 1
+    assert gateway.stats()["breaker_open"]
+    assert len(gateway.models[0].prompts) == 3
+
+    # After the cooldown one trial call goes through and closes the breaker
+    gateway.models[0].failing = False
+    gateway._open_until = 1.0
+    assert gateway.generate_json("trial") == {"prompt": "trial"}
+    assert gateway.admission_error() is None
+    assert not gateway.stats()["breaker_open"]
+
+
+def test_failed_trial_reopens_the_breaker(gateway):
+    gateway.generate("warm up")
+    gateway.models[0].failing = True
+    gateway._open_until = 1.0
+    with pytest.raises(RuntimeError):
+        gateway.generate("trial")
+    assert gateway.stats()["breaker_open"]
+
+
+def test_excess_callers_are_shed(gateway):
+    release = threading.Event()
+    entered = threading.Event()
+    model = FakeModel('slow')
+
+    def _slow(prompt, generation_config=None):
+        entered.set()
+        release.wait(5)
+        return FakeResponse('"ok"')
+    model.generate_content = _slow
+    gateway.use_model_factory(lambda name: model)
+
+    holder = threading.Thread(target=gateway.generate, args=("hold",))
+    holder.start()
+    entered.wait(5)
+    try:
+        # The only slot is busy: the next caller waits and then times out
+        with pytest.raises(LLMOverloadedError):
+            gateway.generate("queued")
+
+        # With the wait queue full, new calls are rejected up front
+        gateway._waiting = gateway.max_queue
+        error = gateway.admission_error()
+        assert isinstance(error, LLMOverloadedError)
+        assert error.retry_after == 7
+        gateway._waiting = 0
+    finally:
+        release.set()
+        holder.join(5)
+    assert gateway.stats()["shed"] == 1
+
+
+def test_generate_plan_returns_503_with_retry_after_when_breaker_open(app, seeded_client, logged_in_user,
+                                                                      monkeypatch):
+    monkeypatch.setitem(app.config, 'GEMINI_API_KEY', 'test-key')
+    monkeypatch.setattr(llm_gateway, 'admission_error',
+                        lambda: LLMUnavailableError("The plan generator is temporarily unavailable.", 42))
+    monkeypatch.setattr(plan_cache, 'enabled', False)
+
+    response = seeded_client.post('/api/workout/generate-plan', headers=logged_in_user['headers'],
+                                  data=json.dumps({"fitnessLevel": "beginner", "equipment": "bodyweight only"}))
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '42'
@@ -0,0 +1,23 @@
+# tests/test_migrations.py
+import os
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), os.pardir, 'migrations')
+
+
+def _scripts():
+    config = Config()
+    config.set_main_option('script_location', MIGRATIONS_DIR)
+    return ScriptDirectory.from_config(config)
+
+
+def test_migration_history_is_a_single_line():
+    scripts = _scripts()
+    files = [name for name in os.listdir(os.path.join(MIGRATIONS_DIR, 'versions')) if name.endswith('.py')]
+    revisions = list(scripts.walk_revisions())
+
+    # A repeated revision id shadows one of the files instead of failing, so count them
+    assert len(revisions) == len(files)
+    assert scripts.get_heads() == [revisions[0].revision]
+    assert [revision.revision for revision in revisions if revision.down_revision is None] == [revisions[-1].revision]
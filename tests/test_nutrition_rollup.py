@@ -0,0 +1,160 @@
+# tests/test_nutrition_rollup.py
+import json
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import event, insert
+from app.models import db, User, DietLog, DailyNutrition, ProgressBucket
+from app.services.nutrition_rollup import rebuild_daily_nutrition, rollup_day
+from app.services.reporting_service import ReportingService
+
+
+def _rollup(user_id):
+    db.session.expire_all()
+    return {row.day: row for row in DailyNutrition.query.filter_by(user_id=user_id).all()}
+
+
+@pytest.fixture()
+def rollup_user(app, seeded_client):
+    with app.app_context():
+        tenant_id = db.session.query(User.client_id).first()[0]
+        user = User(client_id=tenant_id, username='rollup', email='rollup@example.com', name='Rollup User',
+                    age=30, gender='Male', weight_kg=80, height_cm=180, fitness_goals='maintain',
+                    activity_level='sedentary')
+        db.session.add(user)
+        db.session.commit()
+        yield user.id, tenant_id
+
+        DietLog.query.filter_by(user_id=user.id).delete(synchronize_session=False)
+        DailyNutrition.query.filter_by(user_id=user.id).delete(synchronize_session=False)
+        ProgressBucket.query.filter_by(user_id=user.id).delete(synchronize_session=False)
+        db.session.delete(db.session.get(User, user.id))
+        db.session.commit()
+
+
+def test_logging_a_meal_updates_its_day(app, seeded_client, logged_in_user):
+    meal = {"meal_name": "Lunch", "food_items": "Dal, rice", "calories": 550,
+            "macros": {"protein_g": 20, "carbs_g": 80, "fat_g": 12}}
+    for calories in (550, 300):
+        response = seeded_client.post('/api/diet/log', headers=logged_in_user['headers'],
+                                      data=json.dumps(dict(meal, calories=calories)))
+        assert response.status_code == 201, response.get_data(as_text=True)
+
+    with app.app_context():
+        today = rollup_day(datetime.now(timezone.utc))
+        row = _rollup(logged_in_user['user_id'])[today]
+        assert (row.calories, row.meal_count) == (850, 2)
+        assert (row.protein_g, row.carbs_g, row.fat_g) == (40, 160, 24)
+
+
+def test_rollup_shares_the_meal_transaction(app, rollup_user):
+    user_id, tenant_id = rollup_user
+    with app.app_context():
+        db.session.add(DietLog(client_id=tenant_id, user_id=user_id, meal_name='Snack', calories=200))
+        db.session.flush()
+        db.session.rollback()
+        assert _rollup(user_id) == {}
+
+
+def test_deleting_a_meal_takes_it_back_out(app, rollup_user):
+    user_id, tenant_id = rollup_user
+    when = datetime(2026, 3, 1, 23, 30, tzinfo=timezone.utc)
+    with app.app_context():
+        meals = [DietLog(client_id=tenant_id, user_id=user_id, meal_name='Meal', calories=calories, date=when)
+                 for calories in (400, 700)]
+        db.session.add_all(meals)
+        db.session.commit()
+        db.session.delete(meals[0])
+        db.session.commit()
+
+        row = _rollup(user_id)[when.date()]
+        assert (row.calories, row.meal_count) == (700, 1)
+
+
+def test_editing_a_meal_moves_its_totals(app, rollup_user):
+    user_id, tenant_id = rollup_user
+    when = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+    with app.app_context():
+        meals = [DietLog(client_id=tenant_id, user_id=user_id, meal_name='Meal', calories=calories,
+                         protein_g=30, date=when) for calories in (400, 700)]
+        db.session.add_all(meals)
+        db.session.commit()
+
+        # The meal was expired by the commit, so its old values have to be loaded to take them out
+        meals[0].calories = 450
+        meals[0].carbs_g = 50
+        db.session.commit()
+        row = _rollup(user_id)[when.date()]
+        assert (row.calories, row.protein_g, row.carbs_g, row.meal_count) == (1150, 60, 50, 2)
+
+        meals[1].date = when + timedelta(days=1)
+        meals[1].protein_g = None
+        db.session.commit()
+        meals[0].meal_name = 'Renamed'
+        db.session.commit()
+
+        rollup = {day: (row.calories, row.protein_g, row.meal_count) for day, row in _rollup(user_id).items()}
+        assert rollup == {when.date(): (450, 30, 1), (when + timedelta(days=1)).date(): (700, 0, 1)}
+        incremental = {day: row.to_dict() for day, row in _rollup(user_id).items()}
+        rebuild_daily_nutrition([user_id])
+        assert {day: row.to_dict() for day, row in _rollup(user_id).items()} == incremental
+
+
+def test_rebuild_matches_the_incremental_rollup(app, rollup_user):
+    user_id, tenant_id = rollup_user
+    now = datetime.now(timezone.utc)
+    with app.app_context():
+        for hours in range(0, 24 * 5, 7):
+            db.session.add(DietLog(client_id=tenant_id, user_id=user_id, meal_name='Meal', calories=100 + hours,
+                                   protein_g=hours / 2, date=now - timedelta(hours=hours)))
+        db.session.commit()
+        incremental = {day: row.to_dict() for day, row in _rollup(user_id).items()}
+
+        # A bulk insert bypasses the ORM events; the rebuild picks it up
+        db.session.execute(insert(DietLog).values(client_id=tenant_id, user_id=user_id, meal_name='Bulk',
+                                                  calories=1000, date=now - timedelta(days=40)))
+        db.session.commit()
+        assert rebuild_daily_nutrition([user_id]) == len(incremental) + 1
+
+        rebuilt = {day: row.to_dict() for day, row in _rollup(user_id).items()}
+        assert rebuilt.pop((now - timedelta(days=40)).date())['calories'] == 1000
+        assert rebuilt == incremental
+
+
+def test_rebuild_command(app, rollup_user):
+    user_id, tenant_id = rollup_user
+    with app.app_context():
+        db.session.add(DietLog(client_id=tenant_id, user_id=user_id, meal_name='Meal', calories=500))
+        db.session.commit()
+        DailyNutrition.query.filter_by(user_id=user_id).delete()
+        db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=['rebuild-daily-nutrition', '--user-id', str(user_id)])
+    assert result.exit_code == 0, result.output
+    assert 'Rebuilt 1 daily_nutrition rows.' in result.output
+    with app.app_context():
+        assert [row.calories for row in _rollup(user_id).values()] == [500]
+
+
+def test_adherence_reads_one_indexed_query_on_the_rollup(app, rollup_user):
+    user_id, tenant_id = rollup_user
+    now = datetime.now(timezone.utc)
+    with app.app_context():
+        reporter = ReportingService(user_id)
+        target = reporter.target_calories
+        for day in range(10):
+            db.session.add(DietLog(client_id=tenant_id, user_id=user_id, meal_name='Meal',
+                                   calories=round(target), date=now - timedelta(days=day)))
+        db.session.commit()
+        db.session.refresh(reporter.user)
+
+        statements = []
+        record = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            score = reporter.get_diet_adherence_score(days=7)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+
+        assert score == 100
+        assert len(statements) == 1
+        assert 'daily_nutrition' in statements[0] and 'diet_log' not in statements[0]
@@ -0,0 +1,52 @@
+# tests/test_pagination.py
+import json
+
+
+def _log_meals(seeded_client, headers, count):
+    for i in range(count):
+        response = seeded_client.post('/api/diet/log', headers=headers, data=json.dumps({
+            "meal_name": f"Meal {i}", "calories": 100 + i
+        }))
+        assert response.status_code == 201
+
+
+def test_diet_history_pages_cover_every_entry_once(seeded_client, logged_in_user):
+    """Walking the cursor chain returns every log exactly once, newest first."""
+    headers = logged_in_user['headers']
+    _log_meals(seeded_client, headers, 7)
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        url = '/api/diet/logs/me?limit=3' + (f'&cursor={cursor}' if cursor else '')
+        response = seeded_client.get(url, headers=headers)
+        assert response.status_code == 200
+        seen.extend(response.get_json())
+        pages += 1
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            break
+
+    assert pages == 3
+    assert sorted(entry['meal_name'] for entry in seen) == sorted(f"Meal {i}" for i in range(7))
+    dates = [entry['date'] for entry in seen]
+    assert dates == sorted(dates, reverse=True)
+
+
+def test_weight_history_keeps_ascending_order(seeded_client, logged_in_user):
+    headers = logged_in_user['headers']
+    for weight in (80, 79.5, 79):
+        seeded_client.post('/api/progress/weight/log', headers=headers, data=json.dumps({"weight_kg": weight}))
+
+    first = seeded_client.get('/api/progress/weight/me?limit=2', headers=headers)
+    second = seeded_client.get(f"/api/progress/weight/me?limit=2&cursor={first.headers['X-Next-Cursor']}",
+                               headers=headers)
+    weights = [e['weight_kg'] for e in first.get_json() + second.get_json()]
+    assert weights == [80, 79.5, 79]
+    assert 'X-Next-Cursor' not in second.headers
+
+
+def test_invalid_page_arguments_are_rejected(seeded_client, logged_in_user):
+    headers = logged_in_user['headers']
+    assert seeded_client.get('/api/workout/history/me?limit=0', headers=headers).status_code == 400
+    assert seeded_client.get('/api/workout/history/me?limit=abc', headers=headers).status_code == 400
+    assert seeded_client.get('/api/progress/measurements/me?cursor=garbage', headers=headers).status_code == 400
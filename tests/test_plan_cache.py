@@ -0,0 +1,178 @@
+# tests/test_plan_cache.py
+import json
+import time
+from datetime import datetime, timedelta
+import pytest
+from app.models import db, Client, User, PlanCacheEntry
+from app.services.diet_planner import DietPlannerService, parse_budget
+from app.services.workout_planner_service import WorkoutPlannerService
+from app.services.plan_cache import plan_cache
+
+FAKE_DIET_PLAN = {"weekly_plan": {"Monday": {}}, "summary": {"target_daily_calories": "2900"}}
+
+
+@pytest.fixture()
+def llm_calls(app, monkeypatch):
+    """Stubs the diet LLM call and records how many times it was made."""
+    calls = []
+
+    def _fake_llm(self, prompt):
+        calls.append(prompt)
+        return FAKE_DIET_PLAN
+
+    monkeypatch.setitem(app.config, 'GEMINI_API_KEY', 'test-key')
+    monkeypatch.setattr(DietPlannerService, '_call_llm_api', _fake_llm)
+    monkeypatch.setattr(plan_cache, 'enabled', True)
+    return calls
+
+
+def _make_user(client_id, suffix, **overrides):
+    fields = dict(client_id=client_id, username=f'cache_{suffix}', email=f'cache.{suffix}@example.com',
+                  name=f'Cache {suffix}', age=30, gender='Male', weight_kg=80, height_cm=180,
+                  fitness_goals='Weight  Loss', allergies=None, disliked_foods=None)
+    fields.update(overrides)
+    user = User(**fields)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def test_identical_inputs_share_one_generation(app, seeded_client, llm_calls):
+    """A second user with the same normalized inputs is served from the cache."""
+    with app.app_context():
+        client_id = Client.query.filter_by(api_key=seeded_client.api_key).first().id
+        first = _make_user(client_id, 'a1')
+        # Same goal with different spacing/case and a slightly different weight in the same calorie bucket
+        second = _make_user(client_id, 'a2', fitness_goals='weight loss', weight_kg=80.2)
+        form = {"activityLevel": "sedentary", "diet_type": "veg", "optional_cuisines": ["Italian", " thai"]}
+
+        before = plan_cache.stats()
+        assert DietPlannerService(first, form).generate_plan()["plan"] == FAKE_DIET_PLAN
+        result = DietPlannerService(second, dict(form, optional_cuisines=["Thai", "italian"])).generate_plan()
+        after = plan_cache.stats()
+
+        assert result["cached"] is True
+        assert len(llm_calls) == 1
+        assert after["hits"] - before["hits"] == 1
+
+
+def test_allergies_change_the_cache_key(app, seeded_client, llm_calls):
+    with app.app_context():
+        client_id = Client.query.filter_by(api_key=seeded_client.api_key).first().id
+        plain = _make_user(client_id, 'b1')
+        allergic = _make_user(client_id, 'b2', allergies='Peanuts')
+        form = {"activityLevel": "sedentary", "diet_type": "non-veg"}
+
+        DietPlannerService(plain, form).generate_plan()
+        DietPlannerService(allergic, form).generate_plan()
+        assert len(llm_calls) == 2
+
+
+def test_budget_is_read_as_its_first_whole_number(app, seeded_client):
+    assert parse_budget("3000-5000") == 3000
+    assert parse_budget("₹4,500.50") == 4500
+    assert parse_budget(7000) == 7000
+    assert parse_budget("whatever fits") == 5000
+
+    with app.app_context():
+        client_id = Client.query.filter_by(api_key=seeded_client.api_key).first().id
+        user = _make_user(client_id, 'd1')
+        form = {"activityLevel": "sedentary", "diet_type": "veg"}
+        key = DietPlannerService(user, dict(form, budget="4500"))._cache_key(2000)
+        assert DietPlannerService(user, dict(form, budget="₹4,500.50"))._cache_key(2000) == key
+        assert DietPlannerService(user, dict(form, budget="4500-6000"))._cache_key(2000) == key
+        assert DietPlannerService(user, dict(form, budget="5000"))._cache_key(2000) != key
+
+
+def test_workout_plans_are_shared_but_not_across_engines(app, seeded_client, monkeypatch):
+    calls = []
+
+    def _fake_llm(self, prompt):
+        calls.append(prompt)
+        return {"plan_name": f"Plan {len(calls)}", "weekly_schedule": {}}
+
+    monkeypatch.setattr(WorkoutPlannerService, '_call_llm_api', _fake_llm)
+    monkeypatch.setattr(plan_cache, 'enabled', True)
+    with app.app_context():
+        client_id = Client.query.filter_by(api_key=seeded_client.api_key).first().id
+        first = _make_user(client_id, 'w1', workouts_per_week='3-4', workout_duration=45)
+        second = _make_user(client_id, 'w2', workouts_per_week=' 3-4', workout_duration=45,
+                            fitness_goals='weight loss')
+        form = {"fitnessLevel": "Beginner", "equipment": "Home gym"}
+
+        plan = WorkoutPlannerService(first, form, engine='llm').generate_plan()["plan"]
+        result = WorkoutPlannerService(second, dict(form, fitnessLevel=" beginner"), engine='llm').generate_plan()
+        assert (result["plan"], result["cached"]) == (plan, True)
+        assert len(calls) == 1
+
+        # A refined plan starts from the template draft, so it gets its own entry
+        assert WorkoutPlannerService(second, form, engine='refine').generate_plan()["engine"] == 'refine'
+        assert len(calls) == 2
+
+
+def test_least_recently_used_entries_are_evicted(app, monkeypatch):
+    with app.app_context():
+        monkeypatch.setattr(plan_cache, 'enabled', True)
+        monkeypatch.setattr(plan_cache, 'max_entries', 2)
+        for key in ('evict-1', 'evict-2', 'evict-3'):
+            plan_cache.put('workout', key, {"plan_name": key})
+        assert PlanCacheEntry.query.count() == 2
+        assert db.session.get(PlanCacheEntry, 'evict-1') is None
+        assert plan_cache.get('evict-3') == {"plan_name": "evict-3"}
+
+
+def test_cache_never_commits_the_callers_session(app, seeded_client, monkeypatch):
+    monkeypatch.setattr(plan_cache, 'enabled', True)
+    monkeypatch.setattr(plan_cache, 'touch_interval', timedelta(hours=1))
+    monkeypatch.setattr(plan_cache, '_pending_hits', {})
+    monkeypatch.setattr(plan_cache, '_last_touch', datetime.min)
+    with app.app_context():
+        client_id = Client.query.filter_by(api_key=seeded_client.api_key).first().id
+        user = _make_user(client_id, 'c1')
+        user.name = 'Uncommitted'
+
+        plan_cache.put('workout', 'own-transaction', {"plan_name": "own"})
+        for _ in range(3):
+            assert plan_cache.get('own-transaction') == {"plan_name": "own"}
+        db.session.rollback()
+        assert db.session.get(User, user.id).name == 'Cache c1'
+
+        # The first hit is written straight away, the rest wait for the interval or the next eviction
+        assert db.session.get(PlanCacheEntry, 'own-transaction').hit_count == 1
+        db.session.rollback()
+        plan_cache.put('workout', 'own-transaction-2', {"plan_name": "own 2"})
+        assert db.session.get(PlanCacheEntry, 'own-transaction').hit_count == 3
+
+
+def test_expired_entries_miss_and_are_evicted_on_the_next_put(app, monkeypatch):
+    monkeypatch.setattr(plan_cache, 'enabled', True)
+    with app.app_context():
+        plan_cache.put('workout', 'expired', {"plan_name": "old"})
+        db.session.get(PlanCacheEntry, 'expired').created_at = datetime(2000, 1, 1)
+        db.session.commit()
+
+        assert plan_cache.get('expired') is None
+        assert db.session.get(PlanCacheEntry, 'expired') is not None
+        plan_cache.put('workout', 'fresh', {"plan_name": "new"})
+        db.session.expire_all()
+        assert db.session.get(PlanCacheEntry, 'expired') is None
+
+
+def test_generate_route_returns_cached_plan_immediately(seeded_client, logged_in_user, llm_calls):
+    """On a cache hit the route answers 200 with the plan instead of queueing a job."""
+    headers = logged_in_user['headers']
+    payload = json.dumps({"activityLevel": "veryActive", "diet_type": "veg", "budget": "7,000"})
+
+    first = seeded_client.post('/api/diet/generate-plan', headers=headers, data=payload)
+    assert first.status_code in (200, 202)
+
+    if first.status_code == 202:
+        job_url = first.headers['Location']
+        for _ in range(200):
+            if seeded_client.get(job_url, headers=headers).get_json()['status'] == 'succeeded':
+                break
+            time.sleep(0.05)
+
+    second = seeded_client.post('/api/diet/generate-plan', headers=headers, data=payload)
+    assert second.status_code == 200
+    assert second.get_json() == FAKE_DIET_PLAN
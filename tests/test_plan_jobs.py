@@ -0,0 +1,100 @@
+# tests/test_plan_jobs.py
+import json
+import time
+from datetime import datetime, timedelta, timezone
+import pytest
+from app.models import db, User, PlanJob
+from app.services.diet_planner import DietPlannerService
+from app.services.workout_planner_service import WorkoutPlannerService
+from app.services.plan_cache import plan_cache
+from app.services.plan_job_service import plan_job_service
+
+FAKE_DIET_PLAN = {"weekly_plan": {"Monday": {}}, "summary": {"primary_goal": "Build muscle"}}
+FAKE_WORKOUT_PLAN = {"plan_name": "Weekly Plan", "weekly_schedule": {"Monday": {"day_type": "Rest"}}}
+
+
+@pytest.fixture()
+def stubbed_llm(app, monkeypatch):
+    """Replaces the Gemini call with canned plans so jobs run offline."""
+    monkeypatch.setitem(app.config, 'GEMINI_API_KEY', 'test-key')
+    monkeypatch.setattr(plan_cache, 'enabled', False)
+    monkeypatch.setattr(DietPlannerService, '_call_llm_api', lambda self, prompt: FAKE_DIET_PLAN)
+    monkeypatch.setattr(WorkoutPlannerService, '_call_llm_api', lambda self, prompt: FAKE_WORKOUT_PLAN)
+
+
+def _wait_for_job(seeded_client, headers, job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = seeded_client.get(f'/api/jobs/{job_id}', headers=headers).get_json()
+        if job['status'] in ('succeeded', 'failed'):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"Job {job_id} did not finish in {timeout}s")
+
+
+def test_diet_plan_generation_returns_202_and_completes(seeded_client, logged_in_user, stubbed_llm):
+    headers = logged_in_user['headers']
+    response = seeded_client.post('/api/diet/generate-plan', headers=headers, data=json.dumps({
+        "activityLevel": "sedentary", "diet_type": "veg"
+    }))
+    assert response.status_code == 202
+    job_id = response.get_json()['job_id']
+    assert response.headers['Location'] == f'/api/jobs/{job_id}'
+
+    job = _wait_for_job(seeded_client, headers, job_id)
+    assert job['status'] == 'succeeded', job
+    assert job['plan'] == FAKE_DIET_PLAN
+
+    latest = seeded_client.get('/api/diet/plan/latest/me', headers=headers)
+    assert latest.status_code == 200
+
+
+def test_workout_plan_failure_is_reported_on_the_job(seeded_client, logged_in_user, stubbed_llm, monkeypatch):
+    def _broken_llm(self, prompt):
+        raise RuntimeError("model unavailable")
+    monkeypatch.setattr(WorkoutPlannerService, '_call_llm_api', _broken_llm)
+
+    headers = logged_in_user['headers']
+    response = seeded_client.post('/api/workout/generate-plan', headers=headers, data=json.dumps({
+        "fitnessLevel": "beginner", "equipment": "bodyweight only"
+    }))
+    assert response.status_code == 202
+
+    job = _wait_for_job(seeded_client, headers, response.get_json()['job_id'])
+    assert job['status'] == 'failed'
+    assert "model unavailable" in job['error']
+
+
+def test_jobs_are_private_to_their_owner(seeded_client, logged_in_user):
+    response = seeded_client.get('/api/jobs/doesnotexist', headers=logged_in_user['headers'])
+    assert response.status_code == 404
+
+
+def test_jobs_orphaned_by_a_restart_end_up_failed(app, seeded_client, logged_in_user):
+    headers = logged_in_user['headers']
+    now = datetime.now(timezone.utc)
+    long_ago = now - timedelta(seconds=plan_job_service.job_timeout + 60)
+    with app.app_context():
+        user = db.session.get(User, logged_in_user['user_id'])
+        jobs = {
+            'orphaned': PlanJob(client_id=user.client_id, user_id=user.id, kind='diet', status='running',
+                                created_at=long_ago, started_at=long_ago),
+            'never_started': PlanJob(client_id=user.client_id, user_id=user.id, kind='workout', created_at=long_ago),
+            # Still within the limit, so possibly running in another process
+            'recent': PlanJob(client_id=user.client_id, user_id=user.id, kind='diet', status='running',
+                              created_at=now, started_at=now),
+        }
+        db.session.add_all(jobs.values())
+        db.session.commit()
+        ids = {name: job.id for name, job in jobs.items()}
+
+    # Polling fails an orphaned job on its own
+    job = seeded_client.get(f"/api/jobs/{ids['orphaned']}", headers=headers).get_json()
+    assert (job['status'], job['finished_at'] is not None) == ('failed', True)
+    assert 'restarted' in job['error']
+
+    # And so does starting a new process
+    plan_job_service.init_app(app)
+    with app.app_context():
+        statuses = {name: db.session.get(PlanJob, job_id).status for name, job_id in ids.items()}
+    assert statuses == {'orphaned': 'failed', 'never_started': 'failed', 'recent': 'running'}
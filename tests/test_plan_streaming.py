@@ -0,0 +1,172 @@
+# tests/test_plan_streaming.py
+import json
+import pytest
+from app.models import db, Client, DietPlan, WorkoutPlan
+from app.services.llm_gateway import llm_gateway
+from app.services.plan_cache import plan_cache
+from app.services.plan_stream import DAYS, JsonMemberStream
+
+PLAN = {
+    "weekly_plan": {
+        day: {
+            "Breakfast": {"items": f"Poha {{with}} \"peanuts\" on {day}", "portion": "1 plate", "calories": 350},
+            "Lunch": {"items": "Dal, rice [1 bowl]", "portion": "1 bowl", "calories": 550}
+        }
+        for day in DAYS
+    },
+    "summary": {"primary_goal": "Build muscle", "target_daily_calories": "2400"}
+}
+PLAN_TEXT = json.dumps(PLAN, indent=2)
+
+
+def _chunks(text, size=40):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class FakeChunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeStreamingModel:
+    """Streams a fixed JSON document in small chunks and records how far it has got."""
+    def __init__(self, name):
+        self.name = name
+        self.sent = 0
+        self.chunks = _chunks(PLAN_TEXT)
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        assert stream
+        for chunk in self.chunks:
+            self.sent += 1
+            yield FakeChunk(chunk)
+
+
+@pytest.fixture()
+def streaming_model(app, monkeypatch):
+    models = []
+
+    def _factory(name):
+        models.append(FakeStreamingModel(name))
+        return models[-1]
+
+    monkeypatch.setattr(plan_cache, 'enabled', False)
+    llm_gateway.use_model_factory(_factory)
+    yield models
+    llm_gateway.use_model_factory(None)
+
+
+def _events(body):
+    events = []
+    for block in body.strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.splitlines())
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+def test_days_are_emitted_as_soon_as_they_close():
+    parser = JsonMemberStream(DAYS)
+    emitted = []
+    for position, chunk in enumerate(_chunks(PLAN_TEXT, size=7)):
+        for name, value in parser.feed(chunk):
+            emitted.append(name)
+            # The day's closing brace arrived in this very chunk
+            start = PLAN_TEXT.index('{', PLAN_TEXT.index(f'"{name}"'))
+            closing_brace = json.JSONDecoder().raw_decode(PLAN_TEXT, start)[1] - 1
+            assert position * 7 <= closing_brace < (position + 1) * 7
+            assert value == PLAN["weekly_plan"][name]
+    assert emitted == list(DAYS)
+    assert json.loads(parser.text) == PLAN
+
+
+def test_parser_ignores_brackets_and_quotes_inside_strings():
+    parser = JsonMemberStream(['Monday'])
+    document = '{"note": "Monday: {not a day} \\"quoted\\" ]", "Monday": [1, {"x": "}"}]}'
+    completed = [member for char in document for member in parser.feed(char)]
+    assert completed == [('Monday', [1, {"x": "}"}])]
+
+
+def test_stream_route_sends_each_day_then_stores_the_plan(app, seeded_client, logged_in_user, streaming_model):
+    response = seeded_client.post('/api/diet/generate-plan/stream', headers=logged_in_user['headers'],
+                                  data=json.dumps({"activityLevel": "sedentary", "diet_type": "veg"}),
+                                  buffered=False)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+
+    body = ''
+    first_day_at = None
+    for data in response.iter_encoded():
+        body += data.decode()
+        if first_day_at is None and 'event: day' in body:
+            first_day_at = streaming_model[0].sent
+    response.close()
+
+    # The first day went out after roughly a seventh of the model's output, not all of it
+    assert first_day_at < len(streaming_model[0].chunks) / 3
+
+    events = _events(body)
+    assert [name for name, _ in events] == ['day'] * 7 + ['done']
+    assert [data['day'] for _, data in events[:7]] == list(DAYS)
+    done = events[-1][1]
+    assert done['plan'] == PLAN
+    with app.app_context():
+        assert db.session.get(DietPlan, done['plan_id']).generated_plan == PLAN
+
+
+def test_stream_reports_a_broken_model_response(app, seeded_client, logged_in_user, streaming_model):
+    original = FakeStreamingModel.generate_content
+
+    def _truncated(self, prompt, generation_config=None, stream=False):
+        yield from list(original(self, prompt, generation_config, stream))[:10]
+
+    FakeStreamingModel.generate_content = _truncated
+    try:
+        response = seeded_client.post('/api/workout/generate-plan/stream', headers=logged_in_user['headers'],
+                                      data=json.dumps({"fitnessLevel": "beginner", "equipment": "Home gym"}))
+    finally:
+        FakeStreamingModel.generate_content = original
+    events = _events(response.get_data(as_text=True))
+    assert events[-1][0] == 'error'
+    assert llm_gateway.stats()['in_flight'] == 0
+
+
+def test_refine_stream_falls_back_to_the_template_draft(app, seeded_client, logged_in_user, streaming_model):
+    original = FakeStreamingModel.generate_content
+
+    def _truncated(self, prompt, generation_config=None, stream=False):
+        yield from list(original(self, prompt, generation_config, stream))[:10]
+
+    with app.app_context():
+        tenant = Client.query.filter_by(api_key=seeded_client.api_key).first()
+        tenant.workout_engine = 'refine'
+        db.session.commit()
+    FakeStreamingModel.generate_content = _truncated
+    try:
+        response = seeded_client.post('/api/workout/generate-plan/stream', headers=logged_in_user['headers'],
+                                      data=json.dumps({"fitnessLevel": "beginner", "equipment": "Home gym"}))
+    finally:
+        FakeStreamingModel.generate_content = original
+        with app.app_context():
+            tenant = Client.query.filter_by(api_key=seeded_client.api_key).first()
+            tenant.workout_engine = 'llm'
+            db.session.commit()
+
+    events = _events(response.get_data(as_text=True))
+    assert events[-1][0] == 'done'
+    draft = events[-1][1]['plan']
+    assert draft['summary']['engine'] == 'template'
+    # Each day of the draft is sent after whatever the model managed before failing
+    assert [data['day'] for name, data in events if name == 'day'][-len(draft['weekly_schedule']):] == \
+        list(draft['weekly_schedule'])
+    with app.app_context():
+        assert db.session.get(WorkoutPlan, events[-1][1]['plan_id']).generated_plan == draft
+
+
+def test_stream_refuses_before_starting_when_the_llm_is_unavailable(app, seeded_client, logged_in_user,
+                                                                    monkeypatch):
+    monkeypatch.setitem(app.config, 'GEMINI_API_KEY', None)
+    monkeypatch.setattr(plan_cache, 'enabled', False)
+    response = seeded_client.post('/api/diet/generate-plan/stream', headers=logged_in_user['headers'],
+                                  data=json.dumps({"activityLevel": "sedentary", "diet_type": "veg"}))
+    assert response.status_code == 500
+    assert response.mimetype == 'application/json'
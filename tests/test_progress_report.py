@@ -0,0 +1,210 @@
+# tests/test_progress_report.py
+import random
+from datetime import date, datetime, timedelta, timezone
+import pytest
+from sqlalchemy import event, insert
+from app.models import db, Client, User, DietLog, DailyNutrition, WorkoutLog, WeightEntry, ProgressBucket
+from app.services.progress_buckets import BUCKET_END, covering_buckets, rebuild_progress_buckets
+from app.services.reporting_service import ProgressReportService
+
+FIRST_DAY = date(2026, 1, 5)
+HISTORY_DAYS = 120
+
+
+def _buckets(user_id):
+    db.session.expire_all()
+    return {(row.grain, row.start): (row.calories, row.meal_count, row.workouts, row.weigh_ins, row.weight_sum,
+                                     row.first_weight, row.last_weight)
+            for row in ProgressBucket.query.filter_by(user_id=user_id).all()}
+
+
+@pytest.fixture()
+def history_user(app, seeded_client):
+    """A user with four months of meals, workouts and weigh-ins, some days left empty."""
+    with app.app_context():
+        tenant_id = Client.query.filter_by(api_key=seeded_client.api_key).first().id
+        user = User(client_id=tenant_id, username='buckets', email='buckets@example.com', name='Bucket User',
+                    age=30, gender='Female', weight_kg=70, height_cm=170, fitness_goals='weight loss',
+                    activity_level='sedentary')
+        db.session.add(user)
+        db.session.flush()
+
+        rng = random.Random(7)
+        logs = []
+        for offset in range(HISTORY_DAYS):
+            day = datetime.combine(FIRST_DAY + timedelta(days=offset), datetime.min.time(), timezone.utc)
+            if offset % 5 != 4:
+                for hour in (8, 13, 20):
+                    logs.append(DietLog(client_id=tenant_id, user_id=user.id, meal_name='Meal',
+                                        calories=rng.randint(300, 900), protein_g=rng.randint(10, 50),
+                                        date=day + timedelta(hours=hour)))
+            if offset % 2 == 0:
+                logs.append(WorkoutLog(client_id=tenant_id, user_id=user.id, name='Session',
+                                       date=day + timedelta(hours=18)))
+            if offset % 3 == 0:
+                logs.append(WeightEntry(client_id=tenant_id, user_id=user.id,
+                                        weight_kg=round(75 - offset * 0.04 + rng.random(), 2),
+                                        date=day + timedelta(hours=7)))
+        db.session.add_all(logs)
+        records = [(type(log), log.date.date(), getattr(log, 'calories', None) or getattr(log, 'weight_kg', None))
+                   for log in logs]
+        db.session.commit()
+        yield user.id, tenant_id, records
+
+        for model in (DietLog, DailyNutrition, WorkoutLog, WeightEntry, ProgressBucket):
+            model.query.filter_by(user_id=user.id).delete(synchronize_session=False)
+        db.session.delete(db.session.get(User, user.id))
+        db.session.commit()
+
+
+def _raw_summary(records, start, end):
+    """The figures a report should show for [start, end), computed straight from the logged records."""
+    def logged(model):
+        return [(day, value) for kind, day, value in records if kind is model and start <= day < end]
+
+    meals, weights = logged(DietLog), logged(WeightEntry)
+    return {
+        "calories": sum(calories for _, calories in meals),
+        "meals": len(meals),
+        "days_logged": len({day for day, _ in meals}),
+        "workouts": len(logged(WorkoutLog)),
+        "weigh_ins": len(weights),
+        "start_kg": weights[0][1] if weights else None,
+        "end_kg": weights[-1][1] if weights else None,
+        "min_kg": min((weight_kg for _, weight_kg in weights), default=None),
+    }
+
+
+def _figures(summary):
+    return {
+        "calories": summary["nutrition"]["calories"],
+        "meals": summary["nutrition"]["meals"],
+        "days_logged": summary["nutrition"]["days_logged"],
+        "workouts": summary["workouts"],
+        "weigh_ins": summary["weight"]["weigh_ins"],
+        "start_kg": summary["weight"]["start_kg"],
+        "end_kg": summary["weight"]["end_kg"],
+        "min_kg": summary["weight"]["min_kg"],
+    }
+
+
+def test_covering_buckets_use_the_coarsest_buckets_that_fit():
+    assert covering_buckets(date(2026, 1, 1), date(2027, 1, 1)) == [('month', date(2026, m, 1)) for m in range(1, 13)]
+    # A full ISO week that straddles a month boundary is still one week
+    assert covering_buckets(date(2026, 3, 30), date(2026, 4, 6)) == [('week', date(2026, 3, 30))]
+    # The week of Jan 26 would cut into February, which fits whole, so it is taken as days
+    assert covering_buckets(date(2026, 1, 10), date(2026, 5, 1)) == (
+        [('day', date(2026, 1, 10)), ('day', date(2026, 1, 11))]
+        + [('week', date(2026, 1, 12)), ('week', date(2026, 1, 19))]
+        + [('day', date(2026, 1, d)) for d in range(26, 32)]
+        + [('month', date(2026, m, 1)) for m in (2, 3, 4)]
+    )
+
+    rng = random.Random(3)
+    for _ in range(200):
+        start = date(2025, 1, 1) + timedelta(days=rng.randrange(700))
+        end = start + timedelta(days=rng.randrange(1, 400))
+        covered = []
+        for grain, bucket_start in covering_buckets(start, end):
+            day = bucket_start
+            while day < BUCKET_END[grain](bucket_start):
+                covered.append(day)
+                day += timedelta(days=1)
+        assert covered == [start + timedelta(days=n) for n in range((end - start).days)]
+
+
+@pytest.mark.parametrize('granularity', ['day', 'week', 'month'])
+def test_report_matches_the_raw_logs(app, history_user, granularity):
+    user_id, _, records = history_user
+    start, end = date(2026, 1, 20), date(2026, 4, 17)
+    with app.app_context():
+        report = ProgressReportService(user_id).get_report(start, end, granularity)
+
+    assert _figures(report["summary"]) == _raw_summary(records, start, end)
+    assert report["periods"][0]["start"] == '2026-01-20' and report["periods"][-1]["end"] == '2026-04-17'
+    for period in report["periods"]:
+        assert _figures(period) == _raw_summary(records, date.fromisoformat(period["start"]),
+                                                date.fromisoformat(period["end"]))
+    expected_periods = {'day': 87, 'week': 13, 'month': 4}[granularity]
+    assert len(report["periods"]) == expected_periods
+
+
+def test_report_reads_only_the_covering_buckets(app, history_user):
+    user_id, _, _ = history_user
+    statements = []
+    record = lambda conn, cursor, statement, parameters, *args: statements.append((statement, parameters))
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            ProgressReportService(user_id).get_report(date(2026, 1, 1), date(2026, 5, 1), 'month')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+
+    assert len(statements) == 1
+    statement, parameters = statements[0]
+    assert 'progress_bucket' in statement
+    assert not any(table in statement for table in ('diet_log', 'daily_nutrition', 'workout_log', 'weight_entry'))
+    # Four month buckets, no matter how many logs they hold
+    assert len([p for p in parameters if isinstance(p, str) and p.startswith('2026-')]) == 4
+
+
+def test_editing_and_deleting_logs_updates_every_grain(app, history_user):
+    user_id, _, _ = history_user
+    with app.app_context():
+        weigh_in = WeightEntry.query.filter_by(user_id=user_id).order_by(WeightEntry.date.asc()).first()
+        first_day = weigh_in.date.date()
+        db.session.delete(weigh_in)
+        db.session.commit()
+
+        moved = WorkoutLog.query.filter_by(user_id=user_id).order_by(WorkoutLog.date.desc()).first()
+        old_day = moved.date.date()
+        moved.date = moved.date + timedelta(days=40)
+        db.session.commit()
+
+        buckets = _buckets(user_id)
+        assert buckets[('day', first_day)][3] == 0
+        report = ProgressReportService(user_id).get_report(date(2026, 1, 1), date(2026, 7, 1), 'month')
+        second = WeightEntry.query.filter_by(user_id=user_id).order_by(WeightEntry.date.asc()).first()
+        assert report["summary"]["weight"]["start_kg"] == second.weight_kg
+        assert buckets[('day', old_day)][2] == 0
+        assert buckets[('day', moved.date.date())][2] == 1
+        assert report["summary"]["workouts"] == HISTORY_DAYS // 2
+
+
+def test_rebuild_matches_the_incremental_buckets(app, history_user):
+    user_id, tenant_id, _ = history_user
+    with app.app_context():
+        incremental = _buckets(user_id)
+        assert len([key for key in incremental if key[0] == 'month']) == 5
+
+        # A bulk insert bypasses the flush hook; the rebuild picks it up
+        db.session.execute(insert(WorkoutLog).values(client_id=tenant_id, user_id=user_id, name='Bulk',
+                                                     date=datetime(2025, 6, 1, 9, tzinfo=timezone.utc)))
+        db.session.commit()
+        assert rebuild_progress_buckets([user_id]) == len(incremental) + 3
+
+        rebuilt = _buckets(user_id)
+        for key in (('day', date(2025, 6, 1)), ('week', date(2025, 5, 26)), ('month', date(2025, 6, 1))):
+            assert rebuilt.pop(key)[2] == 1
+        assert rebuilt == incremental
+
+
+def test_report_route(app, seeded_client, logged_in_user):
+    headers = logged_in_user['headers']
+    response = seeded_client.post('/api/progress/weight/log', headers=headers, json={"weight_kg": 79.5})
+    assert response.status_code == 201
+
+    response = seeded_client.get('/api/progress/report/me', headers=headers)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    report = response.get_json()
+    assert report["granularity"] == 'day' and len(report["periods"]) == 30
+    assert report["periods"][-1]["weight"]["end_kg"] == 79.5
+    assert report["summary"]["weight"]["weigh_ins"] == 1
+
+    response = seeded_client.get('/api/progress/report/me?from=2025-01-01&to=2026-01-01', headers=headers)
+    assert response.get_json()["granularity"] == 'month'
+
+    for query in ('from=2026-02-01&to=2026-01-01', 'from=yesterday', 'granularity=year',
+                  'from=2020-01-01&to=2026-01-01'):
+        response = seeded_client.get(f'/api/progress/report/me?{query}', headers=headers)
+        assert response.status_code == 400, query
@@ -0,0 +1,145 @@
+# tests/test_query_plans.py
+"""
+Query-plan regression suite: seeds a large history and asserts with
+EXPLAIN QUERY PLAN that every statement the history and report paths run
+against the per-user log tables is answered through an index.
+"""
+import random
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import event
+from app.models import (db, User, DietLog, DietPlan, WorkoutLog, ExerciseEntry, WeightEntry,
+                        MeasurementLog, WorkoutPlan, Achievement)
+from app.services.exercise_catalog import exercise_catalog
+from app.services.reporting_service import ReportingService, BatchReportingService
+from app.utils.pagination import paginate_by_date, decode_cursor
+
+LOG_TABLES = ['diet_log', 'daily_nutrition', 'progress_bucket', 'diet_plan', 'workout_log', 'weight_entry',
+              'measurement_log', 'workout_plan', 'achievement']
+
+ROWS_PER_TABLE = 400
+OTHER_USERS = 10
+
+
+@contextmanager
+def captured_selects():
+    """Records every SELECT statement (with its parameters) sent to the database."""
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', _record)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', _record)
+
+
+def assert_log_queries_use_indexes(statements):
+    checked = 0
+    for statement, parameters in statements:
+        tables = [t for t in LOG_TABLES if f'neondb.{t}' in statement or f'{t}.' in statement]
+        if not tables:
+            continue
+        plan = db.session.connection().exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {statement}", parameters
+        ).fetchall()
+        details = [row[-1] for row in plan]
+        for table in tables:
+            full_scans = [d for d in details if d.split(' ')[:2] in (['SCAN', table], ['SCAN', f'neondb.{table}'])]
+            assert not full_scans, \
+                f"Full scan of {table}:\n{statement}\n{details}"
+        checked += 1
+    assert checked, "No log-table queries were captured"
+
+
+@pytest.fixture(scope='module')
+def seeded_history(app, seeded_client):
+    """Bulk-inserts a long history on every log table for several users of the test tenant."""
+    with app.app_context():
+        tenant_id = db.session.query(User.client_id).first()
+        tenant_id = tenant_id[0] if tenant_id else 1
+        now = datetime.now(timezone.utc)
+        rng = random.Random(42)
+
+        users = []
+        for n in range(OTHER_USERS):
+            user = User(client_id=tenant_id, username=f'plan_user_{n}', email=f'plan.{n}@example.com',
+                        name=f'Plan User {n}', age=30, gender='Female', weight_kg=70, height_cm=170,
+                        fitness_goals='weight loss', activity_level='sedentary')
+            db.session.add(user)
+            users.append(user)
+        db.session.flush()
+
+        squat_id, = exercise_catalog.resolve(['Squat'])
+        for user in users:
+            for i in range(ROWS_PER_TABLE):
+                when = now - timedelta(hours=6 * i)
+                db.session.add(DietLog(client_id=tenant_id, user_id=user.id, meal_name='Meal',
+                                       calories=rng.randint(200, 900), date=when))
+                db.session.add(WeightEntry(client_id=tenant_id, user_id=user.id,
+                                           weight_kg=70 + rng.random(), date=when))
+                db.session.add(MeasurementLog(client_id=tenant_id, user_id=user.id, waist_cm=80, date=when))
+                workout = WorkoutLog(client_id=tenant_id, user_id=user.id, name='Session', date=when)
+                workout.exercises.append(ExerciseEntry(client_id=tenant_id, exercise_id=squat_id,
+                                                       sets=3, reps=5, weight=100))
+                db.session.add(workout)
+            for i in range(20):
+                when = now - timedelta(days=7 * i)
+                db.session.add(DietPlan(client_id=tenant_id, user_id=user.id, generated_plan={}, created_at=when))
+                db.session.add(WorkoutPlan(client_id=tenant_id, user_id=user.id, generated_plan={}, created_at=when))
+                db.session.add(Achievement(client_id=tenant_id, user_id=user.id, name=f'Badge {i}', unlocked_at=when))
+        db.session.commit()
+        db.session.execute(db.text('ANALYZE neondb'))
+        return [user.id for user in users]
+
+
+@pytest.mark.parametrize('path', [
+    '/api/diet/logs/me',
+    '/api/diet/plan/latest/me',
+    '/api/workout/history/me',
+    '/api/workout/plan/latest/me',
+    '/api/progress/weight/me',
+    '/api/progress/measurements/me',
+    '/api/progress/weekly-report/me',
+    '/api/progress/report/me?granularity=week',
+    '/api/reward/status/me',
+])
+def test_route_queries_use_indexes(app, seeded_client, seeded_history, logged_in_user, path):
+    with captured_selects() as statements:
+        response = seeded_client.get(path, headers=logged_in_user['headers'])
+    assert response.status_code in (200, 404), response.get_data(as_text=True)
+    assert_log_queries_use_indexes(statements)
+
+
+def test_deep_history_pages_use_indexes(app, seeded_history):
+    """A cursor page deep into the history is still an index range read."""
+    with app.app_context():
+        for model, descending in ((DietLog, True), (WorkoutLog, True), (WeightEntry, False), (MeasurementLog, False)):
+            query = model.query.filter_by(user_id=seeded_history[0])
+            _, cursor = paginate_by_date(query, model, 300, descending=descending)
+            with captured_selects() as statements:
+                rows, _ = paginate_by_date(query, model, 50, decode_cursor(cursor), descending=descending)
+            assert len(rows) == 50
+            assert_log_queries_use_indexes(statements)
+
+
+def test_reporting_service_queries_use_indexes(app, seeded_history):
+    with app.app_context():
+        with captured_selects() as statements:
+            for user_id in seeded_history:
+                reporter = ReportingService(user_id)
+                reporter.get_weekly_report()
+                reporter.get_diet_adherence_score(days=30)
+        assert_log_queries_use_indexes(statements)
+
+
+def test_batch_reporting_queries_use_indexes(app, seeded_history):
+    with app.app_context():
+        users = User.query.filter(User.id.in_(seeded_history)).all()
+        with captured_selects() as statements:
+            BatchReportingService().get_weekly_reports(users)
+        assert_log_queries_use_indexes(statements)
@@ -0,0 +1,100 @@
+# tests/test_report_cache.py
+import json
+from contextlib import contextmanager
+import pytest
+from sqlalchemy import event
+from app.models import db, User, WorkoutLog
+from app.services.reporting_service import ReportingService, BatchReportingService
+from app.utils.report_cache import report_cache
+
+LOG_TABLES = ('diet_log', 'daily_nutrition', 'workout_log', 'weight_entry')
+
+WRITES = [
+    ('post', '/api/diet/log', {"meal_name": "Lunch", "food_items": "Dal, rice", "calories": 550}),
+    ('post', '/api/workout/log', {"name": "Leg day", "exercises": [{"name": "Squat", "sets": 3, "reps": 5,
+                                                                   "weight": 100}]}),
+    ('post', '/api/progress/weight/log', {"weight_kg": 79.2}),
+    ('put', '/api/user/profile/me', {"age": 31}),
+]
+
+
+@contextmanager
+def captured_statements():
+    statements = []
+    record = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+
+def _data_version(app, user_id):
+    with app.app_context():
+        return db.session.query(User.data_version).filter(User.id == user_id).scalar()
+
+
+def test_repeated_report_loads_are_served_from_the_cache(app, seeded_client, logged_in_user):
+    headers = logged_in_user['headers']
+    first = seeded_client.get('/api/progress/weekly-report/me', headers=headers)
+    assert first.status_code == 200
+
+    hits = report_cache.stats()['hits']
+    with app.app_context(), captured_statements() as statements:
+        second = seeded_client.get('/api/progress/weekly-report/me', headers=headers)
+    assert second.get_json() == first.get_json()
+    assert not [s for s in statements if any(table in s for table in LOG_TABLES)]
+    assert report_cache.stats()['hits'] == hits + 1
+
+
+@pytest.mark.parametrize('method, path, payload', WRITES)
+def test_every_write_route_bumps_the_data_version(app, seeded_client, logged_in_user, method, path, payload):
+    headers = logged_in_user['headers']
+    seeded_client.get('/api/progress/weekly-report/me', headers=headers)
+    before = _data_version(app, logged_in_user['user_id'])
+
+    response = getattr(seeded_client, method)(path, headers=headers, data=json.dumps(payload))
+    assert response.status_code in (200, 201), response.get_data(as_text=True)
+    assert _data_version(app, logged_in_user['user_id']) == before + 1
+
+    misses = report_cache.stats()['misses']
+    seeded_client.get('/api/progress/weekly-report/me', headers=headers)
+    assert report_cache.stats()['misses'] == misses + 1
+
+
+def test_report_reflects_a_write_immediately(app, seeded_client, logged_in_user):
+    headers = logged_in_user['headers']
+    report = seeded_client.get('/api/progress/weekly-report/me', headers=headers).get_json()
+    assert report['summary']['workouts_completed'] == 0
+
+    seeded_client.post('/api/workout/log', headers=headers, data=json.dumps(WRITES[1][2]))
+    report = seeded_client.get('/api/progress/weekly-report/me', headers=headers).get_json()
+    assert report['summary']['workouts_completed'] == 1
+
+
+def test_rolled_back_writes_keep_the_version(app, logged_in_user):
+    user_id = logged_in_user['user_id']
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        db.session.add(WorkoutLog(client_id=user.client_id, user_id=user_id, name='Session'))
+        db.session.flush()
+        assert db.session.query(User.data_version).filter(User.id == user_id).scalar() == 1
+        db.session.rollback()
+    assert _data_version(app, user_id) == 0
+
+
+def test_batch_reports_share_the_cache(app, logged_in_user):
+    user_id = logged_in_user['user_id']
+    with app.app_context():
+        users = User.query.filter(User.id == user_id).all()
+        batch = BatchReportingService().get_weekly_reports(users)
+
+        with captured_statements() as statements:
+            report = ReportingService(user_id).get_weekly_report()
+        assert report == batch[user_id]
+        assert not [s for s in statements if any(table in s for table in LOG_TABLES)]
+
+        # And a second batch pass computes nothing
+        with captured_statements() as statements:
+            assert BatchReportingService().get_weekly_reports(users) == batch
+        assert statements == []
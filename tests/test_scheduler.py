@@ -0,0 +1,109 @@
+# tests/test_scheduler.py
+import os
+import subprocess
+import sys
+import uuid
+from datetime import timedelta
+from sqlalchemy import create_engine, event, update
+from app.models import db, SchedulerLease
+from app.services.scheduler_service import LeaderLease, LeaderScheduler, _utcnow
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Each child process opens the shared SQLite files and races for the same lease
+CHILD_SCRIPT = """
+import sys
+from sqlalchemy import create_engine, event
+from app.services.scheduler_service import LeaderLease
+
+main_db, schema_db = sys.argv[1], sys.argv[2]
+engine = create_engine(f"sqlite:///{main_db}", connect_args={"timeout": 30})
+event.listen(engine, "connect", lambda conn, _: conn.execute(f"ATTACH DATABASE '{schema_db}' AS neondb"))
+print(LeaderLease(name="cluster", ttl=60, engine=engine).try_acquire())
+"""
+
+
+def _lease_name():
+    return f"test-{uuid.uuid4().hex[:8]}"
+
+
+def test_only_one_holder_at_a_time(app):
+    with app.app_context():
+        name = _lease_name()
+        first, second = LeaderLease(name=name), LeaderLease(name=name)
+        assert first.try_acquire()
+        assert not second.try_acquire()
+        # Renewing keeps the lease with its holder
+        assert first.try_acquire()
+        assert not second.try_acquire()
+        assert first.current_holder() == first.holder
+
+
+def test_expired_lease_is_taken_over(app):
+    with app.app_context():
+        name = _lease_name()
+        first, second = LeaderLease(name=name), LeaderLease(name=name)
+        assert first.try_acquire()
+
+        # Simulate the leader dying: its lease runs out without being renewed
+        with db.engine.begin() as conn:
+            conn.execute(update(SchedulerLease.__table__)
+                         .where(SchedulerLease.__table__.c.name == name)
+                         .values(expires_at=_utcnow() - timedelta(seconds=1)))
+        assert first.current_holder() is None
+        assert second.try_acquire()
+        assert not first.try_acquire()
+
+
+def test_release_hands_the_lease_over_immediately(app):
+    with app.app_context():
+        name = _lease_name()
+        first, second = LeaderLease(name=name), LeaderLease(name=name)
+        assert first.try_acquire()
+        first.release()
+        assert second.try_acquire()
+
+
+def test_scheduled_jobs_run_only_on_the_leader(app):
+    runs = []
+
+    def job(job_app):
+        runs.append(job_app)
+
+    name = _lease_name()
+    schedulers = []
+    for _ in range(3):
+        scheduler = LeaderScheduler()
+        scheduler.init_app(app)
+        scheduler.lease.name = name
+        schedulers.append(scheduler)
+
+    for scheduler in schedulers:
+        scheduler.run_if_leader(job)
+    assert runs == [app]
+    assert [s.is_leader for s in schedulers] == [True, False, False]
+
+    # The leader shuts down and releases; the next heartbeat elects someone else
+    schedulers[0].shutdown()
+    assert schedulers[1].heartbeat()
+    schedulers[1].shutdown()
+
+
+def test_one_leader_across_processes(tmp_path):
+    main_db, schema_db = str(tmp_path / 'main.db'), str(tmp_path / 'neondb.db')
+    engine = create_engine(f"sqlite:///{main_db}")
+    event.listen(engine, "connect", lambda conn, _: conn.execute(f"ATTACH DATABASE '{schema_db}' AS neondb"))
+    SchedulerLease.__table__.create(engine)
+    engine.dispose()
+
+    children = [
+        subprocess.Popen([sys.executable, '-c', CHILD_SCRIPT, main_db, schema_db],
+                         cwd=REPO_ROOT, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        for _ in range(4)
+    ]
+    results = []
+    for child in children:
+        out, err = child.communicate(timeout=120)
+        assert child.returncode == 0, err
+        results.append(out.strip().splitlines()[-1])
+    assert sorted(results) == ['False', 'False', 'False', 'True']
@@ -0,0 +1,111 @@
+# tests/test_template_diet_engine.py
+import json
+import time
+import pytest
+from app.models import db, Client
+from app.services.template_diet_engine import TemplateDietEngine, DAYS, MEAL_SLOTS, load_food_table
+
+
+def _day_calories(plan, day):
+    return sum(meal['calories'] for meal in plan['weekly_plan'][day].values())
+
+
+def _all_items(plan):
+    return [meal['items'] for day in plan['weekly_plan'].values() for meal in day.values()]
+
+
+@pytest.mark.parametrize('target', [1400, 1800, 2200, 2800])
+def test_every_day_hits_the_calorie_target(target):
+    engine = TemplateDietEngine()
+    plan = engine.build_plan(target, diet_type='non-veg', monthly_budget=10000)
+    for day in DAYS:
+        assert abs(_day_calories(plan, day) - target) <= target * engine.tolerance + 10, day
+
+
+def test_plan_has_the_llm_plan_shape():
+    plan = TemplateDietEngine().build_plan(2000, goal='Weight loss', weight_kg=80)
+    assert list(plan['weekly_plan']) == list(DAYS)
+    for day in plan['weekly_plan'].values():
+        assert list(day) == [slot for slot, _, _ in MEAL_SLOTS]
+        for meal in day.values():
+            assert {'items', 'portion', 'calories'} <= set(meal)
+    summary = plan['summary']
+    assert summary['target_daily_calories'] == '2000'
+    assert summary['primary_goal'] == 'Weight loss'
+    assert summary['dietary_preference'] == 'Veg'
+    assert summary['cuisine_focus'] == 'Strictly Indian'
+    assert summary['protein_target_g'] == 96
+
+
+def test_veg_plans_and_exclusions_are_respected():
+    foods = {item.name: item for item in load_food_table()}
+    plan = TemplateDietEngine().build_plan(2200, diet_type='veg', disliked_foods='Paneer, rajma',
+                                           allergies='peanuts, lactose')
+    for name in _all_items(plan):
+        item = foods[name]
+        assert item.diet == 'veg'
+        assert not item.allergens & {'nuts', 'dairy'}
+        assert 'paneer' not in name.lower() and 'rajma' not in name.lower()
+
+
+def test_optional_cuisines_are_used_sparingly():
+    foods = {item.name: item for item in load_food_table()}
+    plan = TemplateDietEngine().build_plan(2200, diet_type='non-veg', monthly_budget=9000,
+                                           optional_cuisines=['Chinese', 'Italian', 'string'])
+    foreign = [name for name in _all_items(plan) if foods[name].cuisine != 'indian']
+    assert 1 <= len(foreign) <= 3
+    assert {foods[name].cuisine for name in foreign} <= {'chinese', 'italian'}
+    assert plan['summary']['cuisine_focus'] == 'Primarily Indian with some Chinese, Italian options.'
+
+
+def test_budget_is_respected_when_achievable():
+    plan = TemplateDietEngine().build_plan(2000, monthly_budget=4500)
+    assert plan['summary']['within_budget']
+    assert plan['summary']['estimated_monthly_cost'] <= 4500
+
+    # A budget no menu can meet still gets the cheapest plan, flagged as over budget
+    tight = TemplateDietEngine().build_plan(2000, monthly_budget=1500)
+    assert not tight['summary']['within_budget']
+    assert tight['summary']['estimated_monthly_cost'] <= plan['summary']['estimated_monthly_cost']
+
+
+def test_no_dish_repeats_within_a_day():
+    plan = TemplateDietEngine().build_plan(2400, diet_type='non-veg', monthly_budget=6000)
+    for day in plan['weekly_plan'].values():
+        names = [meal['items'] for meal in day.values()]
+        assert len(names) == len(set(names))
+
+
+def test_impossible_exclusions_raise():
+    with pytest.raises(ValueError):
+        TemplateDietEngine().build_plan(2000, allergies='dairy, gluten, nuts, soy',
+                                        disliked_foods='rice, dal, chana, oats, corn, fruit, egg, vegetables')
+
+
+def test_plans_build_in_milliseconds():
+    engine = TemplateDietEngine()
+    engine.build_plan(2000)
+    started = time.perf_counter()
+    engine.build_plan(2300, diet_type='non-veg', optional_cuisines=['chinese'])
+    assert time.perf_counter() - started < 0.5
+
+
+def test_template_tenant_gets_a_plan_without_the_llm(app, seeded_client, logged_in_user, monkeypatch):
+    monkeypatch.setitem(app.config, 'GEMINI_API_KEY', None)
+    with app.app_context():
+        tenant = Client.query.filter_by(api_key=seeded_client.api_key).first()
+        tenant.plan_engine = 'template'
+        db.session.commit()
+    try:
+        response = seeded_client.post('/api/diet/generate-plan', headers=logged_in_user['headers'],
+                                      data=json.dumps({"activityLevel": "sedentary", "diet_type": "veg"}))
+        assert response.status_code == 200, response.get_data(as_text=True)
+        assert response.get_json()['summary']['engine'] == 'template'
+
+        latest = seeded_client.get('/api/diet/plan/latest/me', headers=logged_in_user['headers'])
+        assert latest.status_code == 200
+    finally:
+        with app.app_context():
+            tenant = Client.query.filter_by(api_key=seeded_client.api_key).first()
+            tenant.plan_engine = 'llm'
+            db.session.commit()
@@ -0,0 +1,149 @@
+# tests/test_template_workout_engine.py
+import json
+import time
+import pytest
+from types import SimpleNamespace
+from app.models import db, Client
+from app.services.workout_planner_service import WorkoutPlannerService
+from app.services.template_workout_engine import (TemplateWorkoutEngine, DAYS, EQUIPMENT_TIERS, LEVELS,
+                                                  condition_tags, load_exercise_library)
+
+
+def _training_days(plan):
+    return {day: schedule for day, schedule in plan['weekly_schedule'].items() if schedule['day_type'] != 'Rest'}
+
+
+def _exercise_names(plan):
+    return [exercise['name'] for day in _training_days(plan).values() for exercise in day['exercises']]
+
+
+@pytest.mark.parametrize('workouts_per_week', ['1', '3', '4', '5+', '7'])
+def test_plan_has_the_llm_plan_shape(workouts_per_week):
+    plan = TemplateWorkoutEngine().build_plan('intermediate', 'Gym access', workouts_per_week, 60,
+                                              goal='Build muscle')
+    assert plan['plan_name'] == 'Weekly Plan for Build muscle'
+    assert list(plan['weekly_schedule']) == list(DAYS)
+    assert len(_training_days(plan)) == plan['summary']['workouts_per_week']
+    for day in _training_days(plan).values():
+        assert day['day_type'].endswith(' Day')
+        assert 5 <= len(day['exercises']) <= 7
+        names = [exercise['name'] for exercise in day['exercises']]
+        assert len(names) == len(set(names))
+        for exercise in day['exercises']:
+            assert {'name', 'sets', 'reps', 'rest_seconds', 'form_guidance'} <= set(exercise)
+
+
+def test_equipment_and_level_are_respected():
+    library = {exercise.name: exercise for exercise in load_exercise_library()}
+    plan = TemplateWorkoutEngine().build_plan('beginner', 'bodyweight only', '3', 45)
+    for name in _exercise_names(plan):
+        assert library[name].equipment == EQUIPMENT_TIERS['bodyweight only']
+        assert library[name].level == LEVELS.index('beginner')
+
+    # With a gym available, most of the week should use it
+    gym_plan = TemplateWorkoutEngine().build_plan('intermediate', 'Gym access', '4', 60)
+    gym_names = _exercise_names(gym_plan)
+    assert sum(library[name].equipment == EQUIPMENT_TIERS['gym access'] for name in gym_names) > len(gym_names) / 2
+
+
+def test_health_conditions_exclude_contraindicated_exercises():
+    library = {exercise.name: exercise for exercise in load_exercise_library()}
+    assert condition_tags('Bad knees, lower back pain and high BP') == {'knee', 'lower_back', 'hypertension'}
+    assert condition_tags('None') == frozenset()
+
+    plan = TemplateWorkoutEngine().build_plan('advanced', 'Gym access', '6', 75,
+                                              health_conditions='ACL tear in the left knee, hypertension')
+    assert plan['summary']['avoided_conditions'] == ['hypertension', 'knee']
+    for name in _exercise_names(plan):
+        assert not library[name].contraindications & {'knee', 'hypertension'}
+    # Leg days lose their squats and lunges but are still filled from other patterns
+    for day in _training_days(plan).values():
+        assert len(day['exercises']) >= 5
+
+
+def test_goal_and_duration_shape_the_prescription():
+    strength = TemplateWorkoutEngine().build_plan('intermediate', 'Gym access', '3', 90, goal='Get stronger')
+    fat_loss = TemplateWorkoutEngine().build_plan('intermediate', 'Gym access', '3', 90, goal='Fat loss')
+    first = lambda plan: next(iter(_training_days(plan).values()))['exercises'][0]
+    assert first(strength)['reps'] < first(fat_loss)['reps']
+    assert first(strength)['rest_seconds'] > first(fat_loss)['rest_seconds']
+
+    short = TemplateWorkoutEngine().build_plan('intermediate', 'Gym access', '3', 20, goal='Fat loss')
+    long = TemplateWorkoutEngine().build_plan('intermediate', 'Gym access', '3', 90, goal='Fat loss')
+    short_volume = sum(e['sets'] for day in _training_days(short).values() for e in day['exercises'])
+    long_volume = sum(e['sets'] for day in _training_days(long).values() for e in day['exercises'])
+    assert short_volume < long_volume
+
+
+def test_impossible_conditions_raise():
+    engine = TemplateWorkoutEngine(exercises=[e for e in load_exercise_library() if e.contraindications])
+    with pytest.raises(ValueError):
+        engine.build_plan('beginner', 'bodyweight only', '3', 45,
+                          health_conditions='knee, back, shoulder, wrist, elbow, ankle, neck, hypertension')
+
+
+def test_plans_build_well_under_ten_milliseconds():
+    engine = TemplateWorkoutEngine()
+    engine.build_plan()
+    runs = 50
+    started = time.perf_counter()
+    for _ in range(runs):
+        engine.build_plan('advanced', 'Gym access', '7', 60, 'shoulder impingement', 'Build muscle')
+    assert (time.perf_counter() - started) / runs < 0.01
+
+
+def test_refine_mode_sends_the_draft_to_the_llm(app, monkeypatch):
+    user = SimpleNamespace(client_id=None, fitness_goals='Build muscle', workouts_per_week='3',
+                           workout_duration=45, health_conditions='None')
+    prompts = []
+
+    def _refine(self, prompt):
+        prompts.append(prompt)
+        return {"plan_name": "Refined", "weekly_schedule": {}, "summary": {"engine": "template"}}
+
+    monkeypatch.setattr(WorkoutPlannerService, '_call_llm_api', _refine)
+    with app.app_context():
+        planner = WorkoutPlannerService(user, {"fitnessLevel": "beginner", "equipment": "bodyweight only"},
+                                        engine='refine')
+        result = planner.generate_plan()
+    assert result['engine'] == 'refine'
+    assert result['plan']['summary']['engine'] == 'refine'
+    assert '"weekly_schedule"' in prompts[0] and 'Bodyweight Squat' in prompts[0]
+
+
+def test_refine_mode_falls_back_to_the_draft(app, monkeypatch):
+    user = SimpleNamespace(client_id=None, fitness_goals='Lose weight', workouts_per_week='2',
+                           workout_duration=30, health_conditions=None)
+
+    def _fail(self, prompt):
+        raise RuntimeError("model unavailable")
+
+    monkeypatch.setattr(WorkoutPlannerService, '_call_llm_api', _fail)
+    with app.app_context():
+        result = WorkoutPlannerService(user, {"fitnessLevel": "beginner", "equipment": "Home gym"},
+                                       engine='refine').generate_plan()
+    assert result['success']
+    assert result['engine'] == 'template'
+    assert result['plan']['summary']['engine'] == 'template'
+
+
+@pytest.mark.parametrize('engine', ['template', 'refine'])
+def test_local_tenants_get_a_plan_without_the_llm(app, seeded_client, logged_in_user, monkeypatch, engine):
+    monkeypatch.setitem(app.config, 'GEMINI_API_KEY', None)
+    with app.app_context():
+        tenant = Client.query.filter_by(api_key=seeded_client.api_key).first()
+        tenant.workout_engine = engine
+        db.session.commit()
+    try:
+        response = seeded_client.post('/api/workout/generate-plan', headers=logged_in_user['headers'],
+                                      data=json.dumps({"fitnessLevel": "beginner", "equipment": "Home gym"}))
+        assert response.status_code == 200, response.get_data(as_text=True)
+        assert response.get_json()['summary']['engine'] == 'template'
+
+        latest = seeded_client.get('/api/workout/plan/latest/me', headers=logged_in_user['headers'])
+        assert latest.status_code == 200
+    finally:
+        with app.app_context():
+            tenant = Client.query.filter_by(api_key=seeded_client.api_key).first()
+            tenant.workout_engine = 'llm'
+            db.session.commit()
@@ -0,0 +1,56 @@
+# tests/test_token_revocation.py
+import uuid
+from datetime import timedelta
+from app.models import db, TokenBlocklist
+from app.utils.token_revocation import BloomFilter, revocation_filter, _utcnow
+
+
+def test_bloom_filter_has_no_false_negatives():
+    """Every added item must be reported as present."""
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    items = [uuid.uuid4().hex for _ in range(1000)]
+    for item in items:
+        bloom.add(item)
+    assert all(item in bloom for item in items)
+    false_positives = sum(uuid.uuid4().hex in bloom for _ in range(2000))
+    assert false_positives < 100
+
+
+def test_logged_out_token_is_rejected(seeded_client, logged_in_user):
+    """After logout the same access token must be refused."""
+    headers = logged_in_user['headers']
+    response = seeded_client.post('/api/auth/logout', headers=headers)
+    assert response.status_code == 200
+
+    response = seeded_client.get('/api/user/profile/me', headers=headers)
+    assert response.status_code == 401
+    assert "revoked" in response.get_json()['error']
+
+
+def test_revocations_from_other_workers_are_loaded_by_watermark(app):
+    """Rows inserted directly into the table (e.g. by another worker) are picked up on refresh."""
+    with app.app_context():
+        jti = uuid.uuid4().hex
+        assert not revocation_filter.is_revoked(jti)
+
+        db.session.add(TokenBlocklist(jti=jti))
+        db.session.commit()
+        revocation_filter.refresh(force=True)
+        assert revocation_filter.is_revoked(jti)
+
+
+def test_expired_revocations_age_out(app):
+    """Entries older than the token lifetime are dropped from memory and purged from the table."""
+    with app.app_context():
+        jti = uuid.uuid4().hex
+        long_ago = _utcnow() - revocation_filter.token_lifetime - timedelta(minutes=1)
+        db.session.add(TokenBlocklist(jti=jti, created_at=long_ago))
+        db.session.commit()
+        revocation_filter.revoke(jti, revoked_at=long_ago)
+
+        revocation_filter.refresh(force=True)
+        assert jti not in revocation_filter._revoked
+
+        revocation_filter.purge_expired()
+        db.session.expire_all()
+        assert TokenBlocklist.query.filter_by(jti=jti).first() is None
@@ -0,0 +1,117 @@
+# tests/test_training_analytics.py
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta, timezone
+import numpy as np
+from sqlalchemy import event
+from app.models import db, User, ExerciseEntry, WorkoutLog
+from app.services.exercise_catalog import exercise_catalog
+from app.services.exercise_stats import estimated_one_rep_max
+from app.services.training_analytics import TrainingAnalyticsService, estimated_one_rep_maxes, week_starts
+
+WORKOUT_TABLES = ('workout_log', 'exercise_entry')
+
+
+@contextmanager
+def captured_statements():
+    statements = []
+    record = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+
+def _today():
+    return datetime.now(timezone.utc).date()
+
+
+def _monday(day):
+    return day - timedelta(days=day.weekday())
+
+
+def _workout(user_id, day, *exercises):
+    """Logs a workout at noon UTC on `day`; exercises are (name, sets, reps, weight) tuples."""
+    user = db.session.get(User, user_id)
+    workout = WorkoutLog(client_id=user.client_id, user_id=user_id, name='Session',
+                         date=datetime.combine(day, time(12), timezone.utc))
+    exercise_ids = exercise_catalog.resolve([name for name, *_ in exercises])
+    for exercise_id, (_, sets, reps, weight) in zip(exercise_ids, exercises):
+        workout.exercises.append(ExerciseEntry(client_id=user.client_id, exercise_id=exercise_id,
+                                               sets=sets, reps=reps, weight=weight))
+    db.session.add(workout)
+    db.session.commit()
+    return workout
+
+
+def test_week_starts_and_one_rep_maxes():
+    days = np.array([(date(2025, 3, d) - date(1970, 1, 1)).days for d in (2, 3, 9)])
+    assert [str(np.datetime64(int(day), 'D')) for day in week_starts(days)] == \
+        ['2025-02-24', '2025-03-03', '2025-03-03']
+    weights, reps = np.array([100.0, 100.0, 80.0]), np.array([1, 5, 8])
+    assert estimated_one_rep_maxes(weights, reps).tolist() == \
+        [estimated_one_rep_max(weight, rep) for weight, rep in zip(weights.tolist(), reps.tolist())]
+
+
+def test_tonnage_progression_frequency_and_workload(app, logged_in_user):
+    user_id = logged_in_user['user_id']
+    today = _today()
+    with app.app_context():
+        _workout(user_id, today, ("Squat", 3, 5, 100), ("Bench", 3, 5, 60))
+        _workout(user_id, today - timedelta(days=7), ("Back Squat", 3, 5, 90))
+        _workout(user_id, today - timedelta(days=20), ("squat", 1, 1, 140))
+        _workout(user_id, today - timedelta(days=40), ("Bench Press", 1, 10, 50))
+        # Outside the 8 weeks analysed
+        _workout(user_id, today - timedelta(days=70), ("Squat", 5, 5, 60))
+
+        analytics = TrainingAnalyticsService(user_id).get_analytics(weeks=8, today=today)
+
+    first_week = _monday(today) - timedelta(weeks=7)
+    assert analytics['from'] == first_week.isoformat()
+    weekly = {week['week_start']: week for week in analytics['weekly']}
+    assert len(analytics['weekly']) == 8
+    assert weekly[_monday(today).isoformat()] == {"week_start": _monday(today).isoformat(),
+                                                  "tonnage": 2400.0, "sets": 6, "workouts": 1}
+    assert weekly[_monday(today - timedelta(days=7)).isoformat()]['tonnage'] == 1350.0
+    assert weekly[_monday(today - timedelta(days=40)).isoformat()]['tonnage'] == 500.0
+    assert sum(week['workouts'] for week in analytics['weekly']) == 4
+
+    squat, bench = analytics['exercises']
+    assert (squat['exercise'], squat['sessions'], bench['exercise'], bench['sessions']) == \
+        ("Barbell Back Squat", 3, "Barbell Bench Press", 2)
+    assert squat['sessions_per_week'] == 0.38
+    assert squat['last_performed'] == today.isoformat()
+    assert [(point['week_start'], point['best_e1rm'], point['top_weight']) for point in squat['progression']] == [
+        (_monday(today - timedelta(days=20)).isoformat(), 140.0, 140.0),
+        (_monday(today - timedelta(days=7)).isoformat(), 105.0, 90.0),
+        (_monday(today).isoformat(), 116.67, 100.0),
+    ]
+
+    # Acute: the last 7 days; chronic: the weekly average of the last 28
+    assert analytics['workload'] == {"acute_days": 7, "chronic_days": 28, "acute_load": 2400.0,
+                                     "chronic_load": 972.5, "acute_chronic_ratio": 2.47}
+
+
+def test_analytics_are_cached_until_a_workout_changes(app, seeded_client, logged_in_user):
+    headers = logged_in_user['headers']
+    user_id = logged_in_user['user_id']
+    with app.app_context():
+        _workout(user_id, _today(), ("Deadlift", 2, 5, 150))
+
+    first = seeded_client.get('/api/workout/analytics/me', headers=headers).get_json()
+    assert first['weekly'][-1]['tonnage'] == 1500.0
+    with app.app_context(), captured_statements() as statements:
+        assert seeded_client.get('/api/workout/analytics/me', headers=headers).get_json() == first
+    assert not [s for s in statements if any(table in s for table in WORKOUT_TABLES)]
+
+    # Editing an entry on its own moves the user to a new data version
+    with app.app_context():
+        entry = ExerciseEntry.query.join(WorkoutLog).filter(WorkoutLog.user_id == user_id).one()
+        entry.weight = 160
+        db.session.commit()
+    assert seeded_client.get('/api/workout/analytics/me', headers=headers).get_json()['weekly'][-1]['tonnage'] == 1600.0
+
+    assert seeded_client.get('/api/workout/analytics/me?weeks=0', headers=headers).status_code == 400
+    assert seeded_client.get('/api/workout/analytics/me?weeks=abc', headers=headers).status_code == 400
+    one_week = seeded_client.get('/api/workout/analytics/me?weeks=1', headers=headers).get_json()
+    assert len(one_week['weekly']) == 1
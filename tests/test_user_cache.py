@@ -0,0 +1,44 @@
+# tests/test_user_cache.py
+import json
+from app.utils.user_cache import user_cache
+
+
+def test_repeated_requests_reuse_the_user_snapshot(seeded_client, logged_in_user):
+    """Only the first authenticated request loads the user's identity from the database."""
+    user_cache.invalidate(logged_in_user['user_id'])
+    before = user_cache.stats()
+
+    for _ in range(3):
+        response = seeded_client.get('/api/diet/logs/me', headers=logged_in_user['headers'])
+        assert response.status_code == 200
+
+    after = user_cache.stats()
+    assert after['misses'] - before['misses'] == 1
+    assert after['hits'] - before['hits'] == 2
+
+
+def test_profile_update_invalidates_the_snapshot(app, seeded_client, logged_in_user):
+    """A profile update bumps the user's version and the next lookup sees the new name."""
+    user_id = logged_in_user['user_id']
+    with app.app_context():
+        old_identity = user_cache.get(user_id)
+
+    response = seeded_client.put('/api/user/profile/me', headers=logged_in_user['headers'],
+                                 data=json.dumps({"name": "Renamed User"}))
+    assert response.status_code == 200
+
+    with app.app_context():
+        new_identity = user_cache.get(user_id)
+    assert new_identity.name == "Renamed User"
+    assert new_identity.version > old_identity.version
+
+
+def test_weight_log_updates_the_full_profile(seeded_client, logged_in_user):
+    """Handlers that need the full User row still load and mutate it."""
+    headers = logged_in_user['headers']
+    response = seeded_client.post('/api/progress/weight/log', headers=headers,
+                                  data=json.dumps({"weight_kg": 77.5}))
+    assert response.status_code == 201
+
+    response = seeded_client.get('/api/user/profile/me', headers=headers)
+    assert response.get_json()['weight_kg'] == 77.5
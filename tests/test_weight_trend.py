@@ -0,0 +1,135 @@
+# tests/test_weight_trend.py
+import json
+from datetime import date, datetime, time, timedelta, timezone
+import pytest
+from app.models import db, User, WeightEntry, WeightTrend
+from app.services.reporting_service import ReportingService, smoothed_weight_changes
+from app.services.weight_trend import (SUM_COLUMNS, advance, project_goal, rebuild_weight_trend, slope_per_day,
+                                       trend_from_history)
+
+
+def _today():
+    return datetime.now(timezone.utc).date()
+
+
+def _weigh_in(user_id, day, weight_kg):
+    """Logs a weigh-in at noon UTC on `day`, in its own flush."""
+    user = db.session.get(User, user_id)
+    entry = WeightEntry(client_id=user.client_id, user_id=user_id, weight_kg=weight_kg,
+                        date=datetime.combine(day, time(12), timezone.utc))
+    db.session.add(entry)
+    db.session.commit()
+    return entry
+
+
+def _trend_row(user_id):
+    db.session.expire_all()
+    row = db.session.get(WeightTrend, user_id)
+    return {column.key: getattr(row, column.key) for column in WeightTrend.__table__.columns
+            if column.key not in ('user_id', 'client_id')} if row else None
+
+
+def _assert_same_state(actual, expected):
+    assert actual.keys() == expected.keys()
+    for key, value in expected.items():
+        assert actual[key] == (pytest.approx(value, rel=1e-9, abs=1e-9) if isinstance(value, float) else value), key
+
+
+def test_running_update_matches_the_whole_history():
+    start = datetime(2025, 1, 1, 7, 30)
+    moments = [start + timedelta(days=d, hours=h) for d, h in ((0, 0), (1, 2), (1, 14), (4, 0), (9, 3), (30, 0))]
+    weights = [90.0, 89.4, 89.9, 88.7, 88.1, 85.0]
+
+    state = None
+    for moment, weight in zip(moments, weights):
+        state = advance(state, moment, weight)
+    _assert_same_state(state, trend_from_history(moments, weights))
+    assert trend_from_history([], []) is None
+
+    # A steady loss of 0.1 kg a day is fitted exactly, whatever the weighting
+    steady = trend_from_history([start + timedelta(days=d) for d in range(20)], [80 - 0.1 * d for d in range(20)])
+    assert float(slope_per_day(*(steady[column] for column in SUM_COLUMNS))) == pytest.approx(-0.1)
+    # One weigh-in has no slope
+    assert float(slope_per_day(*(advance(None, start, 80.0)[column] for column in SUM_COLUMNS))) == 0.0
+
+
+def test_goal_projection():
+    day = date(2025, 3, 1)
+    assert project_goal(80, -0.1, None, day)['status'] == 'no_target'
+    assert project_goal(80.05, -0.1, 80, day) == {"status": "reached", "projected_date": "2025-03-01",
+                                                  "days_to_goal": 0}
+    assert project_goal(80, 0.1, 75, day)['status'] == 'not_trending_towards_goal'
+    assert project_goal(80, 0.0, 75, day)['status'] == 'not_trending_towards_goal'
+    assert project_goal(80, -0.001, 70, day)['status'] == 'beyond_projection_horizon'
+    assert project_goal(80, -0.1, 75, day) == {"status": "on_track", "projected_date": "2025-04-20",
+                                               "days_to_goal": 50}
+    assert project_goal(60, 0.05, 61, day)['days_to_goal'] == 20
+
+
+def test_log_weight_returns_the_trend_and_projection(app, seeded_client, logged_in_user):
+    headers = logged_in_user['headers']
+    user_id = logged_in_user['user_id']
+    empty = seeded_client.get('/api/progress/weight/trend/me', headers=headers).get_json()
+    assert (empty['entries'], empty['goal']['status']) == (0, 'no_weigh_ins')
+
+    response = seeded_client.put('/api/user/profile/me', headers=headers, data=json.dumps({"target_weight_kg": 75}))
+    assert response.status_code == 200
+    today = _today()
+    with app.app_context():
+        _weigh_in(user_id, today - timedelta(days=14), 81.4)
+        _weigh_in(user_id, today - timedelta(days=7), 80.7)
+
+    response = seeded_client.post('/api/progress/weight/log', headers=headers, data=json.dumps({"weight_kg": 80.0}))
+    assert response.status_code == 201
+    trend = response.get_json()['trend']
+    assert seeded_client.get('/api/progress/weight/trend/me', headers=headers).get_json() == trend
+
+    assert trend['entries'] == 3
+    assert trend['last_weigh_in']['weight_kg'] == 80.0
+    assert -0.8 < trend['slope_kg_per_week'] < -0.6
+    assert trend['target_weight_kg'] == 75
+    # The average lags behind the latest weigh-in while losing weight
+    assert 80.0 < trend['trend_kg'] < 80.7
+    goal = trend['goal']
+    assert goal['status'] == 'on_track'
+    assert goal['projected_date'] == (today + timedelta(days=goal['days_to_goal'])).isoformat()
+    assert goal['days_to_goal'] == pytest.approx((trend['trend_kg'] - 75) / -trend['slope_kg_per_week'] * 7, abs=2)
+
+
+def test_back_dated_edited_and_deleted_weigh_ins_recompute_the_trend(app, logged_in_user):
+    user_id = logged_in_user['user_id']
+    today = _today()
+    with app.app_context():
+        for days_ago, weight_kg in ((10, 92.0), (6, 91.1), (2, 90.6)):
+            _weigh_in(user_id, today - timedelta(days=days_ago), weight_kg)
+        _weigh_in(user_id, today - timedelta(days=8), 91.8)
+        edited = _weigh_in(user_id, today, 95.0)
+        edited.weight_kg = 90.2
+        db.session.commit()
+        db.session.delete(WeightEntry.query.filter_by(user_id=user_id, weight_kg=91.1).one())
+        db.session.commit()
+
+        maintained = _trend_row(user_id)
+        assert maintained['entries'] == 4
+        assert maintained['last_kg'] == 90.2
+        assert rebuild_weight_trend([user_id]) == 1
+        _assert_same_state(_trend_row(user_id), maintained)
+
+        for entry in WeightEntry.query.filter_by(user_id=user_id).all():
+            db.session.delete(entry)
+        db.session.commit()
+        assert _trend_row(user_id) is None
+
+
+def test_weekly_report_uses_the_smoothed_change(app, logged_in_user):
+    user_id = logged_in_user['user_id']
+    today = _today()
+    with app.app_context():
+        # A noisy week: the last weigh-in is up on the first, the trend is down
+        for days_ago, weight_kg in ((6, 81.0), (5, 80.2), (4, 80.4), (3, 79.8), (2, 79.9), (1, 79.5), (0, 81.2)):
+            _weigh_in(user_id, today - timedelta(days=days_ago), weight_kg)
+        sums = [_trend_row(user_id)[column] for column in SUM_COLUMNS]
+        report = ReportingService(user_id).get_weekly_report()
+
+    assert report['summary']['weight_change_kg'] == float(smoothed_weight_changes(sums)[0])
+    assert report['summary']['weight_change_kg'] < 0
@@ -0,0 +1,48 @@
+# tests/test_workout_history.py
+import json
+from sqlalchemy import event
+from app.models import db
+
+
+def _history_query_count(app, seeded_client, headers):
+    """Counts the statements the history route sends to the workout tables."""
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if 'workout_log' in statement or 'exercise_entry' in statement:
+            statements.append(statement)
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', _record)
+        try:
+            response = seeded_client.get('/api/workout/history/me?limit=200', headers=headers)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', _record)
+    assert response.status_code == 200
+    return len(statements), response.get_json()
+
+
+def _log_workouts(seeded_client, headers, count):
+    for i in range(count):
+        response = seeded_client.post('/api/workout/log', headers=headers, data=json.dumps({
+            "name": f"Session {i}",
+            "exercises": [{"name": "Squat", "sets": 3, "reps": 5, "weight": 100 + i},
+                          {"name": "Bench Press", "sets": 3, "reps": 8, "weight": 60}]
+        }))
+        assert response.status_code == 201
+
+
+def test_workout_history_query_count_is_constant(app, seeded_client, logged_in_user):
+    """The history route issues the same number of queries for 2 workouts as for 25."""
+    headers = logged_in_user['headers']
+
+    _log_workouts(seeded_client, headers, 2)
+    small_count, small_history = _history_query_count(app, seeded_client, headers)
+
+    _log_workouts(seeded_client, headers, 23)
+    large_count, large_history = _history_query_count(app, seeded_client, headers)
+
+    assert len(small_history) == 2
+    assert len(large_history) == 25
+    assert small_count == large_count == 2
+    assert all(len(workout['exercises']) == 2 for workout in large_history)